@@ -2,13 +2,17 @@ from ninja import Router
 from django.shortcuts import get_object_or_404
 from django.http import HttpRequest
 from ninja.errors import HttpError
-from typing import List
+from typing import List, Optional, Union
 
 from core.jwt_auth import JWTAuth
 from apps.stock.models import Symbol
 from .models import Bot, Trade
-from .schemas import BotSchema, BotDetailSchema, TradeSchema, SymbolBotsSchema
-from .permissions import user_has_symbol_access, user_can_access_bot
+from .schemas import (
+    BotSchema, BotDetailSchema, TradeSchema, SymbolBotsSchema, TradePageSchema, TradeColumnsSchema,
+)
+from .permissions import user_has_symbol_access, user_can_access_bot, user_symbol_ids
+from .services.trade_feed import DEFAULT_PAGE_SIZE, TradeFeedService, recent_trades_prefetch
+from .services.performance import BotPerformanceService
 
 router = Router()
 
@@ -23,7 +27,12 @@ def get_symbol_bots(request: HttpRequest, symbol_id: int):
         raise HttpError(403, "Bạn cần mua mã này để xem bot")
 
     symbol = get_object_or_404(Symbol, id=symbol_id)
-    bots = Bot.objects.filter(symbol=symbol).select_related('symbol').prefetch_related('trades').order_by('bot_type')
+    bots = (
+        Bot.objects.filter(symbol=symbol)
+        .select_related('symbol')
+        .prefetch_related(recent_trades_prefetch())
+        .order_by('bot_type')
+    )
 
     return {
         'symbol_id': symbol.id,
@@ -37,17 +46,12 @@ def list_bots(request: HttpRequest):
     """Get all bots that the authenticated user has purchased"""
     user = request.auth
 
-    # Get all bots
-    all_bots = Bot.objects.select_related('symbol').all()
-
-    # Filter bots based on user's symbol licenses
-    accessible_bots = [
-        bot
-        for bot in all_bots
-        if user_has_symbol_access(user, bot.symbol_id)
-    ]
-
-    return accessible_bots
+    # Lọc theo license ngay trong SQL
+    return list(
+        Bot.objects.select_related('symbol')
+        .filter(symbol_id__in=user_symbol_ids(user))
+        .order_by('symbol_id', 'bot_type')
+    )
 
 
 @router.get("/bots/{bot_id}", response=BotDetailSchema, tags=["Bots"], auth=JWTAuth())
@@ -56,7 +60,7 @@ def get_bot(request: HttpRequest, bot_id: int):
     user = request.auth
 
     bot = get_object_or_404(
-        Bot.objects.select_related('symbol').prefetch_related('trades'),
+        Bot.objects.select_related('symbol').prefetch_related(recent_trades_prefetch()),
         id=bot_id
     )
 
@@ -67,9 +71,42 @@ def get_bot(request: HttpRequest, bot_id: int):
     return bot
 
 
-@router.get("/bots/{bot_id}/trades", response=List[TradeSchema], tags=["Bots"], auth=JWTAuth())
-def list_bot_trades(request: HttpRequest, bot_id: int):
-    """Get all trades for a specific bot - requires user to have purchased the symbol"""
+@router.get("/bots/{bot_id}/performance", response=dict, tags=["Bots"], auth=JWTAuth())
+def get_bot_performance(request: HttpRequest, bot_id: int):
+    """Win rate, profit factor, drawdown, equity curve, rolling stats of a bot - requires purchase"""
+    user = request.auth
+
+    bot = get_object_or_404(Bot, id=bot_id)
+    if not user_can_access_bot(user, bot):
+        raise HttpError(403, f"Bạn cần mua mã này để xem hiệu suất bot")
+
+    return BotPerformanceService().bot_performance(bot)
+
+
+@router.get("/symbols/{symbol_id}/performance", response=dict, tags=["Bots"], auth=JWTAuth())
+def get_symbol_performance(request: HttpRequest, symbol_id: int):
+    """Performance gộp tất cả bots của symbol - requires purchase"""
+    user = request.auth
+
+    if not user_has_symbol_access(user, symbol_id):
+        raise HttpError(403, "Bạn cần mua mã này để xem hiệu suất bot")
+    get_object_or_404(Symbol, id=symbol_id)
+
+    return BotPerformanceService().symbol_performance(symbol_id)
+
+
+@router.get("/bots/{bot_id}/trades", response=Union[TradePageSchema, TradeColumnsSchema], tags=["Bots"], auth=JWTAuth())
+def list_bot_trades(
+    request: HttpRequest,
+    bot_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    format: str = "rows",
+):
+    """
+    Trades of a bot, newest first, keyset paginated - requires user to have purchased the symbol.
+    format=columns trả về mảng song song theo cột cho chart.
+    """
     user = request.auth
 
     bot = get_object_or_404(Bot, id=bot_id)
@@ -78,18 +115,27 @@ def list_bot_trades(request: HttpRequest, bot_id: int):
     if not user_can_access_bot(user, bot):
         raise HttpError(403, f"You need to purchase symbol to access these trades")
 
-    trades = Trade.objects.filter(bot=bot).order_by('-entry_date')
-    return list(trades)
+    return TradeFeedService().page(
+        symbol_ids=[bot.symbol_id], bot_id=bot.id, limit=limit, cursor=cursor, format=format
+    )
 
-@router.get("/trades", response=List[TradeSchema], tags=["Bots"], auth=JWTAuth())
-def list_all_trades(request: HttpRequest, bot_id: int = None, symbol_id: int = None):
-    """Get all trades for symbols the user has purchased"""
-    user = request.auth
 
-    trades = Trade.objects.select_related('bot', 'bot__symbol').all()
+@router.get("/trades", response=Union[TradePageSchema, TradeColumnsSchema], tags=["Bots"], auth=JWTAuth())
+def list_all_trades(
+    request: HttpRequest,
+    bot_id: int = None,
+    symbol_id: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    format: str = "rows",
+):
+    """
+    Trades for symbols the user has purchased, newest first, keyset paginated.
+    Gửi lại next_cursor để lấy trang kế tiếp; format=columns cho chart.
+    """
+    user = request.auth
 
     if bot_id:
-        trades = trades.filter(bot_id=bot_id)
         # Check access for specific bot
         bot = get_object_or_404(Bot, id=bot_id)
         if not user_can_access_bot(user, bot):
@@ -99,15 +145,16 @@ def list_all_trades(request: HttpRequest, bot_id: int = None, symbol_id: int = N
         # Check access for specific symbol
         if not user_has_symbol_access(user, symbol_id):
             raise HttpError(403, "You need to purchase this symbol to access these trades")
-        trades = trades.filter(bot__symbol_id=symbol_id)
 
-    # Filter trades to only show those from bots the user has access to
-    accessible_trades = [
-        trade for trade in trades
-        if user_has_symbol_access(user, trade.bot.symbol_id)
-    ]
-
-    return sorted(accessible_trades, key=lambda t: t.entry_date, reverse=True)
+    # Lọc license, sort và phân trang đều trong SQL
+    return TradeFeedService().page(
+        symbol_ids=user_symbol_ids(user),
+        bot_id=bot_id or None,
+        symbol_id=symbol_id or None,
+        limit=limit,
+        cursor=cursor,
+        format=format,
+    )
 
 
 @router.get("/trades/{trade_id}", response=TradeSchema, tags=["Bots"], auth=JWTAuth())
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.bots.models import Bot
+from apps.bots.services.performance import BotPerformanceService
+
+
+class Command(BaseCommand):
+    help = 'Tính lại bảng hiệu suất bot (BotPerformance) từ toàn bộ lệnh Close'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            help='Chỉ tính lại bots của một symbol (VD: VNM)',
+        )
+
+    def handle(self, *args, **options):
+        bots = Bot.objects.all()
+        if options.get('symbol'):
+            bots = bots.filter(symbol__name=options['symbol'].upper())
+
+        result = BotPerformanceService().rebuild(bots.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Đã tính lại hiệu suất cho {result['bots']} bots"))
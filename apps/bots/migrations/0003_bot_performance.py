@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bots', '0002_alter_bot_unique_together_bot_bot_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotPerformance',
+            fields=[
+                ('bot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='performance', serialize=False, to='bots.bot')),
+                ('closed_trades', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('total_profit', models.FloatField(default=0.0, help_text='Tổng % lợi nhuận (equity hiện tại)')),
+                ('gross_profit', models.FloatField(default=0.0, help_text='Tổng lợi nhuận các lệnh thắng')),
+                ('gross_loss', models.FloatField(default=0.0, help_text='Tổng lỗ các lệnh thua (số dương)')),
+                ('equity_peak', models.FloatField(default=0.0)),
+                ('max_drawdown', models.FloatField(default=0.0, help_text='Sụt giảm lớn nhất từ đỉnh equity')),
+                ('equity_curve', models.JSONField(default=list, help_text='[[epoch_seconds, equity], ...]')),
+                ('recent_profits', models.JSONField(default=list, help_text='Profit các lệnh gần nhất cho rolling stats')),
+                ('last_entry_date', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'bot_performance',
+            },
+        ),
+    ]
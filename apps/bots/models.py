@@ -71,3 +71,34 @@ class Trade(models.Model):
 
     def __str__(self):
         return f"{self.bot_id} - {self.trade_type} ({self.trans_id})"
+
+
+class BotPerformance(models.Model):
+    """
+    Tổng hợp hiệu suất của bot từ các lệnh Close (profit là % lợi nhuận mỗi lệnh).
+    Cập nhật tăng dần khi webhook nhận lệnh Close; API đọc trực tiếp, không quét lại trades.
+    """
+    bot = models.OneToOneField(
+        Bot,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='performance'
+    )
+    closed_trades = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    total_profit = models.FloatField(default=0.0, help_text='Tổng % lợi nhuận (equity hiện tại)')
+    gross_profit = models.FloatField(default=0.0, help_text='Tổng lợi nhuận các lệnh thắng')
+    gross_loss = models.FloatField(default=0.0, help_text='Tổng lỗ các lệnh thua (số dương)')
+    equity_peak = models.FloatField(default=0.0)
+    max_drawdown = models.FloatField(default=0.0, help_text='Sụt giảm lớn nhất từ đỉnh equity')
+    equity_curve = models.JSONField(default=list, help_text='[[epoch_seconds, equity], ...]')
+    recent_profits = models.JSONField(default=list, help_text='Profit các lệnh gần nhất cho rolling stats')
+    last_entry_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'bot_performance'
+
+    def __str__(self):
+        return f"{self.bot_id} - {self.closed_trades} closed trades"
@@ -1,5 +1,14 @@
-from django.utils import timezone
-from apps.seapay.models import PayUserSymbolLicense, LicenseStatus
+from typing import FrozenSet
+
+from apps.seapay.services.entitlement_service import get_user_entitlement
+
+
+def user_symbol_ids(user) -> FrozenSet[int]:
+    """
+    Tập symbol_id user đang có license còn hiệu lực.
+    Dùng để lọc trong SQL: .filter(symbol_id__in=user_symbol_ids(user)).
+    """
+    return get_user_entitlement(user).symbol_ids
 
 
 def user_has_symbol_access(user, symbol_id: int) -> bool:
@@ -13,27 +22,8 @@ def user_has_symbol_access(user, symbol_id: int) -> bool:
     Returns:
         bool: True if user has active license, False otherwise
     """
-    if not user or not user.is_authenticated:
-        return False
-
-    # Check if user has any active license for this symbol
-    active_licenses = PayUserSymbolLicense.objects.filter(
-        user=user,
-        symbol_id=symbol_id,
-        status=LicenseStatus.ACTIVE
-    )
-
-    # Check if any license is currently valid
-    now = timezone.now()
-    for license in active_licenses:
-        # If end_at is None, it's a lifetime license
-        if license.end_at is None:
-            return True
-        # If end_at is in the future, license is still valid
-        if license.end_at > now:
-            return True
-
-    return False
+    # Entitlement được load 1 lần/request (cache ngắn giữa các request), không query mỗi lần gọi
+    return get_user_entitlement(user).has(symbol_id)
 
 
 def user_can_access_bot(user, bot) -> bool:
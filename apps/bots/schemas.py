@@ -1,8 +1,10 @@
 from ninja import Schema
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from decimal import Decimal
 
+from .services.trade_feed import bot_recent_trades, bot_trades_next_cursor
+
 
 class TradeSchema(Schema):
     """Schema for Trade response"""
@@ -60,6 +62,7 @@ class BotWithTradesSchema(Schema):
     symbol_id: int
     symbol_name: Optional[str] = None
     trades: list[TradeSchema] = []
+    trades_next_cursor: Optional[str] = None
 
     @staticmethod
     def resolve_bot_type_display(obj):
@@ -71,7 +74,12 @@ class BotWithTradesSchema(Schema):
 
     @staticmethod
     def resolve_trades(obj):
-        return list(obj.trades.all().order_by('-entry_date'))
+        # Chỉ các trades mới nhất (prefetch recent_trades), phần còn lại đọc qua /bots/{id}/trades
+        return bot_recent_trades(obj)
+
+    @staticmethod
+    def resolve_trades_next_cursor(obj):
+        return bot_trades_next_cursor(obj)
 
     class Config:
         from_attributes = True
@@ -80,10 +88,15 @@ class BotWithTradesSchema(Schema):
 class BotDetailSchema(BotSchema):
     """Schema for Bot detail with trades"""
     trades: list[TradeSchema] = []
+    trades_next_cursor: Optional[str] = None
 
     @staticmethod
     def resolve_trades(obj):
-        return list(obj.trades.all().order_by('-entry_date'))
+        return bot_recent_trades(obj)
+
+    @staticmethod
+    def resolve_trades_next_cursor(obj):
+        return bot_trades_next_cursor(obj)
 
     class Config:
         from_attributes = True
@@ -94,3 +107,16 @@ class SymbolBotsSchema(Schema):
     symbol_id: int
     symbol_name: str
     bots: list[BotWithTradesSchema]
+
+
+class TradePageSchema(Schema):
+    """1 trang trades (keyset, mới nhất trước); next_cursor=null là trang cuối"""
+    items: List[TradeSchema]
+    next_cursor: Optional[str] = None
+
+
+class TradeColumnsSchema(Schema):
+    """1 trang trades dạng cột: mỗi field là 1 mảng song song, entry_ts là epoch seconds"""
+    columns: Dict[str, List[Any]]
+    count: int
+    next_cursor: Optional[str] = None
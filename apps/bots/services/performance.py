@@ -0,0 +1,255 @@
+"""
+Bot performance analytics: win rate, profit factor, drawdown, equity curve, rolling stats.
+
+- Chỉ tính trên lệnh Close có profit (profit là % lợi nhuận của lệnh, equity = tổng cộng dồn).
+- rebuild(): đọc các cột profit/entry_date bằng values_list, tính vector hóa bằng NumPy.
+- record_trade(): webhook gọi sau khi lưu lệnh Close, cập nhật summary O(1)
+  (lệnh đến trễ hơn lệnh cuối đã ghi nhận thì dựng lại cả bot).
+- Equity curve lưu tối đa MAX_EQUITY_POINTS điểm: các điểm gần nhất giữ nguyên, phần cũ
+  được lấy mẫu thưa (xem compact_equity_curve).
+- API đọc từ bảng BotPerformance; metrics theo symbol gộp từ summary của các bot.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from django.db import transaction
+
+from apps.bots.models import Bot, BotPerformance, Trade
+
+logger = logging.getLogger(__name__)
+
+CLOSE_ACTION = "close"
+ROLLING_WINDOWS = (20, 50)
+RECENT_PROFITS_SIZE = max(ROLLING_WINDOWS)
+MAX_EQUITY_POINTS = 1000
+# Các cột record_trade ghi lại (updated_at là auto_now nên phải liệt kê)
+INCREMENTAL_FIELDS = [
+    "closed_trades", "wins", "losses", "total_profit", "gross_profit", "gross_loss", "equity_peak",
+    "max_drawdown", "equity_curve", "recent_profits", "last_entry_date", "updated_at",
+]
+
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    return None if value is None else round(float(value), digits)
+
+
+def equity_stats(profits: np.ndarray) -> Dict[str, Any]:
+    """Equity curve (cumsum), đỉnh và max drawdown; equity bắt đầu từ 0"""
+    equity = np.cumsum(profits, dtype=float)
+    peaks = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    drawdowns = peaks - equity
+    return {
+        "equity": equity,
+        "equity_peak": float(peaks[-1]) if len(peaks) else 0.0,
+        "max_drawdown": float(drawdowns.max()) if len(drawdowns) else 0.0,
+    }
+
+
+def compact_equity_curve(curve: List[List[float]], max_points: Optional[int] = None) -> List[List[float]]:
+    """
+    Giới hạn số điểm equity curve: khi vượt max_points thì giữ nguyên max_points // 2 điểm
+    gần nhất, phần cũ hơn lấy mẫu đều còn max_points // 4 điểm (giữ điểm đầu). Sau mỗi lần
+    nén còn chỗ cho max_points // 4 lệnh nữa nên record_trade vẫn O(1) khấu hao.
+    """
+    max_points = max_points or MAX_EQUITY_POINTS
+    if len(curve) <= max_points:
+        return curve
+    keep = max_points // 2
+    head, tail = curve[:-keep], curve[-keep:]
+    picks = np.unique(np.linspace(0, len(head) - 1, num=max(1, max_points // 4)).round().astype(int))
+    return [head[i] for i in picks] + tail
+
+
+def window_stats(profits: np.ndarray) -> Dict[str, Any]:
+    """Win rate / avg / profit factor của 1 dãy profit"""
+    n = len(profits)
+    gross_profit = float(profits[profits > 0].sum())
+    gross_loss = float(-profits[profits < 0].sum())
+    return {
+        "trades": n,
+        "win_rate": _round((profits > 0).sum() / n) if n else None,
+        "avg_profit": _round(profits.mean()) if n else None,
+        "total_profit": _round(profits.sum()),
+        "profit_factor": _round(gross_profit / gross_loss) if gross_loss > 0 else None,
+    }
+
+
+class BotPerformanceService:
+    """Tính và đọc BotPerformance"""
+
+    # -------- Build --------
+    @staticmethod
+    def _closed_trades(bot_ids: List[int]):
+        return (
+            Trade.objects.filter(bot_id__in=bot_ids, action__iexact=CLOSE_ACTION, profit__isnull=False)
+            .order_by("bot_id", "entry_date", "id")
+            .values_list("bot_id", "entry_date", "profit")
+        )
+
+    @staticmethod
+    def _summary(bot_id: int, entry_ts: np.ndarray, profits: np.ndarray, last_entry_date) -> BotPerformance:
+        stats = equity_stats(profits)
+        wins, losses = profits > 0, profits < 0
+        return BotPerformance(
+            bot_id=bot_id,
+            closed_trades=len(profits),
+            wins=int(wins.sum()),
+            losses=int(losses.sum()),
+            total_profit=float(profits.sum()),
+            gross_profit=float(profits[wins].sum()),
+            gross_loss=float(-profits[losses].sum()),
+            equity_peak=stats["equity_peak"],
+            max_drawdown=stats["max_drawdown"],
+            equity_curve=compact_equity_curve(
+                [[int(ts), _round(eq)] for ts, eq in zip(entry_ts, stats["equity"])]
+            ),
+            recent_profits=[float(p) for p in profits[-RECENT_PROFITS_SIZE:]],
+            last_entry_date=last_entry_date,
+        )
+
+    def rebuild(self, bot_ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """Dựng lại summary từ toàn bộ lệnh Close (mặc định: tất cả bot)"""
+        if bot_ids is None:
+            bot_ids = Bot.objects.values_list("id", flat=True)
+        bot_ids = list(bot_ids)
+
+        columns: Dict[int, Dict[str, list]] = {bot_id: {"dates": [], "profits": []} for bot_id in bot_ids}
+        for bot_id, entry_date, profit in self._closed_trades(bot_ids).iterator(chunk_size=5000):
+            columns[bot_id]["dates"].append(entry_date)
+            columns[bot_id]["profits"].append(profit)
+
+        summaries = []
+        for bot_id, cols in columns.items():
+            dates = cols["dates"]
+            entry_ts = np.fromiter((d.timestamp() for d in dates), dtype=float, count=len(dates))
+            profits = np.asarray(cols["profits"], dtype=float)
+            summaries.append(self._summary(bot_id, entry_ts, profits, dates[-1] if dates else None))
+
+        fields = [f.name for f in BotPerformance._meta.concrete_fields if f.name != "bot"]
+        with transaction.atomic():
+            BotPerformance.objects.bulk_create(
+                summaries,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=["bot"],
+                update_fields=fields,
+            )
+        return {"bots": len(summaries)}
+
+    # -------- Incremental --------
+    def record_trade(self, trade: Trade) -> Optional[BotPerformance]:
+        """Cập nhật summary sau khi lưu 1 lệnh; bỏ qua lệnh Open/không có profit"""
+        if (trade.action or "").lower() != CLOSE_ACTION or trade.profit is None:
+            return None
+
+        with transaction.atomic():
+            perf = BotPerformance.objects.select_for_update().filter(bot_id=trade.bot_id).first()
+            if perf is None or (perf.last_entry_date and trade.entry_date < perf.last_entry_date):
+                # Chưa có summary hoặc lệnh đến không theo thứ tự thời gian -> tính lại cả bot
+                self.rebuild([trade.bot_id])
+                return BotPerformance.objects.get(bot_id=trade.bot_id)
+
+            profit = float(trade.profit)
+            perf.closed_trades += 1
+            if profit > 0:
+                perf.wins += 1
+                perf.gross_profit += profit
+            elif profit < 0:
+                perf.losses += 1
+                perf.gross_loss -= profit
+            perf.total_profit += profit
+            perf.equity_peak = max(perf.equity_peak, perf.total_profit)
+            perf.max_drawdown = max(perf.max_drawdown, perf.equity_peak - perf.total_profit)
+            perf.equity_curve = compact_equity_curve(
+                perf.equity_curve + [[int(trade.entry_date.timestamp()), _round(perf.total_profit)]]
+            )
+            perf.recent_profits = (perf.recent_profits + [profit])[-RECENT_PROFITS_SIZE:]
+            perf.last_entry_date = trade.entry_date
+            perf.save(update_fields=INCREMENTAL_FIELDS)
+        return perf
+
+    # -------- Read --------
+    @staticmethod
+    def _payload(
+        closed_trades: int, wins: int, losses: int, total_profit: float, gross_profit: float,
+        gross_loss: float, max_drawdown: float, equity_curve: List[List[float]], recent_profits: np.ndarray,
+    ) -> Dict[str, Any]:
+        return {
+            "closed_trades": closed_trades,
+            "wins": wins,
+            "losses": losses,
+            "win_rate": _round(wins / closed_trades) if closed_trades else None,
+            "total_profit": _round(total_profit),
+            "avg_profit": _round(total_profit / closed_trades) if closed_trades else None,
+            "avg_win": _round(gross_profit / wins) if wins else None,
+            "avg_loss": _round(-gross_loss / losses) if losses else None,
+            "profit_factor": _round(gross_profit / gross_loss) if gross_loss > 0 else None,
+            "max_drawdown": _round(max_drawdown),
+            "equity_curve": equity_curve,
+            "rolling": {
+                str(window): window_stats(recent_profits[-window:]) for window in ROLLING_WINDOWS
+            },
+        }
+
+    def bot_performance(self, bot: Bot) -> Dict[str, Any]:
+        perf = BotPerformance.objects.filter(bot_id=bot.id).first()
+        if perf is None:
+            self.rebuild([bot.id])
+            perf = BotPerformance.objects.get(bot_id=bot.id)
+        payload = self._payload(
+            perf.closed_trades, perf.wins, perf.losses, perf.total_profit, perf.gross_profit,
+            perf.gross_loss, perf.max_drawdown, perf.equity_curve, np.asarray(perf.recent_profits, dtype=float),
+        )
+        return {"bot_id": bot.id, "symbol_id": bot.symbol_id, "updated_at": perf.updated_at, **payload}
+
+    def symbol_performance(self, symbol_id: int) -> Dict[str, Any]:
+        """
+        Gộp summary các bot của symbol. Equity curve gộp theo thời gian từ các bước tăng equity
+        của từng bot (np.diff), drawdown tính lại trên curve đã gộp (phần lịch sử cũ của bot
+        có curve đã nén chỉ còn các điểm lấy mẫu nên drawdown gộp là xấp xỉ).
+        """
+        bot_ids = list(Bot.objects.filter(symbol_id=symbol_id).values_list("id", flat=True))
+        missing = set(bot_ids) - set(
+            BotPerformance.objects.filter(bot_id__in=bot_ids).values_list("bot_id", flat=True)
+        )
+        if missing:
+            self.rebuild(missing)
+        perfs = list(BotPerformance.objects.filter(bot_id__in=bot_ids).order_by("bot_id"))
+
+        ts_parts, step_parts = [], []
+        for perf in perfs:
+            if perf.equity_curve:
+                curve = np.asarray(perf.equity_curve, dtype=float)
+                ts_parts.append(curve[:, 0])
+                step_parts.append(np.diff(curve[:, 1], prepend=0.0))
+        if ts_parts:
+            ts = np.concatenate(ts_parts)
+            order = np.argsort(ts, kind="stable")
+            ts, steps = ts[order], np.concatenate(step_parts)[order]
+        else:
+            ts, steps = np.empty(0), np.empty(0)
+        stats = equity_stats(steps)
+        equity_curve = [[int(t), _round(eq)] for t, eq in zip(ts, stats["equity"])]
+
+        payload = self._payload(
+            sum(p.closed_trades for p in perfs),
+            sum(p.wins for p in perfs),
+            sum(p.losses for p in perfs),
+            sum(p.total_profit for p in perfs),
+            sum(p.gross_profit for p in perfs),
+            sum(p.gross_loss for p in perfs),
+            stats["max_drawdown"],
+            equity_curve,
+            # Các bước equity đã sort theo thời gian chính là profit từng lệnh của cả symbol
+            steps[-RECENT_PROFITS_SIZE:],
+        )
+        return {"symbol_id": symbol_id, "bots": [p.bot_id for p in perfs], **payload}
+
+
+def record_trade_performance(trade: Trade) -> None:
+    """Gọi từ webhook; lỗi analytics không được làm hỏng việc nhận tín hiệu"""
+    try:
+        BotPerformanceService().record_trade(trade)
+    except Exception as exc:
+        logger.warning("Bot performance update failed for trade %s: %s", trade.id, exc)
@@ -0,0 +1,136 @@
+"""
+Trade feed: danh sách trades phân trang keyset, mới nhất trước.
+
+- Sắp xếp (entry_date DESC, id DESC) để đi theo index (bot, entry_date) khi lọc theo bot.
+- Lọc license ngay trong SQL (bot__symbol_id IN entitlement của user).
+- format="columns": mảng song song theo từng cột (cho client vẽ chart hàng nghìn lệnh),
+  đọc bằng values_list, không dựng model instance.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db.models import Prefetch, Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from ninja.errors import HttpError
+
+from apps.bots.models import Trade
+from core.cursor import decode_cursor, encode_cursor
+
+TRADE_FEED_FORMATS = ("rows", "columns")
+TRADE_ORDERING = ("-entry_date", "-id")
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = {"rows": 1000, "columns": 5000}
+# Số trades mới nhất kèm theo mỗi bot ở /bots/{id} và /symbols/{id}/bots
+BOT_RECENT_TRADES = 50
+
+COLUMN_FIELDS = (
+    "id", "bot_id", "trans_id", "trade_type", "direction", "action",
+    "entry_date", "price", "exit_price", "stop_loss", "take_profit",
+    "position_size", "profit", "win_loss_status",
+)
+DECIMAL_FIELDS = {"price", "exit_price", "stop_loss", "take_profit"}
+
+
+def _cursor(entry_date, trade_id) -> str:
+    # isoformat giữ đủ microseconds (DjangoJSONEncoder cắt còn milliseconds -> so sánh bằng bị lệch)
+    return encode_cursor({"entry_date": entry_date.isoformat(), "id": str(trade_id)})
+
+
+def trades_cursor(trade) -> str:
+    return _cursor(trade.entry_date, trade.id)
+
+
+def recent_trades_prefetch(limit: int = BOT_RECENT_TRADES) -> Prefetch:
+    """
+    Prefetch limit+1 trades mới nhất của mỗi bot vào bot.recent_trades (1 query cho cả nhóm);
+    row dư chỉ để biết còn trang sau hay không.
+    """
+    return Prefetch(
+        "trades",
+        queryset=Trade.objects.order_by(*TRADE_ORDERING)[:limit + 1],
+        to_attr="recent_trades",
+    )
+
+
+def bot_recent_trades(bot, limit: int = BOT_RECENT_TRADES) -> List[Trade]:
+    return list(getattr(bot, "recent_trades", None) or [])[:limit]
+
+
+def bot_trades_next_cursor(bot, limit: int = BOT_RECENT_TRADES) -> Optional[str]:
+    """Cursor để đọc tiếp qua /bots/{id}/trades, None nếu đã đủ"""
+    trades = getattr(bot, "recent_trades", None) or []
+    return trades_cursor(trades[limit - 1]) if len(trades) > limit else None
+
+
+class TradeFeedService:
+    """Đọc trades theo trang cho các API /trades"""
+
+    @staticmethod
+    def _after(qs: QuerySet, cursor: Optional[str]) -> QuerySet:
+        after = decode_cursor(cursor)
+        if not after:
+            return qs
+        entry_date = parse_datetime(str(after.get("entry_date") or ""))
+        if entry_date is None or not after.get("id"):
+            raise HttpError(400, "Invalid cursor")
+        return qs.filter(
+            Q(entry_date__lt=entry_date) | Q(entry_date=entry_date, id__lt=after["id"])
+        )
+
+    @staticmethod
+    def _columns(rows: List[tuple]) -> Dict[str, List[Any]]:
+        columns: Dict[str, List[Any]] = {field: [] for field in COLUMN_FIELDS}
+        for row in rows:
+            for field, value in zip(COLUMN_FIELDS, row):
+                if value is not None:
+                    if field == "id":
+                        value = str(value)
+                    elif field == "entry_date":
+                        value = int(value.timestamp())
+                    elif field in DECIMAL_FIELDS:
+                        value = float(value)
+                columns[field].append(value)
+        # entry_date trả về epoch seconds để chart dùng trực tiếp
+        columns["entry_ts"] = columns.pop("entry_date")
+        return columns
+
+    def page(
+        self,
+        symbol_ids: Iterable[int],
+        bot_id: Optional[int] = None,
+        symbol_id: Optional[int] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        format: str = "rows",
+    ) -> Dict[str, Any]:
+        """
+        1 trang trades của các symbol user được phép xem.
+
+        Returns:
+            format="rows":    {"items": [Trade, ...], "next_cursor": str | None}
+            format="columns": {"columns": {field: [...]}, "count": n, "next_cursor": str | None}
+        """
+        if format not in TRADE_FEED_FORMATS:
+            raise HttpError(400, f"format must be one of {', '.join(TRADE_FEED_FORMATS)}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE[format]))
+
+        qs = Trade.objects.filter(bot__symbol_id__in=symbol_ids)
+        if bot_id is not None:
+            qs = qs.filter(bot_id=bot_id)
+        if symbol_id is not None:
+            qs = qs.filter(bot__symbol_id=symbol_id)
+        qs = self._after(qs, cursor).order_by(*TRADE_ORDERING)
+
+        if format == "columns":
+            rows = list(qs.values_list(*COLUMN_FIELDS)[:limit + 1])
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = None
+            if has_more:
+                last = dict(zip(COLUMN_FIELDS, rows[-1]))
+                next_cursor = _cursor(last["entry_date"], last["id"])
+            return {"columns": self._columns(rows), "count": len(rows), "next_cursor": next_cursor}
+
+        items = list(qs[:limit + 1])
+        has_more = len(items) > limit
+        items = items[:limit]
+        return {"items": items, "next_cursor": trades_cursor(items[-1]) if has_more else None}
@@ -0,0 +1,62 @@
+"""Job nền cho các endpoint /calculate/import/... (chạy bởi `python manage.py run_jobs`)."""
+import time
+from typing import Any, Dict
+
+from apps.calculate.services.financial_service import CalculateService
+from apps.jobs.registry import register_job
+
+IMPORT_QUEUE = "imports"
+STATEMENT_COUNTS = ("balance_sheets", "income_statements", "cash_flows", "ratios")
+
+
+def _summary(result: Dict[str, Any], processing_time: float) -> Dict[str, Any]:
+    """Kết quả job giữ dạng response cũ của endpoint import (summary + chi tiết từng symbol)"""
+    return {
+        "total_symbols": result["total_symbols"],
+        "successful_imports": result["successful_symbols"],
+        "failed_imports": result["failed_symbols"],
+        "skipped_symbols": result.get("skipped_symbols", 0),
+        **{f"total_{name}": result.get(f"total_{name}", 0) for name in STATEMENT_COUNTS},
+        "derived_metrics": result.get("derived_metrics"),
+        "processing_time": round(processing_time, 2),
+        "results": [
+            {
+                "symbol": detail["symbol"],
+                "success": detail["success"],
+                **{name: detail.get(name, 0) for name in STATEMENT_COUNTS},
+                "errors": detail["errors"],
+            }
+            for detail in result["details"]
+        ],
+    }
+
+
+def _run(progress, method: str, **kwargs) -> Dict[str, Any]:
+    start_time = time.time()
+    result = getattr(CalculateService(progress=progress), method)(**kwargs)
+    return _summary(result, time.time() - start_time)
+
+
+@register_job("calculate.import_financials", queue=IMPORT_QUEUE)
+def import_financials(progress):
+    return _run(progress, "import_all_financials")
+
+
+@register_job("calculate.import_income_statements", queue=IMPORT_QUEUE)
+def import_income_statements(progress):
+    return _run(progress, "import_income_statements_all")
+
+
+@register_job("calculate.import_cash_flows", queue=IMPORT_QUEUE)
+def import_cash_flows(progress):
+    return _run(progress, "import_cash_flows_all")
+
+
+@register_job("calculate.import_ratios", queue=IMPORT_QUEUE)
+def import_ratios(progress):
+    return _run(progress, "import_ratios_all")
+
+
+@register_job("calculate.import_all_complete", queue=IMPORT_QUEUE)
+def import_all_complete(progress, force_update: bool = False, incremental: bool = False):
+    return _run(progress, "import_all_complete", force_update=force_update, incremental=incremental)
@@ -0,0 +1,29 @@
+# apps/calculate/management/commands/derive_financial_metrics.py
+from django.core.management.base import BaseCommand
+
+from apps.calculate.services.derived_metrics import DerivedMetricsService
+from apps.calculate.services.financial_snapshot import refresh_financial_snapshot
+from apps.stock.models import Symbol
+
+
+class Command(BaseCommand):
+    help = 'Tính lại chỉ số dẫn xuất (TTM, QoQ/YoY, margins, per-share) từ báo cáo quý'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols',
+            nargs='+',
+            help='Chỉ tính cho list symbols (e.g., VTO ACB FPT); mặc định tất cả',
+        )
+
+    def handle(self, *args, **options):
+        symbol_ids = None
+        if options.get('symbols'):
+            names = [name.upper() for name in options['symbols']]
+            symbol_ids = list(Symbol.objects.filter(name__in=names).values_list('id', flat=True))
+
+        result = DerivedMetricsService().derive(symbol_ids)
+        refresh_financial_snapshot()
+        self.stdout.write(
+            self.style.SUCCESS(f"Derived metrics: {result['symbols']} symbols, {result['periods']} periods")
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculate', '0001_initial'),
+        ('stock', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancialImportWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statement', models.CharField(choices=[('balance_sheet', 'Balance Sheet'), ('income_statement', 'Income Statement'), ('cash_flow', 'Cash Flow'), ('ratio', 'Ratio')], max_length=32)),
+                ('year_report', models.IntegerField(default=0, help_text='Năm của kỳ mới nhất (0 = chưa có dữ liệu)')),
+                ('length_report', models.IntegerField(default=0, help_text='Kỳ mới nhất')),
+                ('row_hashes', models.JSONField(blank=True, default=dict, help_text="{'<year>-<length>': hash}")),
+                ('checked_at', models.DateTimeField(auto_now=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='financial_watermarks', to='stock.symbol')),
+            ],
+            options={
+                'unique_together': {('symbol', 'statement')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculate', '0002_financial_import_watermark'),
+        ('stock', '0002_symbol_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DerivedMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_report', models.IntegerField(help_text='Năm')),
+                ('length_report', models.IntegerField(help_text='Quý')),
+                ('revenue_ttm', models.FloatField(blank=True, help_text='Doanh thu 4 quý gần nhất', null=True)),
+                ('gross_profit_ttm', models.FloatField(blank=True, null=True)),
+                ('net_profit_ttm', models.FloatField(blank=True, help_text='LN CĐ công ty mẹ 4 quý gần nhất', null=True)),
+                ('operating_cash_flow_ttm', models.FloatField(blank=True, null=True)),
+                ('free_cash_flow_ttm', models.FloatField(blank=True, help_text='CFO + mua sắm TSCĐ (4 quý)', null=True)),
+                ('revenue_qoq_percent', models.FloatField(blank=True, null=True)),
+                ('revenue_yoy_percent', models.FloatField(blank=True, null=True)),
+                ('net_profit_qoq_percent', models.FloatField(blank=True, null=True)),
+                ('net_profit_yoy_percent', models.FloatField(blank=True, null=True)),
+                ('revenue_ttm_yoy_percent', models.FloatField(blank=True, null=True)),
+                ('net_profit_ttm_yoy_percent', models.FloatField(blank=True, null=True)),
+                ('gross_margin_percent', models.FloatField(blank=True, null=True)),
+                ('operating_margin_percent', models.FloatField(blank=True, null=True)),
+                ('net_margin_percent', models.FloatField(blank=True, null=True)),
+                ('net_margin_ttm_percent', models.FloatField(blank=True, null=True)),
+                ('eps_ttm', models.FloatField(blank=True, help_text='net_profit_ttm / số cổ phiếu lưu hành', null=True)),
+                ('bvps', models.FloatField(blank=True, help_text='Vốn chủ sở hữu / số cổ phiếu lưu hành', null=True)),
+                ('operating_cash_flow_per_share_ttm', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derived_metrics', to='stock.symbol')),
+            ],
+            options={
+                'ordering': ['-year_report', '-length_report'],
+                'unique_together': {('symbol', 'year_report', 'length_report')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculate', '0003_derived_metric'),
+        ('stock', '0002_symbol_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancialsVersion',
+            fields=[
+                ('symbol', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='financials_version', serialize=False, to='stock.symbol')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -205,3 +205,95 @@ class BalanceSheet(models.Model):
 
     def __str__(self):
         return f"{self.symbol.name} - Balance Sheet {self.year_report}Q{self.length_report}"
+
+
+class FinancialImportWatermark(models.Model):
+    """Kỳ báo cáo mới nhất đã import cho mỗi (symbol, loại báo cáo) + hash từng kỳ để import delta"""
+    STATEMENT_CHOICES = [
+        ('balance_sheet', 'Balance Sheet'),
+        ('income_statement', 'Income Statement'),
+        ('cash_flow', 'Cash Flow'),
+        ('ratio', 'Ratio'),
+    ]
+
+    symbol = models.ForeignKey(
+        STOCK_SYMBOL_MODEL,
+        on_delete=models.CASCADE,
+        related_name='financial_watermarks'
+    )
+    statement = models.CharField(max_length=32, choices=STATEMENT_CHOICES)
+    year_report = models.IntegerField(default=0, help_text="Năm của kỳ mới nhất (0 = chưa có dữ liệu)")
+    length_report = models.IntegerField(default=0, help_text="Kỳ mới nhất")
+    row_hashes = models.JSONField(default=dict, blank=True, help_text="{'<year>-<length>': hash}")
+    checked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('symbol', 'statement')
+
+    def __str__(self):
+        return f"{self.symbol.name} - {self.statement} {self.year_report}Q{self.length_report}"
+
+
+class DerivedMetric(models.Model):
+    """
+    Chỉ số tính từ báo cáo quý (TTM, tăng trưởng QoQ/YoY, biên lợi nhuận, trên mỗi cổ phiếu).
+    Đơn vị tiền giống báo cáo gốc; tăng trưởng và biên lợi nhuận tính theo %.
+    """
+    year_report = models.IntegerField(help_text="Năm")
+    length_report = models.IntegerField(help_text="Quý")
+
+    revenue_ttm = models.FloatField(null=True, blank=True, help_text="Doanh thu 4 quý gần nhất")
+    gross_profit_ttm = models.FloatField(null=True, blank=True)
+    net_profit_ttm = models.FloatField(null=True, blank=True, help_text="LN CĐ công ty mẹ 4 quý gần nhất")
+    operating_cash_flow_ttm = models.FloatField(null=True, blank=True)
+    free_cash_flow_ttm = models.FloatField(null=True, blank=True, help_text="CFO + mua sắm TSCĐ (4 quý)")
+
+    revenue_qoq_percent = models.FloatField(null=True, blank=True)
+    revenue_yoy_percent = models.FloatField(null=True, blank=True)
+    net_profit_qoq_percent = models.FloatField(null=True, blank=True)
+    net_profit_yoy_percent = models.FloatField(null=True, blank=True)
+    revenue_ttm_yoy_percent = models.FloatField(null=True, blank=True)
+    net_profit_ttm_yoy_percent = models.FloatField(null=True, blank=True)
+
+    gross_margin_percent = models.FloatField(null=True, blank=True)
+    operating_margin_percent = models.FloatField(null=True, blank=True)
+    net_margin_percent = models.FloatField(null=True, blank=True)
+    net_margin_ttm_percent = models.FloatField(null=True, blank=True)
+
+    eps_ttm = models.FloatField(null=True, blank=True, help_text="net_profit_ttm / số cổ phiếu lưu hành")
+    bvps = models.FloatField(null=True, blank=True, help_text="Vốn chủ sở hữu / số cổ phiếu lưu hành")
+    operating_cash_flow_per_share_ttm = models.FloatField(null=True, blank=True)
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    symbol = models.ForeignKey(
+        STOCK_SYMBOL_MODEL,
+        on_delete=models.CASCADE,
+        related_name='derived_metrics'
+    )
+
+    class Meta:
+        unique_together = ('symbol', 'year_report', 'length_report')
+        ordering = ['-year_report', '-length_report']
+
+    def __str__(self):
+        return f"{self.symbol.name} - Derived {self.year_report}Q{self.length_report}"
+
+
+class FinancialsVersion(models.Model):
+    """
+    Version dữ liệu báo cáo của 1 symbol, tăng mỗi khi import ghi kỳ mới/thay đổi.
+    Nằm trong DB để mọi process (web workers, CLI, run_jobs) cùng thấy, key cache
+    /calculate/symbols/{id}/financials chứa version này.
+    """
+    symbol = models.OneToOneField(
+        STOCK_SYMBOL_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='financials_version'
+    )
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.symbol_id} - v{self.version}"
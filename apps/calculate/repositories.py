@@ -1,6 +1,6 @@
 import logging
-from typing import Dict, Any, Optional
-from django.db import transaction
+from typing import Dict, Any, List, Optional, Type
+from django.db import models, transaction
 from apps.calculate.models import CashFlow, IncomeStatement, BalanceSheet, Ratio
 from apps.stock.models import Symbol
 
@@ -26,6 +26,10 @@ class CalculateRepository:
         """Upsert ratio record"""
         return upsert_ratio(data)
     
+    def bulk_upsert_statements(self, model: Type[models.Model], objs: List[models.Model]) -> int:
+        """Upsert all periods of one statement type in a single statement"""
+        return bulk_upsert_statements(model, objs)
+    
     def get_cash_flows(self, symbol_id: int, limit: Optional[int] = None):
         """Get cash flows for symbol"""
         return qs_cash_flow(symbol_id, limit)
@@ -42,6 +46,34 @@ class CalculateRepository:
         """Get ratios for symbol"""
         return qs_ratio(symbol_id)  
 
+STATEMENT_UNIQUE_FIELDS = ['symbol', 'year_report', 'length_report']
+
+
+def bulk_upsert_statements(model: Type[models.Model], objs: List[models.Model]) -> int:
+    """
+    Upsert tất cả kỳ báo cáo (BalanceSheet/IncomeStatement/CashFlow/Ratio) của một symbol
+    bằng một câu INSERT ... ON CONFLICT (symbol, year_report, length_report) DO UPDATE.
+    """
+    if not objs:
+        return 0
+
+    update_fields = [
+        f.name for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in STATEMENT_UNIQUE_FIELDS
+    ]
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=STATEMENT_UNIQUE_FIELDS,
+                update_fields=update_fields,
+            )
+        return len(objs)
+    except Exception as e:
+        logger.error(f"[bulk_upsert_statements] {model.__name__}: {e}")
+        return 0
+
 def upsert_balance_sheet(data: Dict[str, Any]) -> Optional[BalanceSheet]:
     try:
         symbol = data.pop('symbol')
@@ -186,4 +218,32 @@ def qs_ratio(symbol_id: int):
         ).select_related('symbol').order_by('-year_report', '-length_report')[:10]
     except Exception as e:
         logger.error(f"[qs_ratio] Error fetching ratios for symbol_id={symbol_id}: {e}")
-        return Ratio.objects.none()
\ No newline at end of file
+        return Ratio.objects.none()
+
+def statement_value_fields(model: Type[models.Model]) -> List[str]:
+    """Các cột số liệu của 1 bảng báo cáo (bỏ id/symbol/kỳ)"""
+    return [
+        f.attname for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in STATEMENT_UNIQUE_FIELDS
+    ]
+
+
+def statement_rows(
+    model: Type[models.Model],
+    symbol_id: int,
+    years: int = 8,
+    quarter: Optional[int] = None,
+):
+    """
+    Các kỳ báo cáo của symbol dạng .values() (không dựng model instance, không join symbol),
+    mới nhất trước; year/quarter thay cho year_report/length_report như các DTO.
+    """
+    from datetime import datetime
+    qs = model.objects.filter(symbol_id=symbol_id, year_report__gte=datetime.now().year - years)
+    if quarter is not None:
+        qs = qs.filter(length_report=quarter)
+    return (
+        qs.order_by('-year_report', '-length_report')
+        .annotate(year=models.F('year_report'), quarter=models.F('length_report'))
+        .values('year', 'quarter', *statement_value_fields(model))
+    )
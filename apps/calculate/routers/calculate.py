@@ -1,232 +1,66 @@
 # apps/calculate/routers/calculate.py
 """Calculate API routes for importing financial data."""
 
-from typing import List
-from ninja import Router, Schema
+from typing import List, Optional
+from django.http import HttpResponse
+from ninja import Router
 from ninja.errors import HttpError
-import time
-from django.db import transaction
-from apps.calculate.services.financial_service import CalculateService
 from apps.calculate.services.query_financial_service import QueryFinancialService
+from apps.calculate.services.financial_snapshot import get_financial_snapshot_store
 from apps.calculate.dtos.cash_flow_dto import CashFlowOut
 from apps.calculate.dtos.income_statement_dto import InComeOut
 from apps.calculate.dtos.blance_sheet_dto import BalanceSheetOut
 from apps.calculate.dtos.ratio_dto import RatioOut
+from apps.jobs.schemas import JobOut
+from apps.jobs.services.job_service import JobService
 router = Router(tags=["calculate"])
 
 
-# Output schemas  
-class ImportResultSchema(Schema):
-    symbol: str
-    success: bool
-    balance_sheets: int = 0
-    income_statements: int = 0
-    cash_flows: int = 0
-    errors: List[str] = []
+def _enqueue(kind: str, **params):
+    """Import chạy nhiều giờ -> tạo job nền, trả về ngay; theo dõi qua GET /api/jobs/{id}"""
+    return 202, JobService().enqueue(kind, params)
 
 
-class ImportSummarySchema(Schema):
-    total_symbols: int
-    successful_imports: int
-    failed_imports: int
-    total_balance_sheets: int
-    total_income_statements: int
-    total_cash_flows: int
-    processing_time: float
-    results: List[ImportResultSchema]
+@router.post("/import/balance/all", response={202: JobOut})
+def import_all_financials(request):
+    """Import financial data for ALL symbols in database (job nền)."""
+    return _enqueue("calculate.import_financials")
 
 
-@router.post("/import/balance/all", response=ImportSummarySchema)
-def import_all_financials(request):
-    """Import financial data for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_all_financials()
-        processing_time = time.time() - start_time
-        
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-        
-    except Exception as e:
-        raise HttpError(500, f"Error importing all financials: {str(e)}")
-
-
-@router.post("/import/income/all", response=ImportSummarySchema)
+@router.post("/import/income/all", response={202: JobOut})
 def import_income_all(request):
-    """Import only income statements for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_income_statements_all()
-        processing_time = time.time() - start_time
-
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing income statements: {str(e)}")
-
-
-@router.post("/import/cashflow/all", response=ImportSummarySchema)
+    """Import only income statements for ALL symbols in database (job nền)."""
+    return _enqueue("calculate.import_income_statements")
+
+
+@router.post("/import/cashflow/all", response={202: JobOut})
 def import_cashflow_all(request):
-    """Import only cash flows for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_cash_flows_all()
-        processing_time = time.time() - start_time
-
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing cash flows: {str(e)}")
-
-
-@router.post("/import/ratio/all", response=ImportSummarySchema)
+    """Import only cash flows for ALL symbols in database (job nền)."""
+    return _enqueue("calculate.import_cash_flows")
+
+
+@router.post("/import/ratio/all", response={202: JobOut})
 def import_ratio_all(request):
-    """Import only ratios for ALL symbols in database."""
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_ratios_all()
-        processing_time = time.time() - start_time
-
-        return ImportSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing ratios: {str(e)}")
-
-
-class ImportCompleteResultSchema(Schema):
-    symbol: str
-    success: bool
-    balance_sheets: int = 0
-    income_statements: int = 0
-    cash_flows: int = 0
-    ratios: int = 0
-    errors: List[str] = []
-
-
-class ImportCompleteSummarySchema(Schema):
-    total_symbols: int
-    successful_imports: int
-    failed_imports: int
-    total_balance_sheets: int
-    total_income_statements: int
-    total_cash_flows: int
-    total_ratios: int
-    processing_time: float
-    results: List[ImportCompleteResultSchema]
-
-
-@router.post("/import/all-complete", response=ImportCompleteSummarySchema)
-def import_all_complete(request, force_update: bool = False):
+    """Import only ratios for ALL symbols in database (job nền)."""
+    return _enqueue("calculate.import_ratios")
+
+
+@router.post("/import/all-complete", response={202: JobOut})
+def import_all_complete(request, force_update: bool = False, incremental: bool = False):
     """
     Import ALL financial data (balance sheet, income statement, cash flow, ratio)
     for ALL symbols in database with detailed logging for each table.
+    Chạy nền: trả về job, tiến độ/kết quả xem tại GET /api/jobs/{id}.
 
     Query Parameters:
     - force_update (bool):
         - False (default): Resume mode - only import symbols missing data
         - True: Force update mode - re-import all symbols to get latest data
+    - incremental (bool):
+        - True: Delta mode - only fetch symbols whose next quarter is due and
+          only write new/changed periods (overrides force_update)
     """
-    try:
-        start_time = time.time()
-        service = CalculateService()
-        result = service.import_all_complete(force_update=force_update)
-        processing_time = time.time() - start_time
-
-        return ImportCompleteSummarySchema(
-            total_symbols=result["total_symbols"],
-            successful_imports=result["successful_symbols"],
-            failed_imports=result["failed_symbols"],
-            total_balance_sheets=result["total_balance_sheets"],
-            total_income_statements=result["total_income_statements"],
-            total_cash_flows=result["total_cash_flows"],
-            total_ratios=result["total_ratios"],
-            processing_time=round(processing_time, 2),
-            results=[
-                ImportCompleteResultSchema(
-                    symbol=detail["symbol"],
-                    success=detail["success"],
-                    balance_sheets=detail["balance_sheets"],
-                    income_statements=detail["income_statements"],
-                    cash_flows=detail["cash_flows"],
-                    ratios=detail["ratios"],
-                    errors=detail["errors"]
-                ) for detail in result["details"]
-            ]
-        )
-    except Exception as e:
-        raise HttpError(500, f"Error importing all complete data: {str(e)}")
+    return _enqueue("calculate.import_all_complete", force_update=force_update, incremental=incremental)
 
 
 @router.get("/cashflows/{symbol_id}", response=List[CashFlowOut])
@@ -244,4 +78,52 @@ def get_balances(request, symbol_id: int):
 @router.get("/ratios/{symbol_id}", response=List[RatioOut])
 def get_ratios(request, symbol_id: int):
     service = QueryFinancialService()
-    return service.get_ratios(symbol_id)
\ No newline at end of file
+    return service.get_ratios(symbol_id)
+
+
+@router.get("/symbols/{symbol_id}/financials")
+def get_symbol_financials(
+    request,
+    symbol_id: int,
+    statements: Optional[str] = None,
+    years: int = 8,
+    quarter: Optional[int] = None,
+):
+    """
+    Balance sheet, income statement, cash flow và ratio của symbol trong 1 request.
+
+    Query Parameters:
+    - statements: danh sách phân tách bằng dấu phẩy (balance_sheet,income_statement,cash_flow,ratio),
+      mặc định tất cả
+    - years: số năm gần nhất (mặc định 8)
+    - quarter: chỉ lấy 1 kỳ (1-4, 5 = cả năm)
+    """
+    service = QueryFinancialService()
+    selected = [name.strip() for name in statements.split(",") if name.strip()] if statements else None
+    body = service.get_financials(symbol_id, statements=selected, years=years, quarter=quarter)
+    return HttpResponse(body, content_type="application/json")
+
+
+@router.get("/screen")
+def screen_symbols(
+    request,
+    filter: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    period: str = "latest",
+    limit: int = 50,
+):
+    """
+    Lọc/xếp hạng toàn thị trường trên snapshot dạng cột (không query DB khi snapshot còn mới).
+
+    Query Parameters:
+    - filter: biểu thức, vd. "roe_percent > 15 and derived.revenue_yoy_percent > 20"
+    - sort: biểu thức xếp hạng, "-" ở đầu là giảm dần, vd. "-roe_percent"
+    - fields: các metric trả kèm, phân tách bằng dấu phẩy (vd. "ratio.p_e,revenue_bn_vnd")
+    - period: "latest" (kỳ mới nhất của từng symbol) hoặc "2024Q2"
+    - limit: số symbol trả về (tối đa 1000)
+    """
+    snapshot = get_financial_snapshot_store().snapshot()
+    selected = [name.strip() for name in fields.split(",") if name.strip()] if fields else []
+    result = snapshot.screen(filter=filter, sort=sort, fields=selected, period=period, limit=limit)
+    return {**result, "snapshot": snapshot.describe()}
@@ -0,0 +1,162 @@
+# apps/calculate/services/derived_metrics.py
+"""
+Tính DerivedMetric (TTM, QoQ/YoY, margins, per-share) từ báo cáo quý.
+
+- Đọc các cột cần thiết của IncomeStatement/CashFlow/BalanceSheet/Ratio bằng values_list
+  cho cả nhóm symbols, ghép thành 1 DataFrame theo (symbol, kỳ).
+- Kỳ được đánh số liên tục (year * 4 + quarter - 1); giá trị kỳ trước k quý lấy bằng reindex
+  trên MultiIndex (symbol, ordinal - k) -> tính vector hóa cho mọi symbol một lượt,
+  kỳ bị thiếu cho ra NaN thay vì ghép nhầm quý không liền kề.
+- Chỉ chạy lại cho các symbol có báo cáo vừa thay đổi (CalculateService truyền vào).
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from apps.calculate.models import BalanceSheet, CashFlow, DerivedMetric, IncomeStatement, Ratio
+from apps.calculate.repositories import bulk_upsert_statements
+from apps.stock.models import Symbol
+
+logger = logging.getLogger(__name__)
+
+QUARTERS = (1, 2, 3, 4)
+
+# cột nguồn: (model, field) -> tên cột trong frame
+SOURCE_COLUMNS = {
+    "revenue": (IncomeStatement, "revenue_bn_vnd"),
+    "gross_profit": (IncomeStatement, "gross_profit"),
+    "operating_profit": (IncomeStatement, "operating_profit_loss"),
+    "net_profit": (IncomeStatement, "attribute_to_parent_company_bn_vnd"),
+    "operating_cash_flow": (CashFlow, "net_cash_inflows_outflows_from_operating_activities"),
+    "capex": (CashFlow, "purchase_of_fixed_assets"),
+    "equity": (BalanceSheet, "owners_equitybn_vnd"),
+    "shares_mil": (Ratio, "outstanding_share_mil_shares"),
+}
+TTM_COLUMNS = ("revenue", "gross_profit", "net_profit", "operating_cash_flow", "capex")
+
+
+def _growth(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """% tăng trưởng so với |kỳ trước|; kỳ trước = 0 hoặc thiếu -> NaN"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous != 0, (current - previous) / np.abs(previous) * 100.0, np.nan)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator * scale, np.nan)
+
+
+class DerivedMetricsService:
+    """Batch tính và lưu DerivedMetric"""
+
+    def __init__(self, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def load_frame(symbol_ids: List[int]) -> pd.DataFrame:
+        """1 query mỗi bảng; index (symbol_id, ordinal), cột theo SOURCE_COLUMNS"""
+        by_model: Dict[type, Dict[str, str]] = {}
+        for column, (model, field) in SOURCE_COLUMNS.items():
+            by_model.setdefault(model, {})[field] = column
+
+        parts = []
+        for model, fields in by_model.items():
+            rows = model.objects.filter(
+                symbol_id__in=symbol_ids, length_report__in=QUARTERS
+            ).values_list("symbol_id", "year_report", "length_report", *fields)
+            frame = pd.DataFrame.from_records(
+                list(rows), columns=["symbol_id", "year", "quarter", *fields.values()]
+            )
+            parts.append(frame.set_index(["symbol_id", "year", "quarter"]))
+
+        frame = pd.concat(parts, axis=1).astype(float).reset_index()
+        frame[["symbol_id", "year", "quarter"]] = frame[["symbol_id", "year", "quarter"]].astype("int64")
+        frame["ordinal"] = frame["year"] * 4 + frame["quarter"] - 1
+        return frame.set_index(["symbol_id", "ordinal"]).sort_index()
+
+    @staticmethod
+    def compute(frame: pd.DataFrame) -> pd.DataFrame:
+        """Tất cả chỉ số cho mọi (symbol, kỳ) trong frame, vector hóa theo cột"""
+        symbols = frame.index.get_level_values("symbol_id")
+        ordinals = frame.index.get_level_values("ordinal")
+
+        def lag(columns, k: int) -> pd.DataFrame:
+            """Giá trị của đúng k quý trước (NaN nếu kỳ đó không có)"""
+            target = pd.MultiIndex.from_arrays([symbols, ordinals - k])
+            return frame[list(columns)].reindex(target)
+
+        current = frame[list(TTM_COLUMNS)].to_numpy()
+        # TTM chỉ có khi đủ 4 quý liền nhau: NaN ở bất kỳ quý nào làm tổng thành NaN
+        ttm = current + sum(lag(TTM_COLUMNS, k).to_numpy() for k in (1, 2, 3))
+        ttm = pd.DataFrame(ttm, index=frame.index, columns=TTM_COLUMNS)
+
+        ttm_last_year = sum(lag(("revenue", "net_profit"), k).to_numpy() for k in (4, 5, 6, 7))
+        prev_q = lag(("revenue", "net_profit"), 1)
+        prev_y = lag(("revenue", "net_profit"), 4)
+
+        revenue, net_profit = frame["revenue"].to_numpy(), frame["net_profit"].to_numpy()
+        shares = frame["shares_mil"].to_numpy() * 1_000_000
+
+        out = pd.DataFrame(index=frame.index)
+        out["year_report"] = frame["year"].to_numpy()
+        out["length_report"] = frame["quarter"].to_numpy()
+        out["revenue_ttm"] = ttm["revenue"].to_numpy()
+        out["gross_profit_ttm"] = ttm["gross_profit"].to_numpy()
+        out["net_profit_ttm"] = ttm["net_profit"].to_numpy()
+        out["operating_cash_flow_ttm"] = ttm["operating_cash_flow"].to_numpy()
+        # purchase_of_fixed_assets là số âm trong báo cáo lưu chuyển tiền tệ
+        out["free_cash_flow_ttm"] = ttm["operating_cash_flow"].to_numpy() + ttm["capex"].to_numpy()
+
+        out["revenue_qoq_percent"] = _growth(revenue, prev_q["revenue"].to_numpy())
+        out["revenue_yoy_percent"] = _growth(revenue, prev_y["revenue"].to_numpy())
+        out["net_profit_qoq_percent"] = _growth(net_profit, prev_q["net_profit"].to_numpy())
+        out["net_profit_yoy_percent"] = _growth(net_profit, prev_y["net_profit"].to_numpy())
+        out["revenue_ttm_yoy_percent"] = _growth(out["revenue_ttm"].to_numpy(), ttm_last_year[:, 0])
+        out["net_profit_ttm_yoy_percent"] = _growth(out["net_profit_ttm"].to_numpy(), ttm_last_year[:, 1])
+
+        out["gross_margin_percent"] = _ratio(frame["gross_profit"].to_numpy(), revenue, 100.0)
+        out["operating_margin_percent"] = _ratio(frame["operating_profit"].to_numpy(), revenue, 100.0)
+        out["net_margin_percent"] = _ratio(net_profit, revenue, 100.0)
+        out["net_margin_ttm_percent"] = _ratio(out["net_profit_ttm"].to_numpy(), out["revenue_ttm"].to_numpy(), 100.0)
+
+        out["eps_ttm"] = _ratio(out["net_profit_ttm"].to_numpy(), shares)
+        out["bvps"] = _ratio(frame["equity"].to_numpy(), shares)
+        out["operating_cash_flow_per_share_ttm"] = _ratio(out["operating_cash_flow_ttm"].to_numpy(), shares)
+        return out
+
+    @staticmethod
+    def to_models(metrics: pd.DataFrame) -> List[DerivedMetric]:
+        values = metrics.replace([np.inf, -np.inf], np.nan)
+        values = values.astype(object).where(values.notna(), None)
+        symbol_ids = metrics.index.get_level_values("symbol_id")
+        return [
+            DerivedMetric(symbol_id=int(symbol_id), **{
+                **row,
+                "year_report": int(row["year_report"]),
+                "length_report": int(row["length_report"]),
+            })
+            for symbol_id, row in zip(symbol_ids, values.to_dict("records"))
+        ]
+
+    def derive(self, symbol_ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """
+        Tính lại DerivedMetric cho các symbol (mặc định: tất cả).
+        Returns: {"symbols": số symbol, "periods": số dòng đã upsert}
+        """
+        if symbol_ids is None:
+            symbol_ids = Symbol.objects.order_by("id").values_list("id", flat=True)
+        symbol_ids = sorted(set(symbol_ids))
+
+        periods = 0
+        for start in range(0, len(symbol_ids), self.chunk_size):
+            chunk = symbol_ids[start:start + self.chunk_size]
+            frame = self.load_frame(chunk)
+            if frame.empty:
+                continue
+            objs = self.to_models(self.compute(frame))
+            periods += bulk_upsert_statements(DerivedMetric, objs)
+
+        logger.info("Derived metrics computed for %d symbols (%d periods)", len(symbol_ids), periods)
+        return {"symbols": len(symbol_ids), "periods": periods}
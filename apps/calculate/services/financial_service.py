@@ -5,27 +5,52 @@ import time
 import pandas as pd
 
 from django.db import transaction
-from apps.calculate.repositories import (
-    upsert_balance_sheet,
-    upsert_income_statement,
-    upsert_cash_flow,
-    upsert_ratio,
-)
+from django.db.models import Exists, OuterRef
+from apps.calculate.repositories import bulk_upsert_statements
+from apps.calculate.services.derived_metrics import DerivedMetricsService
+from apps.calculate.services.financial_snapshot import refresh_financial_snapshot
+from apps.calculate.services.financials_cache import invalidate_symbol_financials
+from apps.calculate.services.import_watermarks import ImportWatermarks
+from apps.calculate.services.statement_mappers import STATEMENT_SPECS, StatementMappers
 from apps.calculate.vnstock import VNStock
+from apps.jobs.services.progress import JobProgress
 from apps.calculate.models import BalanceSheet, IncomeStatement, CashFlow, Ratio
 from apps.stock.models import Symbol
-from apps.stock.utils.safe import safe_int, safe_decimal, safe_str
+from apps.stock.services.coverage_planner import CoveragePlanner
 
 
 logger = logging.getLogger(__name__)
 
 
+def financial_coverage_checks() -> Dict[str, Any]:
+    """Coverage checks cho CoveragePlanner: symbol đã có dữ liệu cho từng bảng tài chính chưa"""
+    return {
+        "balance_sheets": Exists(BalanceSheet.objects.filter(symbol_id=OuterRef("pk"))),
+        "income_statements": Exists(IncomeStatement.objects.filter(symbol_id=OuterRef("pk"))),
+        "cash_flows": Exists(CashFlow.objects.filter(symbol_id=OuterRef("pk"))),
+        "ratios": Exists(Ratio.objects.filter(symbol_id=OuterRef("pk"))),
+    }
+
+
 class CalculateService:
     """Service để import financial data từ vnstock theo mapping chính xác"""
 
-    def __init__(self, vnstock_client: Optional[VNStock] = None, sleep_between_symbols: int = 1):
+    def __init__(
+        self,
+        vnstock_client: Optional[VNStock] = None,
+        sleep_between_symbols: int = 1,
+        watermarks: Optional[ImportWatermarks] = None,
+        progress: Optional[JobProgress] = None,
+    ):
         self.vnstock_client = vnstock_client or VNStock()
         self.sleep_between_symbols = sleep_between_symbols
+        self.watermarks = watermarks or ImportWatermarks()
+        # Tiến độ/checkpoint theo bảng (job nền truyền JobReporter)
+        self.progress = progress or JobProgress()
+        self.derived_metrics = DerivedMetricsService()
+        # Symbols có kỳ báo cáo được ghi trong lần import này -> chỉ tính lại derived metrics cho chúng.
+        # Lưu cả trong checkpoint: job bị hủy/ngắt rồi resume vẫn derive các symbol đã import trước đó
+        self._changed_symbol_ids = set(self.progress.checkpoint.get("changed_symbols", []))
 
     def import_all_financials(self) -> Dict[str, Any]:
         """Import financial data for ALL symbols in database."""
@@ -45,7 +70,7 @@ class CalculateService:
 
         print(f"Starting import for {result['total_symbols']} symbols...")
         
-        for symbol in symbols:
+        for symbol in self.progress.track(self.progress.begin("financials", symbols)):
             print(f"Processing symbol: {symbol.name}")
             symbol_result = self._import_symbol_data(symbol)
             
@@ -62,11 +87,14 @@ class CalculateService:
                 print(f"✗ Failed to import {symbol.name}")
                 result["failed_symbols"] += 1
                 result["errors"].extend(symbol_result.get("errors", []))
+                self.progress.fail(symbol.name, "; ".join(symbol_result.get("errors", [])))
             
             if self.sleep_between_symbols > 0:
                 time.sleep(self.sleep_between_symbols)
+        self.progress.end()
 
         print(f"Import completed: {result['successful_symbols']}/{result['total_symbols']} symbols successful")
+        self._after_import(result)
         return result
 
     def import_income_statements_all(self) -> Dict[str, Any]:
@@ -82,7 +110,7 @@ class CalculateService:
             "details": []
         }
 
-        for symbol in symbols:
+        for symbol in self.progress.track(self.progress.begin("income_statements", symbols)):
             detail = {
                 "symbol": symbol.name,
                 "success": False,
@@ -93,6 +121,7 @@ class CalculateService:
                 ok, bundle = self.vnstock_client.get_full_financial_data(symbol.name)
                 if not ok or not bundle:
                     detail["errors"].append("Failed to fetch data from vnstock")
+                    self.progress.fail(symbol.name, "Failed to fetch data from vnstock")
                 else:
                     with transaction.atomic():
                         cnt = self._import_income_statements(symbol, bundle)
@@ -102,12 +131,15 @@ class CalculateService:
                         result["successful_symbols"] += 1
             except Exception as e:
                 detail["errors"].append(str(e))
+                self.progress.fail(symbol.name, e)
                 result["failed_symbols"] += 1
             finally:
                 result["details"].append(detail)
                 if self.sleep_between_symbols > 0:
                     time.sleep(self.sleep_between_symbols)
+        self.progress.end()
 
+        self._after_import(result)
         return result
 
     def import_cash_flows_all(self) -> Dict[str, Any]:
@@ -123,7 +155,7 @@ class CalculateService:
             "details": []
         }
 
-        for symbol in symbols:
+        for symbol in self.progress.track(self.progress.begin("cash_flows", symbols)):
             detail = {
                 "symbol": symbol.name,
                 "success": False,
@@ -134,6 +166,7 @@ class CalculateService:
                 ok, bundle = self.vnstock_client.get_full_financial_data(symbol.name)
                 if not ok or not bundle:
                     detail["errors"].append("Failed to fetch data from vnstock")
+                    self.progress.fail(symbol.name, "Failed to fetch data from vnstock")
                 else:
                     with transaction.atomic():
                         cnt = self._import_cash_flows(symbol, bundle)
@@ -143,12 +176,15 @@ class CalculateService:
                         result["successful_symbols"] += 1
             except Exception as e:
                 detail["errors"].append(str(e))
+                self.progress.fail(symbol.name, e)
                 result["failed_symbols"] += 1
             finally:
                 result["details"].append(detail)
                 if self.sleep_between_symbols > 0:
                     time.sleep(self.sleep_between_symbols)
+        self.progress.end()
 
+        self._after_import(result)
         return result
 
     def import_ratios_all(self) -> Dict[str, Any]:
@@ -164,7 +200,7 @@ class CalculateService:
             "details": []
         }
 
-        for symbol in symbols:
+        for symbol in self.progress.track(self.progress.begin("ratios", symbols)):
             detail = {
                 "symbol": symbol.name,
                 "success": False,
@@ -175,6 +211,7 @@ class CalculateService:
                 ok, bundle = self.vnstock_client.get_full_financial_data(symbol.name)
                 if not ok or not bundle:
                     detail["errors"].append("Failed to fetch data from vnstock")
+                    self.progress.fail(symbol.name, "Failed to fetch data from vnstock")
                     result["failed_symbols"] += 1
                 else:
                     with transaction.atomic():
@@ -185,15 +222,18 @@ class CalculateService:
                         result["successful_symbols"] += 1
             except Exception as e:
                 detail["errors"].append(str(e))
+                self.progress.fail(symbol.name, e)
                 result["failed_symbols"] += 1
             finally:
                 result["details"].append(detail)
                 if self.sleep_between_symbols > 0:
                     time.sleep(self.sleep_between_symbols)
+        self.progress.end()
 
+        self._after_import(result)
         return result
 
-    def import_all_complete(self, force_update: bool = False) -> Dict[str, Any]:
+    def import_all_complete(self, force_update: bool = False, incremental: bool = False) -> Dict[str, Any]:
         """
         Import ALL financial tables (balance sheet, income statement, cash flow, ratio)
         for all symbols in database with detailed logging for each table.
@@ -201,24 +241,30 @@ class CalculateService:
         Args:
             force_update: If False (default), skip symbols that already have data.
                          If True, re-import all symbols (to get latest data from vnstock).
+            incremental: If True, only fetch symbols whose next reporting period is due
+                         (per-statement watermark) and only write new or changed periods.
+                         Takes precedence over force_update.
         """
         symbols = Symbol.objects.all().order_by('name')
+        watermarks_by_symbol: Dict[int, Dict[str, Any]] = {}
+        not_due = 0
 
-        # Filter symbols based on force_update flag
-        if not force_update:
-            # Only import symbols that don't have complete data
+        # Filter symbols based on force_update / incremental flag
+        if incremental:
+            watermarks_by_symbol = self.watermarks.load()
             symbols_to_import = []
             for symbol in symbols:
-                has_balance = BalanceSheet.objects.filter(symbol=symbol).exists()
-                has_income = IncomeStatement.objects.filter(symbol=symbol).exists()
-                has_cashflow = CashFlow.objects.filter(symbol=symbol).exists()
-                has_ratio = Ratio.objects.filter(symbol=symbol).exists()
-
-                # Import if missing any table
-                if not (has_balance and has_income and has_cashflow and has_ratio):
+                if self.watermarks.is_due(watermarks_by_symbol.get(symbol.id, {})):
                     symbols_to_import.append(symbol)
+                else:
+                    not_due += 1
 
             symbols = symbols_to_import
+            mode_text = f"INCREMENTAL MODE: Importing only symbols with due periods ({not_due} not due)"
+        elif not force_update:
+            # Only import symbols that don't have complete data (1 query Exists(), most missing first)
+            plan = CoveragePlanner(financial_coverage_checks()).plan()
+            symbols = [item.symbol for item in plan]
             mode_text = "RESUME MODE: Importing only incomplete symbols"
         else:
             mode_text = "FORCE UPDATE MODE: Re-importing all symbols"
@@ -229,7 +275,7 @@ class CalculateService:
             "total_symbols": total_symbols,
             "successful_symbols": 0,
             "failed_symbols": 0,
-            "skipped_symbols": 0,
+            "skipped_symbols": not_due,
             "total_balance_sheets": 0,
             "total_income_statements": 0,
             "total_cash_flows": 0,
@@ -244,7 +290,8 @@ class CalculateService:
         print(f"Total symbols to process: {total_symbols}")
         print(f"{'='*60}\n")
 
-        for idx, symbol in enumerate(symbols, 1):
+        symbols = self.progress.begin("financials", symbols)
+        for idx, symbol in enumerate(self.progress.track(symbols), 1):
             symbol_detail = {
                 "symbol": symbol.name,
                 "success": False,
@@ -268,36 +315,42 @@ class CalculateService:
                     logger.error(f"[IMPORT ALL COMPLETE] {symbol.name} - {error_msg}")
                     print(f"  ✗ FAILED: {error_msg}\n")
                     result["failed_symbols"] += 1
+                    self.progress.fail(symbol.name, error_msg)
                 else:
+                    watermarks = watermarks_by_symbol.get(symbol.id, {})
                     # Import all tables in transaction
                     with transaction.atomic():
                         # 1. Import Balance Sheets
+                        self.progress.stage("balance_sheets")
                         print(f"  → Importing Balance Sheets...", end=" ")
-                        balance_count = self._import_balance_sheets(symbol, bundle)
+                        balance_count = self._import_balance_sheets(symbol, bundle, watermarks.get('balance_sheet'), incremental)
                         symbol_detail["balance_sheets"] = balance_count
                         result["total_balance_sheets"] += balance_count
                         print(f"✓ SUCCESS ({balance_count} records)")
                         logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - Balance Sheets: {balance_count} records imported")
 
                         # 2. Import Income Statements
+                        self.progress.stage("income_statements")
                         print(f"  → Importing Income Statements...", end=" ")
-                        income_count = self._import_income_statements(symbol, bundle)
+                        income_count = self._import_income_statements(symbol, bundle, watermarks.get('income_statement'), incremental)
                         symbol_detail["income_statements"] = income_count
                         result["total_income_statements"] += income_count
                         print(f"✓ SUCCESS ({income_count} records)")
                         logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - Income Statements: {income_count} records imported")
 
                         # 3. Import Cash Flows
+                        self.progress.stage("cash_flows")
                         print(f"  → Importing Cash Flows...", end=" ")
-                        cashflow_count = self._import_cash_flows(symbol, bundle)
+                        cashflow_count = self._import_cash_flows(symbol, bundle, watermarks.get('cash_flow'), incremental)
                         symbol_detail["cash_flows"] = cashflow_count
                         result["total_cash_flows"] += cashflow_count
                         print(f"✓ SUCCESS ({cashflow_count} records)")
                         logger.info(f"[IMPORT ALL COMPLETE] {symbol.name} - Cash Flows: {cashflow_count} records imported")
 
                         # 4. Import Ratios
+                        self.progress.stage("ratios")
                         print(f"  → Importing Ratios...", end=" ")
-                        ratio_count = self._import_ratios(symbol, bundle)
+                        ratio_count = self._import_ratios(symbol, bundle, watermarks.get('ratio'), incremental)
                         symbol_detail["ratios"] = ratio_count
                         result["total_ratios"] += ratio_count
                         print(f"✓ SUCCESS ({ratio_count} records)")
@@ -315,6 +368,7 @@ class CalculateService:
                 result["failed_symbols"] += 1
                 logger.error(f"[IMPORT ALL COMPLETE] {symbol.name} - {error_msg}")
                 print(f"  ✗ FAILED: {error_msg}\n")
+                self.progress.fail(symbol.name, error_msg)
 
             finally:
                 result["details"].append(symbol_detail)
@@ -322,15 +376,17 @@ class CalculateService:
                 # Sleep between symbols to avoid rate limiting
                 if self.sleep_between_symbols > 0 and idx < total_symbols:
                     time.sleep(self.sleep_between_symbols)
+        self.progress.end()
 
         # Final summary
         print(f"\n{'='*60}")
         print(f"IMPORT COMPLETE SUMMARY")
         print(f"{'='*60}")
-        print(f"Mode:                 {'FORCE UPDATE' if force_update else 'RESUME'}")
+        print(f"Mode:                 {'INCREMENTAL' if incremental else 'FORCE UPDATE' if force_update else 'RESUME'}")
         print(f"Total Symbols:        {result['total_symbols']}")
         print(f"Successful:           {result['successful_symbols']}")
         print(f"Failed:               {result['failed_symbols']}")
+        print(f"Skipped (not due):    {result['skipped_symbols']}")
         print(f"Balance Sheets:       {result['total_balance_sheets']} records")
         print(f"Income Statements:    {result['total_income_statements']} records")
         print(f"Cash Flows:           {result['total_cash_flows']} records")
@@ -339,8 +395,27 @@ class CalculateService:
 
         logger.info(f"[IMPORT ALL COMPLETE] Finished: {result['successful_symbols']}/{result['total_symbols']} successful")
 
+        self._after_import(result)
         return result
 
+    def _after_import(self, result: Dict[str, Any]) -> None:
+        """Tính derived metrics cho các symbol vừa thay đổi, rồi dựng lại snapshot screening"""
+        changed, self._changed_symbol_ids = self._changed_symbol_ids, set()
+        self.progress.checkpoint.pop("changed_symbols", None)
+        if changed:
+            try:
+                result["derived_metrics"] = self.derived_metrics.derive(changed)
+            except Exception as e:
+                logger.error(f"[DERIVED METRICS] Failed for {len(changed)} symbols: {e}")
+        if result.get("successful_symbols"):
+            refresh_financial_snapshot()
+
+    def _mark_changed(self, symbol_id: int) -> None:
+        if symbol_id not in self._changed_symbol_ids:
+            self._changed_symbol_ids.add(symbol_id)
+            # Ghi xuống Job cùng lần flush với key "done" của symbol
+            self.progress.checkpoint.setdefault("changed_symbols", []).append(symbol_id)
+
     def _import_symbol_data(self, symbol) -> Dict[str, Any]:
         """Import financial data for a single symbol."""
         symbol_result = {
@@ -380,265 +455,43 @@ class CalculateService:
         
         return symbol_result
 
-    def _import_balance_sheets(self, symbol, bundle) -> int:
-        """Import balance sheet data for a symbol."""
-        count = 0
-        balance_sheet_df = bundle.get('balance_sheet_df', pd.DataFrame())
-        
-        if balance_sheet_df.empty:
-            return count
-            
-        for _, row in balance_sheet_df.iterrows():
-            try:
-                mapped_data = self._map_balance_sheet_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_balance_sheet(mapped_data)
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error importing balance sheet for {symbol.name}: {str(e)}")
-        
+    def _import_statement(self, symbol, bundle, statement: str, watermark=None, delta: bool = False) -> int:
+        """
+        Import 1 loại báo cáo cho symbol (tất cả kỳ trong 1 upsert) và cập nhật watermark.
+        delta=True: chỉ ghi các kỳ mới hơn watermark hoặc có giá trị thay đổi.
+        """
+        model, df_key, _, _ = STATEMENT_SPECS[statement]
+        df = bundle.get(df_key, pd.DataFrame())
+        if df is None or df.empty:
+            frame = pd.DataFrame()
+        else:
+            frame = StatementMappers.statement_frame(statement, df)
+
+        hashes = StatementMappers.row_hashes(frame)
+        if delta:
+            frame = self.watermarks.changed_rows(frame, hashes, watermark)
+
+        count = bulk_upsert_statements(model, StatementMappers.from_frame(symbol, model, frame))
+        if count:
+            # Có kỳ mới/thay đổi -> cache /symbols/{id}/financials của symbol không còn đúng
+            invalidate_symbol_financials(symbol.id)
+            self._mark_changed(symbol.id)
+        if count or frame.empty:
+            self.watermarks.save(symbol, statement, frame, hashes, watermark)
         return count
 
-    def _import_income_statements(self, symbol, bundle) -> int:
+    def _import_balance_sheets(self, symbol, bundle, watermark=None, delta: bool = False) -> int:
+        """Import balance sheet data for a symbol."""
+        return self._import_statement(symbol, bundle, "balance_sheet", watermark, delta)
+
+    def _import_income_statements(self, symbol, bundle, watermark=None, delta: bool = False) -> int:
         """Import income statement data for a symbol."""
-        count = 0
-        income_df = bundle.get('income_statement_df', pd.DataFrame())
-        
-        if income_df.empty:
-            return count
-            
-        for _, row in income_df.iterrows():
-            try:
-                mapped_data = self._map_income_statement_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_income_statement(mapped_data)
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error importing income statement for {symbol.name}: {str(e)}")
-        
-        return count
+        return self._import_statement(symbol, bundle, "income_statement", watermark, delta)
 
-    def _import_cash_flows(self, symbol, bundle) -> int:
+    def _import_cash_flows(self, symbol, bundle, watermark=None, delta: bool = False) -> int:
         """Import cash flow data for a symbol."""
-        count = 0
-        cash_flow_df = bundle.get('cash_flow_df', pd.DataFrame())
-        
-        if cash_flow_df.empty:
-            return count
-            
-        for _, row in cash_flow_df.iterrows():
-            try:
-                mapped_data = self._map_cash_flow_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_cash_flow(mapped_data)
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error importing cash flow for {symbol.name}: {str(e)}")
-        
-        return count
+        return self._import_statement(symbol, bundle, "cash_flow", watermark, delta)
 
-    def _import_ratios(self, symbol, bundle) -> int:
+    def _import_ratios(self, symbol, bundle, watermark=None, delta: bool = False) -> int:
         """Import ratio data for a symbol."""
-        count = 0
-        ratio_df = bundle.get('ratios_df', pd.DataFrame())
-
-        if ratio_df.empty:
-            return count
-
-        for _, row in ratio_df.iterrows():
-            try:
-                mapped_data = self._map_ratio_data(symbol, row.to_dict())
-                if mapped_data:
-                    upsert_ratio(mapped_data)
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error importing ratio for {symbol.name}: {str(e)}")
-
-        return count
-
-    def _map_balance_sheet_data(self, symbol, data) -> Dict[str, Any]:
-        """Map vnstock balance sheet data theo mapping chính xác"""
-        year = safe_int(data.get('yearReport'))
-        quarter = safe_int(data.get('lengthReport'))
-        
-        if not year or not quarter:
-            return None
-        
-        return {
-            'symbol': symbol,
-            'year_report': year,
-            'length_report': quarter,
-            # Mapping theo bảng Balance Sheet
-            'current_assets_bn_vnd': safe_int(data.get('CURRENT ASSETS (Bn. VND)')),
-            'cash_and_cash_equivalents_bn_vnd': safe_int(data.get('Cash and cash equivalents (Bn. VND)')),
-            'short_term_investments_bn_vnd': safe_int(data.get('Short-term investments (Bn. VND)')),
-            'accounts_receivable_bn_vnd': safe_int(data.get('Accounts receivable (Bn. VND)')),
-            'net_inventories': safe_int(data.get('Net Inventories')),
-            'other_current_assets_bn_vnd': safe_int(data.get('Other current assets (Bn. VND)')),
-            'long_term_assets_bn_vnd': safe_int(data.get('LONG-TERM ASSETS (Bn. VND)')),
-            'long_term_loans_receivables_bn_vnd': safe_int(data.get('Long-term loans receivables (Bn. VND)')),
-            'fixed_assets_bn_vnd': safe_int(data.get('Fixed assets (Bn. VND)')),
-            'long_term_investments_bn_vnd': safe_int(data.get('Long-term investments (Bn. VND)')),
-            'other_non_current_assets': safe_int(data.get('Other non-current assets')),
-            'total_assets_bn_vnd': safe_int(data.get('TOTAL ASSETS (Bn. VND)')),
-            'liabilities_bn_vnd': safe_int(data.get('LIABILITIES (Bn. VND)')),
-            'current_liabilities_bn_vnd': safe_int(data.get('Current liabilities (Bn. VND)')),
-            'long_term_liabilities_bn_vnd': safe_int(data.get('Long-term liabilities (Bn. VND)')),
-            'owners_equitybn_vnd': safe_int(data.get("OWNER'S EQUITY(Bn.VND)")),
-            'capital_and_reserves_bn_vnd': safe_int(data.get('Capital and reserves (Bn. VND)')),
-            'undistributed_earnings_bn_vnd': safe_int(data.get('Undistributed earnings (Bn. VND)')),
-            'minority_interests': safe_int(data.get('MINORITY INTERESTS')),
-            'total_resources_bn_vnd': safe_int(data.get('TOTAL RESOURCES (Bn. VND)')),
-            'prepayments_to_suppliers_bn_vnd': safe_int(data.get('Prepayments to suppliers (Bn. VND)')),
-            'short_term_loans_receivables_bn_vnd': safe_int(data.get('Short-term loans receivables (Bn. VND)')),
-            'inventories_net_bn_vnd': safe_int(data.get('Inventories, Net (Bn. VND)')),
-            'investment_and_development_funds_bn_vnd': safe_int(data.get('Investment and development funds (Bn. VND)')),
-            'common_shares_bn_vnd': safe_int(data.get('Common shares (Bn. VND)')),
-            'paid_in_capital_bn_vnd': safe_int(data.get('Paid-in capital (Bn. VND)')),
-            'long_term_borrowings_bn_vnd': safe_int(data.get('Long-term borrowings (Bn. VND)')),
-            'advances_from_customers_bn_vnd': safe_int(data.get('Advances from customers (Bn. VND)')),
-            'short_term_borrowings_bn_vnd': safe_int(data.get('Short-term borrowings (Bn. VND)')),
-            'good_will_bn_vnd': safe_int(data.get('Good will (Bn. VND)')),
-            'long_term_prepayments_bn_vnd': safe_int(data.get('Long-term prepayments (Bn. VND)')),
-            'other_long_term_assets_bn_vnd': safe_int(data.get('Other long-term assets (Bn. VND)')),
-            'other_long_term_receivables_bn_vnd': safe_int(data.get('Other long-term receivables (Bn. VND)')),
-            'long_term_trade_receivables_bn_vnd': safe_int(data.get('Long-term trade receivables (Bn. VND)')),
-        }
-
-    def _map_income_statement_data(self, symbol, data) -> Dict[str, Any]:
-        """Map vnstock income statement data theo mapping chính xác"""
-        year = safe_int(data.get('yearReport'))
-        quarter = safe_int(data.get('lengthReport'))
-        
-        if not year or not quarter:
-            return None
-            
-        return {
-            'symbol': symbol,
-            'year_report': year,
-            'length_report': quarter,
-            # Mapping theo bảng Income Statement
-            'revenue_yoy_percent': safe_decimal(data.get('Revenue YoY (%)')),
-            'revenue_bn_vnd': safe_int(data.get('Revenue (Bn. VND)')),
-            'attribute_to_parent_company_bn_vnd': safe_int(data.get('Attribute to parent company (Bn. VND)')),
-            'attribute_to_parent_company_yo_y_percent': safe_decimal(data.get('Attribute to parent company YoY (%)')),
-            'financial_income': safe_int(data.get('Financial Income')),
-            'interest_expenses': safe_int(data.get('Interest Expenses')),
-            'sales': safe_int(data.get('Sales')),
-            'sales_deductions': safe_int(data.get('Sales deductions')),
-            'net_sales': safe_int(data.get('Net Sales')),
-            'cost_of_sales': safe_int(data.get('Cost of Sales')),
-            'gross_profit': safe_int(data.get('Gross Profit')),
-            'financial_expenses': safe_int(data.get('Financial Expenses')),
-            'gain_loss_from_joint_ventures': safe_int(data.get('Gain/(loss) from joint ventures')),
-            'selling_expenses': safe_int(data.get('Selling Expenses')),
-            'general_admin_expenses': safe_int(data.get('General & Admin Expenses')),
-            'operating_profit_loss': safe_int(data.get('Operating Profit/Loss')),
-            'other_income': safe_int(data.get('Other income')),
-            'other_income_expenses': safe_int(data.get('Other Income/Expenses')),
-            'net_other_income_expenses': safe_int(data.get('Net other income/expenses')),
-            'profit_before_tax': safe_int(data.get('Profit before tax')),
-            'business_income_tax_current': safe_int(data.get('Business income tax - current')),
-            'business_income_tax_deferred': safe_int(data.get('Business income tax - deferred')),
-            'net_profit_for_the_year': safe_int(data.get('Net Profit For the Year')),
-            'minority_interest': safe_int(data.get('Minority Interest')),
-            'attributable_to_parent_company': safe_int(data.get('Attributable to parent company')),
-        }
-
-    def _map_cash_flow_data(self, symbol, data) -> Dict[str, Any]:
-        """Map vnstock cash flow data theo mapping chính xác"""
-        year_report = safe_int(data.get('yearReport'))
-        length_report = safe_int(data.get('lengthReport'))
-        
-        if year_report is None or length_report is None:
-            return None
-
-        return {
-            'symbol': symbol,
-            'year_report': year_report,
-            'length_report': length_report,
-            # Mapping theo bảng Cash Flow
-            'net_profit_loss_before_tax': safe_int(data.get('Net Profit/Loss before tax')),
-            'depreciation_and_amortisation': safe_int(data.get('Depreciation and Amortisation')),
-            'provision_for_credit_losses': safe_int(data.get('Provision for credit losses')),
-            'unrealized_foreign_exchange_gain_loss': safe_int(data.get('Unrealized foreign exchange gain/loss')),
-            'profit_loss_from_investing_activities': safe_int(data.get('Profit/Loss from investing activities')),
-            'interest_expense': safe_int(data.get('Interest Expense')),
-            'operating_profit_before_changes_in_working_capital': safe_int(data.get('Operating profit before changes in working capital')),
-            'increase_decrease_in_receivables': safe_int(data.get('Increase/Decrease in receivables')),
-            'increase_decrease_in_inventories': safe_int(data.get('Increase/Decrease in inventories')),
-            'increase_decrease_in_payables': safe_int(data.get('Increase/Decrease in payables')),
-            'increase_decrease_in_prepaid_expenses': safe_int(data.get('Increase/Decrease in prepaid expenses')),
-            'interest_paid': safe_int(data.get('Interest paid')),
-            'business_income_tax_paid': safe_int(data.get('Business Income Tax paid')),
-            'net_cash_inflows_outflows_from_operating_activities': safe_int(data.get('Net cash inflows/outflows from operating activities')),
-            'purchase_of_fixed_assets': safe_int(data.get('Purchase of fixed assets')),
-            'proceeds_from_disposal_of_fixed_assets': safe_int(data.get('Proceeds from disposal of fixed assets')),
-            'loans_granted_purchases_of_debt_instruments_bn_vnd': safe_int(data.get('Loans granted, purchases of debt instruments (Bn. VND)')),
-            'collection_of_loans_proceeds_sales_instruments_vnd': safe_int(data.get('Collection of loans, proceeds from sales of debts instruments (Bn. VND)')),
-            'investment_in_other_entities': safe_int(data.get('Investment in other entities')),
-            'proceeds_from_divestment_in_other_entities': safe_int(data.get('Proceeds from divestment in other entities')),
-            'gain_on_dividend': safe_int(data.get('Gain on Dividend')),
-            'net_cash_flows_from_investing_activities': safe_int(data.get('Net Cash Flows from Investing Activities')),
-            'increase_in_charter_captial': safe_int(data.get('Increase in charter captial')),
-            'payments_for_share_repurchases': safe_int(data.get('Payments for share repurchases')),
-            'proceeds_from_borrowings': safe_int(data.get('Proceeds from borrowings')),
-            'repayment_of_borrowings': safe_int(data.get('Repayment of borrowings')),
-            'finance_lease_principal_payments': safe_int(data.get('Finance lease principal payments')),
-            'dividends_paid': safe_int(data.get('Dividends paid')),
-            'cash_flows_from_financial_activities': safe_int(data.get('Cash flows from financial activities')),
-            'net_increase_decrease_in_cash_and_cash_equivalents': safe_int(data.get('Net increase/decrease in cash and cash equivalents')),
-            'cash_and_cash_equivalents': safe_int(data.get('Cash and cash equivalents')),
-            'foreign_exchange_differences_adjustment': safe_int(data.get('Foreign exchange differences Adjustment')),
-            'cash_and_cash_equivalents_at_the_end_of_period': safe_int(data.get('Cash and Cash Equivalents at the end of period')),
-        }
-
-    def _map_ratio_data(self, symbol, data) -> Dict[str, Any]:
-        """Map vnstock ratio data theo mapping chính xác"""
-        # Ratio data có key dạng tuple: ('Meta', 'yearReport')
-        year_report = safe_int(data.get(('Meta', 'yearReport')) or data.get('yearReport'))
-        length_report = safe_int(data.get(('Meta', 'lengthReport')) or data.get('lengthReport'))
-        
-        if year_report is None or length_report is None or year_report == 0 or length_report == 0:
-            return None
-            
-        return {
-            'symbol': symbol,
-            'year_report': year_report,
-            'length_report': length_report,
-            # Mapping theo bảng Ratio với tuple keys
-            'st_lt_borrowings_equity': safe_decimal(data.get(('Chỉ tiêu cơ cấu nguồn vốn', '(ST+LT borrowings)/Equity'))),
-            'debt_equity': safe_decimal(data.get(('Chỉ tiêu cơ cấu nguồn vốn', 'Debt/Equity'))),
-            'fixed_asset_to_equity': safe_decimal(data.get(('Chỉ tiêu cơ cấu nguồn vốn', 'Fixed Asset-To-Equity'))),
-            'owners_equity_charter_capital': safe_decimal(data.get(('Chỉ tiêu cơ cấu nguồn vốn', "Owners' Equity/Charter Capital"))),
-            'asset_turnover': safe_decimal(data.get(('Chỉ tiêu hiệu quả hoạt động', 'Asset Turnover'))),
-            'fixed_asset_turnover': safe_decimal(data.get(('Chỉ tiêu hiệu quả hoạt động', 'Fixed Asset Turnover'))),
-            'days_sales_outstanding': safe_decimal(data.get(('Chỉ tiêu hiệu quả hoạt động', 'Days Sales Outstanding'))),
-            'days_inventory_outstanding': safe_decimal(data.get(('Chỉ tiêu hiệu quả hoạt động', 'Days Inventory Outstanding'))),
-            'days_payable_outstanding': safe_decimal(data.get(('Chỉ tiêu hiệu quả hoạt động', 'Days Payable Outstanding'))),
-            'cash_cycle': safe_decimal(data.get(('Chỉ tiêu hiệu quả hoạt động', 'Cash Cycle'))),
-            'inventory_turnover': safe_decimal(data.get(('Chỉ tiêu hiệu quả hoạt động', 'Inventory Turnover'))),
-            'ebit_margin_percent': safe_decimal(data.get(('Chỉ tiêu khả năng sinh lợi', 'EBIT Margin (%)'))),
-            'gross_profit_margin_percent': safe_decimal(data.get(('Chỉ tiêu khả năng sinh lợi', 'Gross Profit Margin (%)'))),
-            'net_profit_margin_percent': safe_decimal(data.get(('Chỉ tiêu khả năng sinh lợi', 'Net Profit Margin (%)'))),
-            'roe_percent': safe_decimal(data.get(('Chỉ tiêu khả năng sinh lợi', 'ROE (%)'))),
-            'roic_percent': safe_decimal(data.get(('Chỉ tiêu khả năng sinh lợi', 'ROIC (%)'))),
-            'roa_percent': safe_decimal(data.get(('Chỉ tiêu khả năng sinh lợi', 'ROA (%)'))),
-            'ebitda_bn_vnd': safe_int(data.get(('Chỉ tiêu khả năng sinh lợi', 'EBITDA (Bn. VND)'))),
-            'ebit_bn_vnd': safe_int(data.get(('Chỉ tiêu khả năng sinh lợi', 'EBIT (Bn. VND)'))),
-            'dividend_yield_percent': safe_decimal(data.get(('Chỉ tiêu khả năng sinh lợi', 'Dividend yield (%)'))),
-            'current_ratio': safe_decimal(data.get(('Chỉ tiêu thanh khoản', 'Current Ratio'))),
-            'cash_ratio': safe_decimal(data.get(('Chỉ tiêu thanh khoản', 'Cash Ratio'))),
-            'quick_ratio': safe_decimal(data.get(('Chỉ tiêu thanh khoản', 'Quick Ratio'))),
-            'interest_coverage': safe_decimal(data.get(('Chỉ tiêu thanh khoản', 'Interest Coverage'))),
-            'financial_leverage': safe_decimal(data.get(('Chỉ tiêu thanh khoản', 'Financial Leverage'))),
-            'market_capital_bn_vnd': safe_int(data.get(('Chỉ tiêu định giá', 'Market Capital (Bn. VND)'))),
-            'outstanding_share_mil_shares': safe_int(data.get(('Chỉ tiêu định giá', 'Outstanding Share (Mil. Shares)'))),
-            'p_e': safe_decimal(data.get(('Chỉ tiêu định giá', 'P/E'))),
-            'p_b': safe_decimal(data.get(('Chỉ tiêu định giá', 'P/B'))),
-            'p_s': safe_decimal(data.get(('Chỉ tiêu định giá', 'P/S'))),
-            'p_cash_flow': safe_decimal(data.get(('Chỉ tiêu định giá', 'P/Cash Flow'))),
-            'eps_vnd': safe_decimal(data.get(('Chỉ tiêu định giá', 'EPS (VND)'))),
-            'bvps_vnd': safe_decimal(data.get(('Chỉ tiêu định giá', 'BVPS (VND)'))),
-            'ev_ebitda': safe_decimal(data.get(('Chỉ tiêu định giá', 'EV/EBITDA'))),
-        }
+        return self._import_statement(symbol, bundle, "ratio", watermark, delta)
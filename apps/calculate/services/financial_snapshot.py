@@ -0,0 +1,356 @@
+# apps/calculate/services/financial_snapshot.py
+"""
+Snapshot dạng cột của dữ liệu tài chính cho screening toàn thị trường.
+
+- Mỗi metric là 1 mảng NumPy float64 shape (n_symbols, n_periods), NaN = không có dữ liệu;
+  chỉ giữ `max_periods` quý gần nhất (quý 1-4).
+- Tên metric: "<statement>.<field>" (vd. "ratio.roe_percent"); tên field trần dùng được khi
+  không trùng giữa các bảng (vd. "roe_percent", "net_margin_ttm_percent").
+- period="latest": mỗi symbol lấy kỳ mới nhất mà symbol có báo cáo của bảng chứa metric đó.
+- Biểu thức lọc/sort là cú pháp Python con (so sánh, and/or/not, + - * /, abs()),
+  được parse bằng ast và đánh giá vector hóa trên cả mảng, không eval().
+"""
+import ast
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from apps.calculate.models import DerivedMetric, FinancialImportWatermark
+from apps.calculate.repositories import statement_value_fields
+from apps.calculate.services.statement_mappers import STATEMENT_SPECS
+from apps.stock.models import Symbol
+
+logger = logging.getLogger(__name__)
+
+QUARTERS = (1, 2, 3, 4)
+MAX_RESULTS = 1000
+# Giới hạn biểu thức filter/sort (endpoint public): _eval đệ quy theo độ sâu cây
+MAX_EXPRESSION_LENGTH = 512
+MAX_EXPRESSION_NODES = 64
+
+# Bảng nguồn của snapshot: 4 loại báo cáo + chỉ số dẫn xuất (TTM, tăng trưởng, margins)
+SNAPSHOT_SOURCES = {
+    **{statement: spec[0] for statement, spec in STATEMENT_SPECS.items()},
+    "derived": DerivedMetric,
+}
+
+_COMPARE_OPS = {
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+_BIN_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+}
+_FUNCTIONS = {"abs": np.abs}
+
+
+def period_label(year: int, quarter: int) -> str:
+    return f"{year}Q{quarter}"
+
+
+def parse_period(label: str) -> Tuple[int, int]:
+    try:
+        year, quarter = label.upper().split("Q")
+        return int(year), int(quarter)
+    except ValueError:
+        raise HttpError(400, "period must be 'latest' or like 2024Q2")
+
+
+class FinancialSnapshot:
+    """Snapshot bất biến; dựng lại toàn bộ khi dữ liệu đổi"""
+
+    def __init__(
+        self,
+        symbols: List[Dict[str, Any]],
+        periods: List[Tuple[int, int]],
+        metrics: Dict[str, np.ndarray],
+        presence: Dict[str, np.ndarray],
+    ):
+        self.symbols = symbols
+        self.symbol_ids = np.array([s["id"] for s in symbols], dtype=np.int64)
+        self.periods = periods
+        self.metrics = metrics          # "<statement>.<field>" -> (n_symbols, n_periods)
+        self.presence = presence        # statement -> bool (n_symbols, n_periods)
+        self.built_at = timezone.now()
+
+        owners: Dict[str, List[str]] = {}
+        for name in metrics:
+            owners.setdefault(name.split(".", 1)[1], []).append(name)
+        self.aliases = {field: names[0] for field, names in owners.items() if len(names) == 1}
+        self.ambiguous = {field: names for field, names in owners.items() if len(names) > 1}
+
+        # Cột kỳ mới nhất của từng symbol theo từng bảng (-1 = chưa có)
+        self._latest: Dict[str, np.ndarray] = {}
+        for statement, mask in presence.items():
+            if not mask.shape[1]:
+                # Chưa có kỳ báo cáo nào (argmax không chạy được trên trục rỗng)
+                self._latest[statement] = np.full(mask.shape[0], -1)
+                continue
+            last = mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+            self._latest[statement] = np.where(mask.any(axis=1), last, -1)
+
+    # -------- Build --------
+    @classmethod
+    def build(cls, max_periods: int = 12) -> "FinancialSnapshot":
+        """1 query values_list mỗi bảng nguồn + 1 query symbols"""
+        min_year = timezone.now().year - (max_periods // 4) - 2
+        frames: Dict[str, pd.DataFrame] = {}
+        period_set = set()
+        for statement, model in SNAPSHOT_SOURCES.items():
+            fields = [f for f in statement_value_fields(model) if f != "computed_at"]
+            rows = model.objects.filter(
+                year_report__gte=min_year, length_report__in=QUARTERS
+            ).values_list("symbol_id", "year_report", "length_report", *fields)
+            frame = pd.DataFrame.from_records(list(rows), columns=["symbol_id", "year", "quarter", *fields])
+            frames[statement] = frame
+            period_set.update(zip(frame["year"].tolist(), frame["quarter"].tolist()))
+
+        periods = sorted(period_set)[-max_periods:]
+        period_index = {period: idx for idx, period in enumerate(periods)}
+        symbols = list(Symbol.objects.order_by("id").values("id", "name", "exchange"))
+        symbol_index = {s["id"]: idx for idx, s in enumerate(symbols)}
+        shape = (len(symbols), len(periods))
+
+        metrics: Dict[str, np.ndarray] = {}
+        presence: Dict[str, np.ndarray] = {}
+        for statement, frame in frames.items():
+            rows = frame["symbol_id"].map(symbol_index)
+            cols = pd.Series(list(zip(frame["year"], frame["quarter"])), index=frame.index, dtype=object).map(period_index)
+            keep = rows.notna() & cols.notna()
+            r, c = rows[keep].astype(int).to_numpy(), cols[keep].astype(int).to_numpy()
+
+            mask = np.zeros(shape, dtype=bool)
+            mask[r, c] = True
+            presence[statement] = mask
+            for field in frame.columns[3:]:
+                values = np.full(shape, np.nan)
+                values[r, c] = frame.loc[keep, field].to_numpy(dtype=float, na_value=np.nan)
+                metrics[f"{statement}.{field}"] = values
+        return cls(symbols, periods, metrics, presence)
+
+    # -------- Query --------
+    def resolve(self, name: str) -> str:
+        if name in self.metrics:
+            return name
+        if name in self.aliases:
+            return self.aliases[name]
+        if name in self.ambiguous:
+            raise HttpError(400, f"Metric '{name}' is ambiguous, use one of {', '.join(self.ambiguous[name])}")
+        raise HttpError(400, f"Unknown metric '{name}'")
+
+    def column(self, name: str, period: str = "latest") -> np.ndarray:
+        """Giá trị của metric cho mọi symbol tại 1 kỳ (vector n_symbols)"""
+        qualified = self.resolve(name)
+        values = self.metrics[qualified]
+        if period == "latest":
+            latest = self._latest[qualified.split(".", 1)[0]]
+            out = np.full(len(self.symbols), np.nan)
+            has = latest >= 0
+            out[has] = values[np.nonzero(has)[0], latest[has]]
+            return out
+        target = parse_period(period)
+        if target not in self.periods:
+            raise HttpError(400, f"Period {period} is not in snapshot")
+        return values[:, self.periods.index(target)]
+
+    def evaluate(self, expression: str, period: str = "latest") -> np.ndarray:
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise HttpError(400, f"Expression too long (max {MAX_EXPRESSION_LENGTH} characters)")
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            raise HttpError(400, f"Invalid expression: {expression}")
+        if sum(1 for _ in ast.walk(tree)) > MAX_EXPRESSION_NODES:
+            raise HttpError(400, f"Expression too complex (max {MAX_EXPRESSION_NODES} nodes)")
+        try:
+            return np.asarray(self._eval(tree.body, period))
+        except (RecursionError, MemoryError):
+            raise HttpError(400, f"Expression too complex: {expression}")
+
+    def _name(self, node) -> Optional[str]:
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            return f"{node.value.id}.{node.attr}"
+        return None
+
+    def _eval(self, node, period: str):
+        name = self._name(node)
+        if name is not None:
+            return self.column(name, period)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return float(node.value)
+        if isinstance(node, ast.BoolOp):
+            values = [self._eval(v, period) for v in node.values]
+            op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = values[0]
+            for value in values[1:]:
+                result = op(result, value)
+            return result
+        if isinstance(node, ast.UnaryOp):
+            operand = self._eval(node.operand, period)
+            if isinstance(node.op, ast.Not):
+                return np.logical_not(operand)
+            if isinstance(node.op, ast.USub):
+                return np.negative(operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+        if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return _BIN_OPS[type(node.op)](self._eval(node.left, period), self._eval(node.right, period))
+        if isinstance(node, ast.Compare):
+            result, left = True, self._eval(node.left, period)
+            for op, comparator in zip(node.ops, node.comparators):
+                if type(op) not in _COMPARE_OPS:
+                    break
+                right = self._eval(comparator, period)
+                with np.errstate(invalid="ignore"):
+                    result = np.logical_and(result, _COMPARE_OPS[type(op)](left, right))
+                left = right
+            else:
+                return result
+        if (
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id in _FUNCTIONS and len(node.args) == 1 and not node.keywords
+        ):
+            return _FUNCTIONS[node.func.id](self._eval(node.args[0], period))
+        raise HttpError(400, f"Unsupported expression: {ast.unparse(node)}")
+
+    def screen(
+        self,
+        filter: Optional[str] = None,
+        sort: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        period: str = "latest",
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        Lọc + xếp hạng symbols. sort bắt đầu bằng "-" là giảm dần; NaN luôn xếp cuối.
+        Returns: {"count": số symbol khớp, "items": [...]} (items tối đa `limit`).
+        """
+        limit = max(1, min(limit, MAX_RESULTS))
+        n = len(self.symbols)
+        mask = np.ones(n, dtype=bool)
+        if filter:
+            mask = np.broadcast_to(self.evaluate(filter, period), (n,)).astype(bool)
+        matched = np.nonzero(mask)[0]
+
+        columns = {}
+        if sort:
+            descending = sort.startswith("-")
+            sort_values = np.broadcast_to(self.evaluate(sort.lstrip("-+"), period), (n,)).astype(float)
+            keys = sort_values[matched]
+            # argsort đưa NaN xuống cuối ở cả 2 chiều
+            matched = matched[np.argsort(-keys if descending else keys, kind="stable")]
+        top = matched[:limit]
+
+        for name in fields or []:
+            columns[name] = self.column(name, period)[top]
+        if sort:
+            columns["sort"] = sort_values[top]
+
+        items = []
+        for pos, idx in enumerate(top):
+            item = dict(self.symbols[idx])
+            for name, values in columns.items():
+                value = values[pos]
+                item[name] = None if np.isnan(value) else float(value)
+            items.append(item)
+        return {"count": int(len(matched)), "items": items}
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "built_at": self.built_at,
+            "symbols": len(self.symbols),
+            "periods": [period_label(*p) for p in self.periods],
+            "metrics": len(self.metrics),
+        }
+
+
+class FinancialSnapshotStore:
+    """Giữ snapshot hiện tại, dựng lại sau import hoặc khi fingerprint DB đổi"""
+
+    def __init__(self, max_periods: int = 12, check_interval: float = 60.0):
+        self.max_periods = max_periods
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[FinancialSnapshot] = None
+        self._fingerprint: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def fingerprint() -> Tuple:
+        watermarks = FinancialImportWatermark.objects.aggregate(count=Count("id"), checked=Max("checked_at"))
+        symbols = Symbol.objects.aggregate(count=Count("id"), updated=Max("updated_at"))
+        # derive() chạy sau lần ghi watermark cuối (hoặc riêng qua derive_financial_metrics)
+        derived = DerivedMetric.objects.aggregate(count=Count("id"), computed=Max("computed_at"))
+        return (
+            watermarks["count"], watermarks["checked"], symbols["count"], symbols["updated"],
+            derived["count"], derived["computed"],
+        )
+
+    def refresh(self) -> FinancialSnapshot:
+        fingerprint = self.fingerprint()
+        started = time.monotonic()
+        snapshot = FinancialSnapshot.build(max_periods=self.max_periods)
+        with self._lock:
+            self._snapshot, self._fingerprint, self._checked_at = snapshot, fingerprint, time.monotonic()
+        logger.info(
+            "Financial snapshot built: %d symbols x %d periods, %d metrics in %.2fs",
+            len(snapshot.symbols), len(snapshot.periods), len(snapshot.metrics), time.monotonic() - started,
+        )
+        return snapshot
+
+    def snapshot(self) -> FinancialSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                if self.fingerprint() != self._fingerprint:
+                    return self.refresh()
+            except Exception as exc:
+                logger.warning("Financial snapshot fingerprint check failed: %s", exc)
+        return snapshot
+
+
+_snapshot_store: Optional[FinancialSnapshotStore] = None
+_snapshot_store_lock = threading.Lock()
+
+
+def get_financial_snapshot_store() -> FinancialSnapshotStore:
+    """Global snapshot store (theo settings.FINANCIAL_SNAPSHOT)"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        with _snapshot_store_lock:
+            if _snapshot_store is None:
+                config = getattr(settings, "FINANCIAL_SNAPSHOT", {})
+                _snapshot_store = FinancialSnapshotStore(
+                    max_periods=int(config.get("MAX_PERIODS", 12)),
+                    check_interval=float(config.get("CHECK_INTERVAL", 60.0)),
+                )
+    return _snapshot_store
+
+
+def refresh_financial_snapshot() -> None:
+    """Gọi sau khi import thay đổi báo cáo tài chính"""
+    try:
+        get_financial_snapshot_store().refresh()
+    except Exception as exc:
+        logger.warning("Financial snapshot refresh failed: %s", exc)
@@ -0,0 +1,84 @@
+# apps/calculate/services/financials_cache.py
+"""
+Cache JSON đã serialize của /calculate/symbols/{id}/financials.
+
+Key gồm (symbol_id, tập statements, bộ lọc kỳ) và version của symbol; khi CalculateService
+upsert kỳ mới cho symbol thì tăng version -> mọi biến thể cache cũ của symbol đó không còn được đọc
+(tự hết hạn theo TTL), không cần liệt kê/xóa từng key.
+
+Version lưu trong DB (FinancialsVersion) chứ không trong Django cache: cache mặc định là
+LocMemCache riêng từng process, nên lần tăng version từ CLI/run_jobs sẽ không tới web workers.
+Mỗi request đọc version bằng 1 query theo primary key; phần body JSON vẫn nằm trong cache.
+"""
+import logging
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from apps.calculate.models import FinancialsVersion
+
+logger = logging.getLogger(__name__)
+
+FINANCIALS_CACHE_PREFIX = "financials"
+DEFAULT_FINANCIALS_CACHE_TTL = 6 * 3600
+
+
+class FinancialsCache:
+    def __init__(self, ttl: Optional[int] = None, backend=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, "FINANCIALS_CACHE_TTL", DEFAULT_FINANCIALS_CACHE_TTL)
+        self.backend = backend or cache
+
+    @staticmethod
+    def version(symbol_id: int) -> int:
+        version = FinancialsVersion.objects.filter(symbol_id=symbol_id).values_list("version", flat=True).first()
+        return version or 0
+
+    def key(self, symbol_id: int, statements: Iterable[str], years: int, quarter: Optional[int]) -> str:
+        return ":".join([
+            FINANCIALS_CACHE_PREFIX,
+            str(symbol_id),
+            f"v{self.version(symbol_id)}",
+            ",".join(sorted(statements)),
+            f"y{years}",
+            f"q{quarter or 'all'}",
+        ])
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.backend.get(key)
+
+    def set(self, key: str, body: bytes) -> None:
+        self.backend.set(key, body, self.ttl)
+
+    @staticmethod
+    def invalidate(symbol_id: int) -> None:
+        """
+        Tăng version bằng 1 UPDATE; chạy trong transaction của import nên process khác thấy
+        version mới đúng lúc dữ liệu mới được commit.
+        """
+        bump = FinancialsVersion.objects.filter(symbol_id=symbol_id)
+        if bump.update(version=F("version") + 1):
+            return
+        try:
+            with transaction.atomic():
+                FinancialsVersion.objects.create(symbol_id=symbol_id, version=1)
+        except IntegrityError:
+            # Process khác vừa tạo dòng version
+            bump.update(version=F("version") + 1)
+
+
+_financials_cache = FinancialsCache()
+
+
+def get_financials_cache() -> FinancialsCache:
+    return _financials_cache
+
+
+def invalidate_symbol_financials(symbol_id: int) -> None:
+    """Gọi sau khi upsert báo cáo của symbol (trong cùng transaction với upsert)"""
+    try:
+        _financials_cache.invalidate(symbol_id)
+    except Exception as exc:
+        logger.warning("Financials cache invalidation failed for symbol %s: %s", symbol_id, exc)
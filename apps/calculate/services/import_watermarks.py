@@ -0,0 +1,118 @@
+# apps/calculate/services/import_watermarks.py
+"""
+Watermark cho import báo cáo tài chính dạng delta:
+- Lưu kỳ (year_report, length_report) mới nhất đã import cho mỗi symbol/loại báo cáo
+- Chỉ fetch symbol khi kỳ kế tiếp đã tới hạn công bố
+- Chỉ ghi các kỳ mới hoặc có giá trị thay đổi (so sánh row hash)
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+from django.utils import timezone
+
+from apps.calculate.models import FinancialImportWatermark
+from apps.calculate.services.statement_mappers import STATEMENT_SPECS, StatementMappers
+
+# Hạn nộp BCTC quý hợp nhất: 30 ngày sau khi kết thúc quý
+DEFAULT_FILING_GRACE_DAYS = 30
+# Symbol chưa có dữ liệu cho một loại báo cáo: kiểm tra lại sau N ngày
+DEFAULT_EMPTY_RECHECK_DAYS = 7
+
+
+class ImportWatermarks:
+    """Quyết định symbol nào cần fetch lại và kỳ nào cần ghi"""
+
+    STATEMENTS = tuple(STATEMENT_SPECS)
+
+    def __init__(
+        self,
+        filing_grace_days: int = DEFAULT_FILING_GRACE_DAYS,
+        empty_recheck_days: int = DEFAULT_EMPTY_RECHECK_DAYS,
+        today: Optional[date] = None,
+    ):
+        self.filing_grace_days = filing_grace_days
+        self.empty_recheck_days = empty_recheck_days
+        self._today = today
+
+    @property
+    def today(self) -> date:
+        return self._today or timezone.localdate()
+
+    @staticmethod
+    def next_period(year_report: int, length_report: int) -> Tuple[int, int]:
+        """Kỳ quý kế tiếp; length_report >= 4 (Q4 hoặc cả năm) -> Q1 năm sau"""
+        if length_report >= 4:
+            return year_report + 1, 1
+        return year_report, length_report + 1
+
+    def next_due_date(self, year_report: int, length_report: int) -> date:
+        """Ngày kỳ kế tiếp của watermark phải được công bố"""
+        year, quarter = self.next_period(year_report, length_report)
+        if quarter == 4:
+            quarter_end = date(year, 12, 31)
+        else:
+            quarter_end = date(year, quarter * 3 + 1, 1) - timedelta(days=1)
+        return quarter_end + timedelta(days=self.filing_grace_days)
+
+    def load(self, symbol_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, FinancialImportWatermark]]:
+        """{symbol_id: {statement: watermark}} bằng 1 query"""
+        qs = FinancialImportWatermark.objects.all()
+        if symbol_ids is not None:
+            qs = qs.filter(symbol_id__in=list(symbol_ids))
+        result: Dict[int, Dict[str, FinancialImportWatermark]] = {}
+        for watermark in qs:
+            result.setdefault(watermark.symbol_id, {})[watermark.statement] = watermark
+        return result
+
+    def is_statement_due(self, watermark: Optional[FinancialImportWatermark]) -> bool:
+        if watermark is None:
+            return True
+        if watermark.year_report <= 0:
+            checked = timezone.localdate(watermark.checked_at) if watermark.checked_at else None
+            return checked is None or (self.today - checked).days >= self.empty_recheck_days
+        return self.today >= self.next_due_date(watermark.year_report, watermark.length_report)
+
+    def is_due(self, watermarks: Dict[str, FinancialImportWatermark]) -> bool:
+        """Symbol cần fetch nếu có ít nhất 1 loại báo cáo tới hạn kỳ mới"""
+        return any(self.is_statement_due(watermarks.get(statement)) for statement in self.STATEMENTS)
+
+    @staticmethod
+    def changed_rows(
+        frame: pd.DataFrame,
+        hashes: Dict[str, str],
+        watermark: Optional[FinancialImportWatermark],
+    ) -> pd.DataFrame:
+        """Giữ các kỳ mới hơn watermark hoặc có hash khác với lần import trước"""
+        if frame.empty or watermark is None:
+            return frame
+        stored = watermark.row_hashes or {}
+        keys = [
+            StatementMappers.period_key(year, length)
+            for year, length in zip(frame["year_report"], frame["length_report"])
+        ]
+        mask = [stored.get(key) != hashes.get(key) for key in keys]
+        return frame[mask]
+
+    @staticmethod
+    def save(
+        symbol,
+        statement: str,
+        frame: pd.DataFrame,
+        hashes: Dict[str, str],
+        watermark: Optional[FinancialImportWatermark] = None,
+    ) -> FinancialImportWatermark:
+        """Cập nhật watermark sau khi ghi (gọi trong cùng transaction với upsert)"""
+        if watermark is None:
+            watermark = FinancialImportWatermark.objects.filter(symbol=symbol, statement=statement).first()
+        if watermark is None:
+            watermark = FinancialImportWatermark(symbol=symbol, statement=statement)
+
+        latest = (watermark.year_report, watermark.length_report)
+        if not frame.empty:
+            newest = max((int(year), int(length)) for year, length in zip(frame["year_report"], frame["length_report"]))
+            latest = max(latest, newest)
+        watermark.year_report, watermark.length_report = latest
+        watermark.row_hashes = {**(watermark.row_hashes or {}), **hashes}
+        watermark.save()
+        return watermark
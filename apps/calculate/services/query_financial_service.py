@@ -1,6 +1,12 @@
-from typing import List
+import json
+from decimal import Decimal
+from typing import Iterable, List, Optional
 from ninja.errors import HttpError
-from apps.calculate.repositories import qs_cash_flow, qs_income_statement, qs_balance_sheet
+from ninja.responses import NinjaJSONEncoder
+from apps.calculate.repositories import qs_cash_flow, qs_income_statement, qs_balance_sheet, statement_rows
+from apps.calculate.services.financials_cache import get_financials_cache
+from apps.calculate.services.statement_mappers import STATEMENT_SPECS
+from apps.stock.models import Symbol
 from apps.calculate.dtos.cash_flow_dto import CashFlowOut, SymbolOut as CashFlowSymbolOut
 from apps.calculate.dtos.income_statement_dto import InComeOut, SymbolOut
 from apps.calculate.dtos.blance_sheet_dto import BalanceSheetOut
@@ -9,6 +15,8 @@ from apps.calculate.dtos.ratio_dto import RatioOut, SymbolOut as RatioSymbolOut
 
 class QueryFinancialService:
     """Service to handle financial data queries and formatting"""
+
+    STATEMENTS = tuple(STATEMENT_SPECS)
     
     @staticmethod
     def format_vnd(value) -> str:
@@ -66,8 +74,8 @@ class QueryFinancialService:
     def get_cash_flow_statements(self, symbol_id: int) -> List[CashFlowOut]:
         """Get cash flow statements for a symbol"""
         try:
-            qs = qs_cash_flow(symbol_id)
-            if not qs.exists():
+            qs = list(qs_cash_flow(symbol_id))
+            if not qs:
                 raise HttpError(404, f"No cash flow statements found for symbol_id={symbol_id}")
             
             return [
@@ -116,6 +124,8 @@ class QueryFinancialService:
                 for cf in qs
             ]
 
+        except HttpError:
+            raise
         except Exception as e:
             import traceback
             print(f"Error in get_cash_flow_statements: {e}")
@@ -125,8 +135,8 @@ class QueryFinancialService:
     def get_income_statements(self, symbol_id: int) -> List[InComeOut]:
         """Get income statements for a symbol"""
         try:
-            qs = qs_income_statement(symbol_id)
-            if not qs.exists():
+            qs = list(qs_income_statement(symbol_id))
+            if not qs:
                 raise HttpError(404, "No income statements found for this symbol")
 
             return [
@@ -171,6 +181,8 @@ class QueryFinancialService:
                 for inc in qs
             ]
 
+        except HttpError:
+            raise
         except Exception as e:
             import traceback
             print(f"Error in get_income_statements: {e}")
@@ -180,8 +192,8 @@ class QueryFinancialService:
     def get_balance_sheets(self, symbol_id: int) -> List[BalanceSheetOut]:
         """Get balance sheets for a symbol"""
         try:
-            qs = qs_balance_sheet(symbol_id)
-            if not qs.exists():
+            qs = list(qs_balance_sheet(symbol_id))
+            if not qs:
                 raise HttpError(404, f"No balance sheets found for symbol_id={symbol_id}")
 
             return [
@@ -225,6 +237,8 @@ class QueryFinancialService:
                 for bs in qs
             ]
 
+        except HttpError:
+            raise
         except Exception as e:
             import traceback
             print(f"Error in get_balance_sheets: {e}")
@@ -235,8 +249,8 @@ class QueryFinancialService:
         """Get all financial ratios for a symbol"""
         try:
             from apps.calculate.repositories import qs_ratio
-            qs = qs_ratio(symbol_id)
-            if not qs.exists():
+            qs = list(qs_ratio(symbol_id))
+            if not qs:
                 raise HttpError(404, f"No financial ratios found for symbol_id={symbol_id}")
             
             return [
@@ -286,9 +300,52 @@ class QueryFinancialService:
                 for ratio in qs
             ]
 
+        except HttpError:
+            raise
         except Exception as e:
             import traceback
             print(f"Error in get_ratios: {e}")
             print(traceback.format_exc())
             raise HttpError(500, "Lỗi hệ thống, vui lòng thử lại sau.")
 
+    def get_financials(
+        self,
+        symbol_id: int,
+        statements: Optional[Iterable[str]] = None,
+        years: int = 8,
+        quarter: Optional[int] = None,
+    ) -> bytes:
+        """
+        Nhiều loại báo cáo của symbol trong 1 response (JSON bytes đã serialize).
+        Mỗi bảng 1 query .values(); kết quả cache theo (symbol, statements, years, quarter)
+        và bị vô hiệu khi CalculateService upsert kỳ mới của symbol.
+        """
+        statements = sorted(set(statements or self.STATEMENTS))
+        unknown = [name for name in statements if name not in STATEMENT_SPECS]
+        if unknown:
+            raise HttpError(400, f"statements must be in {', '.join(self.STATEMENTS)}")
+        if quarter is not None and not 1 <= quarter <= 5:
+            raise HttpError(400, "quarter must be between 1 and 5")
+
+        cache = get_financials_cache()
+        key = cache.key(symbol_id, statements, years, quarter)
+        body = cache.get(key)
+        if body is not None:
+            return body
+
+        symbol = Symbol.objects.filter(id=symbol_id).values("id", "name", "exchange").first()
+        if symbol is None:
+            raise HttpError(404, f"Symbol {symbol_id} not found")
+
+        payload = {"symbol": symbol}
+        for name in statements:
+            model = STATEMENT_SPECS[name][0]
+            payload[name] = [
+                # Ratio dùng DecimalField; trả số như các DTO thay vì chuỗi
+                {k: float(v) if isinstance(v, Decimal) else v for k, v in row.items()}
+                for row in statement_rows(model, symbol_id, years=years, quarter=quarter)
+            ]
+
+        body = json.dumps(payload, cls=NinjaJSONEncoder).encode("utf-8")
+        cache.set(key, body)
+        return body
@@ -0,0 +1,287 @@
+# apps/calculate/services/statement_mappers.py
+"""
+Map cả DataFrame báo cáo tài chính từ vnstock sang model instances bằng thao tác theo cột
+(thay cho việc build dict từng row qua iterrows()).
+"""
+from typing import Dict, List, Sequence, Tuple, Type, Union
+
+import numpy as np
+import pandas as pd
+from django.db import models
+
+from apps.calculate.models import BalanceSheet, CashFlow, IncomeStatement, Ratio
+
+SourceColumn = Union[str, Tuple[str, str]]
+
+# model field -> cột nguồn trong DataFrame vnstock
+BALANCE_SHEET_FIELDS = {
+    "current_assets_bn_vnd": 'CURRENT ASSETS (Bn. VND)',
+    "cash_and_cash_equivalents_bn_vnd": 'Cash and cash equivalents (Bn. VND)',
+    "short_term_investments_bn_vnd": 'Short-term investments (Bn. VND)',
+    "accounts_receivable_bn_vnd": 'Accounts receivable (Bn. VND)',
+    "net_inventories": 'Net Inventories',
+    "other_current_assets_bn_vnd": 'Other current assets (Bn. VND)',
+    "long_term_assets_bn_vnd": 'LONG-TERM ASSETS (Bn. VND)',
+    "long_term_loans_receivables_bn_vnd": 'Long-term loans receivables (Bn. VND)',
+    "fixed_assets_bn_vnd": 'Fixed assets (Bn. VND)',
+    "long_term_investments_bn_vnd": 'Long-term investments (Bn. VND)',
+    "other_non_current_assets": 'Other non-current assets',
+    "total_assets_bn_vnd": 'TOTAL ASSETS (Bn. VND)',
+    "liabilities_bn_vnd": 'LIABILITIES (Bn. VND)',
+    "current_liabilities_bn_vnd": 'Current liabilities (Bn. VND)',
+    "long_term_liabilities_bn_vnd": 'Long-term liabilities (Bn. VND)',
+    "owners_equitybn_vnd": "OWNER'S EQUITY(Bn.VND)",
+    "capital_and_reserves_bn_vnd": 'Capital and reserves (Bn. VND)',
+    "undistributed_earnings_bn_vnd": 'Undistributed earnings (Bn. VND)',
+    "minority_interests": 'MINORITY INTERESTS',
+    "total_resources_bn_vnd": 'TOTAL RESOURCES (Bn. VND)',
+    "prepayments_to_suppliers_bn_vnd": 'Prepayments to suppliers (Bn. VND)',
+    "short_term_loans_receivables_bn_vnd": 'Short-term loans receivables (Bn. VND)',
+    "inventories_net_bn_vnd": 'Inventories, Net (Bn. VND)',
+    "investment_and_development_funds_bn_vnd": 'Investment and development funds (Bn. VND)',
+    "common_shares_bn_vnd": 'Common shares (Bn. VND)',
+    "paid_in_capital_bn_vnd": 'Paid-in capital (Bn. VND)',
+    "long_term_borrowings_bn_vnd": 'Long-term borrowings (Bn. VND)',
+    "advances_from_customers_bn_vnd": 'Advances from customers (Bn. VND)',
+    "short_term_borrowings_bn_vnd": 'Short-term borrowings (Bn. VND)',
+    "good_will_bn_vnd": 'Good will (Bn. VND)',
+    "long_term_prepayments_bn_vnd": 'Long-term prepayments (Bn. VND)',
+    "other_long_term_assets_bn_vnd": 'Other long-term assets (Bn. VND)',
+    "other_long_term_receivables_bn_vnd": 'Other long-term receivables (Bn. VND)',
+    "long_term_trade_receivables_bn_vnd": 'Long-term trade receivables (Bn. VND)',
+}
+
+INCOME_STATEMENT_FIELDS = {
+    "revenue_yoy_percent": 'Revenue YoY (%)',
+    "revenue_bn_vnd": 'Revenue (Bn. VND)',
+    "attribute_to_parent_company_bn_vnd": 'Attribute to parent company (Bn. VND)',
+    "attribute_to_parent_company_yo_y_percent": 'Attribute to parent company YoY (%)',
+    "financial_income": 'Financial Income',
+    "interest_expenses": 'Interest Expenses',
+    "sales": 'Sales',
+    "sales_deductions": 'Sales deductions',
+    "net_sales": 'Net Sales',
+    "cost_of_sales": 'Cost of Sales',
+    "gross_profit": 'Gross Profit',
+    "financial_expenses": 'Financial Expenses',
+    "gain_loss_from_joint_ventures": 'Gain/(loss) from joint ventures',
+    "selling_expenses": 'Selling Expenses',
+    "general_admin_expenses": 'General & Admin Expenses',
+    "operating_profit_loss": 'Operating Profit/Loss',
+    "other_income": 'Other income',
+    "other_income_expenses": 'Other Income/Expenses',
+    "net_other_income_expenses": 'Net other income/expenses',
+    "profit_before_tax": 'Profit before tax',
+    "business_income_tax_current": 'Business income tax - current',
+    "business_income_tax_deferred": 'Business income tax - deferred',
+    "net_profit_for_the_year": 'Net Profit For the Year',
+    "minority_interest": 'Minority Interest',
+    "attributable_to_parent_company": 'Attributable to parent company',
+}
+
+CASH_FLOW_FIELDS = {
+    "net_profit_loss_before_tax": 'Net Profit/Loss before tax',
+    "depreciation_and_amortisation": 'Depreciation and Amortisation',
+    "provision_for_credit_losses": 'Provision for credit losses',
+    "unrealized_foreign_exchange_gain_loss": 'Unrealized foreign exchange gain/loss',
+    "profit_loss_from_investing_activities": 'Profit/Loss from investing activities',
+    "interest_expense": 'Interest Expense',
+    "operating_profit_before_changes_in_working_capital": 'Operating profit before changes in working capital',
+    "increase_decrease_in_receivables": 'Increase/Decrease in receivables',
+    "increase_decrease_in_inventories": 'Increase/Decrease in inventories',
+    "increase_decrease_in_payables": 'Increase/Decrease in payables',
+    "increase_decrease_in_prepaid_expenses": 'Increase/Decrease in prepaid expenses',
+    "interest_paid": 'Interest paid',
+    "business_income_tax_paid": 'Business Income Tax paid',
+    "net_cash_inflows_outflows_from_operating_activities": 'Net cash inflows/outflows from operating activities',
+    "purchase_of_fixed_assets": 'Purchase of fixed assets',
+    "proceeds_from_disposal_of_fixed_assets": 'Proceeds from disposal of fixed assets',
+    "loans_granted_purchases_of_debt_instruments_bn_vnd": 'Loans granted, purchases of debt instruments (Bn. VND)',
+    "collection_of_loans_proceeds_sales_instruments_vnd": 'Collection of loans, proceeds from sales of debts instruments (Bn. VND)',
+    "investment_in_other_entities": 'Investment in other entities',
+    "proceeds_from_divestment_in_other_entities": 'Proceeds from divestment in other entities',
+    "gain_on_dividend": 'Gain on Dividend',
+    "net_cash_flows_from_investing_activities": 'Net Cash Flows from Investing Activities',
+    "increase_in_charter_captial": 'Increase in charter captial',
+    "payments_for_share_repurchases": 'Payments for share repurchases',
+    "proceeds_from_borrowings": 'Proceeds from borrowings',
+    "repayment_of_borrowings": 'Repayment of borrowings',
+    "finance_lease_principal_payments": 'Finance lease principal payments',
+    "dividends_paid": 'Dividends paid',
+    "cash_flows_from_financial_activities": 'Cash flows from financial activities',
+    "net_increase_decrease_in_cash_and_cash_equivalents": 'Net increase/decrease in cash and cash equivalents',
+    "cash_and_cash_equivalents": 'Cash and cash equivalents',
+    "foreign_exchange_differences_adjustment": 'Foreign exchange differences Adjustment',
+    "cash_and_cash_equivalents_at_the_end_of_period": 'Cash and Cash Equivalents at the end of period',
+}
+
+RATIO_FIELDS = {
+    "st_lt_borrowings_equity": ('Chỉ tiêu cơ cấu nguồn vốn', '(ST+LT borrowings)/Equity'),
+    "debt_equity": ('Chỉ tiêu cơ cấu nguồn vốn', 'Debt/Equity'),
+    "fixed_asset_to_equity": ('Chỉ tiêu cơ cấu nguồn vốn', 'Fixed Asset-To-Equity'),
+    "owners_equity_charter_capital": ('Chỉ tiêu cơ cấu nguồn vốn', "Owners' Equity/Charter Capital"),
+    "asset_turnover": ('Chỉ tiêu hiệu quả hoạt động', 'Asset Turnover'),
+    "fixed_asset_turnover": ('Chỉ tiêu hiệu quả hoạt động', 'Fixed Asset Turnover'),
+    "days_sales_outstanding": ('Chỉ tiêu hiệu quả hoạt động', 'Days Sales Outstanding'),
+    "days_inventory_outstanding": ('Chỉ tiêu hiệu quả hoạt động', 'Days Inventory Outstanding'),
+    "days_payable_outstanding": ('Chỉ tiêu hiệu quả hoạt động', 'Days Payable Outstanding'),
+    "cash_cycle": ('Chỉ tiêu hiệu quả hoạt động', 'Cash Cycle'),
+    "inventory_turnover": ('Chỉ tiêu hiệu quả hoạt động', 'Inventory Turnover'),
+    "ebit_margin_percent": ('Chỉ tiêu khả năng sinh lợi', 'EBIT Margin (%)'),
+    "gross_profit_margin_percent": ('Chỉ tiêu khả năng sinh lợi', 'Gross Profit Margin (%)'),
+    "net_profit_margin_percent": ('Chỉ tiêu khả năng sinh lợi', 'Net Profit Margin (%)'),
+    "roe_percent": ('Chỉ tiêu khả năng sinh lợi', 'ROE (%)'),
+    "roic_percent": ('Chỉ tiêu khả năng sinh lợi', 'ROIC (%)'),
+    "roa_percent": ('Chỉ tiêu khả năng sinh lợi', 'ROA (%)'),
+    "ebitda_bn_vnd": ('Chỉ tiêu khả năng sinh lợi', 'EBITDA (Bn. VND)'),
+    "ebit_bn_vnd": ('Chỉ tiêu khả năng sinh lợi', 'EBIT (Bn. VND)'),
+    "dividend_yield_percent": ('Chỉ tiêu khả năng sinh lợi', 'Dividend yield (%)'),
+    "current_ratio": ('Chỉ tiêu thanh khoản', 'Current Ratio'),
+    "cash_ratio": ('Chỉ tiêu thanh khoản', 'Cash Ratio'),
+    "quick_ratio": ('Chỉ tiêu thanh khoản', 'Quick Ratio'),
+    "interest_coverage": ('Chỉ tiêu thanh khoản', 'Interest Coverage'),
+    "financial_leverage": ('Chỉ tiêu thanh khoản', 'Financial Leverage'),
+    "market_capital_bn_vnd": ('Chỉ tiêu định giá', 'Market Capital (Bn. VND)'),
+    "outstanding_share_mil_shares": ('Chỉ tiêu định giá', 'Outstanding Share (Mil. Shares)'),
+    "p_e": ('Chỉ tiêu định giá', 'P/E'),
+    "p_b": ('Chỉ tiêu định giá', 'P/B'),
+    "p_s": ('Chỉ tiêu định giá', 'P/S'),
+    "p_cash_flow": ('Chỉ tiêu định giá', 'P/Cash Flow'),
+    "eps_vnd": ('Chỉ tiêu định giá', 'EPS (VND)'),
+    "bvps_vnd": ('Chỉ tiêu định giá', 'BVPS (VND)'),
+    "ev_ebitda": ('Chỉ tiêu định giá', 'EV/EBITDA'),
+}
+PERIOD_COLUMNS: Dict[str, Sequence[SourceColumn]] = {
+    "year_report": ("yearReport",),
+    "length_report": ("lengthReport",),
+}
+
+# Ratio DataFrame dùng MultiIndex columns: ('Meta', 'yearReport')
+RATIO_PERIOD_COLUMNS: Dict[str, Sequence[SourceColumn]] = {
+    "year_report": (("Meta", "yearReport"), "yearReport"),
+    "length_report": (("Meta", "lengthReport"), "lengthReport"),
+}
+
+# statement key -> (model, key của DataFrame trong bundle, field map, period columns)
+STATEMENT_SPECS = {
+    "balance_sheet": (BalanceSheet, "balance_sheet_df", BALANCE_SHEET_FIELDS, PERIOD_COLUMNS),
+    "income_statement": (IncomeStatement, "income_statement_df", INCOME_STATEMENT_FIELDS, PERIOD_COLUMNS),
+    "cash_flow": (CashFlow, "cash_flow_df", CASH_FLOW_FIELDS, PERIOD_COLUMNS),
+    "ratio": (Ratio, "ratios_df", RATIO_FIELDS, RATIO_PERIOD_COLUMNS),
+}
+
+
+class StatementMappers:
+    """Vectorized mapping DataFrame -> model instances cho 4 loại báo cáo"""
+
+    @staticmethod
+    def _column(df: pd.DataFrame, candidates: Sequence[SourceColumn]) -> pd.Series:
+        """Lấy cột đầu tiên tồn tại trong df (ép về numeric), không có thì trả Series NaN."""
+        for name in candidates:
+            try:
+                if name not in df.columns:
+                    continue
+                col = df[name]
+            except (KeyError, TypeError, ValueError):
+                continue
+            if isinstance(col, pd.DataFrame):
+                col = col.iloc[:, 0]
+            return pd.to_numeric(col, errors="coerce")
+        return pd.Series(np.nan, index=df.index, dtype="float64")
+
+    @staticmethod
+    def _as_int(values: pd.Series) -> pd.Series:
+        """Tương đương safe_int theo cột: NaN/inf -> 0, số thực cắt phần thập phân."""
+        if pd.api.types.is_integer_dtype(values):
+            return values.astype("int64")
+        values = values.astype("float64").replace([np.inf, -np.inf], np.nan).fillna(0)
+        return np.trunc(values).astype("int64")
+
+    @staticmethod
+    def _as_float(values: pd.Series) -> pd.Series:
+        """Tương đương safe_decimal theo cột: NaN -> 0.0."""
+        return values.astype("float64").fillna(0.0)
+
+    @classmethod
+    def to_frame(
+        cls,
+        df: pd.DataFrame,
+        model: Type[models.Model],
+        field_map: Dict[str, SourceColumn],
+        period_columns: Dict[str, Sequence[SourceColumn]] = PERIOD_COLUMNS,
+    ) -> pd.DataFrame:
+        """
+        Trả về DataFrame đã chuẩn hoá với tên cột = tên field của model.
+        Bỏ các kỳ không có year/length hợp lệ; trùng kỳ thì giữ row cuối (như upsert tuần tự).
+        """
+        if df is None or df.empty:
+            return pd.DataFrame()
+
+        columns = {
+            period_field: cls._as_int(cls._column(df, candidates))
+            for period_field, candidates in period_columns.items()
+        }
+        for field_name, source in field_map.items():
+            values = cls._column(df, (source,))
+            if isinstance(model._meta.get_field(field_name), models.IntegerField):
+                columns[field_name] = cls._as_int(values)
+            else:
+                columns[field_name] = cls._as_float(values)
+
+        frame = pd.DataFrame(columns, index=df.index)
+        frame = frame[(frame["year_report"] > 0) & (frame["length_report"] > 0)]
+        return frame.drop_duplicates(subset=["year_report", "length_report"], keep="last")
+
+    @classmethod
+    def to_instances(
+        cls,
+        symbol,
+        df: pd.DataFrame,
+        model: Type[models.Model],
+        field_map: Dict[str, SourceColumn],
+        period_columns: Dict[str, Sequence[SourceColumn]] = PERIOD_COLUMNS,
+    ) -> List[models.Model]:
+        return cls.from_frame(symbol, model, cls.to_frame(df, model, field_map, period_columns))
+
+    @staticmethod
+    def from_frame(symbol, model: Type[models.Model], frame: pd.DataFrame) -> List[models.Model]:
+        if frame.empty:
+            return []
+        return [model(symbol=symbol, **record) for record in frame.to_dict("records")]
+
+    @classmethod
+    def statement_frame(cls, statement: str, df: pd.DataFrame) -> pd.DataFrame:
+        """to_frame theo statement key của STATEMENT_SPECS"""
+        model, _, field_map, period_columns = STATEMENT_SPECS[statement]
+        return cls.to_frame(df, model, field_map, period_columns)
+
+    @staticmethod
+    def period_key(year_report: int, length_report: int) -> str:
+        return f"{int(year_report)}-{int(length_report)}"
+
+    @classmethod
+    def row_hashes(cls, frame: pd.DataFrame) -> Dict[str, str]:
+        """Hash ổn định (giữa các lần chạy) cho từng kỳ của frame đã chuẩn hoá"""
+        if frame.empty:
+            return {}
+        hashes = pd.util.hash_pandas_object(frame, index=False)
+        return {
+            cls.period_key(year, length): format(int(value), "016x")
+            for year, length, value in zip(frame["year_report"], frame["length_report"], hashes)
+        }
+
+    @classmethod
+    def balance_sheets(cls, symbol, df: pd.DataFrame) -> List[BalanceSheet]:
+        return cls.to_instances(symbol, df, BalanceSheet, BALANCE_SHEET_FIELDS)
+
+    @classmethod
+    def income_statements(cls, symbol, df: pd.DataFrame) -> List[IncomeStatement]:
+        return cls.to_instances(symbol, df, IncomeStatement, INCOME_STATEMENT_FIELDS)
+
+    @classmethod
+    def cash_flows(cls, symbol, df: pd.DataFrame) -> List[CashFlow]:
+        return cls.to_instances(symbol, df, CashFlow, CASH_FLOW_FIELDS)
+
+    @classmethod
+    def ratios(cls, symbol, df: pd.DataFrame) -> List[Ratio]:
+        return cls.to_instances(symbol, df, Ratio, RATIO_FIELDS, RATIO_PERIOD_COLUMNS)
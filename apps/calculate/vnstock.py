@@ -1,6 +1,4 @@
 import logging
-import re
-import time
 from typing import Callable, Dict, Generator, List, Optional, Tuple
 
 import pandas as pd
@@ -14,39 +12,10 @@ logger = logging.getLogger(__name__)
 
 class VNStock:
 
-    def __init__(self, max_retries: int = 5, wait_seconds: int = 60):
+    def __init__(self, max_retries: int = 5):
         self.max_retries = max_retries
-        self.wait_seconds = wait_seconds
         self.rate_limiter = get_rate_limiter()
 
-    def _compute_wait_seconds(self, exc: Optional[SystemExit], retries: int) -> float:
-        """
-        Determine how long we should wait before retrying.
-        - Try to respect the "try again after X seconds" hint from VCI.
-        - Fall back to exponential backoff using `wait_seconds`.
-        """
-        base_wait = self.wait_seconds * max(1, 2 ** (retries - 1))
-
-        if exc is None:
-            return base_wait
-
-        message = ""
-        if isinstance(exc, SystemExit):
-            if isinstance(exc.code, str):
-                message = exc.code
-            elif exc.code is not None:
-                message = str(exc.code)
-        else:
-            message = str(exc)
-
-        match = re.search(r"(\d+)\s*(?:giây|s|sec)", message)
-        if match:
-            suggested = int(match.group(1))
-            # Add a small buffer to be safe
-            return max(base_wait, suggested + 5)
-
-        return base_wait
-
     def _df_or_empty(self, df: Optional[pd.DataFrame]) -> pd.DataFrame:
         if df is None:
             return pd.DataFrame()
@@ -204,20 +173,20 @@ class VNStock:
                     )
                     break
 
-                wait_for = self._compute_wait_seconds(exc, retries)
+                # Pause chung qua rate limiter; lần wait_if_needed kế tiếp sẽ chờ hết pause
+                wait_for = self.rate_limiter.backoff(exc, f"calculate_finance_{symbol}", attempt=retries)
                 print(
                     f"SystemExit occurred for {symbol}, retrying after {wait_for:.0f}s "
                     f"({retries}/{self.max_retries})"
                 )
                 logger.warning(
-                    "SystemExit encountered for %s (attempt %d/%d). Message=%r. Sleeping %.1fs before retry.",
+                    "SystemExit encountered for %s (attempt %d/%d). Message=%r. Paused limiter %.1fs before retry.",
                     symbol,
                     retries,
                     self.max_retries,
                     exc.code if isinstance(exc, SystemExit) else exc,
                     wait_for,
                 )
-                time.sleep(wait_for)
 
             except Exception as e:
                 print(f"Exception occurred for {symbol}: {e}")
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'queue', 'status', 'attempts', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status', 'queue', 'kind']
+    readonly_fields = ['progress', 'checkpoint', 'result', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+    ordering = ['-id']
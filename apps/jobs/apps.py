@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.jobs"
+    verbose_name = "Background Jobs"
+
+    def ready(self):
+        # Nạp <app>/jobs.py của mọi app để các @register_job có mặt trong web process và worker
+        autodiscover_modules("jobs")
@@ -0,0 +1,51 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.registry import registered_kinds
+from apps.jobs.services.job_service import JobService, jobs_setting
+
+
+class Command(BaseCommand):
+    help = 'Worker chạy job nền (import dữ liệu, ...) từ bảng jobs, không cần broker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Queue cần xử lý, lặp lại để nhận nhiều queue (mặc định: default, imports)',
+        )
+        parser.add_argument('--once', action='store_true', help='Chạy các job đang chờ rồi thoát')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Thoát sau N job (0 = không giới hạn)')
+
+    def handle(self, *args, **options):
+        queues = options.get('queues') or ['default', 'imports']
+        poll_interval = jobs_setting('POLL_INTERVAL')
+        max_jobs = options['max_jobs']
+        service = JobService()
+
+        # SIGTERM (systemd/docker stop) xử lý như Ctrl+C: job đang chạy được trả về hàng đợi
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        self.stdout.write(
+            f"Worker {service.worker_id} - queues: {', '.join(queues)} - kinds: {', '.join(registered_kinds())}"
+        )
+        processed = 0
+        try:
+            while True:
+                job = service.run_next(queues)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                processed += 1
+                style = self.style.SUCCESS if job.status == 'succeeded' else self.style.WARNING
+                self.stdout.write(style(f"Job #{job.pk} {job.kind}: {job.status}"))
+                if max_jobs and processed >= max_jobs:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Worker stopped, running job was requeued'))
@@ -0,0 +1,51 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+    CANCELLED = "cancelled", "Cancelled"
+
+
+class Job(models.Model):
+    """
+    Job nền lưu trong DB (không cần broker): API tạo job QUEUED, worker `run_jobs` claim bằng
+    SELECT ... FOR UPDATE SKIP LOCKED rồi chạy handler đã đăng ký theo `kind`.
+    progress/checkpoint được ghi dần trong lúc chạy để theo dõi và chạy tiếp sau khi dừng.
+    """
+    kind = models.CharField(max_length=64, db_comment="Tên handler đã đăng ký, vd. stock.import_companies")
+    queue = models.CharField(max_length=32, default="default", db_comment="Worker chỉ claim job của queue mình chạy")
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=16, choices=JobStatus.choices, default=JobStatus.QUEUED)
+
+    progress = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    checkpoint = models.JSONField(default=dict, blank=True, db_comment="Các item đã xong theo bảng, dùng khi resume")
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default="")
+
+    cancel_requested = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=128, blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "jobs"
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["queue", "status", "id"], name="idx_jobs_claim"),
+            models.Index(fields=["kind", "-created_at"], name="idx_jobs_kind_created"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Job #{self.pk} {self.kind} ({self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
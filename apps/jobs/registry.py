@@ -0,0 +1,39 @@
+"""
+Đăng ký handler cho job nền.
+
+Mỗi app khai báo handler trong <app>/jobs.py (JobsConfig.ready() tự import):
+
+    @register_job("stock.import_companies", queue="imports")
+    def import_companies(progress, exchange="HSX"):
+        ...
+        return {...}   # JSON-serializable, lưu vào Job.result
+
+Handler nhận `progress` (JobProgress) làm tham số đầu và params của job dưới dạng kwargs.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+
+@dataclass(frozen=True)
+class JobDefinition:
+    kind: str
+    func: Callable
+    queue: str = "default"
+
+
+_registry: Dict[str, JobDefinition] = {}
+
+
+def register_job(kind: str, queue: str = "default"):
+    def decorator(func: Callable) -> Callable:
+        _registry[kind] = JobDefinition(kind=kind, func=func, queue=queue)
+        return func
+    return decorator
+
+
+def get_job_definition(kind: str) -> Optional[JobDefinition]:
+    return _registry.get(kind)
+
+
+def registered_kinds():
+    return sorted(_registry)
@@ -0,0 +1,47 @@
+from typing import List, Optional
+
+from django.shortcuts import get_object_or_404
+from ninja import Router
+from ninja.errors import HttpError
+
+from apps.jobs.models import Job
+from apps.jobs.schemas import JobOut, JobSummaryOut
+from apps.jobs.services.job_service import JobService
+
+router = Router(tags=["jobs"])
+
+
+@router.get("/", response=List[JobSummaryOut])
+def list_jobs(request, kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    """Các job gần nhất (lọc theo kind/status)"""
+    jobs = Job.objects.defer("result", "checkpoint", "params")
+    if kind:
+        jobs = jobs.filter(kind=kind)
+    if status:
+        jobs = jobs.filter(status=status)
+    return jobs.order_by("-id")[:max(1, min(limit, 200))]
+
+
+@router.get("/{job_id}", response=JobOut)
+def get_job(request, job_id: int):
+    """Trạng thái + tiến độ (done/failed, bảng hiện tại, throughput, ETA) và kết quả khi xong"""
+    return get_object_or_404(Job, pk=job_id)
+
+
+@router.post("/{job_id}/cancel", response=JobOut)
+def cancel_job(request, job_id: int):
+    """Hủy job: đang chờ thì hủy ngay, đang chạy thì dừng ở lần ghi tiến độ kế tiếp"""
+    job = get_object_or_404(Job, pk=job_id)
+    if job.is_finished:
+        raise HttpError(409, f"Job is already {job.status}")
+    return JobService.cancel(job)
+
+
+@router.post("/{job_id}/resume", response=JobOut)
+def resume_job(request, job_id: int):
+    """Đưa job failed/cancelled về hàng đợi, chạy tiếp từ checkpoint"""
+    job = get_object_or_404(Job, pk=job_id)
+    try:
+        return JobService.resume(job)
+    except ValueError as e:
+        raise HttpError(409, str(e))
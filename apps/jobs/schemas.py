@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ninja import Schema
+
+
+class JobOut(Schema):
+    id: int
+    kind: str
+    queue: str
+    status: str
+    params: Dict[str, Any]
+    progress: Dict[str, Any]
+    result: Optional[Any] = None
+    error: str
+    cancel_requested: bool
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobSummaryOut(Schema):
+    """Dùng cho danh sách: không kèm result (có thể lớn)"""
+    id: int
+    kind: str
+    queue: str
+    status: str
+    progress: Dict[str, Any]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,236 @@
+"""
+Hàng đợi job nền trên bảng `jobs`.
+
+- enqueue(): API tạo job QUEUED và trả về ngay.
+- Worker (`python manage.py run_jobs`) claim job cũ nhất của queue bằng SELECT ... FOR UPDATE
+  SKIP LOCKED, nên nhiều worker chạy song song không lấy trùng job.
+- Trong lúc chạy, JobReporter ghi progress/checkpoint + heartbeat theo chu kỳ; thêm 1 thread nền
+  ghi heartbeat mỗi HEARTBEAT_INTERVAL giây để handler kẹt lâu giữa 2 lần flush (1 request vnstock
+  chậm, 1 bảng lớn) không bị coi là chết. Job RUNNING mất heartbeat quá STALE_AFTER (worker chết)
+  được trả về QUEUED và chạy tiếp từ checkpoint.
+- Mọi lần ghi của worker đều lọc theo worker id: worker đã mất job (bị requeue, worker khác nhận)
+  dừng ở lần flush kế tiếp (JobLost) và không ghi đè kết quả của worker mới.
+- Hủy: job QUEUED hủy ngay; job RUNNING được đánh dấu cancel_requested, handler dừng ở lần flush kế tiếp.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.jobs.models import Job, JobStatus
+from apps.jobs.registry import get_job_definition
+from apps.jobs.services.progress import JobCancelled, JobLost, JobProgress
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_SETTINGS = {
+    "FLUSH_INTERVAL": 2.0,
+    "POLL_INTERVAL": 2.0,
+    "STALE_AFTER": 300,
+    "HEARTBEAT_INTERVAL": 60,
+}
+
+
+def jobs_setting(name: str) -> Any:
+    return getattr(settings, "JOBS", {}).get(name, DEFAULT_JOBS_SETTINGS[name])
+
+
+class _ResultEncoder(DjangoJSONEncoder):
+    """Kết quả handler có thể chứa numpy scalar / object lạ -> không để lỗi serialize làm mất kết quả"""
+
+    def default(self, o):
+        if hasattr(o, "item"):
+            return o.item()
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+class JobReporter(JobProgress):
+    """JobProgress ghi xuống Job; kiểm tra yêu cầu hủy mỗi lần flush"""
+
+    def __init__(self, job: Job, flush_interval: Optional[float] = None, worker_id: Optional[str] = None):
+        super().__init__(job.checkpoint)
+        self.job_id = job.pk
+        self.worker_id = job.worker if worker_id is None else worker_id
+        self.flush_interval = jobs_setting("FLUSH_INTERVAL") if flush_interval is None else flush_interval
+        self._last_flush = 0.0
+
+    def flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        owned = Job.objects.filter(pk=self.job_id, worker=self.worker_id, status=JobStatus.RUNNING)
+        if not owned.update(progress=self.snapshot(), checkpoint=self.checkpoint, heartbeat_at=timezone.now()):
+            raise JobLost()
+        if owned.filter(cancel_requested=True).exists():
+            raise JobCancelled()
+
+
+class JobHeartbeat:
+    """Thread nền gọi `beat` mỗi `interval` giây cho tới khi stop() (interval <= 0: tắt)"""
+
+    def __init__(self, beat: Callable[[], Any], interval: float):
+        self.beat = beat
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "JobHeartbeat":
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name="job-heartbeat", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    self.beat()
+                except Exception as exc:
+                    logger.warning("Job heartbeat failed: %s", exc)
+        finally:
+            # Connection DB của thread này
+            connections.close_all()
+
+
+class JobService:
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    # -------- API --------
+    def enqueue(self, kind: str, params: Optional[Dict[str, Any]] = None, queue: Optional[str] = None) -> Job:
+        definition = get_job_definition(kind)
+        if definition is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job.objects.create(kind=kind, queue=queue or definition.queue, params=params or {})
+        logger.info("Job #%s enqueued: %s %s", job.pk, kind, job.params)
+        return job
+
+    @staticmethod
+    def cancel(job: Job) -> Job:
+        now = timezone.now()
+        if not Job.objects.filter(pk=job.pk, status=JobStatus.QUEUED).update(
+            status=JobStatus.CANCELLED, finished_at=now
+        ):
+            Job.objects.filter(pk=job.pk, status=JobStatus.RUNNING).update(cancel_requested=True)
+        job.refresh_from_db()
+        return job
+
+    @staticmethod
+    def resume(job: Job) -> Job:
+        """Đưa job FAILED/CANCELLED về hàng đợi; giữ checkpoint để bỏ qua phần đã xong"""
+        if job.status not in (JobStatus.FAILED, JobStatus.CANCELLED):
+            raise ValueError(f"Job #{job.pk} is {job.status}, only failed or cancelled jobs can be resumed")
+        Job.objects.filter(pk=job.pk).update(
+            status=JobStatus.QUEUED, cancel_requested=False, error="", worker="", finished_at=None
+        )
+        job.refresh_from_db()
+        return job
+
+    # -------- Worker --------
+    def _owned(self, job_id: int):
+        """Job vẫn đang chạy bởi worker này"""
+        return Job.objects.filter(pk=job_id, worker=self.worker_id, status=JobStatus.RUNNING)
+
+    def heartbeat(self, job_id: int) -> bool:
+        return bool(self._owned(job_id).update(heartbeat_at=timezone.now()))
+
+    @staticmethod
+    def requeue_stale(queues: Iterable[str]) -> int:
+        """Job RUNNING không còn heartbeat (worker chết) -> QUEUED, chạy tiếp từ checkpoint"""
+        deadline = timezone.now() - timedelta(seconds=jobs_setting("STALE_AFTER"))
+        stale = Job.objects.filter(queue__in=list(queues), status=JobStatus.RUNNING, heartbeat_at__lt=deadline)
+        count = stale.filter(cancel_requested=True).update(
+            status=JobStatus.CANCELLED, finished_at=timezone.now()
+        )
+        count += stale.update(status=JobStatus.QUEUED, worker="")
+        if count:
+            logger.warning("Requeued %d stale jobs", count)
+        return count
+
+    def claim(self, queues: Iterable[str]) -> Optional[Job]:
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(queue__in=list(queues), status=JobStatus.QUEUED)
+                .order_by("id")
+                .first()
+            )
+            if job is None:
+                return None
+            now = timezone.now()
+            job.status = JobStatus.RUNNING
+            job.worker = self.worker_id
+            job.attempts += 1
+            job.heartbeat_at = now
+            job.started_at = job.started_at or now
+            job.save(update_fields=["status", "worker", "attempts", "heartbeat_at", "started_at"])
+        return job
+
+    def run(self, job: Job) -> Job:
+        definition = get_job_definition(job.kind)
+        reporter = JobReporter(job, worker_id=self.worker_id)
+        result, error = None, ""
+        logger.info("Job #%s started: %s (attempt %d)", job.pk, job.kind, job.attempts)
+        heartbeat = JobHeartbeat(lambda: self.heartbeat(job.pk), jobs_setting("HEARTBEAT_INTERVAL")).start()
+        try:
+            if definition is None:
+                raise LookupError(f"No handler registered for job kind {job.kind}")
+            result = definition.func(reporter, **job.params)
+            status = JobStatus.SUCCEEDED
+        except JobLost:
+            logger.warning("Job #%s was taken over by another worker, stopping", job.pk)
+            status = JobStatus.CANCELLED
+        except JobCancelled:
+            status = JobStatus.CANCELLED
+        except KeyboardInterrupt:
+            # Worker bị dừng (Ctrl+C / SIGTERM): trả job về hàng đợi, lần sau chạy tiếp từ checkpoint
+            self._owned(job.pk).update(
+                status=JobStatus.QUEUED, worker="", progress=reporter.snapshot(), checkpoint=reporter.checkpoint
+            )
+            raise
+        except Exception:
+            status = JobStatus.FAILED
+            error = traceback.format_exc()
+            logger.exception("Job #%s failed: %s", job.pk, job.kind)
+        finally:
+            heartbeat.stop()
+
+        now = timezone.now()
+        # Không ghi đè job đã bị requeue / worker khác nhận trong lúc handler chạy
+        self._owned(job.pk).update(
+            status=status,
+            result=None if result is None else json.loads(_ResultEncoder().encode(result)),
+            error=error,
+            progress=reporter.snapshot(),
+            checkpoint=reporter.checkpoint,
+            heartbeat_at=now,
+            finished_at=now,
+        )
+        logger.info("Job #%s %s", job.pk, status)
+        job.refresh_from_db()
+        return job
+
+    def run_next(self, queues: Iterable[str]) -> Optional[Job]:
+        queues = list(queues)
+        self.requeue_stale(queues)
+        job = self.claim(queues)
+        return self.run(job) if job else None
@@ -0,0 +1,165 @@
+"""
+Theo dõi tiến độ các vòng lặp import theo từng bảng.
+
+Service import nhận 1 JobProgress (mặc định bản chỉ giữ trong RAM, dùng cho CLI/management command)
+và gọi:
+
+    symbols = self.progress.begin("shareholders", symbols)      # bỏ các item đã xong trong checkpoint
+    for symbol in self.progress.track(symbols):                 # item xong khi vòng lặp sang item kế tiếp
+        ...
+        self.progress.fail(symbol.name, error)                  # item lỗi: đếm failed, không vào checkpoint
+    self.progress.end()
+
+JobReporter (chạy trong worker) ghi progress/checkpoint xuống Job theo chu kỳ và dừng job bằng
+JobCancelled khi có yêu cầu hủy.
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+MAX_ERRORS = 20
+
+
+class JobCancelled(BaseException):
+    """
+    Job bị hủy. Kế thừa BaseException như KeyboardInterrupt để không bị các khối
+    `except Exception` quanh từng symbol trong service import nuốt mất.
+    """
+
+
+class JobLost(JobCancelled):
+    """
+    Worker không còn giữ job (mất heartbeat nên job đã bị requeue / worker khác nhận):
+    dừng handler và không ghi gì thêm vào job.
+    """
+
+
+def default_key(item: Any) -> str:
+    """Key của item trong checkpoint: Symbol -> name; tuple (symbol, bundle, ...) -> name của phần tử đầu"""
+    if isinstance(item, tuple) and item:
+        item = item[0]
+    name = getattr(item, "name", None)
+    return str(name if name is not None else item)
+
+
+class JobProgress:
+    """Tiến độ trong RAM; subclass override flush() để lưu lại"""
+
+    def __init__(self, checkpoint: Optional[Dict[str, Any]] = None):
+        self.checkpoint: Dict[str, Any] = checkpoint or {}
+        self.checkpoint.setdefault("completed", [])
+        self.checkpoint.setdefault("done", {})
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.table: Optional[str] = None
+        self.current_table: Optional[str] = None
+        self.current: Optional[str] = None
+        self.errors: List[Dict[str, str]] = []
+        self._failed_keys = set()
+        self._started = time.monotonic()
+
+    # -------- API cho service --------
+    def is_complete(self, table: str) -> bool:
+        """Bảng đã chạy xong trong 1 lần chạy trước (resume bỏ qua cả bước)"""
+        return table in self.checkpoint["completed"]
+
+    def begin(self, table: str, items: Iterable[Any], key: Callable[[Any], str] = default_key) -> List[Any]:
+        """Bắt đầu 1 bảng; trả về các item chưa xong theo checkpoint"""
+        items = list(items)
+        done = set(self.checkpoint["done"].get(table, []))
+        if self.is_complete(table):
+            pending = []
+        else:
+            pending = [item for item in items if key(item) not in done] if done else items
+
+        self.table = self.current_table = table
+        self.current = None
+        self._failed_keys = set()
+        self.tables[table] = {
+            "total": len(items),
+            "done": len(items) - len(pending),
+            "failed": 0,
+            "resumed": len(items) - len(pending),
+            "started": time.monotonic(),
+        }
+        self.flush(force=True)
+        return pending
+
+    def track(self, items: Iterable[Any], key: Callable[[Any], str] = default_key) -> Iterator[Any]:
+        """Yield từng item; item được tính xong khi thân vòng lặp chạy hết (kể cả `continue`)"""
+        for item in items:
+            self.current = key(item)
+            yield item
+            self.advance(self.current)
+
+    def stage(self, name: str) -> None:
+        """Bảng con đang ghi trong 1 item (vd. import_all_complete: shareholders -> officers -> ...)"""
+        self.current_table = name
+
+    def advance(self, key: Optional[str] = None, count: int = 1) -> None:
+        stats = self.tables.get(self.table)
+        if stats is None:
+            return
+        if key is not None and key in self._failed_keys:
+            self._failed_keys.discard(key)
+        else:
+            stats["done"] += count
+            if key is not None:
+                self.checkpoint["done"].setdefault(self.table, []).append(key)
+        self.current_table = self.table
+        self.flush()
+
+    def fail(self, key: str, error: Any) -> None:
+        stats = self.tables.get(self.table)
+        if stats is None or key in self._failed_keys:
+            return
+        stats["failed"] += 1
+        self._failed_keys.add(key)
+        self.errors = (self.errors + [{"table": self.table, "item": key, "error": str(error)}])[-MAX_ERRORS:]
+
+    def end(self) -> None:
+        """Bảng đã chạy hết: đánh dấu completed, bỏ danh sách key để checkpoint gọn"""
+        if self.table is None:
+            return
+        if self.table not in self.checkpoint["completed"]:
+            self.checkpoint["completed"].append(self.table)
+        self.checkpoint["done"].pop(self.table, None)
+        self.current = None
+        self.flush(force=True)
+
+    # -------- Snapshot --------
+    def snapshot(self) -> Dict[str, Any]:
+        tables = {}
+        for name, stats in self.tables.items():
+            processed = stats["done"] + stats["failed"]
+            remaining = max(stats["total"] - processed, 0)
+            elapsed = time.monotonic() - stats["started"]
+            # Throughput chỉ tính item xử lý trong lần chạy này (không tính item bỏ qua nhờ checkpoint)
+            fresh = processed - stats["resumed"]
+            rate = fresh / elapsed if elapsed > 0 and fresh > 0 else None
+            tables[name] = {
+                "total": stats["total"],
+                "done": stats["done"],
+                "failed": stats["failed"],
+                "remaining": remaining,
+                "percent": round(processed / stats["total"] * 100, 1) if stats["total"] else 100.0,
+                "items_per_second": round(rate, 3) if rate else None,
+                "eta_seconds": round(remaining / rate) if rate else None,
+                "completed": self.is_complete(name),
+            }
+
+        current = tables.get(self.table, {})
+        return {
+            "table": self.table,
+            "current_table": self.current_table,
+            "current_item": self.current,
+            "done": current.get("done", 0),
+            "failed": current.get("failed", 0),
+            "total": current.get("total", 0),
+            "items_per_second": current.get("items_per_second"),
+            "eta_seconds": current.get("eta_seconds"),
+            "elapsed_seconds": round(time.monotonic() - self._started, 1),
+            "tables": tables,
+            "errors": self.errors,
+        }
+
+    def flush(self, force: bool = False) -> None:
+        """Lưu tiến độ; bản trong RAM không làm gì"""
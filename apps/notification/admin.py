@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import UserEndpoint, NotificationEvent, NotificationDelivery, WebhookLog
+from django.utils import timezone
+
+from .models import DeliveryStatus, UserEndpoint, NotificationEvent, NotificationDelivery, WebhookLog
 
 
 @admin.register(UserEndpoint)
@@ -22,16 +24,24 @@ class NotificationEventAdmin(admin.ModelAdmin):
 
 @admin.register(NotificationDelivery)
 class NotificationDeliveryAdmin(admin.ModelAdmin):
-    list_display = ['delivery_id', 'get_user', 'channel', 'status', 'sent_at']
+    list_display = ['delivery_id', 'get_user', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at']
     list_filter = ['channel', 'status', 'sent_at']
     search_fields = ['delivery_id', 'event__user__email']
-    readonly_fields = ['delivery_id', 'response_raw']
+    readonly_fields = ['delivery_id', 'response_raw', 'claimed_at']
     ordering = ['-sent_at']
+    actions = ['requeue']
 
     def get_user(self, obj):
         return obj.event.user.email if obj.event else None
     get_user.short_description = 'User'
 
+    @admin.action(description='Đưa lại vào hàng đợi gửi')
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status__in=[DeliveryStatus.SENT, DeliveryStatus.SENDING]).update(
+            status=DeliveryStatus.QUEUED, attempts=0, next_attempt_at=timezone.now(), error_message=None
+        )
+        self.message_user(request, f'Requeued {updated} deliveries')
+
 
 @admin.register(WebhookLog)
 class WebhookLogAdmin(admin.ModelAdmin):
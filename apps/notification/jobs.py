@@ -0,0 +1,16 @@
+"""Job fan-out tín hiệu (dispatcher: `python manage.py run_jobs --queue notifications`)."""
+from typing import Optional
+
+from apps.jobs.registry import register_job
+from apps.notification.repositories.notification_repository import WebhookLogRepository
+from apps.notification.services.notification_utils import send_symbol_signal_to_subscribers
+
+NOTIFICATION_QUEUE = "notifications"
+
+
+@register_job("notification.symbol_signal", queue=NOTIFICATION_QUEUE)
+def symbol_signal(progress, webhook_log_id: Optional[str] = None, **signal):
+    result = send_symbol_signal_to_subscribers(progress=progress, **signal)
+    if webhook_log_id:
+        WebhookLogRepository.set_users_notified(webhook_log_id, result['sent_count'])
+    return result
@@ -0,0 +1,70 @@
+"""
+Worker gửi notifications từ hàng đợi deliveries (thay cho cron send_pending_notifications /
+retry_failed_notifications). Chạy nhiều process song song được: mỗi batch được claim bằng
+SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.notification.services.delivery_service import DeliveryService
+
+
+class Command(BaseCommand):
+    help = 'Worker gửi notification deliveries đến hạn (lần đầu + retry theo backoff)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=0,
+            help='Số deliveries mỗi lần claim (mặc định: NOTIFICATION_DISPATCH CHUNK_SIZE)'
+        )
+        parser.add_argument('--once', action='store_true', help='Gửi hết deliveries đến hạn rồi thoát')
+        parser.add_argument(
+            '--max-priority',
+            type=int,
+            default=None,
+            help='Chỉ nhận các làn có priority <= N (0 = chỉ tín hiệu giao dịch), để chạy worker riêng cho signal'
+        )
+        parser.add_argument(
+            '--requeue-dead',
+            type=int,
+            default=0,
+            metavar='N',
+            help='Đưa tối đa N deliveries dead-letter về hàng đợi trước khi chạy'
+        )
+
+    def handle(self, *args, **options):
+        service = DeliveryService(chunk_size=options['batch_size'] or None)
+        poll_interval = getattr(settings, 'NOTIFICATION_DISPATCH', {}).get('POLL_INTERVAL', 1)
+
+        # SIGTERM (systemd/docker stop) xử lý như Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        if options['requeue_dead']:
+            requeued = service.requeue_dead_deliveries(options['requeue_dead'])
+            self.stdout.write(f'Requeued {requeued} dead deliveries')
+
+        self.stdout.write(f'Notification worker started (batch size: {service.chunk_size})')
+        try:
+            while True:
+                stats = service.process_due(max_priority=options['max_priority'])
+                if not stats['claimed']:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                style = self.style.SUCCESS if not stats['failed'] else self.style.WARNING
+                self.stdout.write(style(
+                    f"Sent {stats['sent']}/{stats['claimed']} deliveries "
+                    f"({stats['retrying']} retrying, {stats['dead']} dead)"
+                ))
+        except KeyboardInterrupt:
+            # Batch đang gửi dở (SENDING) được worker khác nhận lại sau STALE_AFTER
+            self.stdout.write(self.style.WARNING('Notification worker stopped'))
+        finally:
+            service.worker.close()
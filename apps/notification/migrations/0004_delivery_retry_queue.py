@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_userendpoint_verification_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Số lần đã gửi'),
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='Worker nhận delivery lúc nào (SENDING quá lâu -> worker chết, trả lại hàng đợi)', null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Thời điểm sớm nhất được gửi (lần đầu / retry theo backoff)'),
+        ),
+        migrations.AlterField(
+            model_name='notificationdelivery',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed'), ('retrying', 'Retrying'), ('dead', 'Dead letter')], default='queued', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='pay_notific_status_863635_idx'),
+        ),
+    ]
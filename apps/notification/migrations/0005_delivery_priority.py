@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0004_delivery_retry_queue'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificationdelivery',
+            name='pay_notific_status_863635_idx',
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'High'), (1, 'Normal'), (2, 'Low')], default=1, help_text='Làn gửi theo loại event (signal trước, nhắc gia hạn sau)'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['status', 'priority', 'next_attempt_at'], name='pay_notific_status_f0b6a1_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class NotificationChannel(models.TextChoices):
@@ -18,12 +19,31 @@ class AppEventType(models.TextChoices):
     SUBSCRIPTION_EXPIRING = 'subscription_expiring', 'Subscription Expiring'
 
 
+class DeliveryPriority(models.IntegerChoices):
+    """Làn gửi: số nhỏ được claim/gửi trước"""
+    HIGH = 0, 'High'
+    NORMAL = 1, 'Normal'
+    LOW = 2, 'Low'
+
+
+# Tín hiệu giao dịch hết giá trị nhanh -> luôn đi trước nhắc gia hạn
+EVENT_PRIORITIES = {
+    AppEventType.SYMBOL_SIGNAL: DeliveryPriority.HIGH,
+    AppEventType.SUBSCRIPTION_EXPIRING: DeliveryPriority.LOW,
+}
+
+
+def priority_for(event_type: str) -> int:
+    return EVENT_PRIORITIES.get(event_type, DeliveryPriority.NORMAL)
+
+
 class DeliveryStatus(models.TextChoices):
     QUEUED = 'queued', 'Queued'
     SENDING = 'sending', 'Sending'
     SENT = 'sent', 'Sent'
     FAILED = 'failed', 'Failed'
     RETRYING = 'retrying', 'Retrying'
+    DEAD = 'dead', 'Dead letter'
 
 
 class UserEndpoint(models.Model):
@@ -132,6 +152,11 @@ class NotificationDelivery(models.Model):
         choices=DeliveryStatus.choices,
         default=DeliveryStatus.QUEUED
     )
+    priority = models.PositiveSmallIntegerField(
+        choices=DeliveryPriority.choices,
+        default=DeliveryPriority.NORMAL,
+        help_text='Làn gửi theo loại event (signal trước, nhắc gia hạn sau)'
+    )
     sent_at = models.DateTimeField(null=True, blank=True)
     response_raw = models.JSONField(
         null=True,
@@ -139,6 +164,16 @@ class NotificationDelivery(models.Model):
         help_text='Phản hồi từ API Telegram/Zalo/Email'
     )
     error_message = models.TextField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0, help_text='Số lần đã gửi')
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='Thời điểm sớm nhất được gửi (lần đầu / retry theo backoff)'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Worker nhận delivery lúc nào (SENDING quá lâu -> worker chết, trả lại hàng đợi)'
+    )
 
     class Meta:
         db_table = 'pay_notification_deliveries'
@@ -146,6 +181,7 @@ class NotificationDelivery(models.Model):
             models.Index(fields=['event']),
             models.Index(fields=['endpoint']),
             models.Index(fields=['status', 'sent_at']),
+            models.Index(fields=['status', 'priority', 'next_attempt_at']),
         ]
 
     def __str__(self):
@@ -1,8 +1,12 @@
 """Repository layer cho notification - xử lý database operations"""
 import logging
+import uuid
+from datetime import timedelta
 from typing import Optional, List
 from django.contrib.auth import get_user_model
-from django.db.models import QuerySet
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
 
 from apps.notification.models import (
     NotificationEvent,
@@ -11,6 +15,7 @@ from apps.notification.models import (
     DeliveryStatus,
     WebhookLog,
     WebhookSource,
+    priority_for,
 )
 
 User = get_user_model()
@@ -39,6 +44,11 @@ class NotificationEventRepository:
         logger.info(f"Created notification event {event.event_id} for user {user.email}")
         return event
 
+    @staticmethod
+    def bulk_create(events: List[NotificationEvent], batch_size: int = 500) -> List[NotificationEvent]:
+        """Insert nhiều events theo batch (event_id sinh sẵn ở Python nên dùng được ngay làm FK)"""
+        return NotificationEvent.objects.bulk_create(events, batch_size=batch_size)
+
     @staticmethod
     def get_by_id(event_id: str) -> Optional[NotificationEvent]:
         """Lấy event theo ID"""
@@ -76,9 +86,15 @@ class NotificationDeliveryRepository:
             event=event,
             endpoint=endpoint,
             channel=channel,
-            status=DeliveryStatus.QUEUED
+            status=DeliveryStatus.QUEUED,
+            priority=priority_for(event.event_type)
         )
 
+    @staticmethod
+    def bulk_create(deliveries: List[NotificationDelivery], batch_size: int = 500) -> List[NotificationDelivery]:
+        """Insert nhiều delivery records theo batch"""
+        return NotificationDelivery.objects.bulk_create(deliveries, batch_size=batch_size)
+
     @staticmethod
     def get_by_id(delivery_id: str) -> Optional[NotificationDelivery]:
         """Lấy delivery theo ID"""
@@ -98,18 +114,100 @@ class NotificationDeliveryRepository:
         ).order_by('-sent_at')
 
     @staticmethod
-    def get_failed_deliveries(limit: int = 100) -> QuerySet:
-        """Lấy các deliveries bị failed"""
-        return NotificationDelivery.objects.filter(
-            status=DeliveryStatus.FAILED
-        )[:limit]
+    def get_queued_ids_for_events(event_ids: List, chunk_size: int = 500) -> List:
+        """delivery_id QUEUED của các events (IN theo chunk để không vượt giới hạn tham số)"""
+        delivery_ids = []
+        for start in range(0, len(event_ids), chunk_size):
+            delivery_ids.extend(
+                NotificationDelivery.objects.filter(
+                    event_id__in=event_ids[start:start + chunk_size],
+                    status=DeliveryStatus.QUEUED
+                ).values_list('delivery_id', flat=True)
+            )
+        return delivery_ids
+
+    @staticmethod
+    def claim_due(
+        limit: int = 100,
+        delivery_ids: Optional[List] = None,
+        max_priority: Optional[int] = None
+    ) -> List[NotificationDelivery]:
+        """
+        Nhận tối đa `limit` deliveries đến hạn gửi (QUEUED/RETRYING, next_attempt_at <= now), làn ưu
+        tiên cao rồi cũ nhất trước. SELECT ... FOR UPDATE SKIP LOCKED nên nhiều worker chạy song song
+        không nhận trùng; các delivery được chuyển sang SENDING và tăng attempts trong cùng transaction.
+        """
+        with transaction.atomic():
+            now = timezone.now()
+            queryset = NotificationDelivery.objects.select_for_update(
+                skip_locked=True, of=('self',)
+            ).select_related('event', 'endpoint').filter(
+                status__in=[DeliveryStatus.QUEUED, DeliveryStatus.RETRYING],
+                next_attempt_at__lte=now
+            )
+            if delivery_ids is not None:
+                queryset = queryset.filter(delivery_id__in=delivery_ids)
+            if max_priority is not None:
+                queryset = queryset.filter(priority__lte=max_priority)
+            deliveries = list(queryset.order_by('priority', 'next_attempt_at')[:limit])
+            return NotificationDeliveryRepository._mark_claimed(deliveries, now)
+
+    @staticmethod
+    def claim(deliveries: List[NotificationDelivery]) -> List[NotificationDelivery]:
+        """
+        Nhận đúng các deliveries đã có trong RAM (vừa tạo cho 1 event) để gửi ngay: chỉ khóa và
+        cập nhật status, không load lại event/endpoint. Bỏ qua delivery đã được worker khác nhận.
+        """
+        with transaction.atomic():
+            claimable = set(NotificationDelivery.objects.select_for_update(skip_locked=True).filter(
+                delivery_id__in=[d.delivery_id for d in deliveries],
+                status__in=[DeliveryStatus.QUEUED, DeliveryStatus.RETRYING]
+            ).values_list('delivery_id', flat=True))
+            return NotificationDeliveryRepository._mark_claimed(
+                [d for d in deliveries if d.delivery_id in claimable], timezone.now()
+            )
+
+    @staticmethod
+    def _mark_claimed(deliveries: List[NotificationDelivery], now) -> List[NotificationDelivery]:
+        """SENDING + tăng attempts (gọi trong transaction đang giữ khóa các dòng)"""
+        if not deliveries:
+            return []
+        NotificationDelivery.objects.filter(
+            delivery_id__in=[d.delivery_id for d in deliveries]
+        ).update(status=DeliveryStatus.SENDING, claimed_at=now, attempts=F('attempts') + 1)
+        for delivery in deliveries:
+            delivery.status = DeliveryStatus.SENDING
+            delivery.claimed_at = now
+            delivery.attempts += 1
+        return deliveries
 
     @staticmethod
-    def get_pending_deliveries(limit: int = 100) -> QuerySet:
-        """Lấy các deliveries đang pending"""
+    def requeue_stale(stale_after: float) -> int:
+        """Deliveries SENDING quá `stale_after` giây (worker chết giữa chừng) -> RETRYING ngay"""
+        now = timezone.now()
         return NotificationDelivery.objects.filter(
-            status=DeliveryStatus.QUEUED
-        ).select_related('event', 'endpoint')[:limit]
+            status=DeliveryStatus.SENDING,
+            claimed_at__lt=now - timedelta(seconds=stale_after)
+        ).update(status=DeliveryStatus.RETRYING, next_attempt_at=now)
+
+    @staticmethod
+    def requeue_dead(limit: int = 100) -> int:
+        """Đưa deliveries dead-letter (và FAILED cũ) về hàng đợi, đếm lại attempts từ đầu"""
+        ids = list(NotificationDelivery.objects.filter(
+            status__in=[DeliveryStatus.DEAD, DeliveryStatus.FAILED]
+        ).order_by('next_attempt_at').values_list('delivery_id', flat=True)[:limit])
+        return NotificationDelivery.objects.filter(delivery_id__in=ids).update(
+            status=DeliveryStatus.QUEUED, attempts=0, next_attempt_at=timezone.now(), error_message=None
+        )
+
+    @staticmethod
+    def save_results(deliveries: List[NotificationDelivery]) -> None:
+        """Lưu status/sent_at/response/error/lịch retry của nhóm deliveries đã gửi (bulk_update)"""
+        NotificationDelivery.objects.bulk_update(
+            deliveries,
+            ['status', 'sent_at', 'response_raw', 'error_message', 'next_attempt_at'],
+            batch_size=500
+        )
 
     @staticmethod
     def update_status(
@@ -145,6 +243,14 @@ class UserEndpointRepository:
             verified=True
         )
 
+    @staticmethod
+    def get_verified_endpoints_for_users(user_ids: List[int]) -> QuerySet:
+        """Endpoints đã verified của nhiều users trong 1 query"""
+        return UserEndpoint.objects.filter(
+            user_id__in=user_ids,
+            verified=True
+        )
+
     @staticmethod
     def get_by_user(user_id: int) -> QuerySet:
         """Lấy tất cả endpoints của user"""
@@ -227,10 +333,12 @@ class WebhookLogRepository:
         status_code: int = 200,
         response_data: Optional[dict] = None,
         error_message: Optional[str] = None,
-        users_notified: int = 0
+        users_notified: int = 0,
+        webhook_id: Optional[uuid.UUID] = None
     ) -> WebhookLog:
-        """Tạo webhook log mới"""
+        """Tạo webhook log mới (webhook_id truyền vào khi job fan-out cần cập nhật log sau)"""
         webhook_log = WebhookLog.objects.create(
+            webhook_id=webhook_id or uuid.uuid4(),
             source=source,
             symbol=symbol,
             payload=payload,
@@ -242,6 +350,11 @@ class WebhookLogRepository:
         logger.info(f"Created webhook log {webhook_log.webhook_id} for {source} - {symbol}")
         return webhook_log
 
+    @staticmethod
+    def set_users_notified(webhook_id: str, users_notified: int) -> None:
+        """Job fan-out cập nhật số user đã gửi sau khi webhook đã trả về"""
+        WebhookLog.objects.filter(webhook_id=webhook_id).update(users_notified=users_notified)
+
     @staticmethod
     def get_by_symbol(symbol: str, limit: int = 50) -> QuerySet:
         """Lấy webhook logs theo symbol"""
@@ -54,21 +54,17 @@ def test_send_notification(request, event_type: str, payload: dict):
     Testing endpoint: Tạo và gửi notification test
     """
     try:
-        notification_service = NotificationService()
-        delivery_service = DeliveryService()
-
-        event, deliveries_count = notification_service.create_and_process_event(
-            user_id=request.auth.id,
+        (event,), deliveries = NotificationService().create_and_process_events_bulk(
             event_type=event_type,
-            payload=payload
+            payloads={request.auth.id: payload}
         )
 
-        if deliveries_count > 0:
-            sent_count = delivery_service.send_pending_deliveries(limit=deliveries_count)
+        if deliveries:
+            stats = DeliveryService().dispatch(deliveries)
             return {
                 "event_id": str(event.event_id),
-                "deliveries_created": deliveries_count,
-                "deliveries_sent": sent_count
+                "deliveries_created": len(deliveries),
+                "deliveries_sent": stats['sent']
             }
         else:
             return {
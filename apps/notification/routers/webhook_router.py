@@ -2,13 +2,15 @@
 from ninja import Router
 from datetime import datetime, timezone as dt_timezone
 import logging
+import uuid
 from decimal import Decimal, InvalidOperation
 from django.utils import timezone
 from apps.notification.schemas import TradingViewWebhookSchema
-from apps.notification.services.notification_utils import send_symbol_signal_to_subscribers
+from apps.notification.services.notification_utils import enqueue_symbol_signal
 from apps.notification.repositories.notification_repository import WebhookLogRepository
 from apps.notification.models import WebhookSource
 from apps.bots.models import Bot, Trade, BotType
+from apps.bots.services.performance import record_trade_performance
 
 logger = logging.getLogger('app')
 
@@ -19,7 +21,8 @@ router = Router(tags=["notification-webhooks"], auth=None)
 def tradingview_webhook(request, payload: TradingViewWebhookSchema):
     """
     Webhook nhận tín hiệu từ TradingView
-    Tự động gửi thông báo cho users đã đăng ký symbol và có license active
+    Chỉ lưu trade + 1 job fan-out rồi trả về ngay; dispatcher (run_jobs --queue notifications)
+    gửi thông báo cho users đã đăng ký symbol và có license active
     """
     print("Received TradingView webhook:", payload.dict())
     print("Payload details:", request.body)
@@ -123,30 +126,33 @@ def tradingview_webhook(request, payload: TradingViewWebhookSchema):
             win_loss_status=payload.WinLossStatus,
             action=payload.Action,
         )
+        # Lệnh Close: cập nhật summary hiệu suất của bot (tăng dần, không quét lại lịch sử)
+        record_trade_performance(trade)
 
         metadata.update({
             "trade_id": str(trade.id),
             "bot_id": bot.id,
             "entry_date": entry_datetime.isoformat(),
         })
-        result = send_symbol_signal_to_subscribers(
+        # Job fan-out cập nhật users_notified của log này sau khi gửi xong
+        webhook_log_id = uuid.uuid4()
+        job = enqueue_symbol_signal(
             symbol_id=symbol.id,
             symbol_name=symbol_name,
             signal_type=payload.Type.lower(),
             price=str(payload.Price),
             timestamp=timestamp_str,
             description=description,
-            metadata=metadata
+            metadata=metadata,
+            webhook_log_id=str(webhook_log_id)
         )
 
         response_data = {
             "success": True,
             "symbol": symbol_name,
             "signal_type": payload.Type,
-            "total_users": result['total_users'],
-            "sent_count": result['sent_count'],
-            "failed_count": result['failed_count'],
-            "message": f"Sent to {result['sent_count']} users",
+            "message": "Signal queued for delivery",
+            "job_id": job.pk,
             "trade_id": str(trade.id),
             "bot_id": bot.id,
         }
@@ -157,7 +163,8 @@ def tradingview_webhook(request, payload: TradingViewWebhookSchema):
             payload=payload.dict(),
             status_code=200,
             response_data=response_data,
-            users_notified=result['sent_count']
+            users_notified=0,
+            webhook_id=webhook_log_id
         )
 
         return response_data
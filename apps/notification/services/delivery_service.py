@@ -1,11 +1,18 @@
 """Service layer cho notification deliveries - xử lý gửi notifications"""
 import logging
+import random
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Union
+
+from django.conf import settings
 from django.utils import timezone
 
-from apps.notification.models import DeliveryStatus
+from apps.jobs.services.progress import JobProgress
+from apps.notification.models import DeliveryStatus, NotificationDelivery
 from apps.notification.repositories.notification_repository import (
     NotificationDeliveryRepository
 )
+from apps.notification.services.delivery_worker import DeliveryWorker, get_delivery_worker
 
 logger = logging.getLogger('app')
 
@@ -13,89 +20,138 @@ logger = logging.getLogger('app')
 class DeliveryService:
     """Service để gửi notifications qua các kênh khác nhau"""
 
-    def __init__(self):
+    def __init__(self, chunk_size: Optional[int] = None, worker: Optional[DeliveryWorker] = None):
         self.delivery_repo = NotificationDeliveryRepository()
-
-    def send_delivery(self, delivery_id: str) -> bool:
+        dispatch = getattr(settings, 'NOTIFICATION_DISPATCH', {})
+        self.chunk_size = chunk_size or dispatch.get('CHUNK_SIZE', 200)
+        self.max_attempts = dispatch.get('MAX_ATTEMPTS', 5)
+        self.retry_base_delay = dispatch.get('RETRY_BASE_DELAY', 30)
+        self.retry_max_delay = dispatch.get('RETRY_MAX_DELAY', 3600)
+        self.stale_after = dispatch.get('STALE_AFTER', 300)
+        self.worker = worker or get_delivery_worker()
+
+    def send_delivery(self, delivery: Union[NotificationDelivery, str]) -> bool:
         """
-        Gửi notification qua kênh tương ứng
+        Gửi ngay 1 delivery (object hoặc id), nếu đang chờ gửi và chưa bị worker khác nhận
         Returns: True nếu gửi thành công
         """
-        delivery = self.delivery_repo.get_by_id(delivery_id)
-        if not delivery:
-            return False
-
-        try:
-            self.delivery_repo.update_status(delivery, DeliveryStatus.SENDING)
-
-            from apps.notification.services.handlers import get_handler
-            handler = get_handler(delivery.channel)
-
-            if handler:
-                success = handler.send(delivery)
-                if success:
-                    self.delivery_repo.update_status(
-                        delivery,
-                        DeliveryStatus.SENT,
-                        sent_at=timezone.now()
-                    )
-                else:
-                    self.delivery_repo.update_status(
-                        delivery,
-                        DeliveryStatus.FAILED
-                    )
-                return success
-            else:
-                logger.error(f"No handler found for channel {delivery.channel}")
-                self.delivery_repo.update_status(
-                    delivery,
-                    DeliveryStatus.FAILED,
-                    error_message=f"No handler for channel {delivery.channel}"
-                )
-                return False
-
-        except Exception as e:
-            logger.exception(f"Error sending delivery {delivery_id}: {e}")
-            try:
-                delivery = self.delivery_repo.get_by_id(delivery_id)
-                if delivery:
-                    self.delivery_repo.update_status(
-                        delivery,
-                        DeliveryStatus.FAILED,
-                        error_message=str(e)
-                    )
-            except:
-                pass
-            return False
-
-    def retry_failed_deliveries(self, limit: int = 100) -> int:
+        return self.dispatch([delivery])['sent'] == 1
+
+    def dispatch(
+        self,
+        deliveries: Iterable[Union[NotificationDelivery, str]],
+        progress: Optional[JobProgress] = None
+    ) -> Dict[str, int]:
         """
-        Retry các deliveries bị failed
-        Returns: số deliveries được retry
+        Gửi đúng các deliveries được chỉ định (vừa tạo cho 1 event / nhóm events), không quét hàng
+        đợi chung. Object đã có trong RAM được claim và gửi luôn, không load lại; id thì được load
+        khi claim. Mỗi chunk gửi theo làn ưu tiên (signal trước nhắc gia hạn).
+        Returns: {'sent', 'failed'}
         """
-        failed_deliveries = self.delivery_repo.get_failed_deliveries(limit)
-
-        retried = 0
-        for delivery in failed_deliveries:
-            self.delivery_repo.update_status(delivery, DeliveryStatus.RETRYING)
-
-            if self.send_delivery(str(delivery.delivery_id)):
-                retried += 1
-
-        logger.info(f"Retried {retried} failed deliveries")
-        return retried
+        progress = progress or JobProgress()
+        items = progress.begin('deliveries', list(deliveries), key=_delivery_key)
+        loaded = sorted(
+            (item for item in items if isinstance(item, NotificationDelivery)),
+            key=lambda d: d.priority
+        )
+        ids = [item for item in items if not isinstance(item, NotificationDelivery)]
+
+        totals = {'sent': 0, 'failed': 0}
+
+        def send_chunk(claimed: List[NotificationDelivery], size: int) -> None:
+            stats = self.send_deliveries(claimed)
+            totals['sent'] += stats['sent']
+            totals['failed'] += stats['failed']
+            progress.advance(count=size)
+
+        for start in range(0, len(loaded), self.chunk_size):
+            chunk = loaded[start:start + self.chunk_size]
+            send_chunk(self.delivery_repo.claim(chunk), len(chunk))
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            send_chunk(self.delivery_repo.claim_due(len(chunk), delivery_ids=chunk), len(chunk))
+        progress.end()
+
+        return totals
+
+    def requeue_dead_deliveries(self, limit: int = 100) -> int:
+        """
+        Đưa deliveries dead-letter về hàng đợi (sau khi đã sửa endpoint/cấu hình)
+        Returns: số deliveries được đưa lại
+        """
+        requeued = self.delivery_repo.requeue_dead(limit)
+        logger.info(f"Requeued {requeued} dead deliveries")
+        return requeued
 
     def send_pending_deliveries(self, limit: int = 100) -> int:
         """
-        Gửi các deliveries đang pending
+        Nhận và gửi tối đa `limit` deliveries đến hạn (lần đầu hoặc retry)
         Returns: số deliveries được gửi thành công
         """
-        pending_deliveries = self.delivery_repo.get_pending_deliveries(limit)
+        return self.process_due(limit)['sent']
+
+    def process_due(self, limit: Optional[int] = None, max_priority: Optional[int] = None) -> Dict[str, int]:
+        """
+        1 vòng của notification_worker: trả deliveries của worker chết về hàng đợi, claim 1 batch
+        đến hạn (SKIP LOCKED, làn ưu tiên cao trước) và gửi. `max_priority` giới hạn worker chỉ
+        phục vụ các làn <= giá trị này (vd. 1 worker riêng cho signal).
+        """
+        self.delivery_repo.requeue_stale(self.stale_after)
+        deliveries = self.delivery_repo.claim_due(limit or self.chunk_size, max_priority=max_priority)
+        stats = self.send_deliveries(deliveries)
+        if deliveries:
+            logger.info(
+                f"Sent {stats['sent']}/{len(deliveries)} due deliveries "
+                f"({stats['retrying']} retrying, {stats['dead']} dead)"
+            )
+        return {'claimed': len(deliveries), **stats}
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff mũ theo số lần đã gửi, kèm jitter để các delivery lỗi cùng lúc không retry dồn cục"""
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** max(attempts - 1, 0))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def send_deliveries(self, deliveries: List[NotificationDelivery]) -> Dict[str, int]:
+        """
+        Gửi song song 1 nhóm deliveries đã claim (claim_due: SENDING, select_related event, endpoint)
+        qua DeliveryWorker (aiohttp theo kênh, SMTP dùng chung kết nối). Worker chỉ làm I/O;
+        status/response/lịch retry ghi lại ở thread hiện tại bằng 1 bulk_update.
+
+        Delivery lỗi được hẹn gửi lại (RETRYING, next_attempt_at theo backoff); quá MAX_ATTEMPTS
+        lần thì chuyển DEAD (dead-letter).
+        """
+        if not deliveries:
+            return {'sent': 0, 'failed': 0, 'retrying': 0, 'dead': 0}
+
+        results = self.worker.send(deliveries)
+
+        now = timezone.now()
+        dead = 0
+        for delivery, success in zip(deliveries, results):
+            if success:
+                delivery.status = DeliveryStatus.SENT
+                delivery.sent_at = now
+            elif delivery.attempts >= self.max_attempts:
+                delivery.status = DeliveryStatus.DEAD
+                dead += 1
+            else:
+                delivery.status = DeliveryStatus.RETRYING
+                delivery.next_attempt_at = now + timedelta(seconds=self.retry_delay(delivery.attempts))
+        self.delivery_repo.save_results(deliveries)
+
+        sent = sum(results)
+        failed = len(results) - sent
+        return {'sent': sent, 'failed': failed, 'retrying': failed - dead, 'dead': dead}
+
+    def send_event_deliveries(self, event_ids: Iterable, progress: Optional[JobProgress] = None) -> Dict[str, int]:
+        """Gửi các deliveries QUEUED của đúng các events này (dùng khi chỉ còn event id, vd. resume job)"""
+        event_ids = list(event_ids)
+        delivery_ids = self.delivery_repo.get_queued_ids_for_events(event_ids)
+        totals = self.dispatch(delivery_ids, progress=progress)
+
+        logger.info(f"Sent {totals['sent']}/{len(delivery_ids)} deliveries for {len(event_ids)} events")
+        return totals
 
-        sent_count = 0
-        for delivery in pending_deliveries:
-            if self.send_delivery(str(delivery.delivery_id)):
-                sent_count += 1
 
-        logger.info(f"Sent {sent_count}/{len(pending_deliveries)} pending deliveries")
-        return sent_count
+def _delivery_key(item: Union[NotificationDelivery, str]) -> str:
+    return str(item.delivery_id if isinstance(item, NotificationDelivery) else item)
@@ -0,0 +1,249 @@
+"""
+Gửi song song 1 nhóm deliveries qua các kênh.
+
+- Telegram/Zalo: mỗi kênh 1 aiohttp.ClientSession (connection pool keep-alive riêng), giới hạn
+  số request đồng thời (CONCURRENCY) và tốc độ (RATE_PER_SECOND) theo giới hạn của từng provider.
+- Session, pool và limiter sống cùng DeliveryWorker (không dựng lại mỗi lần send): worker giữ 1
+  event loop trong thread riêng, send() chỉ gửi coroutine sang loop đó. Dùng get_delivery_worker()
+  để cả process chung 1 worker; close() khi thoát.
+- RATE_PER_SECOND là quota chung của mọi process: mỗi request đặt chỗ 1 token GCRA trong state
+  của rate_limiter (settings.VNSTOCK_RATE_LIMIT, BACKEND "sqlite" = file dùng chung), bucket
+  "notification:<kênh>". CONCURRENCY vẫn tính riêng từng process.
+- Email: các message được gửi lần lượt qua 1 kết nối SMTP dùng lại cho cả batch (BATCH_SIZE
+  message / kết nối), chạy trong thread riêng song song với các kênh HTTP.
+
+Worker chỉ làm I/O: request/message được dựng sẵn ở thread gọi (đọc delivery.event/endpoint),
+kết quả ghi vào các object delivery trong RAM; DeliveryService lưu xuống DB sau đó.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from apps.notification.models import NotificationChannel, NotificationDelivery
+from apps.notification.services.handlers import EmailHandler, HttpNotificationHandler, get_handler
+from apps.stock.services.rate_limiter import Bucket, build_limiter_state
+
+logger = logging.getLogger('app')
+
+DEFAULT_CHANNEL_LIMITS = {
+    NotificationChannel.TELEGRAM: {'CONCURRENCY': 10, 'RATE_PER_SECOND': 25},
+    NotificationChannel.ZALO: {'CONCURRENCY': 5, 'RATE_PER_SECOND': 10},
+    NotificationChannel.EMAIL: {'BATCH_SIZE': 50},
+}
+
+
+class RateLimiter:
+    """
+    Giãn đều các lần gọi của 1 kênh để không vượt `rate` request/giây (0 = không giới hạn).
+    Token đặt chỗ trong `state` (MemoryLimiterState / SQLiteLimiterState) nên các process dùng
+    chung state cùng chia 1 quota.
+    """
+
+    def __init__(self, channel: str, rate: float, state):
+        self.buckets = [Bucket(f"notification:{channel}", interval=1.0 / rate)] if rate else []
+        self.state = state
+
+    async def wait(self) -> None:
+        if not self.buckets:
+            return
+        # SQLite state có thể chờ khóa ghi ngắn: không chặn event loop
+        start = await asyncio.to_thread(self.state.reserve, self.buckets, time.time())
+        delay = start - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class DeliveryWorker:
+    """Gửi deliveries đã load sẵn (select_related event, endpoint); trả về kết quả theo thứ tự"""
+
+    def __init__(
+        self,
+        channels: Optional[Dict[str, Dict[str, Any]]] = None,
+        timeout: Optional[float] = None,
+        limiter_state=None
+    ):
+        dispatch = getattr(settings, 'NOTIFICATION_DISPATCH', {})
+        configured = channels if channels is not None else dispatch.get('CHANNELS', {})
+        self.channels = {
+            channel: {**defaults, **configured.get(channel, {})}
+            for channel, defaults in DEFAULT_CHANNEL_LIMITS.items()
+        }
+        self.timeout = timeout or dispatch.get('HTTP_TIMEOUT', 10)
+        state = limiter_state or build_limiter_state()
+        self.limiters = {
+            channel: RateLimiter(channel, limits.get('RATE_PER_SECOND', 0), state)
+            for channel, limits in self.channels.items()
+        }
+
+        # Event loop riêng (thread nền) giữ các ClientSession qua nhiều lần send()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _run(self, coro) -> Any:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='delivery-worker', daemon=True
+                )
+                self._thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def _session(self, channel: str) -> Tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        """Session + semaphore của kênh, tạo lần đầu trong event loop của worker"""
+        session = self._sessions.get(channel)
+        if session is None or session.closed:
+            concurrency = self.channels.get(channel, {}).get('CONCURRENCY', 10)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._sessions[channel] = session
+            self._semaphores[channel] = asyncio.Semaphore(concurrency)
+        return session, self._semaphores[channel]
+
+    async def _close_sessions(self) -> None:
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            await session.close()
+
+    def close(self) -> None:
+        """Đóng các session và dừng event loop (worker dùng lại được, loop sẽ được tạo lại)"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_sessions(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def send(self, deliveries: List[NotificationDelivery]) -> List[bool]:
+        results = [False] * len(deliveries)
+        http_batches: Dict[str, Tuple[HttpNotificationHandler, List[Tuple[int, Dict[str, Any]]]]] = {}
+        emails: List[Tuple[int, NotificationDelivery, EmailMessage]] = []
+
+        handlers = {channel: get_handler(channel) for channel in {d.channel for d in deliveries}}
+        for index, delivery in enumerate(deliveries):
+            handler = handlers.get(delivery.channel)
+            if handler is None:
+                delivery.error_message = f"No handler for channel {delivery.channel}"
+            elif isinstance(handler, HttpNotificationHandler):
+                error = handler.config_error()
+                if error:
+                    delivery.error_message = error
+                    continue
+                http_batches.setdefault(delivery.channel, (handler, []))[1].append(
+                    (index, handler.build_request(delivery))
+                )
+            elif isinstance(handler, EmailHandler):
+                emails.append((index, delivery, handler.build_message(delivery)))
+            else:
+                results[index] = handler.send(delivery)
+
+        if http_batches or emails:
+            self._run(self._send_all(deliveries, results, http_batches, emails, handlers))
+        return results
+
+    async def _send_all(self, deliveries, results, http_batches, emails, handlers) -> None:
+        tasks = [
+            self._send_http(channel, handler, requests, deliveries, results)
+            for channel, (handler, requests) in http_batches.items()
+        ]
+        if emails:
+            tasks.append(asyncio.to_thread(
+                self._send_emails, handlers[NotificationChannel.EMAIL], emails, results
+            ))
+        await asyncio.gather(*tasks)
+
+    async def _send_http(
+        self,
+        channel: str,
+        handler: HttpNotificationHandler,
+        requests: List[Tuple[int, Dict[str, Any]]],
+        deliveries: List[NotificationDelivery],
+        results: List[bool]
+    ) -> None:
+        session, semaphore = self._session(channel)
+        limiter = self.limiters[channel]
+
+        async def send_one(index: int, request: Dict[str, Any]) -> None:
+            delivery = deliveries[index]
+            async with semaphore:
+                await limiter.wait()
+                try:
+                    async with session.post(**request) as response:
+                        body = await response.json(content_type=None)
+                        results[index] = handler.parse_response(delivery, response.status, body)
+                except Exception as e:
+                    logger.error(f"Error sending {channel} delivery {delivery.delivery_id}: {e}")
+                    delivery.error_message = str(e)
+
+        await asyncio.gather(*(send_one(index, request) for index, request in requests))
+
+        logger.info(f"Sent {sum(results[i] for i, _ in requests)}/{len(requests)} {channel} deliveries")
+
+    def _send_emails(
+        self,
+        handler: EmailHandler,
+        emails: List[Tuple[int, NotificationDelivery, EmailMessage]],
+        results: List[bool]
+    ) -> None:
+        batch_size = self.channels[NotificationChannel.EMAIL].get('BATCH_SIZE') or len(emails)
+        for start in range(0, len(emails), batch_size):
+            batch = emails[start:start + batch_size]
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+            except Exception as e:
+                logger.error(f"Cannot open email connection: {e}")
+                for _, delivery, _ in batch:
+                    delivery.error_message = str(e)
+                continue
+
+            try:
+                for index, delivery, message in batch:
+                    try:
+                        if connection.send_messages([message]):
+                            handler.mark_sent(delivery)
+                            results[index] = True
+                        else:
+                            delivery.error_message = "Email not sent"
+                    except Exception as e:
+                        logger.error(f"Error sending email delivery {delivery.delivery_id}: {e}")
+                        delivery.error_message = str(e)
+                        # Server có thể đã đóng kết nối: mở lại cho các message còn lại của batch
+                        try:
+                            connection.close()
+                            connection.open()
+                        except Exception:
+                            pass
+            finally:
+                connection.close()
+
+
+_delivery_worker: Optional[DeliveryWorker] = None
+_delivery_worker_lock = threading.Lock()
+
+
+def get_delivery_worker() -> DeliveryWorker:
+    """DeliveryWorker dùng chung trong process (session/pool giữ suốt đời process)"""
+    global _delivery_worker
+    if _delivery_worker is None:
+        with _delivery_worker_lock:
+            if _delivery_worker is None:
+                _delivery_worker = DeliveryWorker()
+                atexit.register(_delivery_worker.close)
+    return _delivery_worker
@@ -1,8 +1,9 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Dict, Optional
 import requests
 from django.conf import settings
+from django.core.mail import EmailMessage
 
 from apps.notification.models import NotificationDelivery, NotificationChannel
 
@@ -26,47 +27,81 @@ class NotificationHandler(ABC):
         pass
 
 
-class TelegramHandler(NotificationHandler):
-    """Handler để gửi notification qua Telegram"""
+class HttpNotificationHandler(NotificationHandler):
+    """
+    Handler gửi qua HTTP API. Tách phần dựng request / đọc response khỏi phần gửi để
+    DeliveryWorker gửi cùng logic qua aiohttp; send() đồng bộ dùng chung 1 requests.Session
+    cho mỗi kênh (giữ kết nối keep-alive, không bắt tay TCP+TLS lại mỗi tin).
+    """
+    _session: Optional[requests.Session] = None
 
-    def __init__(self):
-        self.bot_token = getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+    @classmethod
+    def session(cls) -> requests.Session:
+        if cls.__dict__.get('_session') is None:
+            cls._session = requests.Session()
+        return cls._session
+
+    @abstractmethod
+    def config_error(self) -> Optional[str]:
+        """Lỗi cấu hình (thiếu token...) hoặc None"""
+
+    @abstractmethod
+    def build_request(self, delivery: NotificationDelivery) -> Dict[str, Any]:
+        """kwargs cho POST: url, json, headers"""
+
+    @abstractmethod
+    def parse_response(self, delivery: NotificationDelivery, status_code: int, body: Any) -> bool:
+        """Ghi response_raw/error_message vào delivery; True nếu gửi thành công"""
 
     def send(self, delivery: NotificationDelivery) -> bool:
-        if not self.bot_token:
-            logger.error("TELEGRAM_BOT_TOKEN not configured")
-            delivery.error_message = "TELEGRAM_BOT_TOKEN not configured"
+        error = self.config_error()
+        if error:
+            logger.error(error)
+            delivery.error_message = error
             return False
 
         try:
-            chat_id = delivery.endpoint.address
-            message = self.format_message(delivery)
-
-            response = requests.post(
-                f"{self.base_url}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "parse_mode": "HTML"
-                },
-                timeout=10
-            )
+            response = self.session().post(timeout=10, **self.build_request(delivery))
+            return self.parse_response(delivery, response.status_code, response.json())
+        except Exception as e:
+            logger.exception(f"Error sending {self.channel} notification: {e}")
+            delivery.error_message = str(e)
+            return False
 
-            delivery.response_raw = response.json()
 
-            if response.status_code == 200 and response.json().get('ok'):
-                logger.info(f"Sent Telegram notification to {chat_id}")
-                return True
-            else:
-                error_msg = response.json().get('description', 'Unknown error')
-                logger.error(f"Failed to send Telegram notification: {error_msg}")
-                delivery.error_message = error_msg
-                return False
+class TelegramHandler(HttpNotificationHandler):
+    """Handler để gửi notification qua Telegram"""
+    channel = NotificationChannel.TELEGRAM
 
-        except Exception as e:
-            logger.exception(f"Error sending Telegram notification: {e}")
-            delivery.error_message = str(e)
+    def __init__(self):
+        self.bot_token = getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
+        api_url = getattr(settings, 'TELEGRAM_API_URL', 'https://api.telegram.org')
+        self.base_url = f"{api_url}/bot{self.bot_token}"
+
+    def config_error(self) -> Optional[str]:
+        return None if self.bot_token else "TELEGRAM_BOT_TOKEN not configured"
+
+    def build_request(self, delivery: NotificationDelivery) -> Dict[str, Any]:
+        return {
+            'url': f"{self.base_url}/sendMessage",
+            'json': {
+                "chat_id": delivery.endpoint.address,
+                "text": self.format_message(delivery),
+                "parse_mode": "HTML"
+            },
+        }
+
+    def parse_response(self, delivery: NotificationDelivery, status_code: int, body: Any) -> bool:
+        body = body if isinstance(body, dict) else {}
+        delivery.response_raw = body
+
+        if status_code == 200 and body.get('ok'):
+            logger.info(f"Sent Telegram notification to {delivery.endpoint.address}")
+            return True
+        else:
+            error_msg = body.get('description', 'Unknown error')
+            logger.error(f"Failed to send Telegram notification: {error_msg}")
+            delivery.error_message = error_msg
             return False
 
     def format_message(self, delivery: NotificationDelivery) -> str:
@@ -104,54 +139,45 @@ Mã giao dịch: {payload.get('transaction_id', 'N/A')}
         return message.strip()
 
 
-class ZaloHandler(NotificationHandler):
+class ZaloHandler(HttpNotificationHandler):
     """Handler để gửi notification qua Zalo OA"""
+    channel = NotificationChannel.ZALO
 
     def __init__(self):
         self.oa_access_token = getattr(settings, 'ZALO_OA_ACCESS_TOKEN', None)
-        self.base_url = "https://openapi.zalo.me/v3.0/oa"
-
-    def send(self, delivery: NotificationDelivery) -> bool:
-        if not self.oa_access_token:
-            logger.error("ZALO_OA_ACCESS_TOKEN not configured")
-            delivery.error_message = "ZALO_OA_ACCESS_TOKEN not configured"
-            return False
-
-        try:
-            user_id = delivery.endpoint.address
-            message = self.format_message(delivery)
-
-            response = requests.post(
-                f"{self.base_url}/message/cs",
-                headers={
-                    "access_token": self.oa_access_token,
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "recipient": {
-                        "user_id": user_id
-                    },
-                    "message": {
-                        "text": message
-                    }
+        self.base_url = getattr(settings, 'ZALO_OA_API_URL', "https://openapi.zalo.me/v3.0/oa")
+
+    def config_error(self) -> Optional[str]:
+        return None if self.oa_access_token else "ZALO_OA_ACCESS_TOKEN not configured"
+
+    def build_request(self, delivery: NotificationDelivery) -> Dict[str, Any]:
+        return {
+            'url': f"{self.base_url}/message/cs",
+            'headers': {
+                "access_token": self.oa_access_token,
+                "Content-Type": "application/json"
+            },
+            'json': {
+                "recipient": {
+                    "user_id": delivery.endpoint.address
                 },
-                timeout=10
-            )
-
-            delivery.response_raw = response.json()
-
-            if response.status_code == 200 and response.json().get('error') == 0:
-                logger.info(f"Sent Zalo notification to {user_id}")
-                return True
-            else:
-                error_msg = response.json().get('message', 'Unknown error')
-                logger.error(f"Failed to send Zalo notification: {error_msg}")
-                delivery.error_message = error_msg
-                return False
-
-        except Exception as e:
-            logger.exception(f"Error sending Zalo notification: {e}")
-            delivery.error_message = str(e)
+                "message": {
+                    "text": self.format_message(delivery)
+                }
+            },
+        }
+
+    def parse_response(self, delivery: NotificationDelivery, status_code: int, body: Any) -> bool:
+        body = body if isinstance(body, dict) else {}
+        delivery.response_raw = body
+
+        if status_code == 200 and body.get('error') == 0:
+            logger.info(f"Sent Zalo notification to {delivery.endpoint.address}")
+            return True
+        else:
+            error_msg = body.get('message', 'Unknown error')
+            logger.error(f"Failed to send Zalo notification: {error_msg}")
+            delivery.error_message = error_msg
             return False
 
     def format_message(self, delivery: NotificationDelivery) -> str:
@@ -184,26 +210,26 @@ Mã giao dịch: {payload.get('transaction_id', 'N/A')}"""
 
 class EmailHandler(NotificationHandler):
     """Handler để gửi notification qua Email"""
+    channel = NotificationChannel.EMAIL
+
+    def build_message(self, delivery: NotificationDelivery) -> EmailMessage:
+        """EmailMessage của delivery; DeliveryWorker gửi nhiều message qua chung 1 connection"""
+        return EmailMessage(
+            subject=self.get_subject(delivery),
+            body=self.format_message(delivery),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[delivery.endpoint.address],
+        )
+
+    def mark_sent(self, delivery: NotificationDelivery) -> None:
+        email = delivery.endpoint.address
+        logger.info(f"Sent email notification to {email}")
+        delivery.response_raw = {"status": "sent", "email": email}
 
     def send(self, delivery: NotificationDelivery) -> bool:
-        from django.core.mail import send_mail
-        from django.conf import settings
-
         try:
-            email = delivery.endpoint.address
-            subject = self.get_subject(delivery)
-            message = self.format_message(delivery)
-
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=False,
-            )
-
-            logger.info(f"Sent email notification to {email}")
-            delivery.response_raw = {"status": "sent", "email": email}
+            self.build_message(delivery).send(fail_silently=False)
+            self.mark_sent(delivery)
             return True
 
         except Exception as e:
@@ -1,8 +1,13 @@
 """Service layer cho notification events - xử lý business logic"""
 import logging
-from typing import Optional
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
 from django.db import transaction
 
+from apps.notification.models import DeliveryStatus, NotificationDelivery, NotificationEvent, priority_for
+
 from apps.notification.repositories.notification_repository import (
     NotificationEventRepository,
     NotificationDeliveryRepository,
@@ -19,6 +24,7 @@ class NotificationService:
         self.event_repo = NotificationEventRepository()
         self.delivery_repo = NotificationDeliveryRepository()
         self.endpoint_repo = UserEndpointRepository()
+        self.batch_size = getattr(settings, 'NOTIFICATION_DISPATCH', {}).get('BULK_BATCH_SIZE', 500)
 
     def create_event(
         self,
@@ -85,6 +91,58 @@ class NotificationService:
         deliveries_count = self.process_event(str(event.event_id))
         return event, deliveries_count
 
+    @transaction.atomic
+    def create_and_process_events_bulk(
+        self,
+        event_type: str,
+        payloads: Dict[int, dict],
+        subject_id: Optional[str] = None
+    ) -> Tuple[List[NotificationEvent], List[NotificationDelivery]]:
+        """
+        Bản batch của create_and_process_event cho cả nhóm users (vd. subscribers của 1 symbol):
+        1 query lấy endpoints verified của tất cả users, bulk_create events + deliveries theo
+        batch trong 1 transaction. Events được tạo với processed=True như sau process_event.
+
+        Args:
+            payloads: user_id -> payload của event cho user đó
+        Returns: (events, deliveries)
+        """
+        if not payloads:
+            return [], []
+
+        priority = priority_for(event_type)
+        endpoints_by_user = defaultdict(list)
+        for endpoint in self.endpoint_repo.get_verified_endpoints_for_users(list(payloads)):
+            endpoints_by_user[endpoint.user_id].append(endpoint)
+
+        events = [
+            NotificationEvent(
+                user_id=user_id,
+                event_type=event_type,
+                subject_id=subject_id,
+                payload=payload,
+                processed=True
+            )
+            for user_id, payload in payloads.items()
+        ]
+        self.event_repo.bulk_create(events, batch_size=self.batch_size)
+
+        deliveries = [
+            NotificationDelivery(
+                event=event,
+                endpoint=endpoint,
+                channel=endpoint.channel,
+                status=DeliveryStatus.QUEUED,
+                priority=priority
+            )
+            for event in events
+            for endpoint in endpoints_by_user.get(event.user_id, [])
+        ]
+        self.delivery_repo.bulk_create(deliveries, batch_size=self.batch_size)
+
+        logger.info(f"Created {len(events)} {event_type} events with {len(deliveries)} deliveries")
+        return events, deliveries
+
     def get_event(self, event_id: str):
         """Lấy event theo ID"""
         return self.event_repo.get_by_id(event_id)
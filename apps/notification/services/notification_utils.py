@@ -6,6 +6,7 @@ import logging
 from typing import Optional, Dict, Any, List
 from django.utils import timezone
 
+from apps.jobs.services.progress import JobProgress
 from apps.notification.models import AppEventType
 from apps.notification.services.notification_service import NotificationService
 from apps.notification.services.delivery_service import DeliveryService
@@ -41,6 +42,27 @@ def get_users_with_active_license(symbol_id: int) -> List[int]:
     return user_ids
 
 
+def build_symbol_signal_payload(
+    symbol: str,
+    signal_type: str,
+    price: str,
+    timestamp: str,
+    description: str = "",
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Payload của event SYMBOL_SIGNAL (dùng để render tin nhắn)"""
+    payload = {
+        'symbol': symbol,
+        'signal_type': signal_type,
+        'price': price,
+        'timestamp': timestamp,
+        'description': description or f"Tín hiệu {signal_type} cho {symbol}"
+    }
+    if metadata:
+        payload['metadata'] = metadata
+    return payload
+
+
 def send_symbol_signal_notification(
     user_id: int,
     symbol: str,
@@ -66,32 +88,20 @@ def send_symbol_signal_notification(
         True nếu gửi thành công, False nếu thất bại
     """
     try:
-        payload = {
-            'symbol': symbol,
-            'signal_type': signal_type,
-            'price': price,
-            'timestamp': timestamp,
-            'description': description or f"Tín hiệu {signal_type} cho {symbol}"
-        }
-
-        if metadata:
-            payload['metadata'] = metadata
+        payload = build_symbol_signal_payload(symbol, signal_type, price, timestamp, description, metadata)
 
-        notification_service = NotificationService()
-        event, deliveries_count = notification_service.create_and_process_event(
-            user_id=user_id,
+        _, deliveries = NotificationService().create_and_process_events_bulk(
             event_type=AppEventType.SYMBOL_SIGNAL,
-            payload=payload
+            payloads={user_id: payload}
         )
 
         logger.info(
             f"Created symbol signal notification for user {user_id}: "
-            f"{symbol} {signal_type} - {deliveries_count} deliveries"
+            f"{symbol} {signal_type} - {len(deliveries)} deliveries"
         )
 
-        if deliveries_count > 0:
-            delivery_service = DeliveryService()
-            delivery_service.send_pending_deliveries(limit=deliveries_count)
+        # Gửi đúng các deliveries vừa tạo (không quét hàng đợi chung)
+        DeliveryService().dispatch(deliveries)
 
         return True
 
@@ -100,6 +110,36 @@ def send_symbol_signal_notification(
         return False
 
 
+def enqueue_symbol_signal(
+    symbol_id: int,
+    symbol_name: str,
+    signal_type: str,
+    price: str,
+    timestamp: str,
+    description: str = "",
+    metadata: Optional[Dict[str, Any]] = None,
+    webhook_log_id: Optional[str] = None
+):
+    """
+    Tạo 1 job fan-out cho tín hiệu (webhook trả về ngay); dispatcher
+    `python manage.py run_jobs --queue notifications` mở rộng danh sách người nhận và gửi.
+
+    Returns: Job
+    """
+    from apps.jobs.services.job_service import JobService
+
+    return JobService().enqueue('notification.symbol_signal', {
+        'symbol_id': symbol_id,
+        'symbol_name': symbol_name,
+        'signal_type': signal_type,
+        'price': price,
+        'timestamp': timestamp,
+        'description': description,
+        'metadata': metadata,
+        'webhook_log_id': webhook_log_id,
+    })
+
+
 def send_symbol_signal_to_subscribers(
     symbol_id: int,
     symbol_name: str,
@@ -107,11 +147,16 @@ def send_symbol_signal_to_subscribers(
     price: str,
     timestamp: str,
     description: str = "",
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    progress: Optional[JobProgress] = None
 ) -> Dict[str, Any]:
     """
     Gửi tín hiệu symbol cho TẤT CẢ users có license active
 
+    Tạo events + deliveries cho tất cả users bằng bulk insert
+    (NotificationService.create_and_process_events_bulk), sau đó gửi song song đúng các
+    deliveries vừa tạo (DeliveryService.dispatch).
+
     Args:
         symbol_id: ID của symbol
         symbol_name: Tên mã CK (VNM, HPG, etc.)
@@ -120,12 +165,14 @@ def send_symbol_signal_to_subscribers(
         timestamp: Thời gian phát sinh tín hiệu
         description: Mô tả chi tiết
         metadata: Thông tin bổ sung
+        progress: Tiến độ/checkpoint khi chạy trong job fan-out
 
     Returns:
         Dict với thông tin:
         - total_users: Tổng số users có license
-        - sent_count: Số notifications gửi thành công
+        - sent_count: Số users đã tạo notification thành công
         - failed_count: Số thất bại
+        - deliveries_sent / deliveries_failed: Kết quả gửi qua các kênh
     """
     user_ids = get_users_with_active_license(symbol_id)
 
@@ -138,38 +185,43 @@ def send_symbol_signal_to_subscribers(
             'message': 'No subscribed users'
         }
 
-    sent_count = 0
-    failed_count = 0
-
-    for user_id in user_ids:
-        try:
-            success = send_symbol_signal_notification(
-                user_id=user_id,
-                symbol=symbol_name,
-                signal_type=signal_type,
-                price=price,
-                timestamp=timestamp,
-                description=description,
-                metadata=metadata
-            )
-
-            if success:
-                sent_count += 1
-            else:
-                failed_count += 1
-
-        except Exception as e:
-            logger.error(f"Error sending signal to user {user_id}: {e}")
-            failed_count += 1
+    progress = progress or JobProgress()
+    payload = build_symbol_signal_payload(symbol_name, signal_type, price, timestamp, description, metadata)
+
+    # Tạo events + deliveries cho cả nhóm trong 1 transaction; lỗi thì cả job fail và resume
+    # tạo lại từ đầu. Events có delivery được giữ trong checkpoint để lần resume sau bước
+    # này vẫn gửi đúng các deliveries đã tạo (không tạo trùng).
+    recipients = progress.begin('recipients', user_ids, key=str)
+    deliveries = None
+    if recipients:
+        events, deliveries = NotificationService().create_and_process_events_bulk(
+            event_type=AppEventType.SYMBOL_SIGNAL,
+            payloads={user_id: payload for user_id in recipients}
+        )
+        progress.checkpoint['events'] = sorted({str(d.event_id) for d in deliveries})
+        progress.advance(count=len(events))
+    progress.end()
+
+    delivery_service = DeliveryService()
+    if deliveries is not None:
+        delivery_stats = delivery_service.dispatch(deliveries, progress=progress)
+    else:
+        delivery_stats = delivery_service.send_event_deliveries(
+            progress.checkpoint.get('events', []), progress=progress
+        )
 
+    sent_count = len(user_ids)
     logger.info(
-        f"Sent {sent_count}/{len(user_ids)} symbol signal notifications for {symbol_name}"
+        f"Sent {sent_count}/{len(user_ids)} symbol signal notifications for {symbol_name} "
+        f"({delivery_stats['sent']} deliveries sent, {delivery_stats['failed']} failed)"
     )
 
     return {
         'total_users': len(user_ids),
         'sent_count': sent_count,
-        'failed_count': failed_count,
+        'failed_count': 0,
+        'deliveries_sent': delivery_stats['sent'],
+        'deliveries_failed': delivery_stats['failed'],
         'symbol': symbol_name,
         'symbol_id': symbol_id
     }
@@ -204,22 +256,19 @@ def send_subscription_expiring_notification(
             'message': f'Quyền truy cập vào {symbol} sẽ hết hạn sau {days_remaining} ngày (vào {expires_at})'
         }
 
-        notification_service = NotificationService()
-        event, deliveries_count = notification_service.create_and_process_event(
-            user_id=user_id,
+        _, deliveries = NotificationService().create_and_process_events_bulk(
             event_type=AppEventType.SUBSCRIPTION_EXPIRING,
-            payload=payload,
+            payloads={user_id: payload},
             subject_id=str(symbol_id)
         )
 
         logger.info(
             f"Created subscription expiring notification for user {user_id}: "
-            f"{symbol} - {deliveries_count} deliveries"
+            f"{symbol} - {len(deliveries)} deliveries"
         )
 
-        if deliveries_count > 0:
-            delivery_service = DeliveryService()
-            delivery_service.send_pending_deliveries(limit=deliveries_count)
+        # Làn LOW: nếu worker đang bận thì signal vẫn được claim trước
+        DeliveryService().dispatch(deliveries)
 
         return True
 
@@ -239,23 +288,28 @@ def send_bulk_symbol_signals(user_symbol_map: Dict[int, Dict[str, Any]]) -> int:
     Returns:
         Số lượng notifications được gửi thành công
     """
-    success_count = 0
-
-    for user_id, signal_data in user_symbol_map.items():
-        try:
-            if send_symbol_signal_notification(
-                user_id=user_id,
-                symbol=signal_data['symbol'],
-                signal_type=signal_data['signal_type'],
-                price=signal_data['price'],
-                timestamp=signal_data['timestamp'],
-                description=signal_data.get('description', ''),
-                metadata=signal_data.get('metadata')
-            ):
-                success_count += 1
-        except Exception as e:
-            logger.error(f"Error sending signal to user {user_id}: {e}")
-            continue
-
-    logger.info(f"Sent {success_count}/{len(user_symbol_map)} symbol signal notifications")
-    return success_count
+    payloads = {
+        user_id: build_symbol_signal_payload(
+            symbol=signal_data['symbol'],
+            signal_type=signal_data['signal_type'],
+            price=signal_data['price'],
+            timestamp=signal_data['timestamp'],
+            description=signal_data.get('description', ''),
+            metadata=signal_data.get('metadata')
+        )
+        for user_id, signal_data in user_symbol_map.items()
+    }
+
+    try:
+        events, deliveries = NotificationService().create_and_process_events_bulk(
+            event_type=AppEventType.SYMBOL_SIGNAL,
+            payloads=payloads
+        )
+    except Exception as e:
+        logger.error(f"Error creating bulk symbol signals: {e}")
+        return 0
+
+    DeliveryService().dispatch(deliveries)
+
+    logger.info(f"Sent {len(events)}/{len(user_symbol_map)} symbol signal notifications")
+    return len(events)
@@ -0,0 +1,108 @@
+"""
+Entitlement: tập symbol mà user đang có license còn hiệu lực.
+
+- Load 1 query cho mỗi user, kết quả là frozenset symbol_id + thời điểm hết hạn sớm nhất
+  (end_at nhỏ nhất trong các license còn hiệu lực).
+- Cache 2 tầng: trên object user của request (request.auth) và trong Django cache
+  vài chục giây giữa các request; TTL không vượt quá thời điểm hết hạn sớm nhất.
+- Khi license thay đổi (tạo/gia hạn/hết hạn) gọi invalidate_entitlements(user_id).
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import FrozenSet, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.seapay.models import LicenseStatus, PayUserSymbolLicense
+
+ENTITLEMENT_CACHE_PREFIX = "entitlements:user:"
+DEFAULT_ENTITLEMENT_CACHE_TTL = 60
+
+
+@dataclass(frozen=True)
+class SymbolEntitlement:
+    user_id: Optional[int]
+    symbol_ids: FrozenSet[int]
+    expires_at: Optional[datetime] = None  # None: không có license nào sắp hết hạn
+
+    def is_fresh(self, now: Optional[datetime] = None) -> bool:
+        return self.expires_at is None or (now or timezone.now()) < self.expires_at
+
+    def has(self, symbol_id) -> bool:
+        return symbol_id is not None and int(symbol_id) in self.symbol_ids
+
+
+EMPTY_ENTITLEMENT = SymbolEntitlement(user_id=None, symbol_ids=frozenset())
+
+
+class EntitlementService:
+    REQUEST_ATTR = "_symbol_entitlement"
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else getattr(settings, "ENTITLEMENT_CACHE_TTL", DEFAULT_ENTITLEMENT_CACHE_TTL)
+
+    @staticmethod
+    def cache_key(user_id: int) -> str:
+        return f"{ENTITLEMENT_CACHE_PREFIX}{user_id}"
+
+    @staticmethod
+    def load(user_id: int) -> SymbolEntitlement:
+        """Đọc từ DB: license ACTIVE còn hạn (end_at NULL là lifetime)"""
+        now = timezone.now()
+        licenses = PayUserSymbolLicense.objects.filter(
+            user_id=user_id,
+            status=LicenseStatus.ACTIVE,
+        ).filter(Q(end_at__isnull=True) | Q(end_at__gt=now))
+
+        rows = list(licenses.values_list("symbol_id", "end_at"))
+        end_dates = [end_at for _, end_at in rows if end_at is not None]
+        return SymbolEntitlement(
+            user_id=user_id,
+            symbol_ids=frozenset(symbol_id for symbol_id, _ in rows),
+            expires_at=min(end_dates) if end_dates else None,
+        )
+
+    def for_user(self, user) -> SymbolEntitlement:
+        if not user or not getattr(user, "is_authenticated", False):
+            return EMPTY_ENTITLEMENT
+
+        now = timezone.now()
+        entitlement = getattr(user, self.REQUEST_ATTR, None)
+        if entitlement is not None and entitlement.is_fresh(now):
+            return entitlement
+
+        key = self.cache_key(user.pk)
+        entitlement = cache.get(key)
+        if entitlement is None or not entitlement.is_fresh(now):
+            entitlement = self.load(user.pk)
+            timeout = self.ttl
+            if entitlement.expires_at is not None:
+                timeout = min(timeout, max(1, int((entitlement.expires_at - now).total_seconds())))
+            cache.set(key, entitlement, timeout)
+
+        setattr(user, self.REQUEST_ATTR, entitlement)
+        return entitlement
+
+    def invalidate(self, user_id: int) -> None:
+        cache.delete(self.cache_key(user_id))
+
+
+_entitlement_service = EntitlementService()
+
+
+def get_user_entitlement(user) -> SymbolEntitlement:
+    return _entitlement_service.for_user(user)
+
+
+def invalidate_entitlements(user_id: int) -> None:
+    """
+    Gọi sau khi license của user được tạo/gia hạn/hết hạn.
+    Xóa ngay và xóa lại sau commit: request khác đọc trong lúc transaction chưa commit
+    sẽ không giữ entitlement cũ tới hết TTL.
+    """
+    _entitlement_service.invalidate(user_id)
+    transaction.on_commit(lambda: _entitlement_service.invalidate(user_id))
@@ -18,6 +18,7 @@ from apps.seapay.models import (
     PaymentStatus,
 )
 from apps.seapay.repositories.payment_repository import PaymentRepository
+from apps.seapay.services.entitlement_service import invalidate_entitlements
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -307,6 +308,7 @@ class PaymentService:
                 end_at=end_at,
                 status="active",
             )
+        invalidate_entitlements(order.user_id)
 
     def _ensure_order_status_synced(self, intent: PayPaymentIntent) -> None:
         from apps.seapay.models import PaySymbolOrder
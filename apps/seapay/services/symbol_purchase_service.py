@@ -20,6 +20,7 @@ from ..models import (
     PaymentMethod,
     WalletTxType,
 )
+from .entitlement_service import invalidate_entitlements
 from .payment_service import PaymentService
 from apps.setting.services.subscription_service import SymbolAutoRenewService
 from apps.stock.models import Symbol
@@ -438,6 +439,7 @@ class SymbolPurchaseService:
             )
             licenses_created += 1
 
+        invalidate_entitlements(order.user_id)
         return licenses_created
 
     def check_symbol_access(self, user: User, symbol_id: int) -> Dict[str, object]:
@@ -454,6 +456,7 @@ class SymbolPurchaseService:
         if license_obj.end_at and license_obj.end_at <= now:
             license_obj.status = LicenseStatus.EXPIRED
             license_obj.save(update_fields=["status", "updated_at"])
+            invalidate_entitlements(user.id)
             return {
                 "has_access": False,
                 "reason": "License expired",
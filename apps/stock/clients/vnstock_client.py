@@ -1,5 +1,4 @@
-﻿import time
-from typing import Dict, Generator, Optional, Tuple
+﻿from typing import Dict, Generator, Optional, Tuple
 
 import pandas as pd
 from vnstock import Company as VNCompany
@@ -20,9 +19,8 @@ class VNStockClient:
     Cung cấp helper để iterate symbols và fetch thông tin công ty.
     """
 
-    def __init__(self, max_retries: int = 3, wait_seconds: int = 45):
+    def __init__(self, max_retries: int = 3):
         self.max_retries = max_retries
-        self.wait_seconds = wait_seconds
         self.rate_limiter = get_rate_limiter()
 
     # ------------------------------------------------------------
@@ -177,14 +175,14 @@ class VNStockClient:
 
                 return bundle, True
 
-            except SystemExit:
+            except SystemExit as exc:
                 retries += 1
-                wait_time = self.wait_seconds * (2 ** (retries - 1))
+                # Pause chung qua rate limiter thay vì tự sleep
+                wait_time = self.rate_limiter.backoff(exc, f"company_bundle_{symbol}", attempt=retries)
                 print(
                     f"⚠️ Rate limit hit for {symbol}. "
-                    f"Retry {retries}/{self.max_retries} after {wait_time}s..."
+                    f"Retry {retries}/{self.max_retries} after {wait_time:.0f}s..."
                 )
-                time.sleep(wait_time)
 
             except Exception as e:
                 print(f"Error {symbol}: {e}")
@@ -288,14 +286,14 @@ class VNStockClient:
                 ok = overview_tcbs is not None and not overview_tcbs.empty
                 return bundle, bool(ok)
 
-            except SystemExit:
+            except SystemExit as exc:
                 retries += 1
-                wait_time = self.wait_seconds * (2 ** (retries - 1))
+                # Pause chung qua rate limiter thay vì tự sleep
+                wait_time = self.rate_limiter.backoff(exc, f"company_bundle_{symbol}", attempt=retries)
                 print(
                     f"⚠️ Rate limit hit for {symbol}. "
-                    f"Retry {retries}/{self.max_retries} after {wait_time}s..."
+                    f"Retry {retries}/{self.max_retries} after {wait_time:.0f}s..."
                 )
-                time.sleep(wait_time)
 
             except Exception as e:
                 print(f"Error {symbol}: {e}")
@@ -0,0 +1,56 @@
+"""Job nền cho các endpoint import vnstock (chạy bởi `python manage.py run_jobs`)."""
+import time
+
+from apps.jobs.registry import register_job
+from apps.stock.services.symbol_service import SymbolService
+from apps.stock.services.vnstock_import_service import VnstockImportService
+
+IMPORT_QUEUE = "imports"
+
+
+@register_job("stock.import_all", queue=IMPORT_QUEUE)
+def import_all(progress, exchange: str = "HSX", force_update: bool = False):
+    start_time = time.time()
+    result = SymbolService(progress=progress).import_all_symbols(exchange=exchange, force_update=force_update)
+    result["processing_time"] = round(time.time() - start_time, 2)
+    return result
+
+
+@register_job("stock.import_symbols", queue=IMPORT_QUEUE)
+def import_symbols(progress, exchange: str = "HSX"):
+    return VnstockImportService(progress=progress).import_all_symbols_from_vnstock(exchange)
+
+
+@register_job("stock.import_companies", queue=IMPORT_QUEUE)
+def import_companies(progress, exchange: str = "HSX"):
+    return VnstockImportService(progress=progress).import_companies_from_vnstock(exchange)
+
+
+@register_job("stock.import_industries", queue=IMPORT_QUEUE)
+def import_industries(progress):
+    return VnstockImportService(progress=progress).import_industries_for_symbols()
+
+
+@register_job("stock.import_shareholders", queue=IMPORT_QUEUE)
+def import_shareholders(progress):
+    return VnstockImportService(progress=progress).import_shareholders_for_all_symbols()
+
+
+@register_job("stock.import_officers", queue=IMPORT_QUEUE)
+def import_officers(progress):
+    return VnstockImportService(progress=progress).import_officers_for_all_symbols()
+
+
+@register_job("stock.import_events", queue=IMPORT_QUEUE)
+def import_events(progress):
+    return VnstockImportService(progress=progress).import_events_for_all_symbols()
+
+
+@register_job("stock.import_sub_companies", queue=IMPORT_QUEUE)
+def import_sub_companies(progress):
+    results = VnstockImportService(progress=progress).import_sub_companies_for_all_symbols()
+    return {
+        "symbols_processed": len(results),
+        "total_sub_companies": sum(r.get('sub_companies_count', 0) for r in results),
+        "results": results,
+    }
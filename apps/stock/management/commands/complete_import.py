@@ -21,19 +21,26 @@ class Command(BaseCommand):
             default=[],
             help='Steps to skip (e.g., --skip-step symbols companies)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of concurrent bundle fetch workers (default: 1 - sequential). DB writes stay on one thread'
+        )
 
     def handle(self, *args, **options):
         sleep_time = options['sleep']
         skip_steps = set(options['skip_step'])
+        workers = max(1, options['workers'])
         
         self.stdout.write(
-            self.style.SUCCESS(f'Starting complete import pipeline (sleep: {sleep_time}s)')
+            self.style.SUCCESS(f'Starting complete import pipeline (sleep: {sleep_time}s, workers: {workers})')
         )
         
         if skip_steps:
             self.stdout.write(f'Skipping steps: {", ".join(skip_steps)}')
         
-        service = VnstockImportService(per_symbol_sleep=sleep_time)
+        service = VnstockImportService(per_symbol_sleep=sleep_time, workers=workers)
         
         total_start_time = time.time()
         
@@ -28,6 +28,17 @@ class Command(BaseCommand):
             action='store_true',
             help='Safe mode with longer sleep (2.0s) to avoid rate limits'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of concurrent bundle fetch workers (default: 1 - sequential). DB writes stay on one thread'
+        )
+        parser.add_argument(
+            '--force-update',
+            action='store_true',
+            help='Re-import all symbols instead of only symbols missing data'
+        )
 
     def handle(self, *args, **options):
         exchange = options['exchange']
@@ -41,17 +52,20 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('🛡️ Safe mode enabled - longer sleep times'))
         else:
             sleep_time = options['sleep']
+        workers = max(1, options['workers'])
         
         self.stdout.write(
-            self.style.SUCCESS(f'🚀 Starting complete import for {exchange} exchange with {sleep_time}s sleep')
+            self.style.SUCCESS(
+                f'🚀 Starting complete import for {exchange} exchange with {sleep_time}s sleep, {workers} worker(s)'
+            )
         )
         
         # Initialize service
-        service = VnstockImportService(per_symbol_sleep=sleep_time)
+        service = VnstockImportService(per_symbol_sleep=sleep_time, workers=workers)
         
         try:
             # Run complete import
-            results = service.import_all_data_sequential(exchange=exchange)
+            results = service.import_all_complete(exchange=exchange, force_update=options['force_update'])
             
             # Check results
             if results.get('errors'):
@@ -64,7 +78,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS('✅ Complete import finished successfully!'))
             
             # Print summary
-            summary = results.get('summary', {})
+            summary = {k: v for k, v in results.items() if k.startswith(('total_', 'symbols_'))}
             if summary:
                 self.stdout.write(self.style.SUCCESS('\n📊 FINAL SUMMARY:'))
                 for key, value in summary.items():
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymbolDocument',
+            fields=[
+                ('symbol', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='stock.symbol')),
+                ('body', models.BinaryField()),
+                ('etag', models.CharField(max_length=64)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
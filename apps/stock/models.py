@@ -109,4 +109,23 @@ class Officers(models.Model):
 class SubCompany(models.Model):
     parent = models.ForeignKey("Company", on_delete=models.CASCADE, related_name="subsidiaries")
     company_name = models.CharField(max_length=200)
-    sub_own_percent = models.FloatField(blank=True)
\ No newline at end of file
+    sub_own_percent = models.FloatField(blank=True)
+
+class SymbolDocument(models.Model):
+    """
+    Payload chi tiết symbol (GET /api/stocks/symbols/{id}) đã serialize sẵn thành JSON.
+    Được dựng lại sau mỗi lần import upsert dữ liệu của company; read path chỉ là 1 lookup theo PK.
+    """
+    symbol = models.OneToOneField(
+        'Symbol',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document'
+    )
+    body = models.BinaryField()
+    etag = models.CharField(max_length=64)
+    version = models.PositiveIntegerField(default=1)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.symbol_id} v{self.version}"
@@ -1,9 +1,17 @@
 import math
-from typing import Any, Dict, Iterable, Optional
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.db.models import QuerySet, Prefetch
+from django.utils import timezone
 from apps.stock.models import Industry, ShareHolder, Symbol, Company, News, Officers, Events, SubCompany
 from apps.stock.utils.safe import to_epoch_seconds
 
+# Số row mỗi câu INSERT/UPDATE khi bulk upsert
+BULK_BATCH_SIZE = 500
+
 
 def _normalize_public_date(value: Any) -> Optional[int]:
     """Convert various epoch formats to seconds while tolerating NaN values."""
@@ -69,74 +77,178 @@ def upsert_symbol(name: str, defaults: Dict) -> Symbol:
     return symbol
 
 
-def upsert_shareholders(company: Company, rows: Iterable[Dict]) -> None:
-    for r in rows:
-        ShareHolder.objects.update_or_create(
-            share_holder=(r.get("share_holder") or "").strip(),
-            company=company,
-            defaults={
-                "quantity": r.get("quantity"),
-                "share_own_percent": r.get("share_own_percent"),
-                "update_date": r.get("update_date"),
-            }
-        )
+UpsertStats = Dict[str, int]
+
+
+def _normalize_field_value(field, value: Any) -> Any:
+    """Đưa giá trị về đúng kiểu DB lưu để so sánh thay đổi (Decimal đã quantize, date, ...)."""
+    if value is None:
+        return None
+    try:
+        value = field.to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        return value
+    if isinstance(field, models.DecimalField) and isinstance(value, Decimal):
+        try:
+            return value.quantize(Decimal(1).scaleb(-field.decimal_places))
+        except InvalidOperation:
+            return value
+    if isinstance(field, models.DateField) and not isinstance(field, models.DateTimeField):
+        if isinstance(value, datetime):
+            return value.date()
+    return value
+
+
+def _bulk_upsert_children(
+    model,
+    parent_field: str,
+    parent: Company,
+    key_field: str,
+    rows: Iterable[Dict],
+    value_fields: List[str],
+    *,
+    conflict_upsert: bool = False,
+    touch_field: Optional[str] = None,
+) -> UpsertStats:
+    """
+    Upsert toàn bộ rows của một company bằng vài câu lệnh set-based thay vì update_or_create từng row.
+
+    - 1 SELECT lấy các row hiện có theo (key_field, parent) để phân loại inserted/updated/unchanged.
+    - conflict_upsert=True (bảng có unique key thật): 1 INSERT ... ON CONFLICT DO UPDATE cho cả row mới lẫn row đổi.
+    - Ngược lại: bulk_create cho row mới + bulk_update cho row đổi.
+    - touch_field (auto_now): vẫn được cập nhật cho row unchanged để giữ nghĩa "lần cuối thấy trong import".
+    """
+    stats: UpsertStats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return stats
 
+    fields = {name: model._meta.get_field(name) for name in value_fields}
 
-def upsert_news(company: Company, rows: Iterable[Dict]) -> None:
+    incoming: Dict[str, Dict[str, Any]] = {}
     for r in rows:
-      
-        public_date = _normalize_public_date(r.get("public_date"))
-        price_change_pct = safe_decimal(r.get("price_change_pct"), None)
-
-        News.objects.update_or_create(
-            title=(r.get("title") or "").strip(),
-            company=company,
-            defaults={
-                "news_image_url": r.get("news_image_url"),
-                "news_source_link": r.get("news_source_link"),
-                "public_date": public_date,
-                "price_change_pct": price_change_pct,
-            }
+        key = (r.get(key_field) or "").strip()
+        values: Dict[str, Any] = {}
+        valid = True
+        for name, field in fields.items():
+            value = r.get(name)
+            if value is None and not field.null:
+                if not field.has_default():
+                    valid = False
+                    break
+                value = field.get_default()
+            values[name] = _normalize_field_value(field, value)
+        if valid:
+            # Trùng key trong cùng batch: row sau ghi đè row trước (giống update_or_create tuần tự)
+            incoming[key] = values
+    if not incoming:
+        return stats
+
+    existing: Dict[str, Dict[str, Any]] = {}
+    for row in (
+        model.objects.filter(**{parent_field: parent, f"{key_field}__in": list(incoming)})
+        .values("id", key_field, *value_fields)
+    ):
+        existing.setdefault(row[key_field], row)
+
+    to_insert = []
+    to_update = []
+    unchanged_ids = []
+    for key, values in incoming.items():
+        current = existing.get(key)
+        if current is None:
+            to_insert.append(model(**{key_field: key, parent_field: parent}, **values))
+            continue
+        changed = any(
+            _normalize_field_value(fields[name], current[name]) != values[name]
+            for name in value_fields
         )
+        if not changed:
+            unchanged_ids.append(current["id"])
+            continue
+        obj = model(**{key_field: key, parent_field: parent}, **values)
+        if not conflict_upsert:
+            obj.pk = current["id"]
+        to_update.append(obj)
+
+    update_fields = list(value_fields)
+    if touch_field:
+        now = timezone.now()
+        for obj in to_update:
+            setattr(obj, touch_field, now)
+        update_fields.append(touch_field)
+
+    with transaction.atomic():
+        if conflict_upsert:
+            if to_insert or to_update:
+                model.objects.bulk_create(
+                    to_insert + to_update,
+                    batch_size=BULK_BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=[key_field, parent_field],
+                    update_fields=update_fields,
+                )
+        else:
+            if to_insert:
+                model.objects.bulk_create(to_insert, batch_size=BULK_BATCH_SIZE)
+            if to_update:
+                model.objects.bulk_update(to_update, update_fields, batch_size=BULK_BATCH_SIZE)
+        if touch_field and unchanged_ids:
+            model.objects.filter(id__in=unchanged_ids).update(**{touch_field: timezone.now()})
+
+    stats["inserted"] = len(to_insert)
+    stats["updated"] = len(to_update)
+    stats["unchanged"] = len(unchanged_ids)
+    return stats
+
+
+def upsert_shareholders(company: Company, rows: Iterable[Dict]) -> UpsertStats:
+    return _bulk_upsert_children(
+        ShareHolder, "company", company, "share_holder", rows,
+        ["quantity", "share_own_percent", "update_date"],
+        conflict_upsert=True,
+    )
+
 
-def upsert_events(company: Company, rows: Iterable[Dict]) -> None:
+def upsert_news(company: Company, rows: Iterable[Dict]) -> UpsertStats:
+    normalized = [
+        {
+            **r,
+            "public_date": _normalize_public_date(r.get("public_date")),
+            "price_change_pct": safe_decimal(r.get("price_change_pct"), None),
+        }
+        for r in rows
+    ]
+    return _bulk_upsert_children(
+        News, "company", company, "title", normalized,
+        ["news_image_url", "news_source_link", "public_date", "price_change_pct"],
+    )
+
+
+def upsert_events(company: Company, rows: Iterable[Dict]) -> UpsertStats:
     """
     Upsert events với public_date và issue_date từ nguồn vnstock
     """
-    for r in rows:
-        Events.objects.update_or_create(
-            event_title=(r.get("event_title") or "").strip(),
-            company=company,
-            defaults={
-                "source_url": r.get("source_url"),
-                "public_date": r.get("public_date"),
-                "issue_date": r.get("issue_date"),
-            }
-        )
-def upsert_sub_company(rows: Optional[Iterable[Dict]], parent_company: Company) -> None:
+    return _bulk_upsert_children(
+        Events, "company", company, "event_title", rows,
+        ["source_url", "public_date", "issue_date"],
+    )
+
+
+def upsert_sub_company(rows: Optional[Iterable[Dict]], parent_company: Company) -> UpsertStats:
     if not rows:  # None hoặc rỗng
-        return
-    for r in rows:
-        SubCompany.objects.update_or_create(
-            company_name=(r.get("company_name") or "").strip(),
-            parent=parent_company,
-            defaults={
-                "sub_own_percent": r.get("sub_own_percent"),
-            }
-        )
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    return _bulk_upsert_children(
+        SubCompany, "parent", parent_company, "company_name", rows,
+        ["sub_own_percent"],
+    )
 
 
-def upsert_officers(company: Company, rows: Iterable[Dict]) -> None:
-    for r in rows:
-        Officers.objects.update_or_create(
-            officer_name=(r.get("officer_name") or "").strip(),
-            company=company,
-            defaults={
-                "officer_position": r.get("officer_position"),
-                "position_short_name": r.get("position_short_name"),
-                "officer_owner_percent": r.get("officer_owner_percent"),
-            }
-        )
+def upsert_officers(company: Company, rows: Iterable[Dict]) -> UpsertStats:
+    return _bulk_upsert_children(
+        Officers, "company", company, "officer_name", rows,
+        ["officer_position", "position_short_name", "officer_owner_percent"],
+        touch_field="updated_at",
+    )
 
 
 def qs_companies_with_related() -> QuerySet[Company]:
@@ -193,6 +305,30 @@ def qs_symbols_with_industries() -> QuerySet[Symbol]:
             "company__id", "company__company_name", "company__updated_at"
         )
     )
+SYMBOL_ROW_FIELDS = (
+    "id", "name", "exchange", "updated_at",
+    "company_id", "company__company_name", "company__updated_at",
+)
+
+
+def qs_symbol_rows(exchange: Optional[str] = None, order: str = "id") -> QuerySet:
+    """Projection .values() của Symbol + company (không tạo model instance)"""
+    qs = Symbol.objects.values(*SYMBOL_ROW_FIELDS)
+    if exchange:
+        qs = qs.filter(exchange=exchange)
+    return qs.order_by(order) if order == "id" else qs.order_by(order, "id")
+
+
+def symbol_industry_rows(symbol_ids: Iterable[int]) -> QuerySet:
+    """Các cặp symbol-industry của một trang symbols (1 query qua bảng M2M)"""
+    return (
+        Symbol.industries.through.objects
+        .filter(symbol_id__in=list(symbol_ids))
+        .values("symbol_id", "industry_id", "industry__name", "industry__updated_at")
+        .order_by("symbol_id", "industry_id")
+    )
+
+
 def qs_symbol_name(symbol_name):
     return Symbol.objects.filter(name__iexact = symbol_name).only('id','name', 'exchange')
 
@@ -7,19 +7,28 @@ from ninja.errors import HttpError
 from ninja.pagination import paginate, PageNumberPagination
 from apps.stock.schemas import CompanyOut, SymbolList, SubCompanyOut, SymbolOutBasic
 from apps.stock.services.symbol_service import SymbolService
-from typing import List
-from apps.stock.services.vnstock_import_service import VnstockImportService
+from typing import List, Optional
+from apps.jobs.schemas import JobOut
+from apps.jobs.services.job_service import JobService
 from apps.stock.services.cache_service import VNStockCacheService
 from apps.stock.services.rate_limiter import get_rate_limiter
+from apps.stock.services.symbol_documents import SymbolDocumentStore
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 
 router = Router(tags=["vnstock-import"])
 
 
-@router.post("/symbols/import_all")
+def _enqueue(kind: str, **params):
+    """Import chạy nhiều giờ -> tạo job nền, trả về ngay; theo dõi qua GET /api/jobs/{id}"""
+    return 202, JobService().enqueue(kind, params)
+
+
+@router.post("/symbols/import_all", response={202: JobOut})
 def import_all_symbols(request, exchange: str = "HSX", force_update: bool = False):
     """
     Import ALL stock data (symbols, companies, industries, shareholders, officers, events, sub_companies)
     for all symbols with detailed logging for each table.
+    Chạy nền: trả về job, tiến độ/kết quả xem tại GET /api/jobs/{id}.
 
     Query Parameters:
     - exchange (str): Exchange to import (HSX, HNX, UPCOM). Default: HSX
@@ -27,85 +36,98 @@ def import_all_symbols(request, exchange: str = "HSX", force_update: bool = Fals
         - False (default): Resume mode - only import symbols missing data
         - True: Force update mode - re-import all symbols to get latest data
     """
-    import time
-
-    try:
-        start_time = time.time()
-        service = SymbolService()
-        result = service.import_all_symbols(exchange=exchange, force_update=force_update)
-        processing_time = time.time() - start_time
-        result["processing_time"] = round(processing_time, 2)
-
-        return result
+    return _enqueue("stock.import_all", exchange=exchange, force_update=force_update)
 
-    except Exception as e:
-        return {
-            "error": f"Import failed: {str(e)}",
-            "exchange": exchange,
-            "force_update": force_update
-        }
 
-
-@router.post("/import/symbols")
+@router.post("/import/symbols", response={202: JobOut})
 def import_symbols_from_vnstock(request, exchange: str = "HSX"):
-    """Import tất cả symbols từ vnstock theo exchange"""
-    service = VnstockImportService()
-    return service.import_all_symbols_from_vnstock(exchange)
+    """Import tất cả symbols từ vnstock theo exchange (job nền)"""
+    return _enqueue("stock.import_symbols", exchange=exchange)
 
 
-@router.post("/import/companies") 
+@router.post("/import/companies", response={202: JobOut})
 def import_companies_for_symbols(request, exchange: str = "HSX"):
-    """Import company data cho tất cả symbols có trong database"""
-    service = VnstockImportService()
-    return service.import_companies_from_vnstock(exchange)
+    """Import company data cho tất cả symbols có trong database (job nền)"""
+    return _enqueue("stock.import_companies", exchange=exchange)
 
 
-@router.post("/import/industries")
+@router.post("/import/industries", response={202: JobOut})
 def import_industries_for_symbols(request):
-    """Import industry data và tạo quan hệ với symbols"""
-    service = VnstockImportService()
-    return service.import_industries_for_symbols()
+    """Import industry data và tạo quan hệ với symbols (job nền)"""
+    return _enqueue("stock.import_industries")
 
 
-@router.post("/import/shareholders")
+@router.post("/import/shareholders", response={202: JobOut})
 def import_shareholders_for_all_symbols(request):
-    """Import shareholders cho tất cả symbols có company"""
-    service = VnstockImportService()
-    return service.import_shareholders_for_all_symbols()
+    """Import shareholders cho tất cả symbols có company (job nền)"""
+    return _enqueue("stock.import_shareholders")
 
 
-@router.post("/import/officers")
+@router.post("/import/officers", response={202: JobOut})
 def import_officers_for_all_symbols(request):
-    """Import officers cho tất cả symbols có company"""
-    service = VnstockImportService()
-    return service.import_officers_for_all_symbols()
+    """Import officers cho tất cả symbols có company (job nền)"""
+    return _enqueue("stock.import_officers")
 
 
-@router.post("/import/events")
+@router.post("/import/events", response={202: JobOut})
 def import_events_for_all_symbols(request):
-    """Import events cho tất cả symbols có company"""
-    service = VnstockImportService()
-    return service.import_events_for_all_symbols()
+    """Import events cho tất cả symbols có company (job nền)"""
+    return _enqueue("stock.import_events")
 
 
-@router.post("/import/sub_companies")
+@router.post("/import/sub_companies", response={202: JobOut})
 def import_sub_companies_for_all_symbols(request):
-    """Import sub companies (subsidiaries) cho tất cả symbols có company"""
-    service = VnstockImportService()
-    results = service.import_sub_companies_for_all_symbols()
-    total_sub_companies = sum(r.get('sub_companies_count', 0) for r in results)
-    return {
-        "symbols_processed": len(results),
-        "total_sub_companies": total_sub_companies,
-        "results": results
-    }
+    """Import sub companies (subsidiaries) cho tất cả symbols có company (job nền)"""
+    return _enqueue("stock.import_sub_companies")
+
+# Đăng ký trước /symbols/{symbol} để "page"/"export" không bị match như path param
+@router.get("/symbols/page")
+def list_symbols_page(
+    request,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order: str = "id",
+    exchange: Optional[str] = None,
+):
+    """
+    Danh sách symbols phân trang keyset (order=id|name).
+    Gửi lại next_cursor để lấy trang kế tiếp; next_cursor=null là trang cuối.
+    """
+    service = SymbolService()
+    return service.list_symbols_page(limit=limit, cursor=cursor, order=order, exchange=exchange)
+
+
+@router.get("/symbols/export")
+def export_symbols_ndjson(request, exchange: Optional[str] = None, chunk_size: int = 2000):
+    """Full dump toàn bộ symbols dạng NDJSON (stream, bộ nhớ không đổi theo số symbols)"""
+    service = SymbolService()
+    response = StreamingHttpResponse(
+        service.iter_symbols_ndjson(exchange=exchange, chunk_size=max(1, chunk_size)),
+        content_type="application/x-ndjson",
+    )
+    response["Content-Disposition"] = 'attachment; filename="symbols.ndjson"'
+    return response
+
 
 @router.get("/symbols/{symbol}")
 def get_symbol_with_all_relations(request, symbol: int):
-    """Lấy thông tin symbol với tất cả bảng liên quan: company, industries, shareholders, officers, events, sub_companies"""
-    from apps.stock.services.symbol_service import SymbolService
-    service = SymbolService()
-    return service.get_symbol_payload(symbol)
+    """
+    Lấy thông tin symbol với tất cả bảng liên quan: company, industries, shareholders, officers, events, sub_companies.
+    Trả về document đã dựng sẵn khi import (1 lookup theo PK), hỗ trợ ETag/If-None-Match.
+    """
+    document = SymbolDocumentStore().get(symbol)
+    if document is None:
+        raise HttpError(404, "Symbol not found")
+    body, etag = document
+    etag = f'"{etag}"'
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    return response
 
 
 @router.get("/symbols")
@@ -126,40 +148,31 @@ def get_symbol_by_name(request, symbol_name: str, limit: int = 20):
 @router.get("/stats")
 def get_database_stats(request):
     """Lấy thống kê tổng quan về dữ liệu trong database"""
-    from apps.stock.models import Symbol, Company, Industry, ShareHolder, Officers, Events, SubCompany
-    from django.db.models import Count, Q
-    
+    from apps.stock.models import Company, Industry, ShareHolder, Officers, Events, SubCompany
+    from apps.stock.services.coverage_planner import CoveragePlanner, stock_coverage_checks
+
     # Basic counts
-    symbols_count = Symbol.objects.count()
     companies_count = Company.objects.count()
     industries_count = Industry.objects.count()
     shareholders_count = ShareHolder.objects.count()
     officers_count = Officers.objects.count()
     events_count = Events.objects.count()
     sub_companies_count = SubCompany.objects.count()
-    
-    # Relationship stats
-    symbols_with_company = Symbol.objects.filter(company__isnull=False).count()
-    symbols_with_industries = Symbol.objects.filter(industries__isnull=False).distinct().count()
-    symbols_with_shareholders = Symbol.objects.filter(company__shareholders__isnull=False).distinct().count()
-    symbols_with_officers = Symbol.objects.filter(company__officers__isnull=False).distinct().count()
-    symbols_with_events = Symbol.objects.filter(company__events__isnull=False).distinct().count()
-    symbols_with_sub_companies = Symbol.objects.filter(company__subsidiaries__isnull=False).distinct().count()
-    
-    # Coverage percentages
-    company_coverage = (symbols_with_company / symbols_count * 100) if symbols_count > 0 else 0
-    industries_coverage = (symbols_with_industries / symbols_count * 100) if symbols_count > 0 else 0
-    shareholders_coverage = (symbols_with_shareholders / symbols_count * 100) if symbols_count > 0 else 0
-    officers_coverage = (symbols_with_officers / symbols_count * 100) if symbols_count > 0 else 0
-    events_coverage = (symbols_with_events / symbols_count * 100) if symbols_count > 0 else 0
-    sub_companies_coverage = (symbols_with_sub_companies / symbols_count * 100) if symbols_count > 0 else 0
-    
-    # Exchange breakdown
-    exchange_stats = Symbol.objects.values('exchange').annotate(
-        count=Count('id'),
-        with_company=Count('id', filter=Q(company__isnull=False))
-    ).order_by('-count')
-    
+
+    # Relationship stats + exchange breakdown: 1 query GROUP BY exchange với Exists() annotations
+    coverage = CoveragePlanner(stock_coverage_checks(include_industries=True)).summary()
+    totals = coverage["total"]
+    symbols_count = totals["count"]
+
+    def percent(key: str) -> str:
+        value = (totals[key] / symbols_count * 100) if symbols_count > 0 else 0
+        return f"{value:.1f}%"
+
+    exchange_stats = [
+        {"exchange": row["exchange"], "count": row["count"], "with_company": row["with_company"]}
+        for row in coverage["by_exchange"]
+    ]
+
     return {
         "overview": {
             "symbols": symbols_count,
@@ -171,14 +184,14 @@ def get_database_stats(request):
             "sub_companies": sub_companies_count
         },
         "coverage": {
-            "company_coverage": f"{company_coverage:.1f}%",
-            "industries_coverage": f"{industries_coverage:.1f}%",
-            "shareholders_coverage": f"{shareholders_coverage:.1f}%",
-            "officers_coverage": f"{officers_coverage:.1f}%",
-            "events_coverage": f"{events_coverage:.1f}%",
-            "sub_companies_coverage": f"{sub_companies_coverage:.1f}%"
+            "company_coverage": percent("with_company"),
+            "industries_coverage": percent("with_industries"),
+            "shareholders_coverage": percent("with_shareholders"),
+            "officers_coverage": percent("with_officers"),
+            "events_coverage": percent("with_events"),
+            "sub_companies_coverage": percent("with_sub_companies")
         },
-        "by_exchange": list(exchange_stats)
+        "by_exchange": exchange_stats
     }
 
 
@@ -190,13 +203,19 @@ def get_cache_stats(request):
 
 
 @router.post("/cache/clear")
-def clear_cache(request, symbol: str = None):
-    """Xóa cache cho symbol cụ thể hoặc toàn bộ cache"""
+def clear_cache(request, symbol: str = None, pattern: str = None):
+    """
+    Xóa cache cho symbol cụ thể, theo pattern (vd. "company_bundle:VC*", "symbols_list:HNX")
+    hoặc toàn bộ cache
+    """
     cache_service = VNStockCacheService()
 
     if symbol:
         cache_service.clear_symbol_cache(symbol.upper())
         return {"message": f"Cache cleared for symbol: {symbol.upper()}"}
+    elif pattern:
+        removed = cache_service.clear_cache(pattern)
+        return {"message": f"Cache cleared for pattern: {pattern}", "removed": removed}
     else:
         cache_service.clear_cache()
         return {"message": "All cache cleared"}
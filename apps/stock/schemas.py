@@ -82,6 +82,7 @@ class SymbolOutBasic(Schema):
     id: int
     name: str
     exchange: Optional[str] = None
+    company_name: Optional[str] = None
     
 class SymbolList(Schema):
     id: int
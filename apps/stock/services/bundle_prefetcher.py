@@ -0,0 +1,75 @@
+# apps/stock/services/bundle_prefetcher.py
+"""
+Fetch company bundle song song cho nhiều symbol (worker pool có giới hạn)
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+BundleResult = Tuple[Any, Dict, bool, Optional[str]]
+
+
+class BundlePrefetcher:
+    """
+    Worker pool để fetch company bundle cho nhiều symbol cùng lúc.
+
+    - Worker threads chỉ gọi vnstock qua VNStockCacheService, vẫn đi qua
+      VNStockRateLimiter dùng chung nên tổng budget không đổi.
+    - Worker không đụng tới database; kết quả được yield lại trên thread gọi
+      để mọi DB write do một writer duy nhất thực hiện.
+    """
+
+    def __init__(self, cache_service, workers: int = 1, max_pending: Optional[int] = None):
+        self.cache_service = cache_service
+        self.workers = max(1, int(workers or 1))
+        # Giới hạn số bundle đang chờ writer để không giữ quá nhiều DataFrame trong RAM
+        self.max_pending = max(self.workers, int(max_pending or self.workers * 2))
+
+    @staticmethod
+    def _symbol_name(symbol: Any) -> str:
+        return getattr(symbol, "name", symbol)
+
+    def _fetch(self, symbol_name: str) -> Tuple[Dict, bool, Optional[str]]:
+        """Fetch 1 bundle, không raise để một symbol lỗi không làm hỏng cả pool."""
+        try:
+            bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol_name)
+            return bundle or {}, bool(ok), None
+        except Exception as e:
+            return {}, False, str(e)
+
+    def iter_bundles(self, symbols: Iterable[Any]) -> Iterator[BundleResult]:
+        """
+        Yield (symbol, bundle, ok, error) cho từng symbol.
+        workers=1 giữ nguyên thứ tự; workers>1 yield theo thứ tự fetch xong.
+        """
+        if self.workers == 1:
+            for symbol in symbols:
+                bundle, ok, error = self._fetch(self._symbol_name(symbol))
+                yield symbol, bundle, ok, error
+            return
+
+        items = iter(symbols)
+        pending: Dict[Future, Any] = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vnstock-bundle")
+
+        def submit_next() -> bool:
+            try:
+                symbol = next(items)
+            except StopIteration:
+                return False
+            pending[pool.submit(self._fetch, self._symbol_name(symbol))] = symbol
+            return True
+
+        try:
+            while len(pending) < self.max_pending and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol = pending.pop(future)
+                    bundle, ok, error = future.result()
+                    # Nạp việc mới trước khi yield để worker không phải chờ writer
+                    submit_next()
+                    yield symbol, bundle, ok, error
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
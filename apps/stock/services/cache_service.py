@@ -3,17 +3,35 @@ VNStock API caching service để tối ưu hoá hiệu năng
 """
 import hashlib
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Optional, Tuple
-from django.core.cache import cache
 from django.conf import settings
 import pandas as pd
 from apps.stock.clients.vnstock_client import VNStockClient
+from apps.stock.services.cache_store import BaseCacheStore, get_cache_store
+from apps.stock.services.single_flight import SingleFlight
 from apps.stock.utils.pandas_compat import suppress_pandas_warnings
 
 # Suppress pandas warnings
 suppress_pandas_warnings()
 
+# Dùng chung cho mọi VNStockCacheService trong process: gộp các lần fetch bundle cùng symbol
+_bundle_flight = SingleFlight()
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_refresh_pool_lock = threading.Lock()
+
+
+def _get_refresh_pool() -> ThreadPoolExecutor:
+    """Thread pool nhỏ để refresh bundle stale ở background"""
+    global _refresh_pool
+    if _refresh_pool is None:
+        with _refresh_pool_lock:
+            if _refresh_pool is None:
+                _refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vnstock-swr")
+    return _refresh_pool
+
 
 class VNStockCacheService:
     """
@@ -25,9 +43,25 @@ class VNStockCacheService:
     CACHE_TTL_COMPANY_BUNDLE = 24 * 60 * 60  # 24 giờ cho company bundle
     CACHE_TTL_INDUSTRIES = 7 * 24 * 60 * 60  # 7 ngày cho industries (ít thay đổi)
 
-    def __init__(self):
-        # Tăng wait time để tránh rate limit
-        self.client = VNStockClient(max_retries=2, wait_seconds=45)
+    # Bundle quá TTL nhưng chưa quá TTL + STALE vẫn được trả ngay (stale-while-revalidate)
+    CACHE_STALE_COMPANY_BUNDLE = 6 * 60 * 60  # 6 giờ
+
+    # Lock fetch bundle dùng chung giữa các process (qua cache store)
+    BUNDLE_LOCK_TTL = 5 * 60  # lock tự hết hạn nếu process giữ lock chết
+    BUNDLE_LOCK_WAIT = 3 * 60  # thời gian tối đa chờ process khác fetch xong
+    BUNDLE_LOCK_POLL_INTERVAL = 0.5
+
+    CACHE_PREFIX = "vnstock_cache"
+    NAMESPACES = ("symbols_list", "company_bundle", "industries_data")
+
+    def __init__(self, store: Optional[BaseCacheStore] = None, stale_while_revalidate: Optional[bool] = None):
+        # Backoff khi bị rate limit do rate limiter dùng chung điều phối
+        self.client = VNStockClient(max_retries=2)
+        # Store dùng chung giữa các process (xem settings.VNSTOCK_CACHE)
+        self.store = store or get_cache_store()
+        if stale_while_revalidate is None:
+            stale_while_revalidate = getattr(settings, "VNSTOCK_CACHE", {}).get("STALE_WHILE_REVALIDATE", True)
+        self.stale_while_revalidate = bool(stale_while_revalidate)
 
     def _get_cache_key(self, prefix: str, symbol: str = None, **kwargs) -> str:
         """Tạo cache key duy nhất"""
@@ -40,55 +74,58 @@ class VNStockCacheService:
         if kwargs:
             key_data += ":" + hashlib.md5(json.dumps(kwargs, sort_keys=True).encode()).hexdigest()[:8]
 
-        return f"vnstock_cache:{key_data}"
+        return f"{self.CACHE_PREFIX}:{key_data}"
 
     def get_cached_symbols_list(self, exchange: str = "HSX") -> Optional[pd.DataFrame]:
         """Lấy danh sách symbols từ cache"""
-        cache_key = self._get_cache_key("symbols_list", exchange=exchange)
-        cached_data = cache.get(cache_key)
+        cache_key = self._get_cache_key("symbols_list", exchange)
+        cached_df = self.store.get(cache_key)
 
-        if cached_data:
-            try:
-                return pd.DataFrame(cached_data)
-            except Exception:
-                cache.delete(cache_key)
+        if isinstance(cached_df, pd.DataFrame) and not cached_df.empty:
+            return cached_df
 
         return None
 
     def set_cached_symbols_list(self, symbols_df: pd.DataFrame, exchange: str = "HSX") -> None:
         """Lưu danh sách symbols vào cache"""
-        cache_key = self._get_cache_key("symbols_list", exchange=exchange)
+        cache_key = self._get_cache_key("symbols_list", exchange)
         try:
-            # Convert DataFrame to dict để cache
-            cache_data = symbols_df.to_dict('records')
-            cache.set(cache_key, cache_data, self.CACHE_TTL_SYMBOLS)
+            # Lưu nguyên DataFrame (columnar), store tự serialize + nén
+            self.store.set(cache_key, symbols_df, self.CACHE_TTL_SYMBOLS)
         except Exception as e:
             print(f"Error caching symbols list: {e}")
 
-    def get_cached_company_bundle(self, symbol: str) -> Optional[Tuple[Dict[str, pd.DataFrame], bool]]:
-        """Lấy company bundle từ cache"""
+    def _get_bundle_entry(self, symbol: str) -> Optional[Tuple[Tuple[Dict[str, pd.DataFrame], bool], float]]:
+        """((bundle, ok), timestamp) từ cache, kể cả khi đã stale"""
         cache_key = self._get_cache_key("company_bundle", symbol)
-        cached_data = cache.get(cache_key)
+        cached_data = self.store.get(cache_key)
 
         if cached_data:
             try:
-                bundle = {}
-                for key, data in cached_data['bundle'].items():
-                    if data:
-                        bundle[key] = pd.DataFrame(data)
-                    else:
-                        bundle[key] = pd.DataFrame()
-                return bundle, cached_data['ok']
+                bundle = {
+                    key: df if df is not None else pd.DataFrame()
+                    for key, df in cached_data['bundle'].items()
+                }
+                return (bundle, cached_data['ok']), cached_data['timestamp']
             except Exception:
-                cache.delete(cache_key)
+                self.store.delete(cache_key)
+
+        return None
+
+    def _is_fresh(self, timestamp: float) -> bool:
+        return time.time() - timestamp < self.CACHE_TTL_COMPANY_BUNDLE
 
+    def get_cached_company_bundle(self, symbol: str) -> Optional[Tuple[Dict[str, pd.DataFrame], bool]]:
+        """Lấy company bundle còn hạn từ cache"""
+        entry = self._get_bundle_entry(symbol)
+        if entry is not None and self._is_fresh(entry[1]):
+            return entry[0]
         return None
 
     def set_cached_company_bundle(self, symbol: str, bundle: Dict[str, pd.DataFrame], ok: bool) -> None:
         """Lưu company bundle vào cache"""
         cache_key = self._get_cache_key("company_bundle", symbol)
         try:
-            # Convert DataFrames to dict để cache
             cache_data = {
                 'bundle': {},
                 'ok': ok,
@@ -96,27 +133,28 @@ class VNStockCacheService:
             }
 
             for key, df in bundle.items():
-                if df is not None and not df.empty:
-                    cache_data['bundle'][key] = df.to_dict('records')
+                if isinstance(df, pd.DataFrame) and not df.empty:
+                    cache_data['bundle'][key] = df
                 else:
                     cache_data['bundle'][key] = None
 
-            cache.set(cache_key, cache_data, self.CACHE_TTL_COMPANY_BUNDLE)
+            # Giữ thêm CACHE_STALE_COMPANY_BUNDLE để phục vụ stale-while-revalidate
+            self.store.set(cache_key, cache_data, self.CACHE_TTL_COMPANY_BUNDLE + self.CACHE_STALE_COMPANY_BUNDLE)
         except Exception as e:
             print(f"Error caching company bundle for {symbol}: {e}")
 
     def get_cached_industries_data(self) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
         """Lấy industries data từ cache"""
         cache_key = self._get_cache_key("industries_data")
-        cached_data = cache.get(cache_key)
+        cached_data = self.store.get(cache_key)
 
         if cached_data:
             try:
-                industries_icb_df = pd.DataFrame(cached_data['industries_icb']) if cached_data['industries_icb'] else pd.DataFrame()
-                symbols_by_industries_df = pd.DataFrame(cached_data['symbols_by_industries']) if cached_data['symbols_by_industries'] else pd.DataFrame()
+                industries_icb_df = cached_data['industries_icb'] if cached_data['industries_icb'] is not None else pd.DataFrame()
+                symbols_by_industries_df = cached_data['symbols_by_industries'] if cached_data['symbols_by_industries'] is not None else pd.DataFrame()
                 return industries_icb_df, symbols_by_industries_df
             except Exception:
-                cache.delete(cache_key)
+                self.store.delete(cache_key)
 
         return None
 
@@ -125,11 +163,11 @@ class VNStockCacheService:
         cache_key = self._get_cache_key("industries_data")
         try:
             cache_data = {
-                'industries_icb': industries_icb_df.to_dict('records') if not industries_icb_df.empty else None,
-                'symbols_by_industries': symbols_by_industries_df.to_dict('records') if not symbols_by_industries_df.empty else None,
+                'industries_icb': industries_icb_df if not industries_icb_df.empty else None,
+                'symbols_by_industries': symbols_by_industries_df if not symbols_by_industries_df.empty else None,
                 'timestamp': time.time()
             }
-            cache.set(cache_key, cache_data, self.CACHE_TTL_INDUSTRIES)
+            self.store.set(cache_key, cache_data, self.CACHE_TTL_INDUSTRIES)
         except Exception as e:
             print(f"Error caching industries data: {e}")
 
@@ -165,23 +203,88 @@ class VNStockCacheService:
         return symbols_df
 
     def fetch_company_bundle_with_cache(self, symbol: str) -> Tuple[Dict[str, pd.DataFrame], bool]:
-        """Lấy company bundle với cache"""
-        # Thử lấy từ cache trước
-        cached_result = self.get_cached_company_bundle(symbol)
-        if cached_result is not None:
-            print(f"Using cached company bundle for {symbol}")
-            return cached_result
+        """
+        Lấy company bundle với cache.
+        - Còn hạn: trả từ cache.
+        - Stale (quá TTL, chưa quá TTL + STALE) và bật stale_while_revalidate:
+          trả ngay bản cũ, refresh ở background.
+        - Miss: fetch qua single-flight, các lời gọi đồng thời cùng symbol dùng chung 1 lần fetch.
+        """
+        entry = self._get_bundle_entry(symbol)
+        if entry is not None:
+            cached_result, timestamp = entry
+            if self._is_fresh(timestamp):
+                print(f"Using cached company bundle for {symbol}")
+                return cached_result
+            if self.stale_while_revalidate:
+                print(f"Using stale company bundle for {symbol}, refreshing in background")
+                self._schedule_bundle_refresh(symbol)
+                return cached_result
+
+        return self._fetch_bundle_coalesced(symbol)
+
+    def _schedule_bundle_refresh(self, symbol: str) -> None:
+        """Refresh bundle ở background; bỏ qua nếu symbol đang được fetch trong process"""
+        key = self._get_cache_key("company_bundle", symbol)
+        if _bundle_flight.in_flight(key):
+            return
+        try:
+            _get_refresh_pool().submit(self._refresh_bundle_quietly, symbol)
+        except RuntimeError as e:
+            print(f"Cannot schedule refresh for {symbol}: {e}")
 
-        # Nếu không có cache, gọi API
-        print(f"Fetching company bundle from API for {symbol}...")
-        bundle, ok = self.client.fetch_company_bundle_safe(symbol)
+    def _refresh_bundle_quietly(self, symbol: str) -> None:
+        try:
+            self._fetch_bundle_coalesced(symbol)
+        except Exception as e:
+            print(f"Background refresh failed for {symbol}: {e}")
+
+    def _fetch_bundle_coalesced(self, symbol: str) -> Tuple[Dict[str, pd.DataFrame], bool]:
+        """Single-flight trong process, sau đó lock trong shared cache giữa các process"""
+        key = self._get_cache_key("company_bundle", symbol)
+        result, shared = _bundle_flight.do(key, lambda: self._fetch_bundle_with_lock(symbol))
+        if shared:
+            print(f"Reused in-flight company bundle fetch for {symbol}")
+        return result
+
+    def _fetch_bundle_with_lock(self, symbol: str) -> Tuple[Dict[str, pd.DataFrame], bool]:
+        lock_name = self._get_cache_key("lock", f"company_bundle:{symbol}")
+        started = time.time()
+        token = self.store.acquire_lock(lock_name, self.BUNDLE_LOCK_TTL)
+
+        if token is None:
+            # Process khác đang fetch symbol này: chờ kết quả xuất hiện trong shared cache
+            deadline = started + self.BUNDLE_LOCK_WAIT
+            while time.time() < deadline:
+                time.sleep(self.BUNDLE_LOCK_POLL_INTERVAL)
+                entry = self._get_bundle_entry(symbol)
+                if entry is not None and entry[1] >= started:
+                    print(f"Using company bundle fetched by another process for {symbol}")
+                    return entry[0]
+                if not self.store.is_locked(lock_name):
+                    token = self.store.acquire_lock(lock_name, self.BUNDLE_LOCK_TTL)
+                    if token is not None:
+                        break
+            # Hết thời gian chờ hoặc đã lấy được lock: tự fetch
 
-        # Cache kết quả
-        if bundle:
-            self.set_cached_company_bundle(symbol, bundle, ok)
-            print(f"Cached company bundle for {symbol}")
+        try:
+            # Process khác có thể vừa ghi cache trước khi ta lấy được lock
+            entry = self._get_bundle_entry(symbol)
+            if entry is not None and self._is_fresh(entry[1]):
+                return entry[0]
 
-        return bundle, ok
+            print(f"Fetching company bundle from API for {symbol}...")
+            bundle, ok = self.client.fetch_company_bundle_safe(symbol)
+
+            # Cache kết quả
+            if bundle:
+                self.set_cached_company_bundle(symbol, bundle, ok)
+                print(f"Cached company bundle for {symbol}")
+
+            return bundle, ok
+        finally:
+            if token is not None:
+                self.store.release_lock(lock_name, token)
 
     def fetch_industries_with_cache(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """Lấy industries data với cache"""
@@ -209,41 +312,52 @@ class VNStockCacheService:
             print(f"Error fetching industries from API: {e}")
             return pd.DataFrame(), pd.DataFrame()
 
-    def clear_cache(self, pattern: str = None) -> None:
-        """Xóa cache theo pattern"""
+    def clear_cache(self, pattern: str = None) -> int:
+        """
+        Xóa cache theo glob pattern tính từ sau prefix, ví dụ:
+        - "company_bundle:VC*"  -> bundle của các symbol bắt đầu bằng VC
+        - "symbols_list:HNX"    -> danh sách symbols của sàn HNX
+        - "industries_data*"    -> cả namespace industries
+        Không truyền pattern: xóa toàn bộ cache vnstock.
+        """
         if pattern:
-            # Django cache không hỗ trợ pattern delete natively
-            # Cần implement custom cache backend hoặc sử dụng Redis
-            print(f"Cache clear pattern not implemented: {pattern}")
+            removed = self.store.delete_pattern(f"{self.CACHE_PREFIX}:{pattern}")
+            print(f"Cleared {removed} cache entries matching: {pattern}")
         else:
-            cache.clear()
+            removed = self.store.clear()
             print("All cache cleared")
+        return removed
+
+    def clear_namespace(self, namespace: str) -> int:
+        """Xóa toàn bộ entry của một namespace (symbols_list, company_bundle, industries_data)"""
+        return self.clear_cache(f"{namespace}*")
 
     def clear_symbol_cache(self, symbol: str) -> None:
         """Xóa cache của một symbol cụ thể"""
         cache_key = self._get_cache_key("company_bundle", symbol)
-        cache.delete(cache_key)
+        self.store.delete(cache_key)
         print(f"Cleared cache for symbol: {symbol}")
 
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Lấy thống kê cache"""
-        stats = {
-            'cache_backend': type(cache).__name__,
+        """Lấy thống kê cache: hits/misses/stores/evictions/bytes + footprint theo namespace"""
+        store_stats = self.store.stats()
+        namespaces = store_stats.get("namespaces", {})
+        for namespace in self.NAMESPACES:
+            namespaces.setdefault(namespace, {
+                "hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                "bytes_written": 0, "bytes_read": 0,
+                "entries": 0, "raw_bytes": 0, "stored_bytes": 0, "hit_ratio": None,
+            })
+
+        return {
+            'cache_backend': store_stats.get("backend"),
+            'location': store_stats.get("location"),
+            'file_bytes': store_stats.get("file_bytes"),
             'ttl_settings': {
                 'symbols': self.CACHE_TTL_SYMBOLS,
                 'company_bundle': self.CACHE_TTL_COMPANY_BUNDLE,
                 'industries': self.CACHE_TTL_INDUSTRIES
-            }
+            },
+            'namespaces': namespaces,
+            'totals': store_stats.get("totals", {}),
         }
-
-        # Thử lấy một số cache keys để check
-        test_keys = [
-            self._get_cache_key("symbols_list", exchange="HSX"),
-            self._get_cache_key("industries_data")
-        ]
-
-        stats['cached_items'] = {}
-        for key in test_keys:
-            stats['cached_items'][key] = cache.get(key) is not None
-
-        return stats
\ No newline at end of file
@@ -0,0 +1,535 @@
+"""
+Persistent cache store cho dữ liệu vnstock (DataFrame / bundle).
+
+- Giá trị được pickle (DataFrame giữ nguyên các NumPy block theo cột, không qua
+  to_dict('records')) rồi nén zlib.
+- SQLiteCacheStore: một file SQLite (WAL) dùng chung giữa mọi process trên máy
+  (gunicorn workers, management commands) và còn nguyên sau khi restart.
+- DjangoCacheStore: dùng Django cache (LocMem/Redis...) làm backend, cùng codec.
+
+Mọi store đều có key index theo namespace (symbols_list, company_bundle,
+industries_data...) để xóa theo pattern, và đếm hits/misses/stores/evictions/bytes
+cho từng namespace.
+
+Chọn backend qua settings.VNSTOCK_CACHE.
+"""
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+
+DEFAULT_COMPRESS_LEVEL = 6
+
+METRIC_FIELDS = ("hits", "misses", "stores", "evictions", "bytes_written", "bytes_read")
+
+
+class CacheCodec:
+    """Serialize giá trị bất kỳ (dict chứa DataFrame) thành bytes nén"""
+
+    def __init__(self, compress_level: int = DEFAULT_COMPRESS_LEVEL):
+        self.compress_level = compress_level
+
+    def dumps(self, value: Any) -> Tuple[bytes, int]:
+        """Trả về (payload nén, kích thước trước khi nén)"""
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return zlib.compress(raw, self.compress_level), len(raw)
+
+    @staticmethod
+    def loads(payload: bytes) -> Any:
+        return pickle.loads(zlib.decompress(payload))
+
+
+class CacheMetrics:
+    """Bộ đếm theo namespace, thread-safe, trong process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRIC_FIELDS, 0))
+
+    def incr(self, namespace: str, **deltas: int) -> None:
+        with self._lock:
+            counters = self._counters[namespace]
+            for name, value in deltas.items():
+                counters[name] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {namespace: dict(counters) for namespace, counters in self._counters.items()}
+
+    def drain(self) -> Dict[str, Dict[str, int]]:
+        """Lấy và xóa các bộ đếm (dùng khi cộng dồn xuống storage chung)"""
+        with self._lock:
+            counters = {namespace: dict(values) for namespace, values in self._counters.items()}
+            self._counters.clear()
+            return counters
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+class BaseCacheStore:
+    """
+    Interface chung. Subclass implement các thao tác _read/_write/_remove và key index;
+    metrics + pattern invalidation dùng chung ở đây.
+    """
+
+    def __init__(self, codec: Optional[CacheCodec] = None):
+        self.codec = codec or CacheCodec()
+        self.metrics = CacheMetrics()
+
+    @staticmethod
+    def namespace_of(key: str) -> str:
+        """'vnstock_cache:company_bundle:VCB' -> 'company_bundle'"""
+        parts = key.split(":")
+        return parts[1] if len(parts) > 1 else parts[0]
+
+    # ---- metrics ----
+    def record(self, namespace: str, **deltas: int) -> None:
+        self.metrics.incr(namespace, **deltas)
+
+    def metrics_snapshot(self) -> Dict[str, Dict[str, int]]:
+        return self.metrics.snapshot()
+
+    def flush_metrics(self) -> None:
+        """Ghi các bộ đếm còn trong RAM xuống storage chung (store đếm trong process: không làm gì)"""
+
+    # ---- backend primitives ----
+    def _read(self, key: str) -> Tuple[Optional[bytes], bool]:
+        """Trả về (payload, expired). payload None nếu không có hoặc đã hết hạn."""
+        raise NotImplementedError
+
+    def _write(self, key: str, payload: bytes, raw_bytes: int, ttl: int) -> None:
+        raise NotImplementedError
+
+    def _remove(self, keys: List[str]) -> int:
+        raise NotImplementedError
+
+    def keys(self, namespace: Optional[str] = None) -> List[str]:
+        """Các key còn hạn (theo key index), lọc theo namespace nếu có"""
+        raise NotImplementedError
+
+    def footprint(self) -> Dict[str, Dict[str, int]]:
+        """{namespace: {entries, raw_bytes, stored_bytes}} của các entry còn hạn"""
+        raise NotImplementedError
+
+    # ---- lock dùng chung giữa các process ----
+    def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        """Lấy lock không chờ; trả về token nếu thành công, None nếu đang bị giữ"""
+        raise NotImplementedError
+
+    def release_lock(self, name: str, token: str) -> None:
+        raise NotImplementedError
+
+    def is_locked(self, name: str) -> bool:
+        raise NotImplementedError
+
+    # ---- public API ----
+    def get(self, key: str) -> Optional[Any]:
+        namespace = self.namespace_of(key)
+        payload, expired = self._read(key)
+        if payload is None:
+            if expired:
+                self._remove([key])
+                self.record(namespace, misses=1, evictions=1)
+            else:
+                self.record(namespace, misses=1)
+            return None
+        try:
+            value = self.codec.loads(payload)
+        except Exception:
+            self._remove([key])
+            self.record(namespace, misses=1, evictions=1)
+            return None
+        self.record(namespace, hits=1, bytes_read=len(payload))
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        payload, raw_bytes = self.codec.dumps(value)
+        self._write(key, payload, raw_bytes, ttl)
+        self.record(self.namespace_of(key), stores=1, bytes_written=len(payload))
+
+    def delete(self, key: str) -> None:
+        if self._remove([key]):
+            self.record(self.namespace_of(key), evictions=1)
+
+    def delete_pattern(self, pattern: str) -> int:
+        """Xóa các key khớp glob pattern (vd. 'vnstock_cache:company_bundle:VC*')"""
+        matched = [key for key in self.keys() if fnmatchcase(key, pattern)]
+        removed = self._remove(matched) if matched else 0
+        for key in matched:
+            self.record(self.namespace_of(key), evictions=1)
+        return removed
+
+    def clear(self) -> int:
+        return self.delete_pattern("*")
+
+    def stats(self) -> Dict[str, Any]:
+        """Metrics + footprint theo namespace, kèm hit ratio"""
+        metrics = self.metrics_snapshot()
+        footprint = self.footprint()
+        namespaces: Dict[str, Dict[str, Any]] = {}
+        for namespace in sorted(set(metrics) | set(footprint)):
+            entry = dict.fromkeys(METRIC_FIELDS, 0)
+            entry.update(metrics.get(namespace, {}))
+            entry.update(footprint.get(namespace, {"entries": 0, "raw_bytes": 0, "stored_bytes": 0}))
+            lookups = entry["hits"] + entry["misses"]
+            entry["hit_ratio"] = round(entry["hits"] / lookups, 4) if lookups else None
+            namespaces[namespace] = entry
+
+        totals: Dict[str, Any] = {
+            name: sum(entry[name] for entry in namespaces.values())
+            for name in METRIC_FIELDS + ("entries", "raw_bytes", "stored_bytes")
+        }
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_ratio"] = round(totals["hits"] / lookups, 4) if lookups else None
+        return {"backend": type(self).__name__, "namespaces": namespaces, "totals": totals}
+
+
+class SQLiteCacheStore(BaseCacheStore):
+    """
+    Cache store trên 1 file SQLite, an toàn khi nhiều process/thread cùng đọc ghi
+    (WAL + busy timeout, mỗi thread một connection). Key index chính là bảng
+    cache_entries; metrics lưu trong bảng cache_metrics nên cộng dồn giữa các process.
+
+    Cache hit chỉ đọc: bộ đếm được gom trong RAM và cộng dồn xuống cache_metrics tối đa
+    mỗi `metrics_flush_interval` giây (và khi đọc stats), để các lần get không tranh
+    nhau khóa ghi của file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        codec: Optional[CacheCodec] = None,
+        timeout: float = 30.0,
+        metrics_flush_interval: float = 10.0
+    ):
+        super().__init__(codec)
+        self.path = str(path)
+        self.timeout = timeout
+        self.metrics_flush_interval = metrics_flush_interval
+        self._flushed_at = time.monotonic()
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                stored_bytes INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_namespace ON cache_entries (namespace)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_locks (
+                name TEXT PRIMARY KEY,
+                token TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS cache_metrics (
+                namespace TEXT PRIMARY KEY,
+                {", ".join(f"{name} INTEGER NOT NULL DEFAULT 0" for name in METRIC_FIELDS)}
+            )
+            """
+        )
+
+    def record(self, namespace: str, **deltas: int) -> None:
+        self.metrics.incr(namespace, **{name: value for name, value in deltas.items() if name in METRIC_FIELDS})
+        if time.monotonic() - self._flushed_at >= self.metrics_flush_interval:
+            self.flush_metrics()
+
+    def flush_metrics(self) -> None:
+        self._flushed_at = time.monotonic()
+        pending = self.metrics.drain()
+        if not pending:
+            return
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    f"""
+                    INSERT INTO cache_metrics (namespace, {", ".join(METRIC_FIELDS)})
+                    VALUES (?, {", ".join("?" for _ in METRIC_FIELDS)})
+                    ON CONFLICT(namespace) DO UPDATE SET
+                        {", ".join(f"{name} = {name} + excluded.{name}" for name in METRIC_FIELDS)}
+                    """,
+                    [
+                        (namespace, *(counters[name] for name in METRIC_FIELDS))
+                        for namespace, counters in pending.items()
+                    ],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            # File đang bận quá timeout: giữ lại bộ đếm cho lần flush sau
+            for namespace, counters in pending.items():
+                self.metrics.incr(namespace, **counters)
+
+    def metrics_snapshot(self) -> Dict[str, Dict[str, int]]:
+        self.flush_metrics()
+        rows = self._connection().execute(
+            f"SELECT namespace, {', '.join(METRIC_FIELDS)} FROM cache_metrics"
+        ).fetchall()
+        return {row[0]: dict(zip(METRIC_FIELDS, row[1:])) for row in rows}
+
+    def _read(self, key: str) -> Tuple[Optional[bytes], bool]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None, False
+        payload, expires_at = row
+        if expires_at <= time.time():
+            return None, True
+        return payload, False
+
+    def _write(self, key: str, payload: bytes, raw_bytes: int, ttl: int) -> None:
+        now = time.time()
+        self._connection().execute(
+            """
+            INSERT OR REPLACE INTO cache_entries
+                (key, namespace, value, created_at, expires_at, raw_bytes, stored_bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, self.namespace_of(key), sqlite3.Binary(payload), now, now + ttl, raw_bytes, len(payload)),
+        )
+
+    def _remove(self, keys: List[str]) -> int:
+        removed = 0
+        conn = self._connection()
+        # SQLite giới hạn số tham số mỗi câu lệnh
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            cursor = conn.execute(
+                f"DELETE FROM cache_entries WHERE key IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            removed += cursor.rowcount
+        return removed
+
+    def keys(self, namespace: Optional[str] = None) -> List[str]:
+        sql = "SELECT key FROM cache_entries WHERE expires_at > ?"
+        params: List[Any] = [time.time()]
+        if namespace:
+            sql += " AND namespace = ?"
+            params.append(namespace)
+        return [row[0] for row in self._connection().execute(sql, params)]
+
+    def footprint(self) -> Dict[str, Dict[str, int]]:
+        rows = self._connection().execute(
+            "SELECT namespace, COUNT(*), SUM(raw_bytes), SUM(stored_bytes) "
+            "FROM cache_entries WHERE expires_at > ? GROUP BY namespace",
+            (time.time(),),
+        ).fetchall()
+        return {
+            namespace: {"entries": entries, "raw_bytes": raw_bytes, "stored_bytes": stored_bytes}
+            for namespace, entries, raw_bytes, stored_bytes in rows
+        }
+
+    def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Lock hết hạn (process giữ lock đã chết) được thu hồi
+            conn.execute("DELETE FROM cache_locks WHERE name = ? AND expires_at <= ?", (name, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO cache_locks (name, token, expires_at) VALUES (?, ?, ?)",
+                (name, token, now + ttl),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return token if cursor.rowcount == 1 else None
+
+    def release_lock(self, name: str, token: str) -> None:
+        self._connection().execute("DELETE FROM cache_locks WHERE name = ? AND token = ?", (name, token))
+
+    def is_locked(self, name: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM cache_locks WHERE name = ? AND expires_at > ?", (name, time.time())
+        ).fetchone()
+        return row is not None
+
+    def purge_expired(self) -> int:
+        """Xóa các entry hết hạn, trả về số entry đã xóa"""
+        conn = self._connection()
+        expired = conn.execute(
+            "SELECT namespace, COUNT(*) FROM cache_entries WHERE expires_at <= ? GROUP BY namespace",
+            (time.time(),),
+        ).fetchall()
+        cursor = conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        for namespace, count in expired:
+            self.record(namespace, evictions=count)
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["location"] = self.path
+        try:
+            stats["file_bytes"] = sum(
+                os.path.getsize(self.path + suffix)
+                for suffix in ("", "-wal")
+                if os.path.exists(self.path + suffix)
+            )
+        except OSError:
+            stats["file_bytes"] = None
+        return stats
+
+
+class DjangoCacheStore(BaseCacheStore):
+    """
+    Cache store dùng Django cache backend (per-process nếu là LocMemCache).
+    Django cache không liệt kê được key nên key index được giữ trong chính cache
+    (INDEX_KEY); metrics đếm trong process.
+    """
+
+    INDEX_KEY = "vnstock_cache:__index__"
+    INDEX_TTL = 30 * 24 * 60 * 60
+
+    def __init__(self, codec: Optional[CacheCodec] = None, backend=None):
+        super().__init__(codec)
+        self.cache = backend or django_cache
+        self._index_lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        return self.cache.get(self.INDEX_KEY) or {}
+
+    def _update_index(self, add: Optional[Dict[str, Dict[str, Any]]] = None, remove: Optional[List[str]] = None) -> None:
+        with self._index_lock:
+            index = self._load_index()
+            now = time.time()
+            index = {key: meta for key, meta in index.items() if meta["expires_at"] > now}
+            for key in remove or []:
+                index.pop(key, None)
+            index.update(add or {})
+            self.cache.set(self.INDEX_KEY, index, self.INDEX_TTL)
+
+    def _read(self, key: str) -> Tuple[Optional[bytes], bool]:
+        payload = self.cache.get(key)
+        if payload is not None:
+            return payload, False
+        # Backend tự expire: nếu key còn trong index thì đó là entry hết hạn
+        return None, key in self._load_index()
+
+    def _write(self, key: str, payload: bytes, raw_bytes: int, ttl: int) -> None:
+        self.cache.set(key, payload, ttl)
+        self._update_index(add={key: {
+            "namespace": self.namespace_of(key),
+            "expires_at": time.time() + ttl,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": len(payload),
+        }})
+
+    def _remove(self, keys: List[str]) -> int:
+        index = self._load_index()
+        removed = sum(1 for key in keys if key in index)
+        self.cache.delete_many(keys)
+        self._update_index(remove=keys)
+        return removed
+
+    def _live_index(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        return {key: meta for key, meta in self._load_index().items() if meta["expires_at"] > now}
+
+    def keys(self, namespace: Optional[str] = None) -> List[str]:
+        return [
+            key for key, meta in self._live_index().items()
+            if namespace is None or meta["namespace"] == namespace
+        ]
+
+    def footprint(self) -> Dict[str, Dict[str, int]]:
+        result: Dict[str, Dict[str, int]] = {}
+        for meta in self._live_index().values():
+            entry = result.setdefault(meta["namespace"], {"entries": 0, "raw_bytes": 0, "stored_bytes": 0})
+            entry["entries"] += 1
+            entry["raw_bytes"] += meta["raw_bytes"]
+            entry["stored_bytes"] += meta["stored_bytes"]
+        return result
+
+    def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        # cache.add là atomic trên các backend chuẩn (LocMem lock, Redis SET NX)
+        token = uuid.uuid4().hex
+        return token if self.cache.add(name, token, max(1, int(ttl))) else None
+
+    def release_lock(self, name: str, token: str) -> None:
+        if self.cache.get(name) == token:
+            self.cache.delete(name)
+
+    def is_locked(self, name: str) -> bool:
+        return self.cache.get(name) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["location"] = type(self.cache).__name__
+        return stats
+
+
+_global_cache_store: Optional[BaseCacheStore] = None
+_global_cache_store_lock = threading.Lock()
+
+
+def build_cache_store(config: Optional[Dict[str, Any]] = None) -> BaseCacheStore:
+    """Tạo store từ config dạng settings.VNSTOCK_CACHE"""
+    config = config if config is not None else getattr(settings, "VNSTOCK_CACHE", {})
+    codec = CacheCodec(int(config.get("COMPRESS_LEVEL", DEFAULT_COMPRESS_LEVEL)))
+    backend = str(config.get("BACKEND", "sqlite")).lower()
+    if backend == "django":
+        return DjangoCacheStore(codec)
+    if backend == "sqlite":
+        return SQLiteCacheStore(
+            config["LOCATION"], codec,
+            metrics_flush_interval=float(config.get("METRICS_FLUSH_INTERVAL", 10.0)),
+        )
+    raise ValueError(f"Unknown VNSTOCK_CACHE backend: {backend}")
+
+
+def get_cache_store() -> BaseCacheStore:
+    """Get global cache store instance"""
+    global _global_cache_store
+    if _global_cache_store is None:
+        with _global_cache_store_lock:
+            if _global_cache_store is None:
+                _global_cache_store = build_cache_store()
+                atexit.register(_global_cache_store.flush_metrics)
+    return _global_cache_store
@@ -0,0 +1,93 @@
+# apps/stock/services/coverage_planner.py
+"""
+Coverage planner: tính bảng nào còn thiếu cho từng symbol bằng Exists() annotation
+(1 query cho toàn bộ symbols thay vì 4-5 query .exists() cho mỗi symbol).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from django.db.models import BooleanField, Count, Exists, ExpressionWrapper, OuterRef, Q, QuerySet
+
+from apps.stock.models import Events, Officers, ShareHolder, SubCompany, Symbol
+
+
+def stock_coverage_checks(include_industries: bool = False) -> Dict[str, Any]:
+    """Các bảng con của stock cần có cho 1 symbol (theo thứ tự import)"""
+    checks = {
+        "company": ExpressionWrapper(Q(company__isnull=False), output_field=BooleanField()),
+        "shareholders": Exists(ShareHolder.objects.filter(company_id=OuterRef("company_id"))),
+        "officers": Exists(Officers.objects.filter(company_id=OuterRef("company_id"))),
+        "events": Exists(Events.objects.filter(company_id=OuterRef("company_id"))),
+        "sub_companies": Exists(SubCompany.objects.filter(parent_id=OuterRef("company_id"))),
+    }
+    if include_industries:
+        checks["industries"] = Exists(
+            Symbol.industries.through.objects.filter(symbol_id=OuterRef("pk"))
+        )
+    return checks
+
+
+@dataclass
+class SymbolCoverage:
+    symbol: Symbol
+    missing: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+class CoveragePlanner:
+    """
+    checks: {tên bảng: biểu thức boolean trên Symbol} (thường là Exists(...OuterRef...)).
+    Mỗi check được annotate thành cột has_<tên>.
+    """
+
+    def __init__(self, checks: Dict[str, Any]):
+        self.checks = checks
+
+    @staticmethod
+    def _flag(name: str) -> str:
+        return f"has_{name}"
+
+    def annotate(self, queryset: Optional[QuerySet] = None) -> QuerySet:
+        queryset = Symbol.objects.all() if queryset is None else queryset
+        return queryset.annotate(**{self._flag(name): expr for name, expr in self.checks.items()})
+
+    def coverage(self, queryset: Optional[QuerySet] = None) -> List[SymbolCoverage]:
+        """Bitmap thiếu/đủ cho từng symbol (1 query)"""
+        queryset = self.annotate(queryset).select_related("company").order_by("name")
+        return [
+            SymbolCoverage(
+                symbol=symbol,
+                missing=[name for name in self.checks if not getattr(symbol, self._flag(name))],
+            )
+            for symbol in queryset
+        ]
+
+    def plan(self, queryset: Optional[QuerySet] = None, force: bool = False) -> List[SymbolCoverage]:
+        """
+        Danh sách symbol cần xử lý, thiếu nhiều bảng nhất đứng trước.
+        force=True: trả về tất cả symbols (vẫn kèm bitmap).
+        """
+        items = self.coverage(queryset)
+        if not force:
+            items = [item for item in items if not item.complete]
+        # sort ổn định: cùng số bảng thiếu thì giữ thứ tự theo tên
+        return sorted(items, key=lambda item: -len(item.missing))
+
+    def summary(self, queryset: Optional[QuerySet] = None) -> Dict[str, Any]:
+        """
+        Số symbol có dữ liệu cho từng bảng, tổng + theo sàn, trong 1 query GROUP BY exchange.
+        """
+        aggregates = {"count": Count("id")}
+        aggregates.update({
+            f"with_{name}": Count("id", filter=Q(**{self._flag(name): True}))
+            for name in self.checks
+        })
+        rows = list(
+            self.annotate(queryset).order_by().values("exchange").annotate(**aggregates).order_by("-count")
+        )
+
+        totals = {key: sum(row[key] for row in rows) for key in aggregates}
+        return {"total": totals, "by_exchange": rows}
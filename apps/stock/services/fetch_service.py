@@ -1,76 +1,59 @@
 ﻿# apps/stock/services/fetch_service.py
-import time
-from typing import Dict, List, Optional
+from typing import Callable, Optional
 import pandas as pd
 from vnstock import Company as VNCompany
 from apps.stock.clients.vnstock_client import VNStockClient
+from apps.stock.services.rate_limiter import get_rate_limiter
 
 
 class FetchService:
     """Class chuyên fetch data từ external APIs"""
     
-    def __init__(self, max_retries: int = 5, wait_seconds: int = 60, vn_client: Optional[VNStockClient] = None):
+    def __init__(self, max_retries: int = 5, vn_client: Optional[VNStockClient] = None):
         self.max_retries = max_retries
-        self.wait_seconds = wait_seconds
-        self.vn_client = vn_client or VNStockClient(max_retries=max_retries, wait_seconds=wait_seconds)
-    
-    def fetch_shareholders_df(self, symbol_name: str) -> pd.DataFrame:
-        """Fetch shareholders DataFrame with retry/backoff."""
+        self.vn_client = vn_client or VNStockClient(max_retries=max_retries)
+        self.rate_limiter = get_rate_limiter()
+
+    def _fetch_with_backoff(
+        self, what: str, symbol_name: str, fetcher: Callable[[], Optional[pd.DataFrame]]
+    ) -> pd.DataFrame:
+        """
+        Gọi fetcher qua rate limiter; khi dính rate limit (SystemExit) thì báo limiter
+        pause chung theo retry-after của upstream rồi thử lại.
+        """
         retries = 0
         while retries <= self.max_retries:
             try:
-                df = self.vn_client.get_shareholders_df(symbol_name)
-                if df is not None and not df.empty:
-                    return df
-                return pd.DataFrame()
-            except SystemExit:
+                self.rate_limiter.wait_if_needed(f"{what}_{symbol_name}")
+                df = fetcher()
+                return df if df is not None else pd.DataFrame()
+            except SystemExit as exc:
                 retries += 1
+                wait_time = self.rate_limiter.backoff(exc, f"{what}_{symbol_name}", attempt=retries)
                 print(
-                    f"Rate limit when fetching shareholders for {symbol_name}. "
-                    f"Retry {retries}/{self.max_retries} after {self.wait_seconds}s"
+                    f"Rate limit when fetching {what} for {symbol_name}. "
+                    f"Retry {retries}/{self.max_retries} after {wait_time:.0f}s"
                 )
-                time.sleep(self.wait_seconds)
             except Exception as e:
-                print(f"Error fetching shareholders for {symbol_name}: {e}")
+                print(f"Error fetching {what} for {symbol_name}: {e}")
                 return pd.DataFrame()
         return pd.DataFrame()
+    
+    def fetch_shareholders_df(self, symbol_name: str) -> pd.DataFrame:
+        """Fetch shareholders DataFrame with retry/backoff."""
+        df = self._fetch_with_backoff(
+            "shareholders", symbol_name, lambda: self.vn_client.get_shareholders_df(symbol_name)
+        )
+        return df if not df.empty else pd.DataFrame()
 
     def fetch_events_df(self, symbol_name: str) -> pd.DataFrame:
         """Fetch events DataFrame with retry/backoff."""
-        retries = 0
-        while retries <= self.max_retries:
-            try:
-                vn_company = VNCompany(symbol=symbol_name, source="VCI")
-                df: Optional[pd.DataFrame] = vn_company.events()
-                return df if df is not None else pd.DataFrame()
-            except SystemExit:
-                retries += 1
-                print(
-                    f"Rate limit when fetching events for {symbol_name}. "
-                    f"Retry {retries}/{self.max_retries} after {self.wait_seconds}s"
-                )
-                time.sleep(self.wait_seconds)
-            except Exception as e:
-                print(f"Error fetching events for {symbol_name}: {e}")
-                return pd.DataFrame()
-        return pd.DataFrame()
+        return self._fetch_with_backoff(
+            "events", symbol_name, lambda: VNCompany(symbol=symbol_name, source="VCI").events()
+        )
 
     def fetch_officers_df(self, symbol_name: str) -> pd.DataFrame:
         """Fetch officers DataFrame with retry/backoff."""
-        retries = 0
-        while retries <= self.max_retries:
-            try:
-                vn_company = VNCompany(symbol=symbol_name, source="VCI")
-                df: Optional[pd.DataFrame] = vn_company.officers()
-                return df if df is not None else pd.DataFrame()
-            except SystemExit:
-                retries += 1
-                print(
-                    f"Rate limit when fetching officers for {symbol_name}. "
-                    f"Retry {retries}/{self.max_retries} after {self.wait_seconds}s"
-                )
-                time.sleep(self.wait_seconds)
-            except Exception as e:
-                print(f"Error fetching officers for {symbol_name}: {e}")
-                return pd.DataFrame()
-        return pd.DataFrame()
+        return self._fetch_with_backoff(
+            "officers", symbol_name, lambda: VNCompany(symbol=symbol_name, source="VCI").officers()
+        )
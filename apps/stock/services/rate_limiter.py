@@ -1,18 +1,278 @@
 """
 Rate limiter service để tránh gọi API VNStock quá nhiều
+
+GCRA (token bucket dạng "theoretical arrival time"):
+- Mỗi bucket chỉ lưu 1 số (TAT) nên mỗi lần gọi là O(1).
+- Lock chỉ giữ trong lúc đặt chỗ (reserve); việc sleep diễn ra ngoài lock.
+- State có thể nằm trong SQLite dùng chung nên nhiều process (import_vnstock,
+  import_financial_data, gunicorn workers) cùng chia một budget.
+- Budget riêng theo prefix endpoint (vd. "calculate_finance", "company_bundle"),
+  các prefix trỏ cùng tên bucket thì dùng chung quota. Budget riêng được xét trước:
+  call bị chính budget của nó giữ lại chỉ lấy token chung khi tới giờ gọi, nên không
+  chặn các endpoint khác.
+
+Adaptive backoff (AIMD):
+- Khi upstream trả lỗi rate limit (vnstock raise SystemExit "... sau 36 giây"), gợi ý
+  retry-after được đẩy vào bucket "global:pause" trong state chung nên mọi caller
+  (mọi thread/process) cùng dừng đúng khoảng đó, không ai tự sleep 45-65s. Các call
+  xếp hàng sau pause vẫn cách nhau min_interval (token tính từ lúc được gọi).
+- Đồng thời tốc độ gọi bị nhân với `decrease`; sau mỗi `quiet_period` không bị
+  chặn thì cộng lại `increase` cho tới `max_factor`.
 """
+import os
+import re
+import sqlite3
+import threading
 import time
-from typing import Dict, Optional
-from threading import Lock
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class Bucket:
+    name: str
+    interval: float  # số giây cho mỗi token (= 1 / rate)
+    burst: int = 1   # số call tối đa được phép dồn liền nhau
+
+    @property
+    def tolerance(self) -> float:
+        return self.interval * (self.burst - 1)
+
+
+# Bucket tạm dừng: interval=0 nên không tốn token, TAT chính là thời điểm hết pause
+PAUSE_BUCKET = Bucket("global:pause", interval=0.0, burst=1)
+
+_RETRY_AFTER_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:giây|seconds?|secs?|s)\b", re.IGNORECASE)
+
+
+def parse_retry_after(error: Any) -> Optional[float]:
+    """
+    Lấy số giây upstream yêu cầu chờ từ SystemExit/Exception/message của vnstock
+    (vd. "Vui lòng thử lại sau 36 giây"). Returns None nếu không có gợi ý.
+    """
+    if error is None:
+        return None
+    if isinstance(error, SystemExit):
+        message = "" if error.code is None else str(error.code)
+    else:
+        message = str(error)
+    match = _RETRY_AFTER_RE.search(message)
+    if not match:
+        return None
+    return float(match.group(1).replace(",", "."))
+
+
+@dataclass(frozen=True)
+class AIMDThrottle:
+    """
+    Hệ số tốc độ (factor) áp lên interval của mọi bucket: interval thực = interval / factor.
+    State chỉ gồm (factor, since); phần tăng dần được tính lười theo thời gian trôi qua.
+    """
+    decrease: float = 0.5       # nhân factor khi bị upstream chặn
+    increase: float = 0.1       # cộng vào factor sau mỗi quiet_period yên ổn
+    quiet_period: float = 60.0
+    min_factor: float = 0.1
+    max_factor: float = 1.0
+
+    def current(self, factor: float, since: float, now: float) -> float:
+        steps = int(max(0.0, now - since) // self.quiet_period) if self.quiet_period > 0 else 0
+        return max(self.min_factor, min(self.max_factor, factor + self.increase * steps))
+
+    def penalize(self, factor: float, since: float, now: float, until: float) -> Tuple[float, float]:
+        """
+        Returns: (factor, since) mới. since = lúc hết pause (quiet period tính từ đó).
+        Nhiều caller cùng dính lỗi trong một đợt pause chỉ giảm factor 1 lần.
+        """
+        if since > now:
+            return factor, max(since, until)
+        return max(self.min_factor, self.current(factor, since, now) * self.decrease), until
+
+
+def gcra_reserve(
+    buckets: Iterable[Bucket],
+    tats: Dict[str, float],
+    now: float,
+    factor: float = 1.0,
+) -> Tuple[float, Dict[str, float]]:
+    """
+    Đặt chỗ 1 call qua tất cả buckets.
+    Returns: (thời điểm được phép gọi, TAT mới cho từng bucket)
+
+    Thời điểm được gọi (start) là mốc muộn nhất mà mọi bucket cho phép; token của mọi
+    bucket được tính từ start chứ không phải now. Nếu tính từ now thì các call cùng bị
+    hoãn (vd. chờ hết pause) sẽ dồn vào cùng 1 thời điểm thay vì cách nhau đủ interval.
+    factor < 1 làm chậm mọi bucket (AIMD), burst giữ nguyên.
+    """
+    buckets = list(buckets)
+    start = now
+    for bucket in buckets:
+        interval = bucket.interval / factor
+        start = max(start, tats.get(bucket.name, 0.0) - interval * (bucket.burst - 1))
+
+    # Bucket interval=0 (pause, không giới hạn) không tốn token: giữ nguyên TAT
+    new_tats = {
+        bucket.name: max(tats.get(bucket.name, 0.0), start) + bucket.interval / factor
+        for bucket in buckets
+        if bucket.interval > 0
+    }
+    return start, new_tats
+
+
+def gcra_reserve_split(
+    local: Iterable[Bucket],
+    shared: Iterable[Bucket],
+    tats: Dict[str, float],
+    now: float,
+    factor: float = 1.0,
+) -> Tuple[float, Dict[str, float], bool]:
+    """
+    Đặt chỗ 1 call qua budget riêng (local, vd. bucket endpoint) và budget chung (shared).
+    Returns: (thời điểm được phép gọi, TAT mới, đã tính token shared hay chưa)
+
+    local được xét trước. Nếu chính nó bắt chờ thì chỉ đặt token local: token shared mà tính
+    ở mốc tương lai đó thì TAT chung bị đẩy xa và mọi endpoint khác phải xếp hàng sau call
+    này. Caller lấy token shared khi tới giờ gọi.
+    """
+    local = list(local)
+    start, local_tats = gcra_reserve(local, tats, now, factor)
+    if start > now:
+        return start, local_tats, False
+    start, new_tats = gcra_reserve(local + list(shared), tats, now, factor)
+    return start, new_tats, True
+
+
+class MemoryLimiterState:
+    """State trong process (dùng cho test hoặc khi chỉ có 1 process)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tats: Dict[str, float] = {}
+        self._throttle: Tuple[float, float] = (1.0, 0.0)
+
+    def reserve(self, buckets: List[Bucket], now: float, throttle: Optional[AIMDThrottle] = None) -> float:
+        return self.reserve_split([], buckets, now, throttle)[0]
+
+    def reserve_split(
+        self, local: List[Bucket], shared: List[Bucket], now: float, throttle: Optional[AIMDThrottle] = None
+    ) -> Tuple[float, bool]:
+        with self._lock:
+            factor = throttle.current(*self._throttle, now) if throttle else 1.0
+            start, new_tats, charged = gcra_reserve_split(local, shared, self._tats, now, factor)
+            self._tats.update(new_tats)
+            return start, charged
+
+    def penalize(self, pause: str, until: float, now: float, throttle: AIMDThrottle) -> float:
+        with self._lock:
+            self._tats[pause] = max(self._tats.get(pause, 0.0), until)
+            self._throttle = throttle.penalize(*self._throttle, now, until)
+            return self._throttle[0]
 
+    def throttle_state(self) -> Tuple[float, float]:
+        with self._lock:
+            return self._throttle
 
-@dataclass
-class RateLimitInfo:
-    last_call: float
-    call_count: int
-    window_start: float
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._tats)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tats.clear()
+            self._throttle = (1.0, 0.0)
+
+
+class SQLiteLimiterState:
+    """State trong 1 file SQLite dùng chung giữa các process trên máy"""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets (name TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_throttle "
+            "(id INTEGER PRIMARY KEY CHECK (id = 1), factor REAL NOT NULL, since REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _read_throttle(conn: sqlite3.Connection) -> Tuple[float, float]:
+        row = conn.execute("SELECT factor, since FROM rate_throttle WHERE id = 1").fetchone()
+        return (row[0], row[1]) if row else (1.0, 0.0)
+
+    @staticmethod
+    def _write_tats(conn: sqlite3.Connection, tats: Dict[str, float]) -> None:
+        conn.executemany(
+            "INSERT INTO rate_buckets (name, tat) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET tat = excluded.tat",
+            list(tats.items()),
+        )
+
+    def reserve(self, buckets: List[Bucket], now: float, throttle: Optional[AIMDThrottle] = None) -> float:
+        return self.reserve_split([], buckets, now, throttle)[0]
+
+    def reserve_split(
+        self, local: List[Bucket], shared: List[Bucket], now: float, throttle: Optional[AIMDThrottle] = None
+    ) -> Tuple[float, bool]:
+        conn = self._connection()
+        names = [bucket.name for bucket in list(local) + list(shared)]
+        # BEGIN IMMEDIATE: khóa ghi ngắn, các process khác chờ tối đa `timeout`
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT name, tat FROM rate_buckets WHERE name IN ({', '.join('?' for _ in names)})",
+                names,
+            ).fetchall()
+            factor = throttle.current(*self._read_throttle(conn), now) if throttle else 1.0
+            start, new_tats, charged = gcra_reserve_split(local, shared, dict(rows), now, factor)
+            self._write_tats(conn, new_tats)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return start, charged
+
+    def penalize(self, pause: str, until: float, now: float, throttle: AIMDThrottle) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_buckets WHERE name = ?", (pause,)).fetchone()
+            self._write_tats(conn, {pause: max(row[0] if row else 0.0, until)})
+            factor, since = throttle.penalize(*self._read_throttle(conn), now, until)
+            conn.execute(
+                "INSERT INTO rate_throttle (id, factor, since) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET factor = excluded.factor, since = excluded.since",
+                (factor, since),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return factor
+
+    def throttle_state(self) -> Tuple[float, float]:
+        return self._read_throttle(self._connection())
+
+    def snapshot(self) -> Dict[str, float]:
+        return dict(self._connection().execute("SELECT name, tat FROM rate_buckets").fetchall())
+
+    def reset(self) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM rate_buckets")
+        conn.execute("DELETE FROM rate_throttle")
 
 
 class VNStockRateLimiter:
@@ -23,129 +283,240 @@ class VNStockRateLimiter:
     def __init__(self,
                  calls_per_minute: int = 30,  # Giảm xuống 30 calls/phút
                  calls_per_hour: int = 500,   # 500 calls/giờ
-                 min_interval: float = 2.5):  # Tối thiểu 2.5 giây giữa các calls
+                 min_interval: float = 2.5,   # Tối thiểu 2.5 giây giữa các calls
+                 budgets: Optional[Dict[str, Dict[str, Any]]] = None,
+                 state=None,
+                 throttle: Optional[AIMDThrottle] = None,
+                 default_backoff: float = 15.0,  # Không có gợi ý retry-after: 15s, 30s, 60s...
+                 max_backoff: float = 120.0,
+                 backoff_margin: float = 1.0):   # Cộng thêm vào gợi ý của upstream
         self.calls_per_minute = calls_per_minute
         self.calls_per_hour = calls_per_hour
         self.min_interval = min_interval
+        self.state = state or MemoryLimiterState()
+        self.throttle = throttle or AIMDThrottle()
+        self.default_backoff = default_backoff
+        self.max_backoff = max_backoff
+        self.backoff_margin = backoff_margin
+
+        # Budget chung cho mọi endpoint (giới hạn thật của upstream)
+        self.global_buckets = [
+            Bucket("global:interval", interval=min_interval, burst=1),
+            Bucket("global:minute", interval=60.0 / calls_per_minute, burst=calls_per_minute),
+            Bucket("global:hour", interval=3600.0 / calls_per_hour, burst=calls_per_hour),
+        ]
+
+        # Budget riêng theo prefix endpoint; prefix dài nhất được ưu tiên
+        self.budgets: List[Tuple[str, Bucket]] = []
+        for prefix, config in (budgets or {}).items():
+            per_minute = float(config["calls_per_minute"])
+            bucket = Bucket(
+                f"endpoint:{config.get('bucket', prefix)}",
+                interval=60.0 / per_minute,
+                burst=int(config.get("burst", max(1, int(per_minute)))),
+            )
+            self.budgets.append((prefix, bucket))
+        self.budgets.sort(key=lambda item: len(item[0]), reverse=True)
+
+        # Thống kê trong process, cập nhật O(1)
+        self._stats_lock = threading.Lock()
+        self.endpoint_stats: Dict[str, Dict[str, float]] = {}
+        self.total_wait = 0.0
+        self.penalties = 0
+
+    @property
+    def shared_buckets(self) -> List[Bucket]:
+        return [PAUSE_BUCKET] + self.global_buckets
+
+    def budget_for(self, endpoint: str) -> Optional[Bucket]:
+        for prefix, bucket in self.budgets:
+            if endpoint.startswith(prefix):
+                return bucket
+        return None
+
+    def buckets_for(self, endpoint: str) -> List[Bucket]:
+        budget = self.budget_for(endpoint)
+        return self.shared_buckets + ([budget] if budget else [])
 
-        # Track rate limits per endpoint/source
-        self.rate_limits: Dict[str, RateLimitInfo] = {}
-        self.lock = Lock()
+    def _reserve(self, endpoint: str) -> Tuple[float, bool]:
+        now = time.time()
+        budget = self.budget_for(endpoint)
+        start, charged = self.state.reserve_split(
+            [budget] if budget else [], self.shared_buckets, now, self.throttle
+        )
+        return max(0.0, start - now), charged
 
-        # Global tracking
-        self.last_global_call = 0.0
-        self.minute_calls = []
-        self.hour_calls = []
+    def reserve(self, endpoint: str = "default") -> float:
+        """
+        Đặt chỗ 1 call, không sleep. Returns: số giây cần chờ trước khi gọi
+
+        Nếu budget riêng của endpoint bắt chờ thì chỉ token endpoint được đặt; token chung
+        lấy bằng reserve_shared() khi tới giờ gọi (wait_if_needed tự làm việc này).
+        """
+        return self._reserve(endpoint)[0]
 
-    def _clean_old_calls(self, now: float):
-        """Xóa các calls cũ khỏi tracking"""
-        minute_ago = now - 60
-        hour_ago = now - 3600
+    def reserve_shared(self) -> float:
+        """Đặt chỗ token chung (pause + global) cho call sắp chạy. Returns: số giây cần chờ"""
+        now = time.time()
+        return max(0.0, self.state.reserve(self.shared_buckets, now, self.throttle) - now)
+
+    def backoff(self, error: Any = None, endpoint: str = "default", attempt: int = 1) -> float:
+        """
+        Báo upstream vừa rate limit: tạm dừng mọi caller theo gợi ý retry-after
+        (hoặc exponential backoff nếu message không có) và giảm tốc độ gọi (AIMD).
+        Không sleep - lần wait_if_needed kế tiếp của mọi caller sẽ chờ tới hết pause.
+        Returns: số giây tạm dừng
+        """
+        hint = parse_retry_after(error)
+        if hint is not None:
+            seconds = hint + self.backoff_margin
+        else:
+            seconds = min(self.max_backoff, self.default_backoff * 2 ** max(0, attempt - 1))
 
-        self.minute_calls = [call_time for call_time in self.minute_calls if call_time > minute_ago]
-        self.hour_calls = [call_time for call_time in self.hour_calls if call_time > hour_ago]
+        now = time.time()
+        factor = self.state.penalize(PAUSE_BUCKET.name, now + seconds, now, self.throttle)
+        with self._stats_lock:
+            self.penalties += 1
+        print(
+            f"🛑 Rate limit upstream ({endpoint}): pause {seconds:.0f}s "
+            f"cho mọi caller, tốc độ còn {factor:.0%}"
+        )
+        return seconds
 
     def wait_if_needed(self, endpoint: str = "default") -> float:
         """
         Kiểm tra và wait nếu cần thiết để tránh rate limit
         Returns: thời gian đã wait (seconds)
         """
-        with self.lock:
-            now = time.time()
-
-            # Clean old calls
-            self._clean_old_calls(now)
-
-            wait_time = 0.0
-
-            # Check global minimum interval
-            if self.last_global_call > 0:
-                time_since_last = now - self.last_global_call
-                if time_since_last < self.min_interval:
-                    needed_wait = self.min_interval - time_since_last
-                    wait_time = max(wait_time, needed_wait)
-
-            # Check per-minute limit
-            if len(self.minute_calls) >= self.calls_per_minute:
-                oldest_call = min(self.minute_calls)
-                time_to_wait = 60 - (now - oldest_call)
-                if time_to_wait > 0:
-                    wait_time = max(wait_time, time_to_wait)
-
-            # Check per-hour limit
-            if len(self.hour_calls) >= self.calls_per_hour:
-                oldest_call = min(self.hour_calls)
-                time_to_wait = 3600 - (now - oldest_call)
-                if time_to_wait > 0:
-                    wait_time = max(wait_time, time_to_wait)
-
-            # Check endpoint-specific limits
-            if endpoint in self.rate_limits:
-                endpoint_info = self.rate_limits[endpoint]
-                time_since_last = now - endpoint_info.last_call
-                if time_since_last < self.min_interval:
-                    needed_wait = self.min_interval - time_since_last
-                    wait_time = max(wait_time, needed_wait)
-
-            # Perform wait if needed
-            if wait_time > 0:
-                print(f"⏳ Rate limiter: waiting {wait_time:.1f}s for {endpoint}")
-                time.sleep(wait_time)
-                now = time.time()  # Update now after sleep
-
-            # Record this call
-            self.minute_calls.append(now)
-            self.hour_calls.append(now)
-            self.last_global_call = now
-
-            # Update endpoint info
-            if endpoint not in self.rate_limits:
-                self.rate_limits[endpoint] = RateLimitInfo(now, 1, now)
-            else:
-                self.rate_limits[endpoint].last_call = now
-                self.rate_limits[endpoint].call_count += 1
-
-            return wait_time
+        wait_time, charged = self._reserve(endpoint)
+
+        # Sleep ngoài mọi lock: các thread khác vẫn đặt chỗ được
+        if wait_time > 0:
+            print(f"⏳ Rate limiter: waiting {wait_time:.1f}s for {endpoint}")
+            time.sleep(wait_time)
+
+        if not charged:
+            # Chờ theo budget riêng xong mới lấy token chung
+            shared_wait = self.reserve_shared()
+            if shared_wait > 0:
+                print(f"⏳ Rate limiter: waiting {shared_wait:.1f}s for {endpoint}")
+                time.sleep(shared_wait)
+            wait_time += shared_wait
+
+        now = time.time()
+        with self._stats_lock:
+            info = self.endpoint_stats.setdefault(endpoint, {"last_call": now, "call_count": 0, "waited": 0.0})
+            info["last_call"] = now
+            info["call_count"] += 1
+            info["waited"] += wait_time
+            self.total_wait += wait_time
+
+        return wait_time
 
     def get_stats(self) -> Dict:
         """Lấy thống kê rate limiting"""
-        with self.lock:
-            now = time.time()
-            self._clean_old_calls(now)
-
-            return {
-                "calls_last_minute": len(self.minute_calls),
-                "calls_last_hour": len(self.hour_calls),
-                "limits": {
-                    "per_minute": self.calls_per_minute,
-                    "per_hour": self.calls_per_hour,
-                    "min_interval": self.min_interval
-                },
-                "endpoint_stats": {
-                    endpoint: {
-                        "last_call": info.last_call,
-                        "call_count": info.call_count,
-                        "seconds_since_last": now - info.last_call
-                    }
-                    for endpoint, info in self.rate_limits.items()
+        now = time.time()
+        tats = self.state.snapshot()
+        buckets = list(self.global_buckets) + [bucket for _, bucket in self.budgets]
+
+        factor = self.throttle.current(*self.state.throttle_state(), now)
+        throttle_stats = {
+            "factor": round(factor, 3),
+            "paused_for": round(max(0.0, tats.get(PAUSE_BUCKET.name, 0.0) - now), 2),
+        }
+
+        bucket_stats = {}
+        for bucket in buckets:
+            # Interval thực tế sau khi áp hệ số AIMD
+            interval = bucket.interval / factor
+            backlog = max(0.0, tats.get(bucket.name, 0.0) - now)
+            bucket_stats[bucket.name] = {
+                "rate_per_minute": round(60.0 / interval, 2) if interval > 0 else None,
+                "burst": bucket.burst,
+                # Số token đang bị chiếm (call gần đây + call đã đặt chỗ)
+                "tokens_in_use": round(min(bucket.burst, backlog / interval), 2) if interval > 0 else 0.0,
+                "next_free_in": round(max(0.0, backlog - interval * (bucket.burst - 1)), 2),
+            }
+
+        with self._stats_lock:
+            throttle_stats["penalties"] = self.penalties
+            endpoint_stats = {
+                endpoint: {
+                    "last_call": info["last_call"],
+                    "call_count": info["call_count"],
+                    "seconds_since_last": now - info["last_call"],
+                    "waited": round(info["waited"], 2),
                 }
+                for endpoint, info in self.endpoint_stats.items()
             }
+            total_wait = self.total_wait
+
+        return {
+            "backend": type(self.state).__name__,
+            "limits": {
+                "per_minute": self.calls_per_minute,
+                "per_hour": self.calls_per_hour,
+                "min_interval": self.min_interval,
+                "budgets": {prefix: bucket.name for prefix, bucket in self.budgets},
+            },
+            "buckets": bucket_stats,
+            "throttle": throttle_stats,
+            "total_wait_seconds": round(total_wait, 2),
+            "endpoint_stats": endpoint_stats,
+        }
 
     def reset_stats(self):
         """Reset tất cả statistics"""
-        with self.lock:
-            self.rate_limits.clear()
-            self.minute_calls.clear()
-            self.hour_calls.clear()
-            self.last_global_call = 0.0
+        self.state.reset()
+        with self._stats_lock:
+            self.endpoint_stats.clear()
+            self.total_wait = 0.0
+            self.penalties = 0
+
+
+def build_limiter_state(config: Optional[Dict[str, Any]] = None):
+    """State GCRA theo config dạng settings.VNSTOCK_RATE_LIMIT (BACKEND "sqlite" dùng chung giữa các process)"""
+    config = config if config is not None else getattr(settings, "VNSTOCK_RATE_LIMIT", {})
+    backend = str(config.get("BACKEND", "memory")).lower()
+    if backend == "sqlite":
+        return SQLiteLimiterState(config["LOCATION"])
+    if backend == "memory":
+        return MemoryLimiterState()
+    raise ValueError(f"Unknown VNSTOCK_RATE_LIMIT backend: {backend}")
+
+
+def build_rate_limiter(config: Optional[Dict[str, Any]] = None) -> VNStockRateLimiter:
+    """Tạo limiter từ config dạng settings.VNSTOCK_RATE_LIMIT"""
+    config = config if config is not None else getattr(settings, "VNSTOCK_RATE_LIMIT", {})
+    state = build_limiter_state(config)
+    return VNStockRateLimiter(
+        calls_per_minute=int(config.get("CALLS_PER_MINUTE", 30)),
+        calls_per_hour=int(config.get("CALLS_PER_HOUR", 500)),
+        min_interval=float(config.get("MIN_INTERVAL", 2.5)),
+        budgets=config.get("BUDGETS"),
+        state=state,
+        throttle=AIMDThrottle(
+            decrease=float(config.get("AIMD_DECREASE", 0.5)),
+            increase=float(config.get("AIMD_INCREASE", 0.1)),
+            quiet_period=float(config.get("AIMD_QUIET_PERIOD", 60.0)),
+            min_factor=float(config.get("AIMD_MIN_FACTOR", 0.1)),
+            max_factor=float(config.get("AIMD_MAX_FACTOR", 1.0)),
+        ),
+        default_backoff=float(config.get("BACKOFF_SECONDS", 15.0)),
+        max_backoff=float(config.get("MAX_BACKOFF_SECONDS", 120.0)),
+        backoff_margin=float(config.get("BACKOFF_MARGIN", 1.0)),
+    )
 
 
 # Global rate limiter instance
 _global_rate_limiter = None
+_global_rate_limiter_lock = threading.Lock()
 
 def get_rate_limiter() -> VNStockRateLimiter:
     """Get global rate limiter instance"""
     global _global_rate_limiter
     if _global_rate_limiter is None:
-        _global_rate_limiter = VNStockRateLimiter()
-    return _global_rate_limiter
\ No newline at end of file
+        with _global_rate_limiter_lock:
+            if _global_rate_limiter is None:
+                _global_rate_limiter = build_rate_limiter()
+    return _global_rate_limiter
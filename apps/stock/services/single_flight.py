@@ -0,0 +1,54 @@
+"""
+Single-flight: gộp các lời gọi đồng thời cho cùng một key thành một lần thực thi
+(các thread đến sau chờ và dùng chung kết quả của thread đầu tiên).
+"""
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Trong một process: tối đa 1 lời gọi fn đang chạy cho mỗi key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Chạy fn() nếu chưa có lời gọi nào cho key, ngược lại chờ lời gọi đang chạy.
+        Returns: (kết quả, shared) - shared=True nếu dùng lại kết quả của thread khác.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,236 @@
+# apps/stock/services/symbol_documents.py
+"""
+Symbol document store: payload chi tiết symbol được dựng sẵn và lưu dạng JSON bytes + etag.
+
+- Import pipeline gọi rebuild() cho các company vừa upsert; read path chỉ là 1 lookup theo PK.
+- Dựng nhiều symbol một lượt: các bảng con được prefetch theo đúng thứ tự/limit của payload
+  (Prefetch với queryset đã slice) nên số query không phụ thuộc số symbol trong chunk.
+- version chỉ tăng khi nội dung (etag) thay đổi.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from ninja.responses import NinjaJSONEncoder
+
+from apps.stock.models import Events, News, Officers, ShareHolder, SubCompany, Symbol, SymbolDocument
+from apps.stock.utils.safe import to_datetime, to_epoch_seconds
+
+SHAREHOLDERS_LIMIT = 7
+NEWS_LIMIT = 5
+EVENTS_LIMIT = 6
+SUBSIDIARIES_LIMIT = 5
+OFFICERS_MAX_AGE_DAYS = 3 * 365
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+class SymbolDocumentStore:
+    """Dựng, lưu và đọc symbol documents"""
+
+    def __init__(self, chunk_size: int = 200):
+        self.chunk_size = chunk_size
+
+    # -------- Build --------
+    @staticmethod
+    def _queryset(symbol_ids: List[int]):
+        three_years_ago = timezone.now() - timedelta(days=OFFICERS_MAX_AGE_DAYS)
+        return (
+            Symbol.objects.filter(id__in=symbol_ids)
+            .select_related("company")
+            .prefetch_related(
+                "industries",
+                Prefetch(
+                    "company__shareholders",
+                    queryset=ShareHolder.objects.order_by("-share_own_percent", "id")[:SHAREHOLDERS_LIMIT],
+                    to_attr="doc_shareholders",
+                ),
+                Prefetch(
+                    "company__news",
+                    queryset=News.objects.order_by("id")[:NEWS_LIMIT],
+                    to_attr="doc_news",
+                ),
+                Prefetch(
+                    "company__events",
+                    queryset=Events.objects.order_by("-public_date", "id")[:EVENTS_LIMIT],
+                    to_attr="doc_events",
+                ),
+                Prefetch(
+                    "company__officers",
+                    queryset=Officers.objects.filter(updated_at__gte=three_years_ago).order_by("-updated_at", "id"),
+                    to_attr="doc_officers",
+                ),
+                Prefetch(
+                    "company__subsidiaries",
+                    queryset=SubCompany.objects.order_by("id")[:SUBSIDIARIES_LIMIT],
+                    to_attr="doc_subsidiaries",
+                ),
+            )
+        )
+
+    @staticmethod
+    def _company_payload(c) -> Dict[str, Any]:
+        return {
+            "id": c.id,
+            "company_name": c.company_name,
+            "company_profile": c.company_profile,
+            "history": c.history,
+            "issue_share": c.issue_share,
+            "financial_ratio_issue_share": c.financial_ratio_issue_share,
+            "charter_capital": c.charter_capital,
+            "outstanding_share": c.outstanding_share,
+            "foreign_percent": _float_or_none(c.foreign_percent),
+            "established_year": c.established_year,
+            "no_employees": c.no_employees,
+            "stock_rating": _float_or_none(c.stock_rating),
+            "website": c.website,
+            "updated_at": to_datetime(c.updated_at),
+            "shareholders": [
+                {
+                    "id": sh.id,
+                    "share_holder": sh.share_holder,
+                    "quantity": sh.quantity,
+                    "share_own_percent": _float_or_none(sh.share_own_percent),
+                    "update_date": to_datetime(sh.update_date),
+                }
+                for sh in c.doc_shareholders
+            ],
+            "news": [
+                {
+                    "id": n.id,
+                    "title": n.title,
+                    "news_image_url": n.news_image_url,
+                    "news_source_link": n.news_source_link,
+                    "price_change_pct": _float_or_none(n.price_change_pct),
+                    "public_date": to_epoch_seconds(n.public_date),
+                }
+                for n in c.doc_news
+            ],
+            "events": [
+                {
+                    "id": e.id,
+                    "event_title": e.event_title,
+                    "public_date": to_datetime(e.public_date),
+                    "issue_date": to_datetime(e.issue_date),
+                    "source_url": e.source_url,
+                }
+                for e in c.doc_events
+            ],
+            "officers": [
+                {
+                    "id": o.id,
+                    "officer_name": o.officer_name,
+                    "officer_position": o.officer_position,
+                    "position_short_name": o.position_short_name,
+                    "officer_owner_percent": _float_or_none(o.officer_owner_percent),
+                    "updated_at": to_datetime(o.updated_at),
+                }
+                for o in c.doc_officers
+            ],
+            "subsidiaries": [
+                {
+                    "id": sc.id,
+                    "company_name": sc.company_name,
+                    "sub_own_percent": _float_or_none(sc.sub_own_percent),
+                }
+                for sc in c.doc_subsidiaries
+            ],
+        }
+
+    def build_payloads(self, symbol_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """{symbol_id: payload} cho 1 chunk symbols (số query cố định)"""
+        payloads = {}
+        for sym in self._queryset(list(symbol_ids)):
+            payloads[sym.id] = {
+                "id": sym.id,
+                "name": sym.name,
+                "exchange": sym.exchange,
+                "updated_at": to_datetime(sym.updated_at),
+                "industries": [
+                    {
+                        "id": ind.id,
+                        "name": ind.name,
+                        "level": ind.level,
+                        "updated_at": to_datetime(ind.updated_at),
+                    }
+                    for ind in sym.industries.all()
+                ],
+                "company": self._company_payload(sym.company) if sym.company else None,
+            }
+        return payloads
+
+    @staticmethod
+    def serialize(payload: Dict[str, Any]) -> Tuple[bytes, str]:
+        """JSON bytes giống hệt output của ninja renderer + etag theo nội dung"""
+        body = json.dumps(payload, cls=NinjaJSONEncoder).encode("utf-8")
+        return body, hashlib.sha256(body).hexdigest()
+
+    # -------- Write --------
+    def rebuild(
+        self,
+        symbol_ids: Optional[Iterable[int]] = None,
+        company_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[str, int]:
+        """
+        Dựng lại documents cho các symbol (mặc định: tất cả).
+        Returns: {"inserted", "updated", "unchanged"} như các hàm upsert của repositories.
+        """
+        qs = Symbol.objects.all()
+        if symbol_ids is not None:
+            qs = qs.filter(id__in=list(symbol_ids))
+        if company_ids is not None:
+            qs = qs.filter(company_id__in=list(company_ids))
+        ids = list(qs.order_by("id").values_list("id", flat=True))
+
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            payloads = self.build_payloads(chunk)
+            existing = {
+                doc.symbol_id: doc
+                for doc in SymbolDocument.objects.filter(symbol_id__in=chunk).only("symbol_id", "etag", "version")
+            }
+            now = timezone.now()
+            to_create, to_update = [], []
+            for symbol_id, payload in payloads.items():
+                body, etag = self.serialize(payload)
+                doc = existing.get(symbol_id)
+                if doc is None:
+                    to_create.append(SymbolDocument(symbol_id=symbol_id, body=body, etag=etag, generated_at=now))
+                elif doc.etag != etag:
+                    doc.body, doc.etag, doc.version, doc.generated_at = body, etag, doc.version + 1, now
+                    to_update.append(doc)
+                else:
+                    stats["unchanged"] += 1
+
+            with transaction.atomic():
+                if to_create:
+                    SymbolDocument.objects.bulk_create(to_create, batch_size=self.chunk_size)
+                if to_update:
+                    SymbolDocument.objects.bulk_update(
+                        to_update, ["body", "etag", "version", "generated_at"], batch_size=self.chunk_size
+                    )
+            stats["inserted"] += len(to_create)
+            stats["updated"] += len(to_update)
+        return stats
+
+    # -------- Read --------
+    def get(self, symbol_id: int) -> Optional[Tuple[bytes, str]]:
+        """
+        (body, etag) của symbol bằng 1 lookup theo PK.
+        Chưa có document (vd. symbol chưa từng qua import) thì dựng ngay; None nếu symbol không tồn tại.
+        """
+        row = SymbolDocument.objects.filter(symbol_id=symbol_id).values_list("body", "etag").first()
+        if row is None:
+            self.rebuild(symbol_ids=[symbol_id])
+            row = SymbolDocument.objects.filter(symbol_id=symbol_id).values_list("body", "etag").first()
+        if row is None:
+            return None
+        body, etag = row
+        return bytes(body), etag
@@ -0,0 +1,225 @@
+# apps/stock/services/symbol_search.py
+"""
+Index tìm kiếm symbol trong process cho typeahead /symbols/by-name:
+- Mảng tên đã sort + bisect cho exact/prefix
+- Trigram index (tên mã + tên công ty) cho substring và fuzzy
+- So khớp không dấu: "ngan hang" khớp "Ngân hàng", "đ" -> "d"
+
+Xếp hạng: exact > prefix > substring của mã > khớp tên công ty > fuzzy (trigram).
+Query không chạm DB; index được dựng lười ở lần search đầu (hoặc warm_symbol_search() từ
+wsgi/asgi), dựng lại sau import và tự kiểm tra fingerprint của bảng Symbol/Company (tối đa
+mỗi `check_interval` giây) để thấy thay đổi từ process khác.
+"""
+import heapq
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from apps.stock.models import Company, Symbol
+
+logger = logging.getLogger(__name__)
+
+RANK_EXACT, RANK_PREFIX, RANK_SUBSTRING, RANK_COMPANY, RANK_FUZZY = range(5)
+# Query 1 ký tự chỉ match prefix (substring/fuzzy trên 1 ký tự chỉ là nhiễu)
+MIN_SUBSTRING_LENGTH = 2
+
+
+def normalize(text: Optional[str]) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt, gộp khoảng trắng"""
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigram kiểu pg_trgm: mỗi từ được đệm 2 space đầu, 1 space cuối"""
+    grams: Set[str] = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SymbolSearchIndex:
+    """Index bất biến; dựng lại toàn bộ khi dữ liệu đổi (vài nghìn symbol -> vài ms)"""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], fuzzy_threshold: float = 0.5):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.entries: List[Dict[str, Any]] = []
+        self._names: List[str] = []          # tên chuẩn hóa theo từng entry
+        self._companies: List[str] = []
+        self._postings: Dict[str, Set[int]] = {}
+
+        for row in rows:
+            idx = len(self.entries)
+            self.entries.append({
+                "id": row["id"],
+                "name": row["name"],
+                "exchange": row["exchange"],
+                "company_name": row.get("company__company_name"),
+            })
+            name, company = normalize(row["name"]), normalize(row.get("company__company_name"))
+            self._names.append(name)
+            self._companies.append(company)
+            for gram in trigrams(name) | trigrams(company):
+                self._postings.setdefault(gram, set()).add(idx)
+
+        self._sorted = sorted((name, idx) for idx, name in enumerate(self._names))
+        self._sorted_names = [name for name, _ in self._sorted]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _prefix_matches(self, q: str) -> List[int]:
+        matches = []
+        pos = bisect_left(self._sorted_names, q)
+        while pos < len(self._sorted) and self._sorted_names[pos].startswith(q):
+            matches.append(self._sorted[pos][1])
+            pos += 1
+        return matches
+
+    def _candidates(self, q: str) -> Iterable[int]:
+        """
+        Entry có thể chứa q: giao các posting list (q ngắn thì duyệt hết).
+        Chỉ dùng trigram nằm trọn trong chữ: trigram có space đánh dấu đầu/cuối từ nên
+        sẽ loại mất các entry chứa q ở giữa từ (vd. "cbs" trong "vcbs").
+        """
+        grams = [g for g in trigrams(q) if " " not in g]
+        if len(q) < 3 or not grams:
+            return range(len(self.entries))
+        postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def search(self, term: str, limit: int = 20) -> List[Dict[str, Any]]:
+        q = normalize(term)
+        if not q:
+            return []
+
+        ranked: Dict[int, Tuple[int, float, int, str]] = {}
+
+        def add(idx: int, rank: int, score: float = 0.0) -> None:
+            key = (rank, -score, len(self._names[idx]), self._names[idx])
+            if idx not in ranked or key < ranked[idx]:
+                ranked[idx] = key
+
+        for idx in self._prefix_matches(q):
+            add(idx, RANK_EXACT if self._names[idx] == q else RANK_PREFIX)
+
+        # Đã đủ kết quả exact/prefix thì các hạng thấp hơn không thể lọt vào top
+        if len(ranked) < limit and len(q) >= MIN_SUBSTRING_LENGTH:
+            for idx in self._candidates(q):
+                if q in self._names[idx]:
+                    add(idx, RANK_SUBSTRING)
+                elif q in self._companies[idx]:
+                    add(idx, RANK_COMPANY)
+
+        if len(ranked) < limit and len(q) >= MIN_SUBSTRING_LENGTH:
+            query_grams = trigrams(q)
+            scores: Dict[int, int] = {}
+            for gram in query_grams:
+                for idx in self._postings.get(gram, ()):
+                    scores[idx] = scores.get(idx, 0) + 1
+            for idx, shared in scores.items():
+                if idx in ranked:
+                    continue
+                # Tỷ lệ trigram của query có trong mã/tên công ty (giống word_similarity của pg_trgm)
+                similarity = shared / len(query_grams)
+                if similarity >= self.fuzzy_threshold:
+                    add(idx, RANK_FUZZY, similarity)
+
+        best = heapq.nsmallest(limit, ranked.items(), key=lambda item: item[1])
+        return [self.entries[idx] for idx, _ in best]
+
+
+class SymbolSearch:
+    """Giữ index hiện tại, dựng lại khi import hoặc khi fingerprint DB đổi"""
+
+    def __init__(self, check_interval: float = 30.0, fuzzy_threshold: float = 0.5):
+        self.check_interval = check_interval
+        self.fuzzy_threshold = fuzzy_threshold
+        self._lock = threading.Lock()
+        self._index: Optional[SymbolSearchIndex] = None
+        self._fingerprint: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def fingerprint() -> Tuple:
+        symbols = Symbol.objects.aggregate(count=Count("id"), updated=Max("updated_at"))
+        companies = Company.objects.aggregate(count=Count("id"), updated=Max("updated_at"))
+        return symbols["count"], symbols["updated"], companies["count"], companies["updated"]
+
+    def refresh(self) -> SymbolSearchIndex:
+        """Dựng lại index từ DB (1 query .values()) và thay thế index cũ"""
+        fingerprint = self.fingerprint()
+        rows = Symbol.objects.values("id", "name", "exchange", "company__company_name").order_by("id")
+        index = SymbolSearchIndex(rows, fuzzy_threshold=self.fuzzy_threshold)
+        with self._lock:
+            self._index, self._fingerprint, self._checked_at = index, fingerprint, time.monotonic()
+        logger.info("Symbol search index built with %d symbols", len(index))
+        return index
+
+    def index(self) -> SymbolSearchIndex:
+        index = self._index
+        if index is None:
+            return self.refresh()
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                if self.fingerprint() != self._fingerprint:
+                    return self.refresh()
+            except Exception as exc:
+                logger.warning("Symbol search fingerprint check failed: %s", exc)
+        return index
+
+    def search(self, term: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return self.index().search(term, limit=limit)
+
+
+_symbol_search: Optional[SymbolSearch] = None
+_symbol_search_lock = threading.Lock()
+
+
+def get_symbol_search() -> SymbolSearch:
+    """Global search index instance (theo settings.SYMBOL_SEARCH)"""
+    global _symbol_search
+    if _symbol_search is None:
+        with _symbol_search_lock:
+            if _symbol_search is None:
+                config = getattr(settings, "SYMBOL_SEARCH", {})
+                _symbol_search = SymbolSearch(
+                    check_interval=float(config.get("CHECK_INTERVAL", 30.0)),
+                    fuzzy_threshold=float(config.get("FUZZY_THRESHOLD", 0.5)),
+                )
+    return _symbol_search
+
+
+def refresh_symbol_search() -> None:
+    """Gọi sau khi import thay đổi Symbol/Company"""
+    try:
+        get_symbol_search().refresh()
+    except Exception as exc:
+        logger.warning("Symbol search index refresh failed: %s", exc)
+
+
+def warm_symbol_search() -> None:
+    """
+    Dựng sẵn index ở background cho web server (gọi từ config/wsgi.py, asgi.py khi
+    SYMBOL_SEARCH.WARM_ON_STARTUP bật). Không gọi từ AppConfig.ready(): ready() chạy cả
+    với migrate/management command, lúc bảng có thể chưa tồn tại.
+    """
+    if getattr(settings, "SYMBOL_SEARCH", {}).get("WARM_ON_STARTUP", False):
+        threading.Thread(target=refresh_symbol_search, name="symbol-search-warmup", daemon=True).start()
@@ -1,10 +1,14 @@
+import json
 import time
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+from django.db.models import Q
 from django.http import Http404
 import pandas as pd
-from django.shortcuts import get_object_or_404
 from vnstock import Listing
 from ninja.errors import HttpError
+from ninja.responses import NinjaJSONEncoder
+from apps.jobs.services.progress import JobProgress
 from apps.stock.clients.vnstock_client import VNStockClient
 from apps.stock.models import Symbol, Events, News
 from apps.stock.repositories import repositories as repo
@@ -14,23 +18,25 @@ from apps.stock.services.company_processor import CompanyProcessor
 from apps.stock.services.payload_builder import PayloadBuilder
 from apps.stock.services.fetch_service import FetchService
 from apps.stock.services.cache_service import VNStockCacheService
+from apps.stock.services.coverage_planner import CoveragePlanner, stock_coverage_checks
+from apps.stock.services.symbol_documents import SymbolDocumentStore
+from apps.stock.services.symbol_search import get_symbol_search, refresh_symbol_search
 from apps.stock.utils.safe import (
     safe_str,
     to_datetime,
-    to_epoch_seconds,
 )
-from django.utils import timezone
-from datetime import timedelta
 from apps.stock.schemas import SymbolList, SymbolOutBasic
+from core.cursor import decode_cursor, encode_cursor
 from core.db_utils import ensure_django_connection_closed
 from django.db import reset_queries
 
 class SymbolService:
     def __init__(
         self, vn_client: Optional[VNStockClient] = None, per_symbol_sleep: float = 0.2,
-        max_workers: int = 10, batch_size: int = 20
+        max_workers: int = 10, batch_size: int = 20, progress: Optional[JobProgress] = None
     ):
         self.vn_client = vn_client or VNStockClient()
+        self.progress = progress or JobProgress()
         self.per_symbol_sleep = per_symbol_sleep
         self.max_workers = max_workers
         self.batch_size = batch_size
@@ -40,10 +46,11 @@ class SymbolService:
         self.payload_builder = PayloadBuilder()
         self.fetch_service = FetchService(
             max_retries=getattr(self.vn_client, 'max_retries', 5),
-            wait_seconds=getattr(self.vn_client, 'wait_seconds', 60)
+            vn_client=self.vn_client,
         )
         # Initialize cache service for better performance
         self.cache_service = VNStockCacheService()
+        self.documents = SymbolDocumentStore()
 
     # -------- Delegation methods to helper services --------
     def _fetch_shareholders_df(self, symbol_name: str) -> pd.DataFrame:
@@ -82,8 +89,6 @@ class SymbolService:
             force_update: If False (default), skip symbols that already have data.
                          If True, re-import all symbols (to get latest data from vnstock).
         """
-        from apps.stock.models import ShareHolder, Officers, Events, SubCompany
-
         mode_text = "FORCE UPDATE MODE" if force_update else "RESUME MODE"
 
         result = {
@@ -114,32 +119,18 @@ class SymbolService:
             result["total_symbols"] = symbols_imported
             print(f"✓ SUCCESS ({symbols_imported} symbols)")
 
-            # Get symbols to process
-            symbols = Symbol.objects.all().order_by('name')
-
+            # 1 query Exists() cho tất cả symbols; thiếu nhiều bảng nhất xử lý trước
+            plan = CoveragePlanner(stock_coverage_checks()).plan(force=force_update)
+            symbols = [item.symbol for item in plan]
             if not force_update:
-                symbols_to_process = []
-                for symbol in symbols:
-                    has_company = hasattr(symbol, 'company') and symbol.company is not None
-                    has_shareholders = has_company and ShareHolder.objects.filter(company=symbol.company).exists()
-                    has_officers = has_company and Officers.objects.filter(company=symbol.company).exists()
-                    has_events = has_company and Events.objects.filter(company=symbol.company).exists()
-                    has_news = has_company and News.objects.filter(company=symbol.company).exists()
-                    has_subs = has_company and SubCompany.objects.filter(parent=symbol.company).exists()
-
-                    # Process if missing any data
-                    if not (has_company and has_shareholders and has_officers and has_events and has_subs):
-                        symbols_to_process.append(symbol)
-
-                symbols = symbols_to_process
                 print(f"  ℹ Resume mode: {len(symbols)} symbols need processing\n")
             else:
-                symbols = list(symbols)
                 print(f"  ℹ Force update: Processing all {len(symbols)} symbols\n")
 
             # Step 2-7: Process each symbol with all data
+            symbols = self.progress.begin("related_tables", symbols)
             total_symbols = len(symbols)
-            for idx, symbol in enumerate(symbols, 1):
+            for idx, symbol in enumerate(self.progress.track(symbols), 1):
                 symbol_detail = {
                     "symbol": symbol.name,
                     "success": False,
@@ -160,6 +151,7 @@ class SymbolService:
                         print(f"  ⊘ SKIPPED: No bundle data")
                         symbol_detail["errors"].append("No bundle data")
                         result["symbols_failed"] += 1
+                        self.progress.fail(symbol.name, "No bundle data")
                         continue
 
                     # Get overview data
@@ -171,6 +163,7 @@ class SymbolService:
                         print(f"  ⊘ SKIPPED: No overview data")
                         symbol_detail["errors"].append("No overview data")
                         result["symbols_failed"] += 1
+                        self.progress.fail(symbol.name, "No overview data")
                         continue
 
                     print(f"\nSuccessfully fetched data for {symbol.name}")
@@ -192,6 +185,7 @@ class SymbolService:
                     result["total_industries"] += len(industries)
 
                     # Import Shareholders
+                    self.progress.stage("shareholders")
                     print(f"  → Importing Shareholders...", end=" ", flush=True)
                     shareholders_df = bundle.get("shareholders_df")
                     if shareholders_df is not None and not shareholders_df.empty:
@@ -204,6 +198,7 @@ class SymbolService:
                         print(f"⊘ SKIPPED (no data)")
 
                     # Import Officers
+                    self.progress.stage("officers")
                     print(f"  → Importing Officers...", end=" ", flush=True)
                     officers_df = bundle.get("officers_df")
                     if officers_df is not None and not officers_df.empty:
@@ -216,6 +211,7 @@ class SymbolService:
                         print(f"⊘ SKIPPED (no data)")
 
                     # Import Events
+                    self.progress.stage("events")
                     print(f"  → Importing Events...", end=" ", flush=True)
                     events_df = bundle.get("events_df")
                     if events_df is not None and not events_df.empty:
@@ -228,6 +224,7 @@ class SymbolService:
                         print(f"⊘ SKIPPED (no data)")
 
                     # Import Sub Companies
+                    self.progress.stage("sub_companies")
                     print(f"  → Importing Sub Companies...", end=" ", flush=True)
                     subsidiaries_df = bundle.get("subsidiaries")
                     if subsidiaries_df is not None and not subsidiaries_df.empty:
@@ -252,10 +249,14 @@ class SymbolService:
                     else:
                         print(f"⊘ SKIPPED (no data)")
 
+                    # Dựng lại document cho GET /symbols/{id} từ dữ liệu vừa upsert
+                    self.documents.rebuild(company_ids=[company.id])
+
                 except Exception as e:
                     error_msg = f"Import error: {str(e)}"
                     symbol_detail["errors"].append(error_msg)
                     result["symbols_failed"] += 1
+                    self.progress.fail(symbol.name, error_msg)
                     print(f"  ✗ FAILED: {error_msg}")
 
                 finally:
@@ -265,6 +266,7 @@ class SymbolService:
 
                     if self.per_symbol_sleep > 0:
                         time.sleep(self.per_symbol_sleep)
+            self.progress.end()
 
             # Final summary
             print(f"\n{'='*60}")
@@ -283,6 +285,7 @@ class SymbolService:
             print(f"Sub Companies:        {result['total_sub_companies']} records")
             print(f"{'='*60}\n")
 
+            refresh_symbol_search()
             return result
 
         except Exception as e:
@@ -320,37 +323,88 @@ class SymbolService:
             print(f"Error in _import_symbols_from_vnstock: {e}")
             return 0
     
+    SYMBOL_ORDERINGS = ("id", "name")
+
+    @staticmethod
+    def _symbol_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Dựng payload từ .values() rows + 1 query industries cho cả nhóm"""
+        industries: Dict[int, List[Dict[str, Any]]] = {}
+        for link in repo.symbol_industry_rows(row["id"] for row in rows):
+            industries.setdefault(link["symbol_id"], []).append({
+                "id": link["industry_id"],
+                "name": link["industry__name"],
+                "updated_at": link["industry__updated_at"],
+            })
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "exchange": row["exchange"],
+                "updated_at": row["updated_at"],
+                "industries": industries.get(row["id"], []),
+                "company": {
+                    "id": row["company_id"],
+                    "company_name": row["company__company_name"],
+                    "updated_at": row["company__updated_at"],
+                } if row["company_id"] else None,
+            }
+            for row in rows
+        ]
+
+    def list_symbols_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        order: str = "id",
+        exchange: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Keyset pagination theo id hoặc name: WHERE (cột sort) > cursor thay vì OFFSET,
+        chi phí mỗi trang không phụ thuộc vị trí trang.
+        """
+        if order not in self.SYMBOL_ORDERINGS:
+            raise HttpError(400, f"order must be one of {', '.join(self.SYMBOL_ORDERINGS)}")
+        limit = max(1, min(limit, 1000))
+
+        qs = repo.qs_symbol_rows(exchange=exchange, order=order)
+        after = decode_cursor(cursor)
+        if after:
+            after_id, after_name = after.get("id"), after.get("name")
+            if type(after_id) is not int or (order == "name" and not isinstance(after_name, str)):
+                raise HttpError(400, "Invalid cursor")
+            if order == "id":
+                qs = qs.filter(id__gt=after_id)
+            else:
+                # name là unique nhưng vẫn kèm id để cursor ổn định
+                qs = qs.filter(Q(name__gt=after_name) | Q(name=after_name, id__gt=after_id))
+
+        rows = list(qs[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor({"id": last["id"], "name": last["name"]} if order == "name" else {"id": last["id"]})
+        return {"items": self._symbol_rows(rows), "next_cursor": next_cursor}
+
+    def iter_symbols_ndjson(self, exchange: Optional[str] = None, chunk_size: int = 2000) -> Iterator[bytes]:
+        """
+        Full dump dạng NDJSON (1 symbol/dòng) từ server-side cursor (.iterator(chunk_size)),
+        bộ nhớ chỉ giữ 1 chunk tại một thời điểm.
+        """
+        rows = repo.qs_symbol_rows(exchange=exchange).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield b"".join(
+                json.dumps(item, cls=NinjaJSONEncoder).encode("utf-8") + b"\n"
+                for item in self._symbol_rows(chunk)
+            )
+
     def list_symbols_payload(self) -> List[Dict[str, Any]]:
         """List all symbols with industries and minimal company info."""
-        symbols = repo.qs_symbols_with_industries()
-        data: List[Dict[str, Any]] = []
-        for s in symbols:
-            industries = [
-                {
-                    "id": ind.id,
-                    "name": ind.name,
-                    "updated_at": to_datetime(ind.updated_at),
-                }
-                for ind in s.industries.all()
-            ]
-            company_payload = None
-            if s.company:
-                company_payload = {
-                    "id": s.company.id,
-                    "company_name": s.company.company_name,
-                    "updated_at": to_datetime(s.company.updated_at),
-                }
-            data.append(
-                {
-                    "id": s.id,
-                    "name": s.name,
-                    "exchange": s.exchange,
-                    "updated_at": to_datetime(s.updated_at),
-                    "industries": industries,
-                    "company": company_payload,
-                }
-            )
-        return data
+        return self._symbol_rows(list(repo.qs_symbol_rows()))
     
     def get_symbols(self, limit: int = 10) -> List[SymbolList]:
         
@@ -366,161 +420,18 @@ class SymbolService:
         ]
     
     def get_symbol_payload(self, symbol: int) -> Dict[str, Any]:
-        sym: Symbol = get_object_or_404(repo.qs_symbol_by_name(symbol))
-        c = sym.company
-
-        industries = []
-        try:
-            industries = [
-                {
-                    "id": ind.id,
-                    "name": ind.name,
-                    "level": ind.level,
-                    "updated_at": to_datetime(ind.updated_at),
-                }
-                for ind in sym.industries.all()
-            ]
-        except AttributeError as e:
-            print(f"Error accessing industries for symbol {symbol}: {e}")
-            try:
-                from apps.stock.models import Industry
-                symbol_industries = Industry.objects.filter(id = symbol)
-                industries = [
-                    {
-                        "id": ind.id,
-                        "name": ind.name,
-                        "level": ind.level,
-                        "updated_at": to_datetime(ind.updated_at),
-                    }
-                    for ind in symbol_industries
-                ]
-            except Exception as e2:
-                print(f"Alternative industries access failed: {e2}")
-                industries = []
-
-        shareholders = []
-        news_list = []
-        events_list = []
-        officers_list = []
-        subsidiaries_list = []
-
-        if c:
-            shareholders = [
-                {
-                    "id": sh.id,
-                    "share_holder": sh.share_holder,
-                    "quantity": sh.quantity,
-                    "share_own_percent": (
-                        float(sh.share_own_percent)
-                        if sh.share_own_percent is not None
-                        else None
-                    ),
-                    "update_date": to_datetime(sh.update_date),
-                }
-                for sh in c.shareholders.all().order_by('-share_own_percent')[:7]   
-            ]
-
-            news_list = [
-                {
-                    "id": n.id,
-                    "title": n.title,
-                    "news_image_url": n.news_image_url,
-                    "news_source_link": n.news_source_link,
-                    "price_change_pct": (
-                        float(n.price_change_pct) if n.price_change_pct is not None else None
-                    ),
-                    "public_date": to_epoch_seconds(n.public_date),
-                }
-                for n in c.news.all()[:5]
-            ]
-
-            events_list = [
-                {
-                    "id": e.id,
-                    "event_title": e.event_title,
-                    "public_date": to_datetime(e.public_date),
-                    "issue_date": to_datetime(e.issue_date),
-                    "source_url": e.source_url,
-                }
-                for e in c.events.all().order_by('-public_date')[:6]
-            ]
-
-            three_years_ago = timezone.now() - timedelta(days=3*365)
-
-            
-            officers_list = [
-                {
-                    "id": o.id,
-                    "officer_name": o.officer_name,
-                    "officer_position": o.officer_position,
-                    "position_short_name": o.position_short_name,
-                    "officer_owner_percent": (
-                        float(o.officer_owner_percent)
-                        if o.officer_owner_percent is not None
-                        else None
-                    ),
-                    "updated_at": to_datetime(o.updated_at),
-                }
-                 for o in c.officers.filter(updated_at__gte=three_years_ago)
-                       .order_by('-updated_at')
-            ]
-            subsidiaries_list = [
-                {
-                    "id": sc.id,
-                    "company_name": sc.company_name,
-                    "sub_own_percent": (
-                        float(sc.sub_own_percent) if sc.sub_own_percent is not None else None
-                    ),
-                }
-                for sc in c.subsidiaries.all()[:5]
-            ]
-
-            company_payload = {
-                "id": c.id,
-                "company_name": c.company_name,
-                "company_profile": c.company_profile,
-                "history": c.history,
-                "issue_share": c.issue_share,
-                "financial_ratio_issue_share": c.financial_ratio_issue_share,
-                "charter_capital": c.charter_capital,
-                "outstanding_share": c.outstanding_share,
-                "foreign_percent": (
-                    float(c.foreign_percent) if c.foreign_percent is not None else None
-                ),
-                "established_year": c.established_year,
-                "no_employees": c.no_employees,
-                "stock_rating": float(c.stock_rating) if c.stock_rating is not None else None,
-                "website": c.website,
-                "updated_at": to_datetime(c.updated_at),
-                "shareholders": shareholders,
-                "news": news_list,
-                "events": events_list,
-                "officers": officers_list,
-                "subsidiaries": subsidiaries_list,
-            }
-        else:
-            company_payload = None
-
-        return {
-            "id": sym.id,
-            "name": sym.name,
-            "exchange": sym.exchange,
-            "updated_at": to_datetime(sym.updated_at),
-            "industries": industries,
-            "company": company_payload,
-        }
+        """Payload chi tiết symbol (dựng trực tiếp, không qua document store)"""
+        payload = self.documents.build_payloads([symbol]).get(symbol)
+        if payload is None:
+            raise Http404("No Symbol matches the given query.")
+        return payload
 
     def search_symbols_by_name(self, symbol_name: str, limit: int = 20) -> List[SymbolOutBasic]:
         term = (symbol_name or "").strip()
         if not term:
             return []
-        queryset = repo.qs_symbols_like(term).order_by('name', 'id')
-        if limit:
-            queryset = queryset[:limit]
-        return [
-            SymbolOutBasic(id=sym.id, name=sym.name, exchange=sym.exchange)
-            for sym in queryset
-        ]
+        # Index trong process: exact > prefix > substring > tên công ty > fuzzy, không query DB
+        return [SymbolOutBasic(**item) for item in get_symbol_search().search(term, limit=limit or 20)]
 
     def get_symbol_payload_by_name(self, symbol_name: str) -> Dict[str, Any]:
         symbol_key = symbol_name.strip()
@@ -4,11 +4,16 @@ import pandas as pd
 from django.db import transaction
 from vnstock import Listing, Company
 
+from apps.jobs.services.progress import JobProgress
 from apps.stock.models import Symbol
 from apps.stock.repositories import repositories as repo
 from apps.stock.utils.safe import safe_decimal, safe_int, safe_str, to_datetime
 from apps.stock.services.cache_service import VNStockCacheService
+from apps.stock.services.bundle_prefetcher import BundlePrefetcher
+from apps.stock.services.coverage_planner import CoveragePlanner, stock_coverage_checks
 from apps.stock.services.rate_limiter import get_rate_limiter
+from apps.stock.services.symbol_documents import SymbolDocumentStore
+from apps.stock.services.symbol_search import refresh_symbol_search
 from apps.stock.utils.pandas_compat import suppress_pandas_warnings
 
 suppress_pandas_warnings()
@@ -17,11 +22,42 @@ suppress_pandas_warnings()
 class VnstockImportService:
     """Service chuyên dụng để import dữ liệu từ vnstock vào database"""
 
-    def __init__(self, per_symbol_sleep: float = 0.5): 
+    def __init__(self, per_symbol_sleep: float = 0.5, workers: int = 1, progress: Optional[JobProgress] = None):
         self.per_symbol_sleep = per_symbol_sleep
+        self.workers = max(1, int(workers or 1))
+        # Tiến độ/checkpoint theo bảng (job nền truyền JobReporter; CLI dùng bản trong RAM)
+        self.progress = progress or JobProgress()
         self.listing = Listing()
         self.cache_service = VNStockCacheService()
         self.rate_limiter = get_rate_limiter()
+        self.documents = SymbolDocumentStore()
+        self.prefetcher = BundlePrefetcher(self.cache_service, workers=self.workers)
+
+    def _iter_symbol_bundles(self, symbols):
+        """
+        Yield (symbol, bundle, ok, error) cho danh sách symbols.
+        Với workers > 1 bundle được fetch song song, còn DB write vẫn chạy trên thread hiện tại.
+        """
+        return self.prefetcher.iter_bundles(symbols)
+
+    def _pace_sequential(self, symbol_name: str, default_sleep: float = 0.5) -> None:
+        """Sleep giữa các symbol ở chế độ tuần tự; chế độ worker pool để rate limiter điều tiết."""
+        if self.workers > 1:
+            return
+        self.rate_limiter.wait_if_needed(f"processing_{symbol_name}")
+        time.sleep(self.per_symbol_sleep if self.per_symbol_sleep > 0 else default_sleep)
+
+    def _refresh_documents(self, *upserts, symbol_ids=None, company_ids=None) -> None:
+        """
+        Dựng lại symbol documents (GET /symbols/{id}) sau khi upsert.
+        upserts: các dict stats của repo.upsert_*; không có row inserted/updated thì bỏ qua.
+        """
+        if upserts and not any(s and (s.get("inserted") or s.get("updated")) for s in upserts):
+            return
+        try:
+            self.documents.rebuild(symbol_ids=symbol_ids, company_ids=company_ids)
+        except Exception as e:
+            print(f"Error rebuilding symbol documents: {e}")
 
     def import_all_complete(self, exchange: str = "HSX", force_update: bool = False) -> Dict[str, Any]:
         """
@@ -32,9 +68,10 @@ class VnstockImportService:
             exchange: Exchange to import (HSX, HNX, UPCOM)
             force_update: If False (default), skip symbols that already have data.
                          If True, re-import all symbols (to get latest data from vnstock).
-        """
-        from apps.stock.models import Company, ShareHolder, Officers, Events, SubCompany
 
+        Khi service được tạo với workers > 1, bundle của nhiều symbol được fetch song song
+        (vẫn qua rate limiter chung) và DB write chỉ do thread hiện tại thực hiện.
+        """
         mode_text = "FORCE UPDATE MODE" if force_update else "RESUME MODE"
 
         result = {
@@ -65,26 +102,6 @@ class VnstockImportService:
             result["total_symbols"] = len(symbols_result)
             print(f"✓ SUCCESS ({len(symbols_result)} symbols)")
 
-            symbols = Symbol.objects.all().order_by('name')
-
-            if not force_update:
-                symbols_to_process = []
-                for symbol in symbols:
-                    has_company = hasattr(symbol, 'company') and symbol.company is not None
-                    has_shareholders = has_company and ShareHolder.objects.filter(company=symbol.company).exists()
-                    has_officers = has_company and Officers.objects.filter(company=symbol.company).exists()
-                    has_events = has_company and Events.objects.filter(company=symbol.company).exists()
-                    has_subs = has_company and SubCompany.objects.filter(company=symbol.company).exists()
-
-                    # Process if missing any data
-                    if not (has_company and has_shareholders and has_officers and has_events and has_subs):
-                        symbols_to_process.append(symbol)
-
-                symbols = symbols_to_process
-                print(f"  ℹ Resume mode: {len(symbols)} symbols need processing\n")
-            else:
-                print(f"  ℹ Force update: Processing all {symbols.count()} symbols\n")
-
             # Step 2: Import Companies
             print(f"[2/7] → Importing Companies...", end=" ")
             companies_result = self.import_companies_from_vnstock(exchange)
@@ -97,9 +114,40 @@ class VnstockImportService:
             result["total_industries"] = len(industries_result)
             print(f"✓ SUCCESS ({len(industries_result)} mappings)")
 
+            # Lập plan sau khi company/industry đã import: 1 query Exists() cho tất cả symbols,
+            # symbol thiếu nhiều bảng nhất xử lý trước
+            plan = CoveragePlanner(stock_coverage_checks()).plan(force=force_update)
+            symbols = [item.symbol for item in plan]
+            if not force_update:
+                print(f"  ℹ Resume mode: {len(symbols)} symbols need processing\n")
+            else:
+                print(f"  ℹ Force update: Processing all {len(symbols)} symbols\n")
+
             # Step 4-7: Import related data for each symbol
-            total_symbols = len(symbols)
-            for idx, symbol in enumerate(symbols, 1):
+            if self.workers > 1:
+                print(f"  ℹ Worker pool: fetching bundles with {self.workers} workers\n")
+
+            with_company = []
+            for symbol in symbols:
+                if not hasattr(symbol, 'company') or symbol.company is None:
+                    print(f"\n[{symbol.name}] ⊘ SKIPPED: No company data")
+                    result["symbols_failed"] += 1
+                    result["details"].append({
+                        "symbol": symbol.name,
+                        "success": False,
+                        "shareholders": 0,
+                        "officers": 0,
+                        "events": 0,
+                        "sub_companies": 0,
+                        "errors": ["No company data"]
+                    })
+                    continue
+                with_company.append(symbol)
+
+            # Resume: bỏ các symbol đã xong trong checkpoint của job
+            with_company = self.progress.begin("related_tables", with_company)
+            bundles = self.progress.track(self._iter_symbol_bundles(with_company))
+            for idx, (symbol, bundle, ok, fetch_error) in enumerate(bundles, 1):
                 symbol_detail = {
                     "symbol": symbol.name,
                     "success": False,
@@ -110,43 +158,51 @@ class VnstockImportService:
                     "errors": []
                 }
 
-                print(f"\n[{idx}/{total_symbols}] Processing: {symbol.name}")
+                print(f"\n[{idx}/{len(with_company)}] Processing: {symbol.name}")
 
                 try:
-                    if not hasattr(symbol, 'company') or symbol.company is None:
-                        print(f"  ⊘ SKIPPED: No company data")
-                        symbol_detail["errors"].append("No company data")
-                        result["symbols_failed"] += 1
-                        continue
+                    if fetch_error:
+                        raise RuntimeError(fetch_error)
 
                     # Import Shareholders
+                    self.progress.stage("shareholders")
                     print(f"  → Importing Shareholders...", end=" ")
-                    sh_result = self._import_shareholders_for_symbol(symbol)
+                    sh_result = self._import_shareholders_for_symbol(symbol, bundle=bundle, ok=ok)
                     symbol_detail["shareholders"] = sh_result.get("count", 0)
                     result["total_shareholders"] += symbol_detail["shareholders"]
                     print(f"✓ SUCCESS ({symbol_detail['shareholders']} records)")
 
                     # Import Officers
+                    self.progress.stage("officers")
                     print(f"  → Importing Officers...", end=" ")
-                    off_result = self._import_officers_for_symbol(symbol)
+                    off_result = self._import_officers_for_symbol(symbol, bundle=bundle, ok=ok)
                     symbol_detail["officers"] = off_result.get("count", 0)
                     result["total_officers"] += symbol_detail["officers"]
                     print(f"✓ SUCCESS ({symbol_detail['officers']} records)")
 
                     # Import Events
+                    self.progress.stage("events")
                     print(f"  → Importing Events...", end=" ")
-                    evt_result = self._import_events_for_symbol(symbol)
+                    evt_result = self._import_events_for_symbol(symbol, bundle=bundle, ok=ok)
                     symbol_detail["events"] = evt_result.get("count", 0)
                     result["total_events"] += symbol_detail["events"]
                     print(f"✓ SUCCESS ({symbol_detail['events']} records)")
 
                     # Import Sub Companies
+                    self.progress.stage("sub_companies")
                     print(f"  → Importing Sub Companies...", end=" ")
-                    sub_result = self._import_sub_companies_for_symbol(symbol)
+                    sub_result = self._import_sub_companies_for_symbol(symbol, bundle=bundle, ok=ok)
                     symbol_detail["sub_companies"] = sub_result.get("count", 0)
                     result["total_sub_companies"] += symbol_detail["sub_companies"]
                     print(f"✓ SUCCESS ({symbol_detail['sub_companies']} records)")
 
+                    symbol_detail["upsert"] = {
+                        "shareholders": sh_result.get("upsert"),
+                        "officers": off_result.get("upsert"),
+                        "events": evt_result.get("upsert"),
+                        "sub_companies": sub_result.get("upsert"),
+                    }
+                    self._refresh_documents(*symbol_detail["upsert"].values(), company_ids=[symbol.company_id])
                     symbol_detail["success"] = True
                     result["symbols_processed"] += 1
                     print(f"  ✓ COMPLETED: All tables imported successfully")
@@ -155,13 +211,17 @@ class VnstockImportService:
                     error_msg = f"Import error: {str(e)}"
                     symbol_detail["errors"].append(error_msg)
                     result["symbols_failed"] += 1
+                    self.progress.fail(symbol.name, error_msg)
                     print(f"  ✗ FAILED: {error_msg}")
 
                 finally:
                     result["details"].append(symbol_detail)
-                    if self.per_symbol_sleep > 0:
+                    # Worker pool mode: rate limiter điều tiết, không sleep cố định
+                    if self.per_symbol_sleep > 0 and self.workers == 1:
                         time.sleep(self.per_symbol_sleep)
 
+            self.progress.end()
+
             # Final summary
             print(f"\n{'='*60}")
             print(f"STOCK IMPORT COMPLETE SUMMARY")
@@ -187,43 +247,38 @@ class VnstockImportService:
             print(f"\n✗ IMPORT FAILED: {error_msg}")
             return result
 
-    def _handle_rate_limit_error(self, error, symbol_name=None):
-        """Handle rate limit errors gracefully"""
+    def _handle_rate_limit_error(self, error, symbol_name=None, attempt: int = 1):
+        """
+        Báo rate limiter chung: pause mọi caller theo retry-after trong message của vnstock
+        (vd. "36 giây") và giảm tốc độ gọi. Returns: số giây pause.
+        """
+        print(f"Rate limit error for {symbol_name or 'unknown'}: {error}")
+        return self.rate_limiter.backoff(error, f"processing_{symbol_name}", attempt=attempt)
+
+    @staticmethod
+    def _is_rate_limit_error(error) -> bool:
+        if isinstance(error, SystemExit):
+            return True
         error_msg = str(error)
-        print(f"Rate limit error for {symbol_name or 'unknown'}: {error_msg}")
-        
-        if "36 giây" in error_msg or "36s" in error_msg:
-            wait_time = 40  
-        elif "30 giây" in error_msg or "30s" in error_msg:
-            wait_time = 35
-        elif "60 giây" in error_msg or "60s" in error_msg:
-            wait_time = 65
-        else:
-            wait_time = 60  
-            
-        print(f"Waiting {wait_time} seconds before retry...")
-        time.sleep(wait_time)
-        return wait_time
+        return "rate limit" in error_msg.lower() or "quá nhiều request" in error_msg
 
     def _safe_api_call(self, api_func, symbol_name=None, max_retries=3):
         """Safely call API with retry mechanism for rate limits"""
         for attempt in range(max_retries):
             try:
-                result = api_func()
-                return result 
-            except Exception as e:
-                error_msg = str(e)
-                if "rate limit" in error_msg.lower() or "quá nhiều request" in error_msg:
-                    if attempt < max_retries - 1:
-                        wait_time = self._handle_rate_limit_error(e, symbol_name)
-                        print(f"Retrying API call for {symbol_name} (attempt {attempt + 2}/{max_retries})")
-                        continue
-                    else:
-                        print(f"Failed after {max_retries} attempts for {symbol_name}: {error_msg}")
-                        return None
-                else:
-                    print(f"Non-rate-limit error for {symbol_name}: {error_msg}")
+                # Chờ qua rate limiter (gồm cả pause chung sau lỗi rate limit)
+                self.rate_limiter.wait_if_needed(f"processing_{symbol_name}")
+                return api_func()
+            except (Exception, SystemExit) as e:
+                if not self._is_rate_limit_error(e):
+                    print(f"Non-rate-limit error for {symbol_name}: {e}")
                     return None
+                if attempt < max_retries - 1:
+                    self._handle_rate_limit_error(e, symbol_name, attempt=attempt + 1)
+                    print(f"Retrying API call for {symbol_name} (attempt {attempt + 2}/{max_retries})")
+                    continue
+                print(f"Failed after {max_retries} attempts for {symbol_name}: {e}")
+                return None
         return None
     
     def import_all_symbols_from_vnstock(self, exchange: str = "HSX") -> List[Dict[str, Any]]:
@@ -246,6 +301,7 @@ class VnstockImportService:
             
             results = self._bulk_import_symbols(symbols_df, exchange)
             print(f"Import completed! {len(results)} symbols imported successfully")
+            refresh_symbol_search()
             return results
             
         except Exception as e:
@@ -287,6 +343,8 @@ class VnstockImportService:
         results = []
         batch_size = 50
         total_imported = 0
+        # 1 lần gọi API lấy toàn bộ danh sách -> không checkpoint theo symbol, chỉ đếm tiến độ
+        self.progress.begin("symbols", symbols_df.index)
         
         for i in range(0, len(symbols_df), batch_size):
             batch_df = symbols_df.iloc[i:i+batch_size]
@@ -294,11 +352,13 @@ class VnstockImportService:
             
             results.extend(batch_results)
             total_imported += len(batch_results)
+            self.progress.advance(count=len(batch_df))
             print(f"Batch {i//batch_size + 1}: Imported {len(batch_results)} symbols (Total: {total_imported})")
             
             if self.per_symbol_sleep > 0:
                 time.sleep(self.per_symbol_sleep * 5)
         
+        self.progress.end()
         return results
     
     def _import_symbol_batch(self, batch_df, exchange: str) -> List[Dict[str, Any]]:
@@ -351,7 +411,8 @@ class VnstockImportService:
             total_processed = 0
             companies_created = 0
             
-            for symbol in symbols_queryset:
+            symbols = self.progress.begin("companies", symbols_queryset)
+            for symbol in self.progress.track(symbols):
                 try:
                     print(f"Processing symbol: {symbol.name}")
                     
@@ -359,6 +420,7 @@ class VnstockImportService:
                     company_info = self._fetch_company_info_from_vnstock(symbol.name)
                     if not company_info:
                         print(f"No company info found for symbol: {symbol.name}")
+                        self.progress.fail(symbol.name, "No company info")
                         continue
                     
                     company = self._upsert_company_from_info(company_info)
@@ -379,12 +441,17 @@ class VnstockImportService:
                     
                 except Exception as e:
                     print(f"Error processing symbol {symbol.name}: {e}")
+                    self.progress.fail(symbol.name, e)
                     continue
                 
                 if self.per_symbol_sleep > 0:
                     time.sleep(self.per_symbol_sleep)
+            self.progress.end()
             
             print(f"Import companies completed! Processed: {total_processed}, Companies: {companies_created}")
+            if results:
+                self._refresh_documents()
+                refresh_symbol_search()
             return results
             
         except Exception as e:
@@ -522,11 +589,6 @@ class VnstockImportService:
                     results.append(result)
                     print(f"Updated company for symbol: {symbol.name}")
                 
-                if self.per_symbol_sleep > 0:
-                    time.sleep(self.per_symbol_sleep)
-                else:
-                    time.sleep(1.0) 
-                
             except Exception as e:
                 print(f"Error importing company for {symbol.name}: {e}")
                 continue
@@ -535,6 +597,8 @@ class VnstockImportService:
                 time.sleep(self.per_symbol_sleep)
         
         print(f"Company import completed! {len(results)} companies processed")
+        if results:
+            refresh_symbol_search()
         return results
     
     def import_industries_for_symbols(self) -> List[Dict[str, Any]]:
@@ -582,10 +646,10 @@ class VnstockImportService:
             print(f"Imported {industries_imported} industries")
             
             print("Creating Symbol-Industry relationships...")
-            symbols = Symbol.objects.all()
+            symbols = self.progress.begin("industries", Symbol.objects.all())
             relationships_created = 0
             
-            for symbol in symbols:
+            for symbol in self.progress.track(symbols):
                 try:
                     symbol_name = symbol.name.upper()
                     try:
@@ -646,9 +710,13 @@ class VnstockImportService:
                         
                 except Exception as e:
                     print(f"Error processing symbol {symbol.name}: {e}")
+                    self.progress.fail(symbol.name, e)
                     continue
+            self.progress.end()
             
             print(f"Industry import completed! Created {relationships_created} Symbol-Industry relationships")
+            if results:
+                self._refresh_documents()
             return results
             
         except Exception as e:
@@ -667,60 +735,54 @@ class VnstockImportService:
         print(f"Processing {total_symbols} symbols with companies...")
         
         processed = 0
-        batch_size = 20 
-        
-        for i in range(0, total_symbols, batch_size):
-            batch_symbols = symbols[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1}: {len(batch_symbols)} symbols")
-            
-            for symbol in batch_symbols:
-                try:
-                    symbol_name = symbol.name
 
-                    # Sử dụng cache để lấy bundle data
-                    bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
-                    if not bundle:
-                        print(f"No bundle data for {symbol.name}")
-                        continue
+        symbols = self.progress.begin("shareholders", symbols)
+        for symbol, bundle, ok, fetch_error in self.progress.track(self._iter_symbol_bundles(symbols)):
+            try:
+                symbol_name = symbol.name
 
-                    shareholders_df = bundle.get("shareholders_df")
-                    if shareholders_df is None or shareholders_df.empty:
-                        print(f"No shareholders data for {symbol.name}")
-                        continue
-                    
-                    shareholder_rows = []
-                    for _, row in shareholders_df.iterrows():
-                        shareholder_row = {
-                            'share_holder': safe_str(row.get('shareholder') or row.get('share_holder') or row.get('name')),
-                            'quantity': safe_int(row.get('quantity') or row.get('shares')),
-                            'share_own_percent': safe_decimal(row.get('percentage') or row.get('share_own_percent') or row.get('ownership')),
-                            'update_date': to_datetime(row.get('date') or row.get('update_date'))
-                        }
-                        shareholder_rows.append(shareholder_row)
-                    
-                    if shareholder_rows:
-                        repo.upsert_shareholders(symbol.company, shareholder_rows)
-                        
-                        results.append({
-                            'symbol': symbol.name,
-                            'shareholders_count': len(shareholder_rows),
-                            'status': 'imported'
-                        })
-                        
-                        print(f"✓ {symbol.name}: {len(shareholder_rows)} shareholders")
-                    
-                    processed += 1
-                    
-                    self.rate_limiter.wait_if_needed(f"processing_{symbol.name}")
-                    if self.per_symbol_sleep > 0:
-                        time.sleep(self.per_symbol_sleep)
-                    else:
-                        time.sleep(0.5)  
-                    
-                except Exception as e:
-                    print(f"✗ Error with {symbol.name}: {e}")
+                if not bundle:
+                    print(f"No bundle data for {symbol.name}")
                     continue
+
+                shareholders_df = bundle.get("shareholders_df")
+                if shareholders_df is None or shareholders_df.empty:
+                    print(f"No shareholders data for {symbol.name}")
+                    continue
+            
+                shareholder_rows = []
+                for _, row in shareholders_df.iterrows():
+                    shareholder_row = {
+                        'share_holder': safe_str(row.get('shareholder') or row.get('share_holder') or row.get('name')),
+                        'quantity': safe_int(row.get('quantity') or row.get('shares')),
+                        'share_own_percent': safe_decimal(row.get('percentage') or row.get('share_own_percent') or row.get('ownership')),
+                        'update_date': to_datetime(row.get('date') or row.get('update_date'))
+                    }
+                    shareholder_rows.append(shareholder_row)
             
+                if shareholder_rows:
+                    stats = repo.upsert_shareholders(symbol.company, shareholder_rows)
+                    self._refresh_documents(stats, company_ids=[symbol.company_id])
+                
+                    results.append({
+                        **stats,
+                        'symbol': symbol.name,
+                        'shareholders_count': len(shareholder_rows),
+                        'status': 'imported'
+                    })
+                
+                    print(f"✓ {symbol.name}: {len(shareholder_rows)} shareholders")
+            
+                processed += 1
+            
+                self._pace_sequential(symbol.name)
+            
+            except Exception as e:
+                print(f"✗ Error with {symbol.name}: {e}")
+                self.progress.fail(symbol.name, e)
+                continue
+        self.progress.end()
+
         print(f"Shareholders import completed! Processed {processed}/{total_symbols} symbols, {len(results)} successful")
         return results
     
@@ -736,56 +798,50 @@ class VnstockImportService:
         print(f"Processing {total_symbols} symbols with companies...")
 
         processed = 0
-        batch_size = 20 
-        
-        for i in range(0, total_symbols, batch_size):
-            batch_symbols = symbols[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1}: {len(batch_symbols)} symbols")
+
+        symbols = self.progress.begin("officers", symbols)
+        for symbol, bundle, ok, fetch_error in self.progress.track(self._iter_symbol_bundles(symbols)):
+            try:
+                if not bundle:
+                    continue
             
-            for symbol in batch_symbols:
-                try:
-                    bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
-                    if not bundle:
-                        continue
-                    
-                    officers_df = bundle.get("officers_df")
-                    if officers_df is None or officers_df.empty:
-                        continue
-                    
-                    officer_rows = []
-                    for _, row in officers_df.iterrows():
-                        officer_row = {
-                            'officer_name': safe_str(row.get('officer_name') or row.get('name')),
-                            'officer_position': safe_str(row.get('officer_position') or row.get('position')),
-                            'position_short_name': safe_str(row.get('position_short_name') or row.get('short_name')),
-                            'officer_owner_percent': safe_decimal(row.get('officer_owner_percent') or row.get('ownership') or row.get('percentage'))
-                        }
-                        officer_rows.append(officer_row)
-                    
-                    if officer_rows:
-                        repo.upsert_officers(symbol.company, officer_rows)
-                        
-                        results.append({
-                            'symbol': symbol.name,
-                            'officers_count': len(officer_rows),
-                            'status': 'imported'
-                        })
-                        
-                        print(f"✓ {symbol.name}: {len(officer_rows)} officers")
-                    
-                    processed += 1
-                    
-                    self.rate_limiter.wait_if_needed(f"processing_{symbol.name}")
-                    if self.per_symbol_sleep > 0:
-                        time.sleep(self.per_symbol_sleep)
-                    else:
-                        time.sleep(0.5)  
-                    
-                except Exception as e:
-                    print(f"✗ Error with {symbol.name}: {e}")
+                officers_df = bundle.get("officers_df")
+                if officers_df is None or officers_df.empty:
                     continue
             
-        
+                officer_rows = []
+                for _, row in officers_df.iterrows():
+                    officer_row = {
+                        'officer_name': safe_str(row.get('officer_name') or row.get('name')),
+                        'officer_position': safe_str(row.get('officer_position') or row.get('position')),
+                        'position_short_name': safe_str(row.get('position_short_name') or row.get('short_name')),
+                        'officer_owner_percent': safe_decimal(row.get('officer_owner_percent') or row.get('ownership') or row.get('percentage'))
+                    }
+                    officer_rows.append(officer_row)
+            
+                if officer_rows:
+                    stats = repo.upsert_officers(symbol.company, officer_rows)
+                    self._refresh_documents(stats, company_ids=[symbol.company_id])
+                
+                    results.append({
+                        **stats,
+                        'symbol': symbol.name,
+                        'officers_count': len(officer_rows),
+                        'status': 'imported'
+                    })
+                
+                    print(f"✓ {symbol.name}: {len(officer_rows)} officers")
+            
+                processed += 1
+            
+                self._pace_sequential(symbol.name)
+            
+            except Exception as e:
+                print(f"✗ Error with {symbol.name}: {e}")
+                self.progress.fail(symbol.name, e)
+                continue
+        self.progress.end()
+
         print(f"Officers import completed! Processed {processed}/{total_symbols} symbols, {len(results)} successful")
         return results
     
@@ -801,55 +857,50 @@ class VnstockImportService:
         print(f"Processing {total_symbols} symbols with companies...")
 
         processed = 0
-        batch_size = 20  # Increased batch size
-        
-        for i in range(0, total_symbols, batch_size):
-            batch_symbols = symbols[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1}: {len(batch_symbols)} symbols")
+
+        symbols = self.progress.begin("events", symbols)
+        for symbol, bundle, ok, fetch_error in self.progress.track(self._iter_symbol_bundles(symbols)):
+            try:
+                if not bundle:
+                    continue
             
-            for symbol in batch_symbols:
-                try:
-                    bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
-                    if not bundle:
-                        continue
-                    
-                    events_df = bundle.get("events_df")
-                    if events_df is None or events_df.empty:
-                        continue
-                    
-                    event_rows = []
-                    for _, row in events_df.iterrows():
-                        event_row = {
-                            'event_title': safe_str(row.get('event_title') or row.get('title')),
-                            'public_date': to_datetime(row.get('public_date') or row.get('date')),
-                            'issue_date': to_datetime(row.get('issue_date')),
-                            'source_url': safe_str(row.get('source_url') or row.get('url'))
-                        }
-                        event_rows.append(event_row)
-                    
-                    if event_rows:
-                        repo.upsert_events(symbol.company, event_rows)
-                        
-                        results.append({
-                            'symbol': symbol.name,
-                            'events_count': len(event_rows),
-                            'status': 'imported'
-                        })
-                        
-                        print(f"✓ {symbol.name}: {len(event_rows)} events")
-                    
-                    processed += 1
-                    
-                    self.rate_limiter.wait_if_needed(f"processing_{symbol.name}")
-                    if self.per_symbol_sleep > 0:
-                        time.sleep(self.per_symbol_sleep)
-                    else:
-                        time.sleep(0.5)
-                    
-                except Exception as e:
-                    print(f"✗ Error with {symbol.name}: {e}")
+                events_df = bundle.get("events_df")
+                if events_df is None or events_df.empty:
                     continue
             
+                event_rows = []
+                for _, row in events_df.iterrows():
+                    event_row = {
+                        'event_title': safe_str(row.get('event_title') or row.get('title')),
+                        'public_date': to_datetime(row.get('public_date') or row.get('date')),
+                        'issue_date': to_datetime(row.get('issue_date')),
+                        'source_url': safe_str(row.get('source_url') or row.get('url'))
+                    }
+                    event_rows.append(event_row)
+            
+                if event_rows:
+                    stats = repo.upsert_events(symbol.company, event_rows)
+                    self._refresh_documents(stats, company_ids=[symbol.company_id])
+                
+                    results.append({
+                        **stats,
+                        'symbol': symbol.name,
+                        'events_count': len(event_rows),
+                        'status': 'imported'
+                    })
+                
+                    print(f"✓ {symbol.name}: {len(event_rows)} events")
+            
+                processed += 1
+            
+                self._pace_sequential(symbol.name)
+            
+            except Exception as e:
+                print(f"✗ Error with {symbol.name}: {e}")
+                self.progress.fail(symbol.name, e)
+                continue
+        self.progress.end()
+
         print(f"Events import completed! Processed {processed}/{total_symbols} symbols, {len(results)} successful")
         return results
 
@@ -870,65 +921,63 @@ class VnstockImportService:
         print(f"Found {total_symbols} symbols with companies")
 
         processed = 0
-        batch_size = 25  
-        
-        for i in range(0, total_symbols, batch_size):
-            batch_symbols = symbols[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1}: {len(batch_symbols)} symbols")
+
+        symbols = self.progress.begin("sub_companies", symbols)
+        for symbol, bundle, ok, fetch_error in self.progress.track(self._iter_symbol_bundles(symbols)):
+            try:
+                if not bundle:
+                    continue
             
-            for symbol in batch_symbols:
-                try:
-                    bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
-                    if not bundle:
-                        continue
-                    
-                    subsidiaries_df = bundle.get("subsidiaries")
-                    if subsidiaries_df is None or subsidiaries_df.empty:
-                        continue
-                    
-                    sub_company_rows = []
-                    for _, row in subsidiaries_df.iterrows():
-                        sub_company_row = {
-                            'company_name': safe_str(row.get('sub_company_name') or row.get('company_name') or row.get('name')),
-                            'sub_own_percent': safe_decimal(row.get('sub_own_percent') or row.get('ownership_percentage') or row.get('percentage'))
-                        }
-                        sub_company_rows.append(sub_company_row)
-                    
-                    if sub_company_rows:
-                        repo.upsert_sub_company(sub_company_rows, symbol.company)
-                        
-                        results.append({
-                            'symbol': symbol.name,
-                            'sub_companies_count': len(sub_company_rows),
-                            'status': 'imported'
-                        })
-                        
-                        print(f"✓ {symbol.name}: {len(sub_company_rows)} sub companies")
-                    
-                    processed += 1
-                    
-                    self.rate_limiter.wait_if_needed(f"processing_{symbol.name}")
-                    if self.per_symbol_sleep > 0:
-                        time.sleep(self.per_symbol_sleep)
-                    else:
-                        time.sleep(0.5) 
-                    
-                except Exception as e:
-                    print(f"✗ Error with {symbol.name}: {e}")
+                subsidiaries_df = bundle.get("subsidiaries")
+                if subsidiaries_df is None or subsidiaries_df.empty:
                     continue
             
+                sub_company_rows = []
+                for _, row in subsidiaries_df.iterrows():
+                    sub_company_row = {
+                        'company_name': safe_str(row.get('sub_company_name') or row.get('company_name') or row.get('name')),
+                        'sub_own_percent': safe_decimal(row.get('sub_own_percent') or row.get('ownership_percentage') or row.get('percentage'))
+                    }
+                    sub_company_rows.append(sub_company_row)
+            
+                if sub_company_rows:
+                    stats = repo.upsert_sub_company(sub_company_rows, symbol.company)
+                    self._refresh_documents(stats, company_ids=[symbol.company_id])
+                
+                    results.append({
+                        **stats,
+                        'symbol': symbol.name,
+                        'sub_companies_count': len(sub_company_rows),
+                        'status': 'imported'
+                    })
+                
+                    print(f"✓ {symbol.name}: {len(sub_company_rows)} sub companies")
+            
+                processed += 1
+            
+                self._pace_sequential(symbol.name)
+            
+            except Exception as e:
+                print(f"✗ Error with {symbol.name}: {e}")
+                self.progress.fail(symbol.name, e)
+                continue
+        self.progress.end()
+
         print(f"Sub companies import completed! Processed {processed}/{total_symbols} symbols, {len(results)} successful")
         return results
 
-    def _import_shareholders_for_symbol(self, symbol: Symbol) -> Dict[str, Any]:
-        """Import shareholders for a single symbol"""
+    def _import_shareholders_for_symbol(
+        self, symbol: Symbol, bundle: Optional[Dict[str, pd.DataFrame]] = None, ok: bool = True
+    ) -> Dict[str, Any]:
+        """Import shareholders for a single symbol (bundle đã fetch sẵn thì dùng lại, không fetch lại)"""
         result = {"symbol": symbol.name, "count": 0, "errors": []}
 
         try:
             if not hasattr(symbol, 'company') or symbol.company is None:
                 return result
 
-            bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
+            if bundle is None:
+                bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
             if not ok or not bundle:
                 return result
 
@@ -947,7 +996,7 @@ class VnstockImportService:
                 shareholder_rows.append(shareholder_row)
 
             if shareholder_rows:
-                repo.upsert_shareholders(symbol.company, shareholder_rows)
+                result["upsert"] = repo.upsert_shareholders(symbol.company, shareholder_rows)
                 result["count"] = len(shareholder_rows)
 
         except Exception as e:
@@ -955,15 +1004,18 @@ class VnstockImportService:
 
         return result
 
-    def _import_officers_for_symbol(self, symbol: Symbol) -> Dict[str, Any]:
-        """Import officers for a single symbol"""
+    def _import_officers_for_symbol(
+        self, symbol: Symbol, bundle: Optional[Dict[str, pd.DataFrame]] = None, ok: bool = True
+    ) -> Dict[str, Any]:
+        """Import officers for a single symbol (bundle đã fetch sẵn thì dùng lại, không fetch lại)"""
         result = {"symbol": symbol.name, "count": 0, "errors": []}
 
         try:
             if not hasattr(symbol, 'company') or symbol.company is None:
                 return result
 
-            bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
+            if bundle is None:
+                bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
             if not ok or not bundle:
                 return result
 
@@ -982,7 +1034,7 @@ class VnstockImportService:
                 officer_rows.append(officer_row)
 
             if officer_rows:
-                repo.upsert_officers(symbol.company, officer_rows)
+                result["upsert"] = repo.upsert_officers(symbol.company, officer_rows)
                 result["count"] = len(officer_rows)
 
         except Exception as e:
@@ -990,15 +1042,18 @@ class VnstockImportService:
 
         return result
 
-    def _import_events_for_symbol(self, symbol: Symbol) -> Dict[str, Any]:
-        """Import events for a single symbol"""
+    def _import_events_for_symbol(
+        self, symbol: Symbol, bundle: Optional[Dict[str, pd.DataFrame]] = None, ok: bool = True
+    ) -> Dict[str, Any]:
+        """Import events for a single symbol (bundle đã fetch sẵn thì dùng lại, không fetch lại)"""
         result = {"symbol": symbol.name, "count": 0, "errors": []}
 
         try:
             if not hasattr(symbol, 'company') or symbol.company is None:
                 return result
 
-            bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
+            if bundle is None:
+                bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
             if not ok or not bundle:
                 return result
 
@@ -1017,7 +1072,7 @@ class VnstockImportService:
                 event_rows.append(event_row)
 
             if event_rows:
-                repo.upsert_events(symbol.company, event_rows)
+                result["upsert"] = repo.upsert_events(symbol.company, event_rows)
                 result["count"] = len(event_rows)
 
         except Exception as e:
@@ -1025,15 +1080,18 @@ class VnstockImportService:
 
         return result
 
-    def _import_sub_companies_for_symbol(self, symbol: Symbol) -> Dict[str, Any]:
-        """Import sub companies for a single symbol"""
+    def _import_sub_companies_for_symbol(
+        self, symbol: Symbol, bundle: Optional[Dict[str, pd.DataFrame]] = None, ok: bool = True
+    ) -> Dict[str, Any]:
+        """Import sub companies for a single symbol (bundle đã fetch sẵn thì dùng lại, không fetch lại)"""
         result = {"symbol": symbol.name, "count": 0, "errors": []}
 
         try:
             if not hasattr(symbol, 'company') or symbol.company is None:
                 return result
 
-            bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
+            if bundle is None:
+                bundle, ok = self.cache_service.fetch_company_bundle_with_cache(symbol.name)
             if not ok or not bundle:
                 return result
 
@@ -1050,7 +1108,7 @@ class VnstockImportService:
                 sub_company_rows.append(sub_company_row)
 
             if sub_company_rows:
-                repo.upsert_sub_company(sub_company_rows, symbol.company)
+                result["upsert"] = repo.upsert_sub_company(sub_company_rows, symbol.company)
                 result["count"] = len(sub_company_rows)
 
         except Exception as e:
@@ -1,7 +1,12 @@
+import json
+
 from django.test import TestCase
 from django.urls import reverse
 from django.test import Client
 
+from apps.stock.models import Company, Symbol
+from core.cursor import encode_cursor
+
 from .factories import create_company_bundle
 
 
@@ -25,3 +30,61 @@ class TestStockAPI(TestCase):
     def test_get_symbol_not_found(self):
         resp = self.client.get("/api/stocks/symbols/ZZZZ")
         self.assertEqual(resp.status_code, 404)
+
+    def test_symbol_document_supports_etag(self):
+        company = Company.objects.create(company_name="Etag Co")
+        symbol = Symbol.objects.create(name="ETG", exchange="HSX", company=company)
+
+        resp = self.client.get(f"/api/stocks/symbols/{symbol.id}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["company"]["id"], company.id)
+        etag = resp["ETag"]
+
+        cached = self.client.get(f"/api/stocks/symbols/{symbol.id}", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], etag)
+
+        self.assertEqual(self.client.get("/api/stocks/symbols/999999").status_code, 404)
+
+    def test_symbols_keyset_pages_and_ndjson_export(self):
+        company = Company.objects.create(company_name="Page Co")
+        for name in ["CCC", "AAA", "BBB", "DDD", "EEE"]:
+            Symbol.objects.create(name=name, exchange="HSX", company=company if name == "AAA" else None)
+
+        names, cursor = [], None
+        while True:
+            params = {"limit": 2, "order": "name", **({"cursor": cursor} if cursor else {})}
+            page = self.client.get("/api/stocks/symbols/page", params).json()
+            names += [item["name"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(names, ["AAA", "BBB", "CCC", "DDD", "EEE"])
+        self.assertEqual(self.client.get("/api/stocks/symbols/page", {"cursor": "%%"}).status_code, 400)
+        # Cursor bị sửa tay: 400 thay vì 500
+        tampered = [("id", {"id": None}), ("id", {"id": "x"}), ("name", {"id": 1}), ("name", {"id": 1, "name": 2})]
+        for order, values in tampered:
+            resp = self.client.get("/api/stocks/symbols/page", {"order": order, "cursor": encode_cursor(values)})
+            self.assertEqual(resp.status_code, 400, values)
+
+        resp = self.client.get("/api/stocks/symbols/export", {"chunk_size": 2})
+        self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+        self.assertEqual([row["name"] for row in rows], ["CCC", "AAA", "BBB", "DDD", "EEE"])
+        self.assertEqual(rows[1]["company"]["company_name"], "Page Co")
+
+    def test_search_by_name_uses_index_and_returns_company_name(self):
+        company = Company.objects.create(company_name="Ngân hàng Á Châu")
+        Symbol.objects.create(name="ACB", exchange="HSX", company=company)
+        Symbol.objects.create(name="ACBS", exchange="HNX")
+
+        resp = self.client.get("/api/stocks/symbols/by-name/acb")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp.json(),
+            [
+                {"id": resp.json()[0]["id"], "name": "ACB", "exchange": "HSX", "company_name": "Ngân hàng Á Châu"},
+                {"id": resp.json()[1]["id"], "name": "ACBS", "exchange": "HNX", "company_name": None},
+            ],
+        )
+        self.assertEqual([r["name"] for r in self.client.get("/api/stocks/symbols/by-name/a chau").json()], ["ACB"])
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.test import TestCase
+
+from apps.stock.models import Company, Officers, ShareHolder, SubCompany
+from apps.stock.repositories import repositories as repo
+
+
+class TestBulkUpsert(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(company_name="Acme Corp")
+
+    def test_shareholders_insert_update_unchanged_counts(self):
+        rows = [
+            {"share_holder": "Founder", "quantity": 1000, "share_own_percent": 12.3456, "update_date": "2024-01-02"},
+            {"share_holder": "Fund A", "quantity": 500, "share_own_percent": 5.0, "update_date": None},
+        ]
+        first = repo.upsert_shareholders(self.company, rows)
+        self.assertEqual(first, {"inserted": 2, "updated": 0, "unchanged": 0})
+
+        rows[1] = {**rows[1], "quantity": 750}
+        rows.append({"share_holder": " Fund B ", "quantity": 10, "share_own_percent": 0.1, "update_date": None})
+        second = repo.upsert_shareholders(self.company, rows)
+
+        self.assertEqual(second, {"inserted": 1, "updated": 1, "unchanged": 1})
+        self.assertEqual(ShareHolder.objects.filter(company=self.company).count(), 3)
+        self.assertEqual(ShareHolder.objects.get(share_holder="Fund A").quantity, 750)
+        self.assertEqual(ShareHolder.objects.get(share_holder="Founder").update_date, date(2024, 1, 2))
+
+    def test_officers_use_natural_key_without_duplicates(self):
+        rows = [{"officer_name": "Jane", "officer_position": "CEO", "position_short_name": "CEO", "officer_owner_percent": 1.5}]
+        repo.upsert_officers(self.company, rows)
+        stats = repo.upsert_officers(self.company, rows)
+
+        self.assertEqual(stats, {"inserted": 0, "updated": 0, "unchanged": 1})
+        self.assertEqual(Officers.objects.filter(company=self.company).count(), 1)
+
+    def test_rows_missing_required_values_are_skipped(self):
+        stats = repo.upsert_sub_company(
+            [{"company_name": "Sub 1", "sub_own_percent": 51.0}, {"company_name": "Sub 2", "sub_own_percent": None}],
+            self.company,
+        )
+
+        self.assertEqual(stats["inserted"], 1)
+        self.assertEqual(list(SubCompany.objects.values_list("company_name", flat=True)), ["Sub 1"])
@@ -0,0 +1,536 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import pandas as pd
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.stock.models import Company, Events, Officers, ShareHolder, SubCompany, Symbol, SymbolDocument
+from apps.stock.services.bundle_prefetcher import BundlePrefetcher
+from apps.stock.services.cache_service import VNStockCacheService
+from apps.stock.services.cache_store import DjangoCacheStore, SQLiteCacheStore
+from apps.stock.services.coverage_planner import CoveragePlanner, stock_coverage_checks
+from apps.stock.services.rate_limiter import (
+    AIMDThrottle,
+    Bucket,
+    SQLiteLimiterState,
+    VNStockRateLimiter,
+    gcra_reserve,
+    parse_retry_after,
+)
+from apps.stock.services.symbol_documents import SymbolDocumentStore
+from apps.stock.services.symbol_search import SymbolSearch, SymbolSearchIndex, warm_symbol_search
+
+
+class _FakeCacheService:
+    def __init__(self, delay: float = 0.0, fail_on: str | None = None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.threads = set()
+
+    def fetch_company_bundle_with_cache(self, symbol):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.threads.add(threading.get_ident())
+        try:
+            time.sleep(self.delay)
+            if symbol == self.fail_on:
+                raise RuntimeError("upstream down")
+            return {"symbol": symbol}, True
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class TestBundlePrefetcher(SimpleTestCase):
+    def test_sequential_keeps_order(self):
+        prefetcher = BundlePrefetcher(_FakeCacheService(), workers=1)
+
+        names = [symbol for symbol, _, _, _ in prefetcher.iter_bundles(["AAA", "BBB", "CCC"])]
+
+        self.assertEqual(names, ["AAA", "BBB", "CCC"])
+
+    def test_workers_fetch_concurrently_and_yield_on_caller_thread(self):
+        cache = _FakeCacheService(delay=0.05)
+        prefetcher = BundlePrefetcher(cache, workers=4)
+        caller = threading.get_ident()
+        symbols = [f"S{i:02d}" for i in range(12)]
+
+        seen = []
+        for symbol, bundle, ok, error in prefetcher.iter_bundles(symbols):
+            self.assertEqual(threading.get_ident(), caller)
+            self.assertEqual(bundle, {"symbol": symbol})
+            self.assertTrue(ok)
+            self.assertIsNone(error)
+            seen.append(symbol)
+
+        self.assertCountEqual(seen, symbols)
+        self.assertGreater(cache.max_in_flight, 1)
+        self.assertLessEqual(cache.max_in_flight, 4)
+        self.assertNotIn(caller, cache.threads)
+
+    def test_fetch_error_is_reported_per_symbol(self):
+        prefetcher = BundlePrefetcher(_FakeCacheService(fail_on="BAD"), workers=2)
+
+        results = {symbol: (ok, error) for symbol, _, ok, error in prefetcher.iter_bundles(["AAA", "BAD"])}
+
+        self.assertEqual(results["AAA"], (True, None))
+        self.assertEqual(results["BAD"], (False, "upstream down"))
+
+
+class TestCoveragePlanner(TestCase):
+    def setUp(self):
+        full = Company.objects.create(company_name="Full Co")
+        ShareHolder.objects.create(company=full, share_holder="Founder")
+        Officers.objects.create(company=full, officer_name="Jane")
+        Events.objects.create(company=full, event_title="AGM")
+        SubCompany.objects.create(parent=full, company_name="Sub", sub_own_percent=51.0)
+        partial = Company.objects.create(company_name="Partial Co")
+        ShareHolder.objects.create(company=partial, share_holder="Fund")
+
+        Symbol.objects.create(name="AAA", exchange="HSX", company=full)
+        Symbol.objects.create(name="BBB", exchange="HSX", company=partial)
+        Symbol.objects.create(name="CCC", exchange="HNX")
+
+    def test_plan_orders_by_missing_tables_in_one_query(self):
+        planner = CoveragePlanner(stock_coverage_checks())
+
+        with self.assertNumQueries(1):
+            plan = planner.plan()
+            names = [item.symbol.name for item in plan]
+            company = plan[1].symbol.company
+
+        self.assertEqual(names, ["CCC", "BBB"])
+        self.assertEqual(plan[1].missing, ["officers", "events", "sub_companies"])
+        self.assertEqual(company.company_name, "Partial Co")
+        self.assertEqual(len(planner.plan(force=True)), 3)
+
+    def test_summary_counts_per_exchange(self):
+        summary = CoveragePlanner(stock_coverage_checks()).summary()
+
+        self.assertEqual(summary["total"]["count"], 3)
+        self.assertEqual(summary["total"]["with_company"], 2)
+        self.assertEqual(summary["total"]["with_shareholders"], 2)
+        self.assertEqual(summary["total"]["with_sub_companies"], 1)
+        self.assertEqual(
+            {row["exchange"]: row["with_company"] for row in summary["by_exchange"]},
+            {"HSX": 2, "HNX": 0},
+        )
+
+
+class TestSQLiteCacheStore(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "vnstock.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_values_are_shared_between_store_instances(self):
+        df = pd.DataFrame({"symbol": ["AAA"] * 500, "price": range(500)})
+        SQLiteCacheStore(self.path).set("vnstock_cache:symbols_list:x", df, ttl=60)
+
+        other = SQLiteCacheStore(self.path)
+        pd.testing.assert_frame_equal(other.get("vnstock_cache:symbols_list:x"), df)
+        stats = other.stats()["namespaces"]["symbols_list"]
+        self.assertEqual(stats["entries"], 1)
+        self.assertLess(stats["stored_bytes"], stats["raw_bytes"])
+
+    def test_expired_entries_are_not_returned(self):
+        store = SQLiteCacheStore(self.path)
+        store.set("vnstock_cache:industries_data", {"a": 1}, ttl=-1)
+
+        self.assertIsNone(store.get("vnstock_cache:industries_data"))
+        stats = store.stats()["namespaces"]["industries_data"]
+        self.assertEqual((stats["entries"], stats["misses"], stats["evictions"]), (0, 1, 1))
+
+    def test_hits_are_counted_in_memory_and_flushed(self):
+        store = SQLiteCacheStore(self.path, metrics_flush_interval=3600)
+        store.set("vnstock_cache:industries_data", {"a": 1}, ttl=60)
+        other = SQLiteCacheStore(self.path)
+        self.assertNotIn("industries_data", other.metrics_snapshot())
+
+        # Cache hit không ghi vào file
+        for _ in range(5):
+            self.assertEqual(store.get("vnstock_cache:industries_data"), {"a": 1})
+        self.assertNotIn("industries_data", other.metrics_snapshot())
+
+        self.assertEqual(store.stats()["namespaces"]["industries_data"]["hits"], 5)
+        counters = other.metrics_snapshot()["industries_data"]
+        self.assertEqual((counters["stores"], counters["hits"]), (1, 5))
+
+    def test_company_bundle_roundtrip_keeps_dataframes(self):
+        service = VNStockCacheService(store=SQLiteCacheStore(self.path))
+        bundle = {"officers_df": pd.DataFrame({"officer_name": ["Jane"]}), "events_df": pd.DataFrame()}
+        service.set_cached_company_bundle("aaa", bundle, True)
+
+        cached, ok = VNStockCacheService(store=SQLiteCacheStore(self.path)).get_cached_company_bundle("AAA")
+
+        self.assertTrue(ok)
+        pd.testing.assert_frame_equal(cached["officers_df"], bundle["officers_df"])
+        self.assertTrue(cached["events_df"].empty)
+
+
+class TestCacheInvalidationAndMetrics(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _stores(self):
+        from django.core.cache.backends.locmem import LocMemCache
+
+        return [
+            SQLiteCacheStore(os.path.join(self.tmpdir.name, "vnstock.sqlite3")),
+            DjangoCacheStore(backend=LocMemCache("vnstock-test", {})),
+        ]
+
+    def test_pattern_invalidation_and_per_namespace_counters(self):
+        for store in self._stores():
+            with self.subTest(store=type(store).__name__):
+                service = VNStockCacheService(store=store)
+                for name in ("VCB", "VCI", "FPT"):
+                    service.set_cached_company_bundle(name, {"officers_df": pd.DataFrame({"a": [1]})}, True)
+                service.set_cached_symbols_list(pd.DataFrame({"symbol": ["AAA"]}), "HSX")
+                service.set_cached_symbols_list(pd.DataFrame({"symbol": ["BBB"]}), "HNX")
+
+                self.assertEqual(service.clear_cache("company_bundle:VC*"), 2)
+                self.assertEqual(service.clear_cache("symbols_list:HNX"), 1)
+                self.assertIsNone(service.get_cached_company_bundle("VCB"))
+                self.assertIsNotNone(service.get_cached_company_bundle("FPT"))
+                self.assertIsNotNone(service.get_cached_symbols_list("HSX"))
+
+                stats = service.get_cache_stats()["namespaces"]
+                bundles = stats["company_bundle"]
+                self.assertEqual((bundles["stores"], bundles["hits"], bundles["misses"]), (3, 1, 1))
+                self.assertEqual(bundles["evictions"], 2)
+                self.assertEqual(bundles["entries"], 1)
+                self.assertEqual(bundles["hit_ratio"], 0.5)
+                self.assertEqual(stats["symbols_list"]["entries"], 1)
+                self.assertEqual(stats["industries_data"]["hit_ratio"], None)
+
+
+class _SlowBundleClient:
+    def __init__(self, delay: float = 0.1):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def fetch_company_bundle_safe(self, symbol):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"officers_df": pd.DataFrame({"officer_name": [f"{symbol}-{self.calls}"]})}, True
+
+
+class TestBundleCoalescing(SimpleTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "vnstock.sqlite3")
+
+    def _service(self, **kwargs):
+        service = VNStockCacheService(store=SQLiteCacheStore(self.path), **kwargs)
+        service.client = _SlowBundleClient()
+        service.BUNDLE_LOCK_POLL_INTERVAL = 0.02
+        return service
+
+    def test_concurrent_misses_share_one_upstream_call(self):
+        service = self._service()
+        results = []
+
+        def worker():
+            results.append(service.fetch_company_bundle_with_cache("AAA"))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(service.client.calls, 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(ok for _, ok in results))
+
+    def test_waits_for_fetch_held_by_another_process(self):
+        service = self._service()
+        other = SQLiteCacheStore(self.path)
+        lock_name = service._get_cache_key("lock", "company_bundle:AAA")
+        token = other.acquire_lock(lock_name, ttl=60)
+
+        def other_process_finishes():
+            time.sleep(0.1)
+            VNStockCacheService(store=other).set_cached_company_bundle(
+                "AAA", {"officers_df": pd.DataFrame({"officer_name": ["from-other"]})}, True
+            )
+            other.release_lock(lock_name, token)
+
+        thread = threading.Thread(target=other_process_finishes)
+        thread.start()
+        bundle, ok = service.fetch_company_bundle_with_cache("AAA")
+        thread.join()
+
+        self.assertEqual(service.client.calls, 0)
+        self.assertEqual(bundle["officers_df"]["officer_name"].tolist(), ["from-other"])
+
+    def test_stale_bundle_is_served_and_refreshed_in_background(self):
+        service = self._service(stale_while_revalidate=True)
+        service.set_cached_company_bundle("AAA", {"officers_df": pd.DataFrame({"officer_name": ["old"]})}, True)
+        key = service._get_cache_key("company_bundle", "AAA")
+        entry = service.store.get(key)
+        entry["timestamp"] -= service.CACHE_TTL_COMPANY_BUNDLE + 1
+        service.store.set(key, entry, 60)
+
+        bundle, _ = service.fetch_company_bundle_with_cache("AAA")
+        self.assertEqual(bundle["officers_df"]["officer_name"].tolist(), ["old"])
+
+        deadline = time.time() + 5
+        while service.get_cached_company_bundle("AAA") is None and time.time() < deadline:
+            time.sleep(0.02)
+        fresh, _ = service.get_cached_company_bundle("AAA")
+        self.assertEqual(fresh["officers_df"]["officer_name"].tolist(), ["AAA-1"])
+        self.assertEqual(service.client.calls, 1)
+
+
+class TestRateLimiter(SimpleTestCase):
+    def test_reservations_are_spaced_without_sleeping(self):
+        limiter = VNStockRateLimiter(calls_per_minute=600, calls_per_hour=10000, min_interval=0.5)
+
+        started = time.monotonic()
+        waits = [limiter.reserve("company_bundle_AAA") for _ in range(4)]
+
+        self.assertLess(time.monotonic() - started, 0.1)
+        for expected, wait in zip([0.0, 0.5, 1.0, 1.5], waits):
+            self.assertAlmostEqual(wait, expected, delta=0.05)
+
+    def test_delayed_reservations_are_charged_from_their_start(self):
+        # "pause" hết hạn ở +37s: các call xếp hàng sau đó vẫn phải cách nhau interval
+        buckets = [
+            Bucket("pause", interval=0.0),
+            Bucket("interval", interval=1.0),
+            Bucket("minute", interval=2.0, burst=30),
+        ]
+        tats = {"pause": 37.0}
+
+        starts = []
+        for _ in range(10):
+            start, new_tats = gcra_reserve(buckets, tats, now=0.0)
+            tats.update(new_tats)
+            starts.append(start)
+
+        self.assertEqual(starts, [37.0 + i for i in range(10)])
+        self.assertEqual(tats["interval"], 47.0)
+
+    def test_endpoint_budgets_can_be_split_or_shared(self):
+        limiter = VNStockRateLimiter(
+            calls_per_minute=6000, calls_per_hour=100000, min_interval=0.0,
+            budgets={
+                "calculate_finance": {"calls_per_minute": 6, "burst": 1, "bucket": "finance"},
+                "calculate_company": {"calls_per_minute": 6, "burst": 1, "bucket": "finance"},
+            },
+        )
+
+        self.assertEqual(limiter.reserve("calculate_finance_balance_sheet"), 0.0)
+        self.assertAlmostEqual(limiter.reserve("calculate_company_VCI_ratio"), 10.0, delta=0.05)
+        self.assertLess(limiter.reserve("company_bundle_AAA"), 0.05)
+
+    def test_endpoint_held_by_its_budget_does_not_delay_others(self):
+        limiter = VNStockRateLimiter(
+            calls_per_minute=30, calls_per_hour=500, min_interval=2.5,
+            budgets={"calculate_finance": {"calls_per_minute": 2, "burst": 1}},
+        )
+
+        waits = [limiter.reserve(f"calculate_finance_{i}") for i in range(3)]
+
+        for expected, wait in zip([0.0, 30.0, 60.0], waits):
+            self.assertAlmostEqual(wait, expected, delta=0.05)
+        # Chỉ call đầu đã lấy token chung (min_interval 2.5s)
+        self.assertLess(limiter.reserve("company_bundle_AAA"), 2.5 + 0.05)
+
+    def test_shared_tokens_are_taken_when_the_held_call_runs(self):
+        limiter = VNStockRateLimiter(
+            calls_per_minute=6000, calls_per_hour=100000, min_interval=0.05,
+            budgets={"calculate_finance": {"calls_per_minute": 600, "burst": 1}},
+        )
+
+        limiter.wait_if_needed("calculate_finance_a")
+        waited = limiter.wait_if_needed("calculate_finance_b")
+        ran_at = time.time()
+
+        self.assertAlmostEqual(waited, 0.1, delta=0.05)
+        self.assertAlmostEqual(limiter.state.snapshot()["global:interval"], ran_at + 0.05, delta=0.02)
+
+    def test_budget_is_shared_across_processes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "rate.sqlite3")
+            first = VNStockRateLimiter(min_interval=1.0, state=SQLiteLimiterState(path))
+            second = VNStockRateLimiter(min_interval=1.0, state=SQLiteLimiterState(path))
+
+            self.assertEqual(first.reserve("a"), 0.0)
+            self.assertAlmostEqual(second.reserve("b"), 1.0, delta=0.05)
+            self.assertIn("global:minute", second.get_stats()["buckets"])
+
+    def test_parse_retry_after_from_vnstock_messages(self):
+        self.assertEqual(parse_retry_after(SystemExit("Quá nhiều request. Vui lòng thử lại sau 36 giây.")), 36.0)
+        self.assertEqual(parse_retry_after(RuntimeError("rate limit, retry in 12s")), 12.0)
+        self.assertEqual(parse_retry_after("try again after 1.5 seconds"), 1.5)
+        self.assertIsNone(parse_retry_after(SystemExit(1)))
+        self.assertIsNone(parse_retry_after("5 symbols failed"))
+
+    def test_backoff_pauses_every_caller_for_the_hint(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "rate.sqlite3")
+            first = VNStockRateLimiter(min_interval=0.0, state=SQLiteLimiterState(path), backoff_margin=0.0)
+            second = VNStockRateLimiter(min_interval=0.0, state=SQLiteLimiterState(path), backoff_margin=0.0)
+
+            paused = first.backoff(SystemExit("Vui lòng thử lại sau 36 giây"), "company_bundle_AAA")
+
+            self.assertEqual(paused, 36.0)
+            self.assertAlmostEqual(second.reserve("calculate_finance_init"), 36.0, delta=0.1)
+            self.assertAlmostEqual(second.get_stats()["throttle"]["factor"], 0.5)
+
+    def test_calls_queued_behind_backoff_keep_min_interval(self):
+        limiter = VNStockRateLimiter(
+            calls_per_minute=30, calls_per_hour=500, min_interval=2.5, backoff_margin=1.0,
+            throttle=AIMDThrottle(decrease=1.0),
+        )
+        limiter.backoff(SystemExit("Vui lòng thử lại sau 36 giây"), "company_bundle_AAA")
+
+        waits = [limiter.reserve(f"company_bundle_{i}") for i in range(10)]
+
+        self.assertAlmostEqual(waits[0], 37.0, delta=0.1)
+        for previous, current in zip(waits, waits[1:]):
+            self.assertGreaterEqual(current - previous, 2.5 - 0.05)
+
+    def test_backoff_without_hint_is_exponential_and_capped(self):
+        limiter = VNStockRateLimiter(default_backoff=10.0, max_backoff=25.0)
+
+        self.assertEqual(limiter.backoff(SystemExit(1), attempt=1), 10.0)
+        self.assertEqual(limiter.backoff(SystemExit(1), attempt=2), 20.0)
+        self.assertEqual(limiter.backoff(SystemExit(1), attempt=3), 25.0)
+
+    def test_aimd_decreases_once_per_pause_and_recovers_when_quiet(self):
+        throttle = AIMDThrottle(decrease=0.5, increase=0.25, quiet_period=10.0)
+
+        factor, since = throttle.penalize(1.0, 0.0, now=100.0, until=130.0)
+        self.assertEqual((factor, since), (0.5, 130.0))
+        # Caller khác dính lỗi trong cùng đợt pause: không giảm thêm
+        self.assertEqual(throttle.penalize(factor, since, now=105.0, until=135.0), (0.5, 135.0))
+
+        self.assertEqual(throttle.current(0.5, 135.0, now=140.0), 0.5)
+        self.assertEqual(throttle.current(0.5, 135.0, now=145.0), 0.75)
+        self.assertEqual(throttle.current(0.5, 135.0, now=500.0), 1.0)
+
+    def test_reduced_factor_spaces_reservations_further(self):
+        limiter = VNStockRateLimiter(
+            calls_per_minute=6000, calls_per_hour=100000, min_interval=1.0,
+            throttle=AIMDThrottle(decrease=0.5, quiet_period=3600.0), backoff_margin=0.0,
+        )
+        limiter.backoff("retry after 0 s")
+
+        self.assertEqual(limiter.reserve("a"), 0.0)
+        self.assertAlmostEqual(limiter.reserve("b"), 2.0, delta=0.05)
+
+
+class TestSymbolDocumentStore(TestCase):
+    def _company(self, name: str, shareholders: int = 0) -> Company:
+        company = Company.objects.create(company_name=name)
+        for i in range(shareholders):
+            ShareHolder.objects.create(company=company, share_holder=f"{name} holder {i}", share_own_percent=i)
+        Events.objects.create(company=company, event_title=f"{name} AGM")
+        return company
+
+    def test_rebuild_limits_children_and_bumps_version_only_on_change(self):
+        company = self._company("Doc Co", shareholders=9)
+        symbol = Symbol.objects.create(name="DOC", exchange="HSX", company=company)
+        store = SymbolDocumentStore()
+
+        self.assertEqual(store.rebuild(), {"inserted": 1, "updated": 0, "unchanged": 0})
+        body, etag = store.get(symbol.id)
+        payload = json.loads(body)
+        self.assertEqual(
+            [sh["share_holder"] for sh in payload["company"]["shareholders"]],
+            [f"Doc Co holder {i}" for i in range(8, 1, -1)],
+        )
+
+        self.assertEqual(store.rebuild(company_ids=[company.id]), {"inserted": 0, "updated": 0, "unchanged": 1})
+        Events.objects.create(company=company, event_title="EGM")
+        self.assertEqual(store.rebuild(company_ids=[company.id]), {"inserted": 0, "updated": 1, "unchanged": 0})
+
+        document = SymbolDocument.objects.get(symbol=symbol)
+        self.assertEqual(document.version, 2)
+        self.assertNotEqual(document.etag, etag)
+
+    def test_rebuild_query_count_does_not_grow_with_symbols(self):
+        def queries_for(count: int, prefix: str) -> int:
+            ids = [
+                Symbol.objects.create(name=f"{prefix}{i}", exchange="HSX", company=self._company(f"{prefix} {i}", 3)).id
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                SymbolDocumentStore().rebuild(symbol_ids=ids)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(2, "A"), queries_for(6, "B"))
+
+    def test_missing_symbol_has_no_document(self):
+        self.assertIsNone(SymbolDocumentStore().get(424242))
+
+
+class TestSymbolSearchIndex(SimpleTestCase):
+    def setUp(self):
+        rows = [
+            {"id": 1, "name": "VCB", "exchange": "HSX", "company__company_name": "Ngân hàng TMCP Ngoại thương Việt Nam"},
+            {"id": 2, "name": "VCBS", "exchange": "HNX", "company__company_name": "Chứng khoán Vietcombank"},
+            {"id": 3, "name": "AVC", "exchange": "UPCOM", "company__company_name": "Thủy điện A Vương"},
+            {"id": 4, "name": "VNM", "exchange": "HSX", "company__company_name": "Công ty Cổ phần Sữa Việt Nam - Vinamilk"},
+            {"id": 5, "name": "DVC", "exchange": "HNX", "company__company_name": None},
+        ]
+        self.index = SymbolSearchIndex(rows)
+
+    def test_ranks_exact_then_prefix_then_substring_then_company(self):
+        results = self.index.search("vc")
+        self.assertEqual([r["name"] for r in results], ["VCB", "VCBS", "AVC", "DVC"])
+
+        results = self.index.search("VCB")
+        self.assertEqual([r["name"] for r in results][:2], ["VCB", "VCBS"])
+        self.assertEqual(results[0]["company_name"], "Ngân hàng TMCP Ngoại thương Việt Nam")
+
+    def test_substring_inside_a_word_is_found(self):
+        index = SymbolSearchIndex([
+            {"id": 1, "name": "VCBS", "exchange": "HNX", "company__company_name": "Chứng khoán Vietcombank"},
+            {"id": 2, "name": "XYZ", "exchange": "HSX", "company__company_name": "CBS Holdings"},
+        ])
+        self.assertEqual([r["name"] for r in index.search("cbs")], ["VCBS", "XYZ"])
+        self.assertEqual([r["name"] for r in index.search("etcomb")], ["VCBS"])
+
+    def test_company_names_match_without_diacritics(self):
+        self.assertEqual([r["name"] for r in self.index.search("ngoai thuong")], ["VCB"])
+        self.assertEqual([r["name"] for r in self.index.search("thuy dien")], ["AVC"])
+
+    def test_fuzzy_match_tolerates_typos(self):
+        self.assertEqual([r["name"] for r in self.index.search("vinamik")], ["VNM"])
+        self.assertEqual(self.index.search("   "), [])
+
+
+class TestSymbolSearch(TestCase):
+    def test_index_is_built_on_first_search_not_at_startup(self):
+        Symbol.objects.create(name="VCB", exchange="HSX")
+        search = SymbolSearch()
+
+        with override_settings(SYMBOL_SEARCH={"WARM_ON_STARTUP": False}), \
+                mock.patch("apps.stock.services.symbol_search.threading.Thread") as thread:
+            warm_symbol_search()
+        thread.assert_not_called()
+
+        self.assertIsNone(search._index)
+        self.assertEqual([r["name"] for r in search.search("vcb")], ["VCB"])
+        self.assertEqual(len(search._index), 1)
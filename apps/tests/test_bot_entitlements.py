@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from apps.bots.models import Bot, BotType, Trade
+from apps.bots.permissions import user_has_symbol_access
+from apps.seapay.models import LicenseStatus, PaySymbolOrder, PaySymbolOrderItem, PayUserSymbolLicense
+from apps.seapay.services.entitlement_service import get_user_entitlement
+from apps.seapay.services.symbol_purchase_service import SymbolPurchaseService
+from apps.stock.models import Symbol
+from core.jwt_auth import create_tokens
+
+User = get_user_model()
+
+
+class BotEntitlementTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="trader", email="trader@example.com", password="pass12345")
+        self.owned = Symbol.objects.create(name="AAA", exchange="HSX")
+        self.other = Symbol.objects.create(name="BBB", exchange="HSX")
+        PayUserSymbolLicense.objects.create(
+            user=self.user,
+            symbol_id=self.owned.id,
+            status=LicenseStatus.ACTIVE,
+            end_at=timezone.now() + timedelta(days=30),
+        )
+
+    def _fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_access_checks_share_one_license_query(self):
+        user, next_request_user = self._fresh_user(), self._fresh_user()
+        with self.assertNumQueries(1):
+            self.assertTrue(user_has_symbol_access(user, self.owned.id))
+            self.assertFalse(user_has_symbol_access(user, self.other.id))
+            for _ in range(100):
+                user_has_symbol_access(user, self.owned.id)
+
+        # Request sau dùng cache ngắn hạn, không query lại
+        with self.assertNumQueries(0):
+            self.assertTrue(user_has_symbol_access(next_request_user, self.owned.id))
+
+    def test_new_license_invalidates_cached_entitlement(self):
+        self.assertFalse(user_has_symbol_access(self._fresh_user(), self.other.id))
+
+        order = PaySymbolOrder.objects.create(user=self.user, total_amount=100000)
+        PaySymbolOrderItem.objects.create(order=order, symbol_id=self.other.id, price=100000, license_days=30)
+        SymbolPurchaseService()._create_symbol_licenses(order)
+
+        self.assertTrue(user_has_symbol_access(self._fresh_user(), self.other.id))
+
+    def test_entitlement_expires_with_earliest_license(self):
+        PayUserSymbolLicense.objects.filter(user=self.user).update(end_at=timezone.now() - timedelta(seconds=1))
+        cache.clear()
+
+        entitlement = get_user_entitlement(self._fresh_user())
+        self.assertEqual(entitlement.symbol_ids, frozenset())
+        self.assertIsNone(entitlement.expires_at)
+
+    @override_settings(JWT_SECRET="test-secret", JWT_ALGORITHM="HS256")
+    def test_trades_and_bots_are_filtered_in_sql(self):
+        now = timezone.now()
+        for symbol in (self.owned, self.other):
+            bot = Bot.objects.create(name=f"{symbol.name} bot", bot_type=BotType.SHORT_TERM, symbol=symbol)
+            for i in range(3):
+                Trade.objects.create(
+                    bot=bot, trans_id=i, trade_type="buy", action="Open", entry_date=now - timedelta(days=i)
+                )
+
+        token = create_tokens(self.user.id, self.user.email)[0]
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        bots = client.get("/api/bots").json()
+        self.assertEqual([bot["symbol_id"] for bot in bots], [self.owned.id])
+
+        trades = client.get("/api/trades").json()["items"]
+        self.assertEqual(len(trades), 3)
+        self.assertEqual(trades, sorted(trades, key=lambda t: t["entry_date"], reverse=True))
+
+    @override_settings(JWT_SECRET="test-secret", JWT_ALGORITHM="HS256")
+    def test_trade_feed_cursor_pagination_and_columns(self):
+        bot = Bot.objects.create(name="AAA bot", bot_type=BotType.SHORT_TERM, symbol=self.owned)
+        now = timezone.now()
+        # 2 trades cùng entry_date để kiểm tra tie-break theo id
+        for i in range(7):
+            Trade.objects.create(
+                bot=bot, trans_id=i, trade_type="buy", action="Open", price="10.50",
+                entry_date=now - timedelta(hours=min(i, 5)),
+            )
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {create_tokens(self.user.id)[0]}")
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get(f"/api/bots/{bot.id}/trades", params).json()
+            seen.extend(t["id"] for t in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        expected = [str(pk) for pk in Trade.objects.order_by("-entry_date", "-id").values_list("id", flat=True)]
+        self.assertEqual(seen, expected)
+
+        columns = client.get("/api/trades", {"format": "columns", "limit": 5}).json()
+        self.assertEqual(columns["count"], 5)
+        self.assertEqual(columns["columns"]["id"], expected[:5])
+        self.assertEqual(columns["columns"]["price"], [10.5] * 5)
+        self.assertEqual(columns["columns"]["entry_ts"], sorted(columns["columns"]["entry_ts"], reverse=True))
+        self.assertIsNotNone(columns["next_cursor"])
+
+        self.assertEqual(client.get("/api/trades", {"cursor": "not-a-cursor"}).status_code, 400)
+
+        detail = client.get(f"/api/bots/{bot.id}").json()
+        self.assertEqual(len(detail["trades"]), 7)
+        self.assertIsNone(detail["trades_next_cursor"])
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.bots.models import Bot, BotPerformance, BotType, Trade
+from apps.bots.services import performance
+from apps.bots.services.performance import BotPerformanceService, compact_equity_curve
+from apps.stock.models import Symbol
+
+
+class BotPerformanceTestCase(TestCase):
+    PROFITS = [2.0, -1.0, -3.0, 4.0, 1.5, -0.5]
+
+    def setUp(self):
+        self.symbol = Symbol.objects.create(name="AAA", exchange="HSX")
+        self.bot = Bot.objects.create(name="AAA short", bot_type=BotType.SHORT_TERM, symbol=self.symbol)
+        self.start = timezone.now() - timedelta(days=30)
+        self.service = BotPerformanceService()
+
+    def _trade(self, bot, day, profit, action="Close"):
+        return Trade.objects.create(
+            bot=bot, trans_id=day, trade_type="buy", action=action, profit=profit,
+            entry_date=self.start + timedelta(days=day),
+        )
+
+    def test_rebuild_computes_metrics(self):
+        self._trade(self.bot, 0, None, action="Open")
+        for day, profit in enumerate(self.PROFITS, start=1):
+            self._trade(self.bot, day, profit)
+        self.service.rebuild([self.bot.id])
+
+        perf = self.service.bot_performance(self.bot)
+        self.assertEqual(perf["closed_trades"], 6)
+        self.assertEqual((perf["wins"], perf["losses"]), (3, 3))
+        self.assertEqual(perf["win_rate"], 0.5)
+        self.assertEqual(perf["total_profit"], 3.0)
+        self.assertEqual(perf["profit_factor"], round(7.5 / 4.5, 4))
+        # Equity 2, 1, -2, 2, 3.5, 3 -> sụt từ đỉnh 2 xuống -2
+        self.assertEqual(perf["max_drawdown"], 4.0)
+        self.assertEqual([point[1] for point in perf["equity_curve"]], [2.0, 1.0, -2.0, 2.0, 3.5, 3.0])
+        self.assertEqual(perf["rolling"]["20"]["trades"], 6)
+
+    def test_incremental_update_matches_rebuild(self):
+        for day, profit in enumerate(self.PROFITS, start=1):
+            self.service.record_trade(self._trade(self.bot, day, profit))
+        incremental = self.service.bot_performance(self.bot)
+
+        self.service.rebuild([self.bot.id])
+        rebuilt = self.service.bot_performance(self.bot)
+        incremental.pop("updated_at"), rebuilt.pop("updated_at")
+        self.assertEqual(incremental, rebuilt)
+
+    def test_out_of_order_trade_triggers_rebuild(self):
+        self.service.record_trade(self._trade(self.bot, 5, 1.0))
+        self.service.record_trade(self._trade(self.bot, 2, -2.0))
+
+        perf = BotPerformance.objects.get(bot=self.bot)
+        self.assertEqual([point[1] for point in perf.equity_curve], [-2.0, -1.0])
+        self.assertEqual(perf.max_drawdown, 2.0)
+
+    def test_open_trade_is_ignored(self):
+        self.assertIsNone(self.service.record_trade(self._trade(self.bot, 1, None, action="Open")))
+        self.assertFalse(BotPerformance.objects.exists())
+
+    def test_symbol_performance_merges_bots_by_time(self):
+        other = Bot.objects.create(name="AAA long", bot_type=BotType.LONG_TERM, symbol=self.symbol)
+        self._trade(self.bot, 1, 3.0)
+        self._trade(other, 2, -5.0)
+        self._trade(self.bot, 3, 1.0)
+
+        self.service.rebuild()
+        with self.assertNumQueries(3):
+            # Chỉ đọc bots + bảng summary, không quét lại trades
+            perf = self.service.symbol_performance(self.symbol.id)
+        self.assertEqual(perf["closed_trades"], 3)
+        self.assertEqual([point[1] for point in perf["equity_curve"]], [3.0, -2.0, -1.0])
+        self.assertEqual(perf["max_drawdown"], 5.0)
+        self.assertEqual(perf["rolling"]["20"]["total_profit"], -1.0)
+
+    def test_compact_equity_curve_keeps_recent_points(self):
+        curve = [[i, float(i)] for i in range(20)]
+
+        self.assertIs(compact_equity_curve(curve, max_points=20), curve)
+        compacted = compact_equity_curve(curve + [[20, 20.0]], max_points=20)
+        # 10 điểm gần nhất giữ nguyên, 11 điểm cũ lấy mẫu còn 5 (có điểm đầu)
+        self.assertEqual(compacted[-10:], [[i, float(i)] for i in range(11, 21)])
+        self.assertEqual(len(compacted), 15)
+        self.assertEqual(compacted[0], [0, 0.0])
+
+    def test_record_trade_caps_stored_curve_and_updates_only_summary_fields(self):
+        with mock.patch.object(performance, "MAX_EQUITY_POINTS", 8):
+            for day in range(1, 21):
+                self.service.record_trade(self._trade(self.bot, day, 1.0))
+                perf = BotPerformance.objects.get(bot=self.bot)
+                self.assertLessEqual(len(perf.equity_curve), 8)
+
+        self.assertEqual(perf.closed_trades, 20)
+        self.assertEqual(perf.equity_curve[-1][1], 20.0)
+        self.assertEqual([point[1] for point in perf.equity_curve[-4:]], [17.0, 18.0, 19.0, 20.0])
+
+        trade = self._trade(self.bot, 21, -1.0)
+        with self.assertNumQueries(4):
+            # savepoint + SELECT ... FOR UPDATE + UPDATE + release
+            self.service.record_trade(trade)
@@ -0,0 +1,383 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import Client, TestCase
+
+from apps.calculate.models import BalanceSheet, FinancialImportWatermark, IncomeStatement, Ratio
+from apps.calculate.repositories import bulk_upsert_statements
+from apps.calculate.services.financial_service import CalculateService
+from apps.calculate.services.financials_cache import FinancialsCache
+from apps.calculate.services.financial_snapshot import FinancialSnapshot
+from apps.calculate.services.import_watermarks import ImportWatermarks
+from apps.calculate.services.statement_mappers import StatementMappers
+from apps.stock.models import Symbol
+
+
+class TestBulkStatementImport(TestCase):
+    def setUp(self):
+        self.symbol = Symbol.objects.create(name="AAA", exchange="HOSE")
+
+    def test_balance_sheet_reimport_updates_in_place(self):
+        df = pd.DataFrame({
+            "yearReport": [2023, 2023, 2024, np.nan],
+            "lengthReport": [4, 4, 1, 1],
+            "TOTAL ASSETS (Bn. VND)": [100.0, 110.7, np.nan, 5.0],
+            "Net Inventories": ["7", "8", "x", "1"],
+        })
+
+        objs = StatementMappers.balance_sheets(self.symbol, df)
+        self.assertEqual(bulk_upsert_statements(BalanceSheet, objs), 2)
+
+        q4 = BalanceSheet.objects.get(symbol=self.symbol, year_report=2023, length_report=4)
+        self.assertEqual(q4.total_assets_bn_vnd, 110)
+        self.assertEqual(q4.net_inventories, 8)
+        q1 = BalanceSheet.objects.get(symbol=self.symbol, year_report=2024, length_report=1)
+        self.assertEqual((q1.total_assets_bn_vnd, q1.net_inventories), (0, 0))
+
+        df["TOTAL ASSETS (Bn. VND)"] = [100, 120, 50, 5]
+        bulk_upsert_statements(BalanceSheet, StatementMappers.balance_sheets(self.symbol, df))
+
+        self.assertEqual(BalanceSheet.objects.filter(symbol=self.symbol).count(), 2)
+        q4.refresh_from_db()
+        self.assertEqual(q4.total_assets_bn_vnd, 120)
+
+    def test_ratio_multiindex_columns(self):
+        df = pd.DataFrame(
+            [[2024, 2, 1.5, 12.0]],
+            columns=pd.MultiIndex.from_tuples([
+                ("Meta", "yearReport"),
+                ("Meta", "lengthReport"),
+                ("Chỉ tiêu thanh khoản", "Current Ratio"),
+                ("Chỉ tiêu định giá", "P/E"),
+            ]),
+        )
+
+        objs = StatementMappers.ratios(self.symbol, df)
+        self.assertEqual(bulk_upsert_statements(Ratio, objs), 1)
+
+        ratio = Ratio.objects.get(symbol=self.symbol)
+        self.assertEqual((ratio.year_report, ratio.length_report), (2024, 2))
+        self.assertEqual(ratio.current_ratio, 1.5)
+        self.assertEqual(ratio.p_e, 12.0)
+
+
+class _FakeVNStock:
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.calls = []
+
+    def get_full_financial_data(self, symbol):
+        self.calls.append(symbol)
+        return True, self.bundle
+
+
+class TestIncrementalFinancialImport(TestCase):
+    def setUp(self):
+        self.symbol = Symbol.objects.create(name="AAA", exchange="HOSE")
+        self.balance = pd.DataFrame({
+            "yearReport": [2024, 2024],
+            "lengthReport": [1, 2],
+            "TOTAL ASSETS (Bn. VND)": [100, 110],
+        })
+        self.client = _FakeVNStock({
+            key: self.balance for key in ("balance_sheet_df", "income_statement_df", "cash_flow_df", "ratios_df")
+        })
+
+    def _service(self, today):
+        return CalculateService(
+            vnstock_client=self.client,
+            sleep_between_symbols=0,
+            watermarks=ImportWatermarks(today=today),
+        )
+
+    def test_next_period_due_date(self):
+        watermarks = ImportWatermarks(filing_grace_days=30)
+        self.assertEqual(watermarks.next_due_date(2024, 2), date(2024, 10, 30))
+        self.assertEqual(watermarks.next_due_date(2024, 4), date(2025, 4, 30))
+
+    def test_skips_symbols_until_next_quarter_is_due(self):
+        first = self._service(date(2024, 8, 15)).import_all_complete(incremental=True)
+        self.assertEqual(first["total_balance_sheets"], 2)
+        watermark = FinancialImportWatermark.objects.get(symbol=self.symbol, statement="balance_sheet")
+        self.assertEqual((watermark.year_report, watermark.length_report), (2024, 2))
+
+        second = self._service(date(2024, 8, 20)).import_all_complete(incremental=True)
+        self.assertEqual(second["total_symbols"], 0)
+        self.assertEqual(second["skipped_symbols"], 1)
+        self.assertEqual(self.client.calls, ["AAA"])
+
+    def test_writes_only_new_or_changed_periods(self):
+        self._service(date(2024, 8, 15)).import_all_complete(incremental=True)
+
+        self.client.bundle = {"balance_sheet_df": pd.DataFrame({
+            "yearReport": [2024, 2024, 2024],
+            "lengthReport": [1, 2, 3],
+            "TOTAL ASSETS (Bn. VND)": [100, 115, 120],
+        })}
+        result = self._service(date(2024, 11, 1)).import_all_complete(incremental=True)
+
+        self.assertEqual(result["total_balance_sheets"], 2)
+        self.assertEqual(
+            list(BalanceSheet.objects.filter(symbol=self.symbol).order_by("length_report")
+                 .values_list("total_assets_bn_vnd", flat=True)),
+            [100, 115, 120],
+        )
+        watermark = FinancialImportWatermark.objects.get(symbol=self.symbol, statement="balance_sheet")
+        self.assertEqual((watermark.year_report, watermark.length_report), (2024, 3))
+
+
+class TestSymbolFinancialsEndpoint(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.symbol = Symbol.objects.create(name="AAA", exchange="HOSE")
+        self.client = Client()
+        self.url = f"/api/calculate/symbols/{self.symbol.id}/financials"
+        bulk_upsert_statements(BalanceSheet, [
+            BalanceSheet(symbol=self.symbol, year_report=2024, length_report=q, total_assets_bn_vnd=100 + q)
+            for q in (1, 2)
+        ])
+        bulk_upsert_statements(Ratio, [
+            Ratio(symbol=self.symbol, year_report=2024, length_report=2, current_ratio="1.5")
+        ])
+
+    def test_returns_all_statements_in_one_request_and_caches(self):
+        with self.assertNumQueries(6):  # version + symbol + 4 bảng
+            data = self.client.get(self.url).json()
+        self.assertEqual(data["symbol"]["name"], "AAA")
+        self.assertEqual([row["quarter"] for row in data["balance_sheet"]], [2, 1])
+        self.assertEqual(data["balance_sheet"][0]["total_assets_bn_vnd"], 102)
+        self.assertEqual(data["ratio"][0]["current_ratio"], 1.5)
+        self.assertEqual(data["income_statement"], [])
+
+        with self.assertNumQueries(1):  # chỉ đọc version của symbol
+            self.assertEqual(self.client.get(self.url).json(), data)
+
+        subset = self.client.get(self.url, {"statements": "balance_sheet", "quarter": 1}).json()
+        self.assertEqual(set(subset), {"symbol", "balance_sheet"})
+        self.assertEqual([row["quarter"] for row in subset["balance_sheet"]], [1])
+
+    def test_import_invalidates_cached_financials(self):
+        self.client.get(self.url)
+        bundle = {"balance_sheet_df": pd.DataFrame({
+            "yearReport": [2024],
+            "lengthReport": [3],
+            "TOTAL ASSETS (Bn. VND)": [130],
+        })}
+        CalculateService(vnstock_client=_FakeVNStock(bundle), sleep_between_symbols=0).import_all_complete(
+            force_update=True
+        )
+
+        data = self.client.get(self.url).json()
+        self.assertEqual([row["quarter"] for row in data["balance_sheet"]], [3, 2, 1])
+
+    def test_version_bump_is_seen_by_other_processes(self):
+        # Mỗi process có LocMemCache riêng; version nằm trong DB nên vẫn dùng chung
+        web = FinancialsCache(backend=LocMemCache("financials-web", {}))
+        importer = FinancialsCache(backend=LocMemCache("financials-importer", {}))
+        key = web.key(self.symbol.id, ["balance_sheet"], 5, None)
+        web.set(key, b"old")
+
+        importer.invalidate(self.symbol.id)
+        importer.invalidate(self.symbol.id)
+
+        new_key = web.key(self.symbol.id, ["balance_sheet"], 5, None)
+        self.assertNotEqual(new_key, key)
+        self.assertIsNone(web.get(new_key))
+        self.assertEqual(FinancialsCache.version(self.symbol.id), 2)
+
+    def test_unknown_symbol_and_statement(self):
+        self.assertEqual(self.client.get("/api/calculate/symbols/999999/financials").status_code, 404)
+        self.assertEqual(self.client.get(self.url, {"statements": "nope"}).status_code, 400)
+
+
+class TestFinancialScreening(TestCase):
+    def setUp(self):
+        # (roe Q1, roe Q2, revenue yoy Q2); CCC chưa có Q2 -> "latest" dùng Q1
+        data = {"AAA": (10, 20, 25.0), "BBB": (30, 16, 10.0), "CCC": (40, None, None)}
+        for name, (roe_q1, roe_q2, yoy_q2) in data.items():
+            symbol = Symbol.objects.create(name=name, exchange="HOSE")
+            Ratio.objects.create(symbol=symbol, year_report=2024, length_report=1, roe_percent=roe_q1)
+            IncomeStatement.objects.create(symbol=symbol, year_report=2024, length_report=1, revenue_yoy_percent=5.0)
+            if roe_q2 is not None:
+                Ratio.objects.create(symbol=symbol, year_report=2024, length_report=2, roe_percent=roe_q2)
+                IncomeStatement.objects.create(
+                    symbol=symbol, year_report=2024, length_report=2, revenue_yoy_percent=yoy_q2
+                )
+        self.snapshot = FinancialSnapshot.build(max_periods=4)
+
+    def _names(self, result):
+        return [item["name"] for item in result["items"]]
+
+    def test_filter_and_sort_on_latest_period(self):
+        result = self.snapshot.screen(filter="roe_percent > 15", sort="-ratio.roe_percent", fields=["roe_percent"])
+        self.assertEqual(self._names(result), ["CCC", "AAA", "BBB"])
+        self.assertEqual([item["roe_percent"] for item in result["items"]], [40.0, 20.0, 16.0])
+
+        result = self.snapshot.screen(filter="roe_percent > 15 and income_statement.revenue_yoy_percent > 20")
+        self.assertEqual(self._names(result), ["AAA"])
+
+    def test_specific_period_and_nan_sorted_last(self):
+        result = self.snapshot.screen(sort="-roe_percent", period="2024Q2", limit=2)
+        self.assertEqual(result["count"], 3)
+        self.assertEqual(self._names(result), ["AAA", "BBB"])
+        self.assertEqual(
+            self._names(self.snapshot.screen(filter="not roe_percent < 20 or abs(roe_percent - 16) < 1", period="2024Q1")),
+            ["BBB", "CCC"],
+        )
+
+    def test_rejects_unknown_metric_and_unsafe_expression(self):
+        from ninja.errors import HttpError
+        with self.assertRaises(HttpError):
+            self.snapshot.screen(filter="no_such_metric > 1")
+        with self.assertRaises(HttpError):
+            self.snapshot.screen(filter="revenue_yoy_percent > 1")  # income_statement và derived
+        with self.assertRaises(HttpError):
+            self.snapshot.screen(filter="__import__('os').system('true')")
+
+    def test_rejects_oversized_expressions(self):
+        from ninja.errors import HttpError
+        for expression in ["roe_percent" + "+1" * 5000, "roe_percent" + "+1" * 40, "-" * 300 + "roe_percent"]:
+            with self.assertRaises(HttpError) as ctx:
+                self.snapshot.screen(filter=expression)
+            self.assertEqual(ctx.exception.status_code, 400)
+
+        response = Client().get("/api/calculate/screen", {"filter": "roe_percent" + "+1" * 5000 + " > 0"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_screen_endpoint(self):
+        response = Client().get("/api/calculate/screen", {"filter": "roe_percent >= 20", "sort": "-roe_percent"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(self._names(data), ["CCC", "AAA"])
+        self.assertEqual(data["snapshot"]["periods"], ["2024Q1", "2024Q2"])
+
+    def test_symbols_without_statements(self):
+        Ratio.objects.all().delete()
+        IncomeStatement.objects.all().delete()
+        snapshot = FinancialSnapshot.build(max_periods=4)
+        result = snapshot.screen(sort="-roe_percent")
+        self.assertEqual(result["count"], 3)
+        self.assertEqual(self._names(snapshot.screen(filter="roe_percent > 0")), [])
+
+
+class TestDerivedMetrics(TestCase):
+    def setUp(self):
+        self.symbol = Symbol.objects.create(name="AAA", exchange="HOSE")
+        # 2023Q1..2024Q2, thiếu 2023Q3 -> TTM của 2023Q3..2024Q2 không đủ 4 quý liền nhau
+        for year, quarter, revenue, profit in [
+            (2023, 1, 100, 10), (2023, 2, 110, 11), (2023, 4, 130, 13),
+            (2024, 1, 150, 15), (2024, 2, 165, 22),
+        ]:
+            IncomeStatement.objects.create(
+                symbol=self.symbol, year_report=year, length_report=quarter, revenue_bn_vnd=revenue,
+                attribute_to_parent_company_bn_vnd=profit, gross_profit=revenue // 2,
+            )
+        Ratio.objects.create(symbol=self.symbol, year_report=2024, length_report=2, outstanding_share_mil_shares=2)
+
+    def _metric(self, year, quarter):
+        from apps.calculate.models import DerivedMetric
+        return DerivedMetric.objects.get(symbol=self.symbol, year_report=year, length_report=quarter)
+
+    def test_growth_margins_and_gaps(self):
+        from apps.calculate.services.derived_metrics import DerivedMetricsService
+        result = DerivedMetricsService().derive([self.symbol.id])
+        self.assertEqual(result["periods"], 5)
+
+        q2 = self._metric(2024, 2)
+        self.assertAlmostEqual(q2.revenue_qoq_percent, 10.0)
+        self.assertAlmostEqual(q2.revenue_yoy_percent, 50.0)
+        self.assertAlmostEqual(q2.net_profit_yoy_percent, 100.0)
+        self.assertAlmostEqual(q2.gross_margin_percent, 82 / 165 * 100)
+        self.assertIsNone(q2.revenue_ttm)  # thiếu 2023Q3
+        self.assertIsNone(self._metric(2023, 4).revenue_qoq_percent)
+
+    def test_ttm_and_per_share(self):
+        from apps.calculate.services.derived_metrics import DerivedMetricsService
+        IncomeStatement.objects.create(
+            symbol=self.symbol, year_report=2023, length_report=3, revenue_bn_vnd=120,
+            attribute_to_parent_company_bn_vnd=12,
+        )
+        DerivedMetricsService().derive([self.symbol.id])
+
+        q2 = self._metric(2024, 2)
+        self.assertEqual(q2.revenue_ttm, 120 + 130 + 150 + 165)
+        self.assertEqual(q2.net_profit_ttm, 12 + 13 + 15 + 22)
+        self.assertAlmostEqual(q2.eps_ttm, 62 / 2_000_000)
+        self.assertIsNone(self._metric(2024, 1).eps_ttm)  # không có số cổ phiếu kỳ đó
+
+    def test_snapshot_store_picks_up_derive_run_elsewhere(self):
+        from apps.calculate.services.derived_metrics import DerivedMetricsService
+        from apps.calculate.services.financial_snapshot import FinancialSnapshotStore
+
+        store = FinancialSnapshotStore(max_periods=4, check_interval=0)
+        before = store.snapshot()
+        self.assertEqual(before.screen(filter="derived.revenue_yoy_percent > 40")["count"], 0)
+
+        # vd. derive_financial_metrics chạy từ CLI, không gọi refresh của process này
+        DerivedMetricsService().derive([self.symbol.id])
+
+        after = store.snapshot()
+        self.assertIsNot(after, before)
+        self.assertEqual(after.screen(filter="derived.revenue_yoy_percent > 40")["count"], 1)
+
+    def test_import_recomputes_only_changed_symbols(self):
+        from apps.calculate.services.derived_metrics import DerivedMetricsService
+
+        class RecordingDerived(DerivedMetricsService):
+            calls = []
+
+            def derive(self, symbol_ids=None):
+                self.calls.append(set(symbol_ids))
+                return super().derive(symbol_ids)
+
+        class PerSymbolVNStock(_FakeVNStock):
+            def get_full_financial_data(self, symbol):
+                self.calls.append(symbol)
+                return True, self.bundle.get(symbol, {})
+
+        Symbol.objects.create(name="BBB", exchange="HOSE")
+        client = PerSymbolVNStock({"AAA": {"income_statement_df": pd.DataFrame({
+            "yearReport": [2024], "lengthReport": [3], "Revenue (Bn. VND)": [181],
+        })}})
+        service = CalculateService(vnstock_client=client, sleep_between_symbols=0)
+        service.derived_metrics = RecordingDerived()
+        service.import_all_complete(force_update=True)
+
+        self.assertEqual(RecordingDerived.calls, [{self.symbol.id}])
+        self.assertAlmostEqual(self._metric(2024, 3).revenue_qoq_percent, 181 / 165 * 100 - 100)
+
+    def test_resumed_import_derives_symbols_changed_before_cancel(self):
+        from apps.jobs.services.progress import JobCancelled, JobProgress
+
+        class CancelOnceVNStock(_FakeVNStock):
+            cancel = True
+
+            def get_full_financial_data(self, symbol):
+                if symbol == "BBB" and self.cancel:
+                    self.cancel = False
+                    raise JobCancelled()
+                return super().get_full_financial_data(symbol)
+
+        Symbol.objects.create(name="BBB", exchange="HOSE")
+        client = CancelOnceVNStock({"income_statement_df": pd.DataFrame({
+            "yearReport": [2024], "lengthReport": [3], "Revenue (Bn. VND)": [181],
+        })})
+        progress = JobProgress()
+        with self.assertRaises(JobCancelled):
+            CalculateService(vnstock_client=client, sleep_between_symbols=0, progress=progress).import_all_complete(
+                force_update=True
+            )
+        self.assertEqual(progress.checkpoint["changed_symbols"], [self.symbol.id])
+
+        # Resume: AAA đã xong trong checkpoint nên không import lại nhưng vẫn phải được derive
+        resumed = JobProgress(progress.checkpoint)
+        CalculateService(vnstock_client=client, sleep_between_symbols=0, progress=resumed).import_all_complete(
+            force_update=True
+        )
+
+        self.assertEqual(client.calls, ["AAA", "BBB"])
+        self.assertAlmostEqual(self._metric(2024, 3).revenue_qoq_percent, 181 / 165 * 100 - 100)
+        self.assertNotIn("changed_symbols", resumed.checkpoint)
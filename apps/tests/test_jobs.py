@@ -0,0 +1,179 @@
+import time
+from datetime import timedelta
+
+import pandas as pd
+from django.test import Client, TestCase
+from django.utils import timezone
+
+from apps.calculate.services.financial_service import CalculateService
+from apps.jobs.models import Job, JobStatus
+from apps.jobs.registry import register_job
+from apps.jobs.services.job_service import JobHeartbeat, JobService
+from apps.jobs.services.progress import JobProgress
+from apps.stock.models import Symbol
+
+TEST_QUEUE = "tests"
+
+
+@register_job("tests.walk_symbols", queue=TEST_QUEUE)
+def walk_symbols(progress, fail=(), cancel_after=None, interrupt_at=None):
+    seen = []
+    symbols = progress.begin("walk", Symbol.objects.order_by("name"))
+    for symbol in progress.track(symbols):
+        seen.append(symbol.name)
+        if symbol.name == interrupt_at:
+            raise KeyboardInterrupt
+        if symbol.name in fail:
+            progress.fail(symbol.name, "boom")
+            continue
+        if cancel_after and len(seen) == cancel_after:
+            Job.objects.filter(status=JobStatus.RUNNING).update(cancel_requested=True)
+    progress.end()
+    return {"seen": seen}
+
+
+@register_job("tests.taken_over", queue=TEST_QUEUE)
+def taken_over(progress, flush=False):
+    # Worker này bị coi là chết: job được requeue và worker khác nhận trong lúc handler chạy
+    Job.objects.filter(status=JobStatus.RUNNING).update(worker="other-worker", heartbeat_at=timezone.now())
+    if flush:
+        progress.begin("walk", ["AAA"])
+    return {"stale": True}
+
+
+class JobServiceTestCase(TestCase):
+    def setUp(self):
+        for name in ("AAA", "BBB", "CCC", "DDD"):
+            Symbol.objects.create(name=name, exchange="HSX")
+        self.service = JobService(worker_id="test-worker")
+
+    def _run(self, **params):
+        self.service.enqueue("tests.walk_symbols", params)
+        return self.service.run_next([TEST_QUEUE])
+
+    def test_run_records_progress_and_result(self):
+        job = self._run(fail=["BBB"])
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {"seen": ["AAA", "BBB", "CCC", "DDD"]})
+        self.assertEqual((job.attempts, job.worker), (1, "test-worker"))
+        walk = job.progress["tables"]["walk"]
+        self.assertEqual((walk["total"], walk["done"], walk["failed"], walk["remaining"]), (4, 3, 1, 0))
+        self.assertTrue(walk["completed"])
+        self.assertEqual(job.progress["errors"], [{"table": "walk", "item": "BBB", "error": "boom"}])
+
+    def test_cancel_then_resume_from_checkpoint(self):
+        job = self._run(cancel_after=3)
+        self.assertEqual(job.status, JobStatus.CANCELLED)
+        self.assertEqual(job.checkpoint["done"]["walk"], ["AAA", "BBB", "CCC"])
+
+        JobService.resume(job)
+        job = self.service.run_next([TEST_QUEUE])
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {"seen": ["DDD"]})
+        self.assertEqual(job.progress["tables"]["walk"]["done"], 4)
+        self.assertEqual(job.attempts, 2)
+
+    def test_interrupted_worker_requeues_job(self):
+        self.service.enqueue("tests.walk_symbols", {"interrupt_at": "CCC"})
+        with self.assertRaises(KeyboardInterrupt):
+            self.service.run_next([TEST_QUEUE])
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+        self.assertEqual(job.checkpoint["done"]["walk"], ["AAA", "BBB"])
+
+    def test_stale_running_job_is_requeued(self):
+        job = self.service.enqueue("tests.walk_symbols")
+        self.service.claim([TEST_QUEUE])
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(JobService.requeue_stale([TEST_QUEUE]), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, JobStatus.QUEUED)
+
+    def test_worker_that_lost_the_job_does_not_overwrite_it(self):
+        for flush in (False, True):
+            job = self.service.enqueue("tests.taken_over", {"flush": flush})
+            self.service.run_next([TEST_QUEUE])
+
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.worker, job.result), (JobStatus.RUNNING, "other-worker", None))
+            self.assertFalse(self.service.heartbeat(job.pk))
+            Job.objects.filter(pk=job.pk).update(status=JobStatus.SUCCEEDED)
+
+    def test_heartbeat_thread_beats_until_stopped(self):
+        beats = []
+        heartbeat = JobHeartbeat(lambda: beats.append(time.monotonic()), interval=0.01).start()
+        time.sleep(0.1)
+        heartbeat.stop()
+        count = len(beats)
+
+        self.assertGreaterEqual(count, 2)
+        time.sleep(0.03)
+        self.assertEqual(len(beats), count)
+
+    def test_claim_only_takes_own_queue(self):
+        self.service.enqueue("tests.walk_symbols")
+        self.assertIsNone(self.service.run_next(["imports"]))
+        self.assertEqual(Job.objects.get().status, JobStatus.QUEUED)
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.service.enqueue("tests.missing")
+
+
+class ImportProgressTestCase(TestCase):
+    def test_calculate_import_skips_checkpointed_symbols(self):
+        for name in ("AAA", "BBB"):
+            Symbol.objects.create(name=name, exchange="HSX")
+
+        class FakeVNStock:
+            def __init__(self):
+                self.calls = []
+
+            def get_full_financial_data(self, symbol):
+                self.calls.append(symbol)
+                return True, {"income_statement_df": pd.DataFrame()}
+
+        client = FakeVNStock()
+        progress = JobProgress({"done": {"income_statements": ["AAA"]}})
+        result = CalculateService(vnstock_client=client, sleep_between_symbols=0, progress=progress) \
+            .import_income_statements_all()
+
+        self.assertEqual(client.calls, ["BBB"])
+        self.assertEqual(result["successful_symbols"], 1)
+        snapshot = progress.snapshot()["tables"]["income_statements"]
+        self.assertEqual((snapshot["total"], snapshot["done"]), (2, 2))
+        self.assertEqual(progress.checkpoint["completed"], ["income_statements"])
+
+
+class JobsApiTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_import_endpoint_enqueues_job(self):
+        response = self.client.post("/api/calculate/import/all-complete?incremental=true")
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual((body["kind"], body["status"], body["queue"]), ("calculate.import_all_complete", "queued", "imports"))
+        self.assertEqual(body["params"], {"force_update": False, "incremental": True})
+
+        response = self.client.get(f"/api/jobs/{body['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "queued")
+
+    def test_stock_import_endpoint_enqueues_job(self):
+        response = self.client.post("/api/stocks/import/companies?exchange=HNX")
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.json()["id"])
+        self.assertEqual((job.kind, job.params), ("stock.import_companies", {"exchange": "HNX"}))
+
+    def test_cancel_queued_job(self):
+        job = JobService().enqueue("tests.walk_symbols")
+
+        response = self.client.post(f"/api/jobs/{job.pk}/cancel")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "cancelled")
+        self.assertEqual(self.client.post(f"/api/jobs/{job.pk}/cancel").status_code, 409)
+        self.assertEqual(self.client.get("/api/jobs/999999").status_code, 404)
@@ -0,0 +1,156 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import Client, TestCase
+from django.utils import timezone
+
+from apps.bots.models import Trade
+from apps.jobs.models import Job, JobStatus
+from apps.jobs.services.job_service import JobService
+from apps.notification.models import (
+    AppEventType,
+    DeliveryStatus,
+    NotificationChannel,
+    NotificationDelivery,
+    NotificationEvent,
+    UserEndpoint,
+    WebhookLog,
+)
+from apps.notification.services.delivery_service import DeliveryService
+from apps.notification.services.notification_service import NotificationService
+from apps.notification.services.notification_utils import send_bulk_symbol_signals
+from apps.seapay.models import LicenseStatus, PayUserSymbolLicense
+from apps.stock.models import Symbol
+
+User = get_user_model()
+
+
+class SignalFanOutTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.symbol = Symbol.objects.create(name="AAA", exchange="HSX")
+        for i in range(3):
+            user = User.objects.create_user(username=f"u{i}", email=f"u{i}@example.com", password="pass12345")
+            PayUserSymbolLicense.objects.create(
+                user=user, symbol_id=self.symbol.id, status=LicenseStatus.ACTIVE,
+                end_at=timezone.now() + timedelta(days=30),
+            )
+            UserEndpoint.objects.create(
+                user=user, channel=NotificationChannel.EMAIL, address=user.email, verified=True,
+            )
+        # Endpoint chưa verify không nhận tin
+        UserEndpoint.objects.create(
+            user=user, channel=NotificationChannel.EMAIL, address="pending@example.com", verified=False,
+        )
+
+    def _webhook(self):
+        return self.client.post(
+            "/api/notifications/webhook/tradingview",
+            data={
+                "Type": "BUY", "TransId": 1, "Action": "Open", "botName": "AAA bot", "botType": "short",
+                "Symbol": "aaa", "Price": 12.5, "CheckDate": int(time.time() * 1000),
+            },
+            content_type="application/json",
+        )
+
+    def test_webhook_only_persists_trade_and_job(self):
+        response = self._webhook()
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        job = Job.objects.get(pk=body["job_id"])
+        self.assertEqual((job.kind, job.queue, job.status), ("notification.symbol_signal", "notifications", JobStatus.QUEUED))
+        self.assertEqual(Trade.objects.count(), 1)
+        self.assertFalse(NotificationEvent.objects.exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_dispatcher_fans_out_and_sends(self):
+        job_id = self._webhook().json()["job_id"]
+
+        job = JobService().run_next(["notifications"])
+
+        self.assertEqual(job.pk, job_id)
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result["total_users"], 3)
+        self.assertEqual((job.result["deliveries_sent"], job.result["deliveries_failed"]), (3, 0))
+        self.assertEqual(NotificationEvent.objects.filter(processed=True).count(), 3)
+        self.assertEqual(NotificationDelivery.objects.filter(status=DeliveryStatus.SENT).count(), 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["u0@example.com", "u1@example.com", "u2@example.com"])
+        self.assertEqual(WebhookLog.objects.get().users_notified, 3)
+        # response_raw của handler được lưu cùng status
+        self.assertEqual(NotificationDelivery.objects.first().response_raw["status"], "sent")
+
+    def test_resume_after_recipients_sends_created_events(self):
+        job_id = self._webhook().json()["job_id"]
+        # Lần chạy trước đã tạo xong events, dừng khi 1 delivery đang SENDING
+        service = NotificationService()
+        event_ids = [
+            str(service.create_and_process_event(user.id, AppEventType.SYMBOL_SIGNAL, {"symbol": "AAA"})[0].event_id)
+            for user in User.objects.order_by("id")
+        ]
+        NotificationDelivery.objects.filter(event_id=event_ids[0]).update(
+            status=DeliveryStatus.SENDING, claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        Job.objects.filter(pk=job_id).update(
+            checkpoint={"completed": ["recipients"], "done": {}, "events": event_ids}
+        )
+
+        job = JobService().run_next(["notifications"])
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(NotificationEvent.objects.count(), 3)
+        self.assertEqual((job.result["sent_count"], job.result["deliveries_sent"]), (3, 2))
+        self.assertEqual(WebhookLog.objects.get().users_notified, 3)
+        # Delivery SENDING bị bỏ dở do worker nhận lại khi quá STALE_AFTER
+        self.assertEqual(DeliveryService().process_due()["sent"], 1)
+        self.assertEqual(NotificationDelivery.objects.filter(status=DeliveryStatus.SENT).count(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class BulkEventCreationTestCase(TestCase):
+    def setUp(self):
+        self.users = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"b{i}", email=f"b{i}@example.com", password="pass12345")
+            UserEndpoint.objects.create(
+                user=user, channel=NotificationChannel.EMAIL, address=user.email, verified=True,
+            )
+            self.users.append(user)
+        # user cuối có thêm 1 kênh verified, user đầu có kênh chưa verify
+        UserEndpoint.objects.create(
+            user=self.users[2], channel=NotificationChannel.TELEGRAM, address="12345", verified=True,
+        )
+        UserEndpoint.objects.create(
+            user=self.users[0], channel=NotificationChannel.ZALO, address="z0", verified=False,
+        )
+
+    def test_bulk_creates_events_and_deliveries_in_constant_queries(self):
+        payloads = {user.id: {"symbol": "AAA", "signal_type": "BUY"} for user in self.users}
+
+        # SELECT endpoints + INSERT events + INSERT deliveries (+ savepoint/release)
+        with self.assertNumQueries(5):
+            events, deliveries = NotificationService().create_and_process_events_bulk(
+                AppEventType.SYMBOL_SIGNAL, payloads
+            )
+
+        self.assertEqual(len(events), 3)
+        self.assertEqual(NotificationEvent.objects.filter(processed=True).count(), 3)
+        self.assertEqual(len(deliveries), 4)
+        self.assertEqual(
+            NotificationDelivery.objects.filter(event__user=self.users[2], status=DeliveryStatus.QUEUED).count(), 2
+        )
+        self.assertFalse(NotificationDelivery.objects.filter(channel=NotificationChannel.ZALO).exists())
+
+    def test_send_bulk_symbol_signals_uses_per_user_payloads(self):
+        sent = send_bulk_symbol_signals({
+            user.id: {"symbol": f"S{i}", "signal_type": "SELL", "price": "1", "timestamp": "t"}
+            for i, user in enumerate(self.users[:2])
+        })
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(
+            sorted(e.payload["symbol"] for e in NotificationEvent.objects.all()), ["S0", "S1"]
+        )
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["b0@example.com", "b1@example.com"])
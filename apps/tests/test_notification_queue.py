@@ -0,0 +1,148 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.notification.models import (
+    AppEventType,
+    DeliveryPriority,
+    DeliveryStatus,
+    NotificationChannel,
+    NotificationDelivery,
+    UserEndpoint,
+)
+from apps.notification.repositories.notification_repository import NotificationDeliveryRepository
+from apps.notification.services.delivery_service import DeliveryService
+from apps.notification.services.notification_service import NotificationService
+from apps.notification.services.notification_utils import send_symbol_signal_notification
+
+User = get_user_model()
+
+
+def _enqueue(channel, count, event_type=AppEventType.SYMBOL_SIGNAL):
+    payloads = {}
+    for i in range(count):
+        user = User.objects.create_user(
+            username=f"q{event_type}{channel}{i}", email=f"q{event_type}{i}@example.com", password="x"
+        )
+        address = user.email if channel == NotificationChannel.EMAIL else str(2000 + i)
+        UserEndpoint.objects.create(user=user, channel=channel, address=address, verified=True)
+        payloads[user.id] = {"symbol": "AAA", "signal_type": "buy", "price": "10", "timestamp": "t"}
+    _, deliveries = NotificationService().create_and_process_events_bulk(event_type, payloads)
+    return deliveries
+
+
+class DeliveryQueueTestCase(TestCase):
+    def setUp(self):
+        self.repo = NotificationDeliveryRepository()
+
+    def test_claim_takes_due_rows_oldest_first_once(self):
+        first, second, later = _enqueue(NotificationChannel.EMAIL, 3)
+        now = timezone.now()
+        NotificationDelivery.objects.filter(pk=first.pk).update(next_attempt_at=now - timedelta(minutes=1))
+        NotificationDelivery.objects.filter(pk=second.pk).update(next_attempt_at=now - timedelta(minutes=5))
+        NotificationDelivery.objects.filter(pk=later.pk).update(next_attempt_at=now + timedelta(minutes=5))
+
+        claimed = self.repo.claim_due(10)
+
+        self.assertEqual([d.pk for d in claimed], [second.pk, first.pk])
+        self.assertEqual({(d.status, d.attempts) for d in claimed}, {(DeliveryStatus.SENDING, 1)})
+        self.assertEqual(NotificationDelivery.objects.get(pk=first.pk).attempts, 1)
+        self.assertEqual(self.repo.claim_due(10), [])
+
+    @override_settings(
+        TELEGRAM_BOT_TOKEN=None,
+        NOTIFICATION_DISPATCH={**settings.NOTIFICATION_DISPATCH, "MAX_ATTEMPTS": 2, "RETRY_BASE_DELAY": 60},
+    )
+    def test_failures_back_off_then_dead_letter(self):
+        (delivery,) = _enqueue(NotificationChannel.TELEGRAM, 1)
+        service = DeliveryService()
+
+        before = timezone.now()
+        stats = service.process_due()
+        delivery.refresh_from_db()
+
+        self.assertEqual((stats["retrying"], stats["dead"]), (1, 0))
+        self.assertEqual((delivery.status, delivery.attempts), (DeliveryStatus.RETRYING, 1))
+        # Lần 1: 60s, jitter trong [30s, 60s]
+        self.assertGreaterEqual(delivery.next_attempt_at, before + timedelta(seconds=30))
+        self.assertLessEqual(delivery.next_attempt_at, timezone.now() + timedelta(seconds=60))
+        self.assertEqual(service.process_due()["claimed"], 0)
+
+        NotificationDelivery.objects.filter(pk=delivery.pk).update(next_attempt_at=timezone.now())
+        stats = service.process_due()
+        delivery.refresh_from_db()
+
+        self.assertEqual(stats["dead"], 1)
+        self.assertEqual((delivery.status, delivery.attempts), (DeliveryStatus.DEAD, 2))
+
+        self.assertEqual(service.requeue_dead_deliveries(), 1)
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), (DeliveryStatus.QUEUED, 0))
+
+    def test_stale_sending_is_reclaimed(self):
+        (delivery,) = _enqueue(NotificationChannel.EMAIL, 1)
+        self.repo.claim_due(1)
+        NotificationDelivery.objects.filter(pk=delivery.pk).update(claimed_at=timezone.now() - timedelta(hours=1))
+
+        stats = DeliveryService().process_due()
+
+        self.assertEqual(stats["sent"], 1)
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), (DeliveryStatus.SENT, 2))
+
+    def test_worker_command_once_drains_queue(self):
+        _enqueue(NotificationChannel.EMAIL, 3)
+        out = StringIO()
+
+        call_command("notification_worker", "--once", "--batch-size", "2", stdout=out)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(NotificationDelivery.objects.filter(status=DeliveryStatus.SENT).count(), 3)
+        self.assertIn("Sent 2/2 deliveries", out.getvalue())
+
+
+class TargetedDispatchTestCase(TestCase):
+    def test_signal_lane_is_claimed_before_older_reminders(self):
+        reminders = _enqueue(NotificationChannel.EMAIL, 2, AppEventType.SUBSCRIPTION_EXPIRING)
+        NotificationDelivery.objects.filter(pk__in=[d.pk for d in reminders]).update(
+            next_attempt_at=timezone.now() - timedelta(hours=1)
+        )
+        (signal,) = _enqueue(NotificationChannel.EMAIL, 1)
+        repo = NotificationDeliveryRepository()
+
+        self.assertEqual(signal.priority, DeliveryPriority.HIGH)
+        self.assertEqual([d.pk for d in repo.claim_due(10, max_priority=DeliveryPriority.HIGH)], [signal.pk])
+        NotificationDelivery.objects.filter(pk=signal.pk).update(status=DeliveryStatus.QUEUED)
+        claimed = repo.claim_due(10)
+        self.assertEqual(claimed[0].pk, signal.pk)
+        self.assertEqual({d.priority for d in claimed[1:]}, {DeliveryPriority.LOW})
+
+    def test_dispatch_sends_only_own_deliveries(self):
+        backlog = _enqueue(NotificationChannel.EMAIL, 2, AppEventType.SUBSCRIPTION_EXPIRING)
+        user = User.objects.create_user(username="signal", email="signal@example.com", password="x")
+        UserEndpoint.objects.create(user=user, channel=NotificationChannel.EMAIL, address=user.email, verified=True)
+
+        self.assertTrue(send_symbol_signal_notification(user.id, "AAA", "buy", "10", "t"))
+
+        self.assertEqual([m.to for m in mail.outbox], [["signal@example.com"]])
+        self.assertEqual(
+            set(NotificationDelivery.objects.filter(pk__in=[d.pk for d in backlog]).values_list("status", flat=True)),
+            {DeliveryStatus.QUEUED},
+        )
+
+    def test_dispatch_does_not_reload_loaded_deliveries(self):
+        deliveries = _enqueue(NotificationChannel.EMAIL, 3)
+
+        # claim (savepoint, SELECT ids FOR UPDATE, UPDATE, release) + bulk_update kết quả,
+        # không SELECT lại event/endpoint
+        with self.assertNumQueries(5):
+            stats = DeliveryService().dispatch(deliveries)
+
+        self.assertEqual(stats, {"sent": 3, "failed": 0})
+        self.assertEqual(DeliveryService().dispatch(deliveries), {"sent": 0, "failed": 0})
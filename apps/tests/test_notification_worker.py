@@ -0,0 +1,204 @@
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from apps.notification.models import (
+    AppEventType,
+    DeliveryStatus,
+    NotificationChannel,
+    NotificationDelivery,
+    UserEndpoint,
+)
+from apps.notification.services.delivery_service import DeliveryService
+from apps.notification.services.delivery_worker import DeliveryWorker
+from apps.notification.repositories.notification_repository import NotificationDeliveryRepository
+from apps.notification.services.notification_service import NotificationService
+from apps.stock.services.rate_limiter import SQLiteLimiterState
+
+User = get_user_model()
+
+
+class _StubApiHandler(BaseHTTPRequestHandler):
+    """Giả lập Telegram (/bot<token>/sendMessage) và Zalo (/message/cs) với keep-alive"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.client_address, self.path, body))
+        self.server.times.append(time.monotonic())
+        if self.path.endswith("/sendMessage"):
+            reply = {"ok": True, "result": {"chat": {"id": body["chat_id"]}}}
+        else:
+            reply = {"error": -213, "message": "User has not followed OA"}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubSmtpHandler(socketserver.StreamRequestHandler):
+    """SMTP tối thiểu: đếm số kết nối và lưu các message nhận được"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stub")
+        data, lines = False, []
+        for raw in self.rfile:
+            line = raw.decode().rstrip("\r\n")
+            if data:
+                if line == ".":
+                    self.server.messages.append("\n".join(lines))
+                    data, lines = False, []
+                    self.reply("250 OK")
+                else:
+                    lines.append(line)
+                continue
+            command = line[:4].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 stub")
+            elif command == "DATA":
+                data = True
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                break
+            else:
+                self.reply("250 OK")
+
+
+def _start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class DeliveryWorkerTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.http = _start(ThreadingHTTPServer(("127.0.0.1", 0), _StubApiHandler))
+        cls.smtp = _start(socketserver.ThreadingTCPServer(("127.0.0.1", 0), _StubSmtpHandler))
+        cls.http.daemon_threads = cls.smtp.daemon_threads = True
+        cls.api_url = f"http://127.0.0.1:{cls.http.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in (cls.http, cls.smtp):
+            server.shutdown()
+            server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.http.requests, self.http.times = [], []
+        self.smtp.connections, self.smtp.messages = 0, []
+
+    def _enqueue(self, channel, count):
+        payloads = {}
+        for i in range(count):
+            user = User.objects.create_user(username=f"{channel}{i}", email=f"{channel}{i}@example.com", password="x")
+            address = user.email if channel == NotificationChannel.EMAIL else str(1000 + i)
+            UserEndpoint.objects.create(user=user, channel=channel, address=address, verified=True)
+            payloads[user.id] = {"symbol": "AAA", "signal_type": "buy", "price": "10", "timestamp": "t"}
+        NotificationService().create_and_process_events_bulk(AppEventType.SYMBOL_SIGNAL, payloads)
+
+    def test_http_channel_reuses_pooled_connections_under_rate_cap(self):
+        self._enqueue(NotificationChannel.TELEGRAM, 6)
+        worker = DeliveryWorker(channels={"telegram": {"CONCURRENCY": 2, "RATE_PER_SECOND": 50}})
+        self.addCleanup(worker.close)
+
+        with override_settings(TELEGRAM_BOT_TOKEN="t0k", TELEGRAM_API_URL=self.api_url):
+            started = time.monotonic()
+            stats = DeliveryService(chunk_size=3, worker=worker).process_due()
+            stats_next = DeliveryService(chunk_size=3, worker=worker).process_due()
+            elapsed = time.monotonic() - started
+
+        self.assertEqual((stats["claimed"], stats["sent"], stats["failed"]), (3, 3, 0))
+        self.assertEqual((stats_next["claimed"], stats_next["sent"]), (3, 3))
+        self.assertEqual(NotificationDelivery.objects.filter(status=DeliveryStatus.SENT).count(), 6)
+        self.assertEqual({path for _, path, _ in self.http.requests}, {"/bott0k/sendMessage"})
+        # 2 lần send dùng chung session của worker: 6 request qua tối đa 2 kết nối keep-alive,
+        # giãn cách 1/50 giây
+        self.assertLessEqual(len({address for address, _, _ in self.http.requests}), 2)
+        self.assertGreaterEqual(elapsed, 5 / 50)
+        self.assertTrue(NotificationDelivery.objects.first().response_raw["ok"])
+
+    def test_rate_budget_is_shared_between_worker_processes(self):
+        self._enqueue(NotificationChannel.TELEGRAM, 6)
+        deliveries = NotificationDeliveryRepository().claim_due(6)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, "rate.sqlite3")
+        # 2 worker với state riêng trỏ cùng 1 file, như 2 process notification_worker
+        workers = [
+            DeliveryWorker(channels={"telegram": {"RATE_PER_SECOND": 20}}, limiter_state=SQLiteLimiterState(path))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            self.addCleanup(worker.close)
+
+        with override_settings(TELEGRAM_BOT_TOKEN="t0k", TELEGRAM_API_URL=self.api_url):
+            threads = [
+                threading.Thread(target=worker.send, args=(deliveries[i::2],))
+                for i, worker in enumerate(workers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        times = sorted(self.http.times)
+        self.assertEqual(len(times), 6)
+        # Cả 2 worker chung 20 request/giây: mọi request cách nhau ~1/20 giây
+        self.assertGreaterEqual(min(b - a for a, b in zip(times, times[1:])), 0.04)
+
+    def test_http_provider_error_schedules_retry(self):
+        self._enqueue(NotificationChannel.ZALO, 2)
+
+        with override_settings(ZALO_OA_ACCESS_TOKEN="oa", ZALO_OA_API_URL=self.api_url):
+            stats = DeliveryService().process_due()
+
+        self.assertEqual((stats["sent"], stats["failed"], stats["retrying"]), (0, 2, 2))
+        failed = NotificationDelivery.objects.filter(status=DeliveryStatus.RETRYING)
+        self.assertEqual(failed.count(), 2)
+        self.assertEqual(failed.first().error_message, "User has not followed OA")
+
+    def test_missing_token_fails_without_request(self):
+        self._enqueue(NotificationChannel.TELEGRAM, 1)
+
+        with override_settings(TELEGRAM_BOT_TOKEN=None, TELEGRAM_API_URL=self.api_url):
+            stats = DeliveryService().process_due()
+
+        self.assertEqual((stats["sent"], stats["failed"]), (0, 1))
+        self.assertEqual(self.http.requests, [])
+        self.assertEqual(NotificationDelivery.objects.get().error_message, "TELEGRAM_BOT_TOKEN not configured")
+
+    def test_emails_are_batched_over_one_smtp_connection(self):
+        self._enqueue(NotificationChannel.EMAIL, 5)
+        worker = DeliveryWorker(channels={"email": {"BATCH_SIZE": 3}})
+        self.addCleanup(worker.close)
+
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1", EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False, EMAIL_USE_SSL=False, EMAIL_HOST_USER="", EMAIL_HOST_PASSWORD="",
+        ):
+            stats = DeliveryService(worker=worker).process_due()
+
+        self.assertEqual((stats["sent"], stats["failed"]), (5, 0))
+        self.assertEqual(len(self.smtp.messages), 5)
+        self.assertEqual(self.smtp.connections, 2)
+        self.assertEqual(NotificationDelivery.objects.filter(status=DeliveryStatus.SENT).count(), 5)
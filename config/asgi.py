@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
+
+# Chỉ web server dựng sẵn search index cho /symbols/by-name (không chặn startup)
+from apps.stock.services.symbol_search import warm_symbol_search  # noqa: E402
+
+warm_symbol_search()
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     "apps.seapay",
     "apps.logs.apps.LogsConfig",
     "apps.notification.apps.NotificationConfig",
+    "apps.jobs.apps.JobsConfig",
     "core",
 ]
 
@@ -203,6 +204,98 @@ CACHES = {
     }
 }
 
+# Cache dữ liệu vnstock (bundle/DataFrame) dùng chung giữa các process, còn sau restart.
+# BACKEND: "sqlite" (file dùng chung) hoặc "django" (dùng CACHES['default'])
+VNSTOCK_CACHE = {
+    'BACKEND': os.getenv('VNSTOCK_CACHE_BACKEND', 'sqlite'),
+    'LOCATION': os.getenv('VNSTOCK_CACHE_PATH', str(BASE_DIR.parent / '.cache' / 'vnstock_cache.sqlite3')),
+    'COMPRESS_LEVEL': int(os.getenv('VNSTOCK_CACHE_COMPRESS_LEVEL', '6')),
+    # Hit/miss gom trong RAM, cộng dồn xuống file cache tối đa mỗi N giây (không ghi mỗi lần đọc)
+    'METRICS_FLUSH_INTERVAL': float(os.getenv('VNSTOCK_CACHE_METRICS_FLUSH_INTERVAL', '10')),
+    # Trả company bundle đã hết hạn ngay và refresh ở background
+    'STALE_WHILE_REVALIDATE': _env_bool('VNSTOCK_CACHE_STALE_WHILE_REVALIDATE', 'True'),
+}
+
+# Rate limit gọi vnstock, state dùng chung giữa các process (BACKEND "sqlite" | "memory").
+# BUDGETS: quota riêng theo prefix endpoint; các prefix cùng "bucket" thì dùng chung quota, vd.
+#   {"calculate_finance": {"calls_per_minute": 15},
+#    "company_bundle": {"calls_per_minute": 15, "bucket": "company"}}
+VNSTOCK_RATE_LIMIT = {
+    'BACKEND': os.getenv('VNSTOCK_RATE_LIMIT_BACKEND', 'sqlite'),
+    'LOCATION': os.getenv('VNSTOCK_RATE_LIMIT_PATH', str(BASE_DIR.parent / '.cache' / 'vnstock_rate_limit.sqlite3')),
+    'CALLS_PER_MINUTE': int(os.getenv('VNSTOCK_CALLS_PER_MINUTE', '30')),
+    'CALLS_PER_HOUR': int(os.getenv('VNSTOCK_CALLS_PER_HOUR', '500')),
+    'MIN_INTERVAL': float(os.getenv('VNSTOCK_MIN_INTERVAL', '2.5')),
+    'BUDGETS': {},
+    # Adaptive backoff: pause theo retry-after của upstream, rồi tăng tốc lại dạng AIMD.
+    # AIMD_MAX_FACTOR > 1 cho phép thăm dò vượt các limit trên khi upstream không chặn.
+    'BACKOFF_SECONDS': float(os.getenv('VNSTOCK_BACKOFF_SECONDS', '15')),
+    'MAX_BACKOFF_SECONDS': float(os.getenv('VNSTOCK_MAX_BACKOFF_SECONDS', '120')),
+    'BACKOFF_MARGIN': float(os.getenv('VNSTOCK_BACKOFF_MARGIN', '1')),
+    'AIMD_DECREASE': float(os.getenv('VNSTOCK_AIMD_DECREASE', '0.5')),
+    'AIMD_INCREASE': float(os.getenv('VNSTOCK_AIMD_INCREASE', '0.1')),
+    'AIMD_QUIET_PERIOD': float(os.getenv('VNSTOCK_AIMD_QUIET_PERIOD', '60')),
+    'AIMD_MIN_FACTOR': float(os.getenv('VNSTOCK_AIMD_MIN_FACTOR', '0.1')),
+    'AIMD_MAX_FACTOR': float(os.getenv('VNSTOCK_AIMD_MAX_FACTOR', '1')),
+}
+
+# Search index trong process cho /api/stocks/symbols/by-name
+SYMBOL_SEARCH = {
+    # Dựng sẵn index khi web server (wsgi/asgi) khởi động; tắt thì dựng ở lần search đầu
+    'WARM_ON_STARTUP': os.getenv('SYMBOL_SEARCH_WARM_ON_STARTUP', 'False') == 'True',
+    'CHECK_INTERVAL': float(os.getenv('SYMBOL_SEARCH_CHECK_INTERVAL', '30')),  # giây giữa 2 lần so fingerprint DB
+    'FUZZY_THRESHOLD': float(os.getenv('SYMBOL_SEARCH_FUZZY_THRESHOLD', '0.5')),
+}
+
+# Cache entitlement (symbol license) của user giữa các request, giây
+ENTITLEMENT_CACHE_TTL = int(os.getenv('ENTITLEMENT_CACHE_TTL', '60'))
+
+# Cache /api/calculate/symbols/{id}/financials (bị vô hiệu khi import kỳ mới), giây
+FINANCIALS_CACHE_TTL = int(os.getenv('FINANCIALS_CACHE_TTL', str(6 * 3600)))
+
+# Snapshot dạng cột cho /api/calculate/screen
+FINANCIAL_SNAPSHOT = {
+    'MAX_PERIODS': int(os.getenv('FINANCIAL_SNAPSHOT_MAX_PERIODS', '12')),  # số quý gần nhất giữ trong RAM
+    'CHECK_INTERVAL': float(os.getenv('FINANCIAL_SNAPSHOT_CHECK_INTERVAL', '60')),  # giây giữa 2 lần so fingerprint DB
+}
+
+# Job nền trong DB (python manage.py run_jobs), giây
+JOBS = {
+    'FLUSH_INTERVAL': float(os.getenv('JOBS_FLUSH_INTERVAL', '2')),  # chu kỳ ghi progress/checkpoint + kiểm tra hủy
+    'POLL_INTERVAL': float(os.getenv('JOBS_POLL_INTERVAL', '2')),  # worker rảnh chờ bao lâu trước khi claim lại
+    'STALE_AFTER': int(os.getenv('JOBS_STALE_AFTER', '300')),  # job RUNNING mất heartbeat lâu hơn -> chạy lại
+    'HEARTBEAT_INTERVAL': float(os.getenv('JOBS_HEARTBEAT_INTERVAL', '60')),  # thread nền ghi heartbeat khi handler chạy (< STALE_AFTER)
+}
+
+# Gửi thông báo: cỡ nhóm deliveries mỗi lần gửi/ghi status và giới hạn của từng kênh
+NOTIFICATION_DISPATCH = {
+    'CHUNK_SIZE': int(os.getenv('NOTIFICATION_DISPATCH_CHUNK_SIZE', '200')),
+    'BULK_BATCH_SIZE': int(os.getenv('NOTIFICATION_DISPATCH_BULK_BATCH_SIZE', '500')),  # số dòng mỗi INSERT bulk events/deliveries
+    'HTTP_TIMEOUT': float(os.getenv('NOTIFICATION_DISPATCH_HTTP_TIMEOUT', '10')),
+    # Hàng đợi retry (python manage.py notification_worker), giây
+    'MAX_ATTEMPTS': int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '5')),  # quá số lần này -> dead-letter
+    'RETRY_BASE_DELAY': float(os.getenv('NOTIFICATION_RETRY_BASE_DELAY', '30')),  # 30s, 60s, 120s... + jitter
+    'RETRY_MAX_DELAY': float(os.getenv('NOTIFICATION_RETRY_MAX_DELAY', '3600')),
+    'POLL_INTERVAL': float(os.getenv('NOTIFICATION_POLL_INTERVAL', '1')),  # worker rảnh chờ bao lâu trước khi claim lại
+    'STALE_AFTER': int(os.getenv('NOTIFICATION_STALE_AFTER', '300')),  # SENDING lâu hơn -> worker chết, gửi lại
+    # RATE_PER_SECOND là quota chung của mọi process (token nằm trong state của VNSTOCK_RATE_LIMIT),
+    # CONCURRENCY tính riêng từng process
+    'CHANNELS': {
+        # Telegram giới hạn ~30 tin/giây cho 1 bot
+        'telegram': {
+            'CONCURRENCY': int(os.getenv('NOTIFICATION_TELEGRAM_CONCURRENCY', '10')),
+            'RATE_PER_SECOND': float(os.getenv('NOTIFICATION_TELEGRAM_RATE', '25')),
+        },
+        'zalo': {
+            'CONCURRENCY': int(os.getenv('NOTIFICATION_ZALO_CONCURRENCY', '5')),
+            'RATE_PER_SECOND': float(os.getenv('NOTIFICATION_ZALO_RATE', '10')),
+        },
+        'email': {
+            'BATCH_SIZE': int(os.getenv('NOTIFICATION_EMAIL_BATCH_SIZE', '50')),  # số email / 1 kết nối SMTP
+        },
+    },
+}
+
 # =========================
 # EMAIL SETTINGS
 # =========================
@@ -23,3 +23,31 @@ DEBUG = True
 CORS_ALLOWED_ORIGINS = []
 
 ALLOWED_HOSTS = ["testserver", "localhost", "127.0.0.1"]
+
+# Keep the vnstock cache in-process for tests (no shared file on disk)
+VNSTOCK_CACHE = {
+    "BACKEND": "django",
+}
+
+VNSTOCK_RATE_LIMIT = {
+    "BACKEND": "memory",
+}
+
+# Search index: không warm-up bằng thread, luôn so fingerprint (DB đổi giữa các test)
+SYMBOL_SEARCH = {
+    "WARM_ON_STARTUP": False,
+    "CHECK_INTERVAL": 0,
+}
+
+FINANCIAL_SNAPSHOT = {
+    "MAX_PERIODS": 12,
+    "CHECK_INTERVAL": 0,
+}
+
+JOBS = {
+    "FLUSH_INTERVAL": 0,
+    "POLL_INTERVAL": 0,
+    "STALE_AFTER": 300,
+    # Không chạy thread heartbeat: SQLite in-memory của test không dùng được từ thread khác
+    "HEARTBEAT_INTERVAL": 0,
+}
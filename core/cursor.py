@@ -0,0 +1,31 @@
+"""
+Keyset (cursor) pagination helpers dùng chung cho các API list.
+
+Cursor là base64 (urlsafe) của JSON chứa giá trị các cột sort của row cuối trang,
+client chỉ cần gửi lại nguyên chuỗi next_cursor.
+"""
+import base64
+import json
+from typing import Any, Dict, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from ninja.errors import HttpError
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, cls=DjangoJSONEncoder, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """None nếu không có cursor; cursor hỏng -> HTTP 400"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HttpError(400, "Invalid cursor")
+    if not isinstance(values, dict):
+        raise HttpError(400, "Invalid cursor")
+    return values